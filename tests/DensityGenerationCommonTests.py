@@ -1,9 +1,31 @@
+import json
 import os
 import shutil
+import sys
 import tempfile
 import unittest
 
-from wwpdb.utils.dp.electron_density.common_functions import run_command_and_check_output_file
+from wwpdb.utils.dp.electron_density.common_functions import (
+    convert_mdb_to_binary_cif_levels,
+    get_detail_output_path,
+    query_mdb_maps,
+    run_command_and_check_output_file,
+)
+
+# stands in for volume-server-query - writes the output file of each job and counts its runs
+FAKE_QUERY = """
+import json, os, sys
+jobs_path = sys.argv[sys.argv.index("--jobs") + 1]
+with open(jobs_path) as ifh:
+    jobs = json.load(ifh)
+with open(os.path.join(os.path.dirname(jobs_path), "runs.txt"), "a") as ofh:
+    ofh.write("run\\n")
+for job in jobs:
+    if job["source"]["filename"] == "missing.mdb":
+        sys.exit(1)
+    with open(os.path.join(job["outputFolder"], job["outputFilename"]), "w") as ofh:
+        ofh.write("detail %d\\n" % job["params"]["detail"])
+"""
 
 
 class MyTestCase(unittest.TestCase):
@@ -37,6 +59,58 @@ class MyTestCase(unittest.TestCase):
         ok = run_command_and_check_output_file(command=command, output_file=self.temp_out_map, process_name="test")
         self.assertTrue(ok)
 
+    def __writeFakeQuery(self):
+        query_path = os.path.join(self.working_dir, "fake_query.py")
+        with open(query_path, "w") as ofh:
+            ofh.write(FAKE_QUERY)
+        return query_path
+
+    def test_query_mdb_maps_single_run(self):
+        query_path = self.__writeFakeQuery()
+        bcif_files = query_mdb_maps(
+            node_path=sys.executable,
+            volume_server_query_path=query_path,
+            mdb_maps=[("2fofc", "x-ray", "a.mdb"), ("em_volume", "em", "b.mdb")],
+            detail_levels=[0, 2, 4],
+            working_dir=self.working_dir,
+        )
+        self.assertEqual(sorted(bcif_files), ["2fofc", "em_volume"])
+        self.assertEqual(sorted(bcif_files["em_volume"]), [0, 2, 4])
+        with open(bcif_files["em_volume"][2]) as ifh:
+            self.assertEqual(ifh.read(), "detail 2\n")
+        with open(os.path.join(self.working_dir, "runs.txt")) as ifh:
+            self.assertEqual(ifh.read().count("run"), 1)
+        with open(os.path.join(self.working_dir, "conversion.json")) as ifh:
+            self.assertEqual(len(json.load(ifh)), 6)
+
+    def test_convert_mdb_to_binary_cif_levels(self):
+        query_path = self.__writeFakeQuery()
+        output_file = os.path.join(self.working_dir, "out", "map.bcif")
+        output_files = {1: output_file, 3: get_detail_output_path(output_file, 3)}
+        self.assertEqual(output_files[3], os.path.join(self.working_dir, "out", "map_d3.bcif"))
+        ret = convert_mdb_to_binary_cif_levels(
+            node_path=sys.executable,
+            volume_server_query_path=query_path,
+            map_id="em_volume",
+            source_id="em",
+            mdb_map_path="em.mdb",
+            output_files=output_files,
+            working_dir=self.working_dir,
+        )
+        self.assertEqual(ret, output_files)
+        with open(output_files[3]) as ifh:
+            self.assertEqual(ifh.read(), "detail 3\n")
+        ret = convert_mdb_to_binary_cif_levels(
+            node_path=sys.executable,
+            volume_server_query_path=query_path,
+            map_id="em_volume",
+            source_id="em",
+            mdb_map_path="missing.mdb",
+            output_files=output_files,
+            working_dir=self.working_dir,
+        )
+        self.assertEqual(ret, {})
+
     def tearDown(self):
         shutil.rmtree(self.working_dir, ignore_errors=True)
 
@@ -0,0 +1,69 @@
+##
+# File:    FileLinkerTests.py
+# Date:    17-Oct-2026
+#
+# Update:
+##
+"""
+Test cases for linking files between the steps of an operation chain
+
+"""
+
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+from wwpdb.utils.dp import FileLinker
+from wwpdb.utils.dp.FileLinker import METHOD_COPY, METHOD_HARDLINK, METHOD_REFLINK, linkFile, unshareFile
+
+
+class FileLinkerTests(unittest.TestCase):
+    def setUp(self):
+        self.__wrkPath = tempfile.mkdtemp()
+        self.__srcPath = os.path.join(self.__wrkPath, "result_file_1")
+        with open(self.__srcPath, "w") as ofh:
+            ofh.write("data_test\n")
+
+    def tearDown(self):
+        shutil.rmtree(self.__wrkPath, ignore_errors=True)
+
+    def __read(self, fPath):
+        with open(fPath) as ifh:
+            return ifh.read()
+
+    def testLinkFile(self):
+        dstPath = os.path.join(self.__wrkPath, "input_file_2")
+        with open(dstPath, "w") as ofh:
+            ofh.write("stale\n")
+        method = linkFile(self.__srcPath, dstPath)
+        self.assertIn(method, (METHOD_REFLINK, METHOD_HARDLINK))
+        self.assertEqual(self.__read(dstPath), "data_test\n")
+        self.assertEqual(os.path.samefile(self.__srcPath, dstPath), method == METHOD_HARDLINK)
+        self.assertEqual(sorted(os.listdir(self.__wrkPath)), ["input_file_2", "result_file_1"])
+
+    def testFallbacks(self):
+        dstPath = os.path.join(self.__wrkPath, "input_file_2")
+        with mock.patch.object(FileLinker, "reflinkFile", return_value=False):
+            self.assertEqual(linkFile(self.__srcPath, dstPath), METHOD_HARDLINK)
+            self.assertTrue(os.path.samefile(self.__srcPath, dstPath))
+            self.assertEqual(linkFile(self.__srcPath, dstPath, allowHardlink=False), METHOD_COPY)
+            self.assertFalse(os.path.samefile(self.__srcPath, dstPath))
+            with mock.patch.object(os, "link", side_effect=OSError("cross-device link")):
+                self.assertEqual(linkFile(self.__srcPath, dstPath), METHOD_COPY)
+        self.assertEqual(self.__read(dstPath), "data_test\n")
+
+    def testUnshareFile(self):
+        dstPath = os.path.join(self.__wrkPath, "input_file_1")
+        os.link(self.__srcPath, dstPath)
+        self.assertTrue(unshareFile(dstPath))
+        self.assertFalse(os.path.samefile(self.__srcPath, dstPath))
+        with open(dstPath, "w") as ofh:
+            ofh.write("rewritten\n")
+        self.assertEqual(self.__read(self.__srcPath), "data_test\n")
+        self.assertFalse(unshareFile(dstPath))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -7,10 +7,15 @@ Test cases for SF Map coefficients
 
 """
 
+import gzip
 import logging
 import os
 import unittest
 
+import gemmi
+import numpy as np
+from mmcif.io.IoAdapterCore import IoAdapterCore
+
 if __package__ is None or __package__ == "":
     import sys
     from os import path
@@ -20,7 +25,7 @@ if __package__ is None or __package__ == "":
 else:
     from .commonsetup import TESTOUTPUT, mockTopPath, toolsmissing
 
-from wwpdb.utils.dp.PdbxSFMapCoefficients import PdbxSFMapCoefficients
+from wwpdb.utils.dp.PdbxSFMapCoefficients import PdbxSFMapCoefficients, probe_map_coeff
 
 logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s]-%(module)s.%(funcName)s: %(message)s")
 logger = logging.getLogger()
@@ -53,6 +58,104 @@ class PdbxSFTests(unittest.TestCase):
         self.assertTrue(os.path.exists(foout))
         self.assertTrue(os.path.exists(twofoout))
 
+    def testMmcifSinglePass(self):
+        """Tests writing both coefficient files from a PDBx/mmCIF SF file"""
+        sffile = os.path.join(TESTOUTPUT, "coef-sf.cif")
+        foout = os.path.join(TESTOUTPUT, "mmcif-fo.cif")
+        twofoout = os.path.join(TESTOUTPUT, "mmcif-2fo.cif")
+        with open(sffile, "w") as ofh:
+            ofh.write(
+                "data_r1abcsf\n_entry.id 1abc\n_audit.revision_id 1\n_cell.entry_id 1abc\n_cell.length_a 70.067\n"
+                "_symmetry.entry_id 1abc\n_symmetry.space_group_name_H-M 'P 21 21 21'\n"
+                "loop_\n_refln.index_h\n_refln.index_k\n_refln.index_l\n_refln.status\n_refln.F_meas_au\n_refln.fom\n"
+                "_refln.pdbx_FWT\n_refln.pdbx_PHWT\n_refln.pdbx_DELFWT\n_refln.pdbx_DELPHWT\n"
+                "0 0 4 o 1000.0 1.00 1043.98 360.00 164.51 180.00\n0 1 5 f 150.0 ? 156.48 270.00 3.65 270.00\n"
+            )
+        psf = PdbxSFMapCoefficients()
+        self.assertTrue(psf.read_mmcif_sf(sffile))
+        self.assertTrue(psf.has_map_coeff())
+        self.assertTrue(psf.write_mmcif_coef(foout, twofoout, "zyxw"))
+        io = IoAdapterCore()
+        block = io.readFile(foout)[0]
+        self.assertEqual(block.getName(), "zyxwfo")
+        self.assertEqual(block.getObjNameList(), ["entry", "cell", "symmetry", "refln"])
+        self.assertEqual(block.getObj("entry").getValue("id", 0), "zyxw")
+        self.assertEqual(block.getObj("symmetry").getValue("space_group_name_H-M", 0), "P 21 21 21")
+        refln = block.getObj("refln")
+        self.assertEqual(refln.getAttributeList(), ["index_h", "index_k", "index_l", "fom", "pdbx_DELFWT", "pdbx_DELPHWT"])
+        self.assertEqual(refln.getRowList(), [["0", "0", "4", "1.00", "164.51", "180.00"], ["0", "1", "5", "?", "3.65", "270.00"]])
+        refln = io.readFile(twofoout)[0].getObj("refln")
+        self.assertEqual(refln.getAttributeList(), ["index_h", "index_k", "index_l", "fom", "pdbx_FWT", "pdbx_PHWT"])
+        self.assertEqual(refln.getRow(1), ["0", "1", "5", "?", "156.48", "270.00"])
+        # the input block is left unchanged
+        self.assertTrue(psf.has_map_coeff())
+        #
+        # header probe without reading the files in
+        self.assertTrue(PdbxSFMapCoefficients().has_map_coeff(sffile))
+        self.assertFalse(probe_map_coeff(foout))
+        self.assertFalse(probe_map_coeff(os.path.join(TESTOUTPUT, "missing-sf.cif")))
+        gzfile = os.path.join(TESTOUTPUT, "coef-sf.cif.gz")
+        with open(sffile, "rb") as ifh, gzip.open(gzfile, "wb") as ofh:
+            ofh.write(ifh.read())
+        self.assertTrue(probe_map_coeff(gzfile))
+
+    def testProbeMapCoeff(self):
+        """Tests probing SF file headers for map coefficients"""
+        sffile = os.path.join(TESTOUTPUT, "probe-sf.cif")
+        header = "loop_\n_refln.index_h\n_refln.index_k\n_refln.index_l\n_refln.fom\n_refln.pdbx_FWT\n_refln.pdbx_PHWT\n"
+        text = "data_r1abcsf\n_entry.id 1abc\n_pdbx_audit.details\n;\n_refln.pdbx_DELFWT\n_refln.pdbx_DELPHWT\n;\n" + header + "0 0 4 1.0 2.0 3.0\n"
+        for extra, expected in (
+            ("", False),
+            ("_refln.pdbx_DELFWT\n_refln.pdbx_DELPHWT\n", True),
+            ("# tags of a later loop are not part of the header\n0 0 5 1.0 2.0 3.0\nloop_\n_refln.pdbx_DELFWT\n_refln.pdbx_DELPHWT\n", False),
+        ):
+            with open(sffile, "w") as ofh:
+                ofh.write(text.replace("_refln.pdbx_PHWT\n", "_refln.pdbx_PHWT\n" + extra))
+            self.assertEqual(probe_map_coeff(sffile), expected, extra)
+        # only the first data block is considered
+        with open(sffile, "w") as ofh:
+            ofh.write("data_r1abcsf\n" + header + "0 0 4 1.0 2.0 3.0\ndata_r1abcAsf\n" + header + "_refln.pdbx_DELFWT\n_refln.pdbx_DELPHWT\n")
+        self.assertFalse(probe_map_coeff(sffile))
+
+    def __writeMtz(self, pathout, labels):
+        mtz = gemmi.Mtz(with_base=True)
+        mtz.spacegroup = gemmi.find_spacegroup_by_name("P 21 21 21")
+        mtz.set_cell_for_all(gemmi.UnitCell(70.067, 73.945, 74.392, 90, 90, 90))
+        mtz.add_dataset("coef")
+        for label in labels:
+            mtz.add_column(label, "P" if label.startswith("PH") else "W" if label == "FOM" else "F")
+        data = np.array([[0, 0, 4, 1043.98, -0.001, 164.51, 180.0, 1.0], [0, 1, 5, 156.48, -90.0, 3.65, 270.0, np.nan]], dtype=np.float32)
+        mtz.set_data(data[:, : 3 + len(labels)])
+        mtz.write_to_file(pathout)
+
+    def testMtzGemmi(self):
+        """Tests writing map coefficients read from an MTZ file in process"""
+        mtzfile = os.path.join(TESTOUTPUT, "coef.mtz")
+        foout = os.path.join(TESTOUTPUT, "gemmi-fo.cif")
+        twofoout = os.path.join(TESTOUTPUT, "gemmi-2fo.cif")
+        self.__writeMtz(mtzfile, ["FWT", "PHWT", "DELFWT", "PHDELWT", "FOM"])
+        psf = PdbxSFMapCoefficients()
+        self.assertTrue(psf.read_mtz_sf(mtzfile))
+        self.assertTrue(psf.has_map_coeff())
+        self.assertTrue(psf.write_mmcif_coef(foout, twofoout, "zyxw"))
+        #
+        io = IoAdapterCore()
+        block = io.readFile(twofoout)[0]
+        self.assertEqual(block.getName(), "zyxw2fo")
+        self.assertEqual(block.getObj("symmetry").getValue("space_group_name_H-M", 0), "P 21 21 21")
+        self.assertEqual(block.getObj("cell").getValue("length_b", 0), "73.945")
+        refln = block.getObj("refln")
+        self.assertEqual(refln.getAttributeList(), ["index_h", "index_k", "index_l", "pdbx_FWT", "pdbx_PHWT", "fom"])
+        self.assertEqual(refln.getRow(0), ["0", "0", "4", "1043.98", "360.00", "1.00"])
+        self.assertEqual(refln.getRow(1), ["0", "1", "5", "156.48", "270.00", "?"])
+        refln = io.readFile(foout)[0].getObj("refln")
+        self.assertEqual(refln.getAttributeList(), ["index_h", "index_k", "index_l", "pdbx_DELFWT", "pdbx_DELPHWT", "fom"])
+        self.assertEqual(refln.getRow(0), ["0", "0", "4", "164.51", "180.00", "1.00"])
+        #
+        self.__writeMtz(mtzfile, ["FWT", "PHWT"])
+        self.assertTrue(psf.read_mtz_sf(mtzfile))
+        self.assertFalse(psf.has_map_coeff())
+
 
 if __name__ == "__main__":
     # Run all tests --
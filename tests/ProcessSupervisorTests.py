@@ -0,0 +1,82 @@
+##
+# File:    ProcessSupervisorTests.py
+# Date:    17-Oct-2026
+#
+# Update:
+##
+"""
+Test cases for event driven process supervision
+
+"""
+
+import os
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+from unittest import mock
+
+from wwpdb.utils.dp.ProcessSupervisor import ProcessSupervisor
+
+
+class ProcessSupervisorTests(unittest.TestCase):
+    def setUp(self):
+        self.working_dir = tempfile.mkdtemp()
+        self.log_path = os.path.join(self.working_dir, "step.log")
+
+    def tearDown(self):
+        shutil.rmtree(self.working_dir, ignore_errors=True)
+
+    def test_return_code(self):
+        self.assertEqual(ProcessSupervisor("exit 3").run(), 3)
+        ps = ProcessSupervisor("true")
+        self.assertEqual(ps.run(), 0)
+        self.assertIsNotNone(ps.rusage)
+        self.assertGreaterEqual(ps.getElapsedTime(), 0.0)
+
+    def test_output_streamed_to_log(self):
+        # More output than a pipe buffer holds must not block the child
+        ps = ProcessSupervisor("head -c 1000000 /dev/zero; echo done 1>&2", logPath=self.log_path, timeout=30)
+        self.assertEqual(ps.run(), 0)
+        self.assertFalse(ps.timedOut)
+        self.assertEqual(os.path.getsize(self.log_path), 1000005)
+
+    def test_timeout(self):
+        start = time.time()
+        ps = ProcessSupervisor("sleep 30 & sleep 30", timeout=0.5)
+        self.assertIsNone(ps.run())
+        self.assertTrue(ps.timedOut)
+        self.assertLess(time.time() - start, 10)
+
+    def test_timeout_without_pidfd(self):
+        with mock.patch.object(os, "pidfd_open", None, create=True):
+            ps = ProcessSupervisor("sleep 30", timeout=0.5)
+            self.assertIsNone(ps.run())
+            self.assertTrue(ps.timedOut)
+            self.assertEqual(ProcessSupervisor("exit 2").run(), 2)
+
+    def test_kill(self):
+        ps = ProcessSupervisor("sleep 30")
+        ps.start()
+        threading.Timer(0.2, ps.kill).start()
+        self.assertLess(ps.wait(), 0)
+        self.assertTrue(ps.killed)
+        self.assertFalse(ps.kill())
+
+    def test_concurrent_wait(self):
+        ps = ProcessSupervisor("sleep 0.3; exit 4")
+        ps.start()
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(ps.wait())) for _ in range(8)]
+        for th in threads:
+            th.start()
+        for th in threads:
+            th.join()
+        self.assertEqual(results, [4] * 8)
+        self.assertIsNotNone(ps.rusage)
+        self.assertIsNotNone(ps.endTime)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,135 @@
+##
+# File:    RcsbDpBatchTests.py
+# Date:    17-Oct-2026
+#
+# Update:
+##
+"""
+Test cases for the multi-entry batch driver
+
+"""
+
+import logging
+import os
+import shutil
+import tempfile
+import unittest
+
+if __package__ is None or __package__ == "":
+    import sys
+    from os import path
+
+    sys.path.append(path.dirname(path.abspath(__file__)))
+    from commonsetup import TOPDIR, toolsmissing  # pylint: disable=import-error
+else:
+    from .commonsetup import TOPDIR, toolsmissing
+
+from wwpdb.utils.config.ConfigInfo import getSiteId
+
+from wwpdb.utils.dp.RcsbDpBatch import MANIFEST_FIELDS, STATUS_COMPLETED, STATUS_FAILED, RcsbDpBatch, readManifest, writeManifest
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s]-%(module)s.%(funcName)s: %(message)s")
+logger = logging.getLogger()
+
+
+class RcsbDpBatchTests(unittest.TestCase):
+    def setUp(self):
+        self.__siteId = getSiteId(defaultSiteId=None)
+        self.__batchDir = tempfile.mkdtemp()
+        self.__opList = ["annot-rcsb2pdbx-strip", "annot-complexity", "centre-of-mass"]
+        cifPath = os.path.join(TOPDIR, "tests", "test_files", "2gc2.cif")
+        self.__cifPath = cifPath
+        self.__entryList = [{"entry_id": "D_%d" % ii, "source_path": cifPath} for ii in range(5)]
+
+    def tearDown(self):
+        shutil.rmtree(self.__batchDir, ignore_errors=True)
+
+    def testBatchManifest(self):
+        """Test the result manifest of a batch run and resuming from it"""
+        batch = RcsbDpBatch(self.__batchDir, self.__opList, siteId=self.__siteId, numWorkers=2, testMode=True)
+        recList = batch.run(self.__entryList)
+        self.assertEqual([rec["entry_id"] for rec in recList], [entry["entry_id"] for entry in self.__entryList])
+        for rec in recList:
+            self.assertEqual(rec["status"], STATUS_COMPLETED)
+            self.assertEqual(rec["return_codes"], [0, 0, 0])
+        #
+        # Rerun after marking a single entry as failed - only that entry is processed again
+        manifestPath = batch.getResultManifestPath()
+        recList = readManifest(manifestPath)
+        for rec in recList:
+            rec["message"] = "first run"
+            if rec["entry_id"] == "D_2":
+                rec["status"] = STATUS_FAILED
+        writeManifest(manifestPath, recList)
+        #
+        recList = RcsbDpBatch(self.__batchDir, self.__opList, siteId=self.__siteId, numWorkers=2, testMode=True).run(self.__entryList)
+        self.assertTrue(all(rec["status"] == STATUS_COMPLETED for rec in recList))
+        self.assertEqual([rec["message"] for rec in recList], ["first run", "first run", None, "first run", "first run"])
+
+    def testBatchCsvManifest(self):
+        """Test writing the result manifest as CSV"""
+        manifestPath = os.path.join(self.__batchDir, "result.csv")
+        batch = RcsbDpBatch(self.__batchDir, self.__opList, siteId=self.__siteId, numWorkers=2, resultManifestPath=manifestPath, testMode=True)
+        batch.run(self.__entryList)
+        recList = readManifest(manifestPath)
+        self.assertEqual(len(recList), len(self.__entryList))
+        self.assertTrue(all(rec["status"] == STATUS_COMPLETED for rec in recList))
+        self.assertEqual(recList[0]["return_codes"], [0, 0, 0])
+
+    def testCsvManifestRoundTrip(self):
+        """Test that records read back from a CSV manifest equal those read back from JSON"""
+        recList = [
+            {
+                "entry_id": "D_1",
+                "source_path": self.__cifPath,
+                "status": STATUS_FAILED,
+                "failed_op": "annot-complexity",
+                "return_codes": [0, "JobStatus.FAILED"],
+                "result_path": "D_1_result",
+                "log_path": "D_1.log",
+                "elapsed": 1.25,
+                "message": "operation annot-complexity returned 'JobStatus.FAILED'",
+            },
+            {field: None for field in MANIFEST_FIELDS},
+        ]
+        recList[1].update({"entry_id": "D_2", "return_codes": [], "elapsed": 0})
+        for fileName in ("result.csv", "result.json"):
+            manifestPath = os.path.join(self.__batchDir, fileName)
+            writeManifest(manifestPath, recList)
+            self.assertEqual(readManifest(manifestPath), recList)
+
+    def testBatchFailedOp(self):
+        """Test that the chain of an entry stops at the first operation which fails"""
+        batch = RcsbDpBatch(self.__batchDir, ["xray-density-bcif", "annot-complexity"], siteId=self.__siteId, numWorkers=2)
+        recList = batch.run(self.__entryList[:2])
+        for rec in recList:
+            self.assertEqual(rec["status"], STATUS_FAILED)
+            # no map coefficients are given for the first operation, and the second is not run
+            self.assertEqual(rec["failed_op"], "xray-density-bcif")
+            self.assertEqual(rec["return_codes"], [-1])
+            self.assertIn("xray-density-bcif", rec["message"])
+            self.assertFalse(os.path.exists(rec["result_path"]))
+            # the working files of failed entries are kept
+            self.assertTrue(os.path.isdir(os.path.join(batch.getEntryDir(rec["entry_id"]), "work")))
+        # in the order the entries finished
+        self.assertEqual(sorted(readManifest(batch.getResultManifestPath()), key=lambda rec: rec["entry_id"]), recList)
+
+    @unittest.skipIf(toolsmissing, "Tools not available for testing")
+    def testBatchRealOp(self):
+        """Test running a real operation over the entries of a batch"""
+        batch = RcsbDpBatch(self.__batchDir, ["annot-complexity"], siteId=self.__siteId, numWorkers=2)
+        recList = batch.run(self.__entryList[:3])
+        for rec in recList:
+            self.assertEqual(rec["status"], STATUS_COMPLETED, rec["message"])
+            self.assertEqual(rec["return_codes"], [0])
+            self.assertIsNone(rec["failed_op"])
+            self.assertTrue(rec["result_path"].startswith(batch.getEntryDir(rec["entry_id"])))
+            with open(rec["result_path"]) as ifh:
+                self.assertIn("_pdbx_complexity.entry_complexity", ifh.read())
+            self.assertTrue(os.path.exists(rec["log_path"]))
+            # the working files of completed entries are removed
+            self.assertFalse(os.path.exists(os.path.join(batch.getEntryDir(rec["entry_id"]), "work")))
+
+
+if __name__ == "__main__":
+    unittest.main()
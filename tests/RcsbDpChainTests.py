@@ -0,0 +1,135 @@
+##
+# File:    RcsbDpChainTests.py
+# Date:    17-Oct-2026
+#
+# Update:
+##
+"""
+Test cases for running a chain of operations as a single remote job
+
+"""
+
+import json
+import logging
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+if __package__ is None or __package__ == "":
+    import sys
+    from os import path
+
+    sys.path.append(path.dirname(path.abspath(__file__)))
+    from commonsetup import TESTOUTPUT  # pylint: disable=import-error
+else:
+    from .commonsetup import TESTOUTPUT
+
+from wwpdb.utils.config.ConfigInfo import getSiteId
+
+from wwpdb.utils.dp.RcsbDpChain import runChain
+from wwpdb.utils.dp.RcsbDpUtility import RcsbDpUtility
+from wwpdb.utils.dp.RunExecutor import RunExecutor
+from wwpdb.utils.dp.RunRemote import JobStatus
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s]-%(module)s.%(funcName)s: %(message)s")
+logger = logging.getLogger()
+
+
+def fakeAnnotationStep(dp, op):
+    """Append the operation name to the step input - fails for op annot-cis-peptide"""
+    stepNo = dp.saveResult()
+    wrkPath = dp.getWorkingDir()
+    inpPath = os.path.join(wrkPath, "input_file_1" if stepNo == 1 else "result_file_%d" % (stepNo - 1))
+    with open(inpPath) as ifh:
+        text = ifh.read()
+    with open(os.path.join(wrkPath, "log_file_%d" % stepNo), "w") as ofh:
+        ofh.write("log of %s\n" % op)
+    if op == "annot-cis-peptide":
+        return -1
+    resultPath = os.path.join(wrkPath, "result_file_%d" % stepNo)
+    with open(resultPath, "w") as ofh:
+        ofh.write(text + op + "\n")
+    dp._RcsbDpUtility__resultPathList = [resultPath]  # pylint: disable=protected-access
+    return 0
+
+
+class ChainRunningExecutor(RunExecutor):
+    """Remote backend stand-in running the submitted chain in this process"""
+
+    remote = True
+
+    def __init__(self):
+        self.jobList = []
+
+    def run(self, job):
+        self.jobList.append(job)
+        specPath = job.command.split("--spec ")[-1]
+        with open(specPath) as ifh:
+            runChain(json.load(ifh))
+        return JobStatus.COMPLETED
+
+
+class RcsbDpChainTests(unittest.TestCase):
+    def setUp(self):
+        self.__siteId = getSiteId(defaultSiteId=None)
+        self.__wrkPath = tempfile.mkdtemp(dir=TESTOUTPUT)
+        self.__inpPath = os.path.join(self.__wrkPath, "input.cif")
+        with open(self.__inpPath, "w") as ofh:
+            ofh.write("data_test\n")
+
+    def tearDown(self):
+        shutil.rmtree(self.__wrkPath, ignore_errors=True)
+
+    def __makeUtility(self, executor):
+        dp = RcsbDpUtility(tmpPath=self.__wrkPath, siteId=self.__siteId)
+        dp.setWorkingDir(os.path.join(self.__wrkPath, "work"))
+        dp.setExecutor(executor)
+        dp.imp(self.__inpPath)
+        return dp
+
+    def testChainSingleJob(self):
+        """Test that a chain of operations runs as one remote job whose result is the next step result"""
+        executor = ChainRunningExecutor()
+        with mock.patch.object(RcsbDpUtility, "_RcsbDpUtility__annotationStep", fakeAnnotationStep):
+            dp = self.__makeUtility(executor)
+            self.assertEqual(dp.opChain(["annot-secondary-structure", "annot-complexity"]), JobStatus.COMPLETED)
+            self.assertEqual(len(executor.jobList), 1)
+            self.assertIn("python -m wwpdb.utils.dp.RcsbDpChain", executor.jobList[0].command)
+            outPath = os.path.join(self.__wrkPath, "out.cif")
+            self.assertTrue(dp.exp(outPath))
+            with open(outPath) as ifh:
+                self.assertEqual(ifh.read(), "data_test\nannot-secondary-structure\nannot-complexity\n")
+            self.assertEqual(dp.getResultPathList(), [os.path.join(dp.getWorkingDir(), "result_file_1")])
+            logPath = os.path.join(self.__wrkPath, "out.log")
+            dp.expLog(logPath)
+            with open(logPath) as ifh:
+                logText = ifh.read()
+            self.assertIn("log of annot-secondary-structure", logText)
+            self.assertIn("log of annot-complexity", logText)
+            # a following operation takes the chain result as input
+            self.assertEqual(dp.op("annot-complexity"), 0)
+            dp.exp(outPath)
+            with open(outPath) as ifh:
+                self.assertEqual(ifh.read().count("annot-complexity"), 2)
+
+    def testChainFailure(self):
+        executor = ChainRunningExecutor()
+        with mock.patch.object(RcsbDpUtility, "_RcsbDpUtility__annotationStep", fakeAnnotationStep):
+            dp = self.__makeUtility(executor)
+            self.assertEqual(dp.opChain(["annot-secondary-structure", "annot-cis-peptide", "annot-complexity"]), -1)
+            self.assertEqual(dp.opChain(["annot-secondary-structure", "annot-bogus"]), -1)
+        self.assertEqual(len(executor.jobList), 1)
+
+    def testChainLocal(self):
+        """Test that without a remote executor the operations run one by one"""
+        with mock.patch.object(RcsbDpUtility, "_RcsbDpUtility__annotationStep", fakeAnnotationStep):
+            dp = self.__makeUtility("inline")
+            self.assertEqual(dp.opChain(["annot-secondary-structure", "annot-complexity"]), 0)
+            self.assertEqual(dp.saveResult(), 2)
+            self.assertFalse(os.path.exists(os.path.join(dp.getWorkingDir(), "chain-1")))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,72 @@
+##
+# File:    RcsbDpOpRegistryTests.py
+# Date:    17-Oct-2026
+#
+# Update:
+##
+"""
+Test cases for the declarative operation registry
+
+"""
+
+import unittest
+
+from wwpdb.utils.dp.RcsbDpOpRegistry import OP_FAMILY_ANNOTATION, OP_FAMILY_MAXIT, OP_FAMILY_POINTSUITE, getOpDescriptor, getOpList
+
+
+class RcsbDpOpRegistryTests(unittest.TestCase):
+    def testLookup(self):
+        self.assertEqual(getOpDescriptor("cif2pdb").family, OP_FAMILY_MAXIT)
+        self.assertEqual(getOpDescriptor("annot-secondary-structure").family, OP_FAMILY_ANNOTATION)
+        self.assertIsNone(getOpDescriptor("not-an-operation"))
+        self.assertEqual(getOpList(OP_FAMILY_POINTSUITE), ["pointsuite-importmats", "pointsuite-findframe", "pointsuite-makeassembly"])
+        self.assertEqual(len(getOpList()), len(set(getOpList())))
+
+    def testRenderTemplate(self):
+        fieldD = {"iPath": "input_file_1", "oPath": "result_file_1", "tPath": "tmp.log", "lPath": "step.log", "annotBin": "/apps/bin"}
+        opDesc = getOpDescriptor("annot-secondary-structure")
+        self.assertTrue(opDesc.hasTemplate())
+        cmd = opDesc.render(fieldD, {})
+        self.assertEqual(
+            cmd,
+            "/apps/bin/GetSecondStruct -input input_file_1 -output result_file_1 -log annot-step.log"
+            " > tmp.log 2>&1 ; cat tmp.log >> step.log ; cat annot-step.log >> step.log",
+        )
+        cmd = opDesc.render(fieldD, {"ss_topology_file_path": "topology.txt"})
+        self.assertIn("-log annot-step.log -support topology.txt > tmp.log", cmd)
+        self.assertEqual(opDesc.expectedOutputs(fieldD), [])
+        self.assertIn("-mol_id 2 >", getOpDescriptor("annot-reorder-models").render(fieldD, {"model_number": "2"}))
+        self.assertIn("-conformer_id >", getOpDescriptor("annot-reorder-models").render(fieldD, {}))
+        self.assertFalse(getOpDescriptor("annot-wwpdb-validate-all").hasTemplate())
+
+    def testRenderEnvironmentAndOutputs(self):
+        fieldD = {"iPath": "input_file_1", "oPath": "result_file_1", "tPath": "tmp.log", "lPath": "step.log"}
+        fieldD.update({"annotBin": "/apps/bin", "prdccCvsPath": "/prdcc", "prdDictPath": "/prd", "prdSummarySerial": "prd.sdb", "ccDictPathIdx": "cc.idx"})
+        cmd = getOpDescriptor("prd-search").render(fieldD, {"firstmodel": "1"})
+        self.assertTrue(cmd.startswith("PRDCC_PATH=/prdcc ; export PRDCC_PATH ; PRD_DICT_PATH=/prd ; export PRD_DICT_PATH ; /apps/bin/GetPrdMatch "))
+        self.assertIn("-index prd.sdb -cc_index cc.idx -firstmodel 1 > tmp.log", cmd)
+        #
+        fieldD.update({"dictBin": "/dict/bin", "dictSdb": "/dict/pdbx.sdb"})
+        opDesc = getOpDescriptor("annot-check-cif")
+        self.assertEqual(
+            opDesc.render(fieldD, {"first_block": "y"}),
+            "/dict/bin/CifCheck -dictSdb /dict/pdbx.sdb -f input_file_1 -checkFirstBlock 2> tmp 1> tmp.log ; cat tmp >> step.log"
+            " ; touch input_file_1-parser.log ; cat input_file_1-parser.log >> step.log",
+        )
+        self.assertEqual(opDesc.expectedOutputs(fieldD), ["input_file_1-diag.log", "step.log"])
+        #
+        fieldD.update({"ePath": "step.err", "javaPath": "java", "packagePath": "/packages"})
+        opDesc = getOpDescriptor("annot-read-map-header-in-place")
+        self.assertEqual(opDesc.missingInputs({}), ["map_file_path"])
+        cmd = opDesc.render(fieldD, {"map_file_path": "/maps/em.map"})
+        self.assertTrue(cmd.startswith("java -Xms256m -Xmx256m -jar /packages/mapFix/mapFixAnot.jar -in /maps/em.map -out  dummy-out.map "))
+        self.assertTrue(cmd.endswith(" ; } 2> step.err 1> result_file_1 ; cat step.err > step.log"))
+
+    def testRequiredInputs(self):
+        opDesc = getOpDescriptor("xray-density-bcif")
+        self.assertEqual(opDesc.missingInputs({"two_fofc_cif": "2fofc.cif"}), ["one_fofc_cif"])
+        self.assertEqual(opDesc.missingInputs({"two_fofc_cif": "2fofc.cif", "one_fofc_cif": "fofc.cif"}), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,143 @@
+##
+# File:    RcsbDpResourcePredictorTests.py
+# Date:    17-Oct-2026
+#
+# Update:
+##
+"""
+Test cases for sizing remote jobs from the resource history of earlier steps
+
+"""
+
+import logging
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+if __package__ is None or __package__ == "":
+    import sys
+    from os import path
+
+    sys.path.append(path.dirname(path.abspath(__file__)))
+    from commonsetup import TESTOUTPUT, TOPDIR  # pylint: disable=import-error
+else:
+    from .commonsetup import TESTOUTPUT, TOPDIR
+
+from wwpdb.utils.config.ConfigInfo import getSiteId
+
+from wwpdb.utils.dp import RcsbDpResourcePredictor as RcsbDpResourcePredictor_module
+from wwpdb.utils.dp import RunExecutor
+from wwpdb.utils.dp.RcsbDpResourcePredictor import RcsbDpResourcePredictor, getModelComplexity
+from wwpdb.utils.dp.RcsbDpUtility import RcsbDpUtility
+from wwpdb.utils.dp.RunRemote import JobStatus
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s]-%(module)s.%(funcName)s: %(message)s")
+logger = logging.getLogger()
+
+
+REMOTE_JOB_LIST = []
+
+
+class FakeRunRemote:
+    """Stand-in for RunRemote recording the requested resources"""
+
+    def __init__(
+        self,
+        command,
+        job_name,
+        log_dir,
+        run_dir=None,
+        timeout=90,
+        memory_limit=16000,
+        number_of_processors=1,
+        add_site_config=False,
+        stage_inputs=None,
+        stage_outputs=None,
+        stage_dirs=None,
+    ):
+        self.job_name = job_name
+        self.timeout = timeout
+        self.memory_limit = memory_limit
+        self.job_id = 100 + len(REMOTE_JOB_LIST)
+        self.accounting = {"wall_time": 600, "user_cpu": 590, "system_cpu": 5, "max_rss_kb": 3 * 1024 * 1024, "read_kb": 0, "write_kb": 0}
+        REMOTE_JOB_LIST.append(self)
+
+    def run(self):
+        return JobStatus.COMPLETED
+
+
+class RcsbDpResourcePredictorTests(unittest.TestCase):
+    def setUp(self):
+        self.__siteId = getSiteId(defaultSiteId=None)
+        self.__wrkPath = tempfile.mkdtemp(dir=TESTOUTPUT)
+        self.__dbPath = os.path.join(self.__wrkPath, "history", "resources.sqlite")
+        self.__cifPath = os.path.join(TOPDIR, "tests", "test_files", "2gc2.cif")
+
+    def tearDown(self):
+        shutil.rmtree(self.__wrkPath, ignore_errors=True)
+
+    def testPredict(self):
+        rP = RcsbDpResourcePredictor(self.__dbPath, margin=1.5, minRecords=3, neighbours=2, minMemory=100, minTime=1)
+        self.assertIsNone(rP.predict("op-a", 1000))
+        # peak memory 1, 2 and 8 GB with run times of 1, 2 and 8 minutes
+        for inputSize, gb in ((1000, 1), (2000, 2), (8000, 8)):
+            self.assertTrue(rP.record("op-a", inputSize, None, gb * 1024 * 1024, gb * 60.0))
+        self.assertFalse(rP.record("op-a", 1000, None, None, 10.0))
+        self.assertEqual(rP.getRecordCount("op-a"), 3)
+        self.assertIsNone(rP.predict("op-b", 1000))
+        self.assertIsNone(rP.predict("op-a", 1000, numThreads=4))
+        # nearest runs are those with 1000 and 2000 byte inputs
+        self.assertEqual(rP.predict("op-a", 1000), (3072, 3))
+        # larger inputs than any recorded scale the request up
+        self.assertEqual(rP.predict("op-a", 16000), (24576, 24))
+        # history is shared through the file
+        self.assertEqual(RcsbDpResourcePredictor(self.__dbPath, minRecords=4).predict("op-a", 1000), None)
+        rP = RcsbDpResourcePredictor(self.__dbPath, margin=1.0, minRecords=1, maxHistory=2, minMemory=5000, minTime=1)
+        self.assertEqual(rP.predict("op-a", 1000), (8192, 8))
+        rP.record("op-a", 4000, None, 1024, 60.0)
+        self.assertEqual(rP.predict("op-a", 4000), (8192, 8))
+        self.assertEqual(rP.getRecordCount("op-a"), 2)
+
+    def testModelComplexity(self):
+        self.assertGreater(getModelComplexity(self.__cifPath), 0)
+        textPath = os.path.join(self.__wrkPath, "map.txt")
+        with open(textPath, "w") as ofh:
+            ofh.write("not a model\n")
+        self.assertIsNone(getModelComplexity(textPath))
+        self.assertIsNone(getModelComplexity(os.path.join(self.__wrkPath, "missing.cif")))
+
+    def testModelComplexityCache(self):
+        """Test that the model complexity is computed once for each path and modification time"""
+        cifPath = os.path.join(self.__wrkPath, "model.cif")
+        shutil.copyfile(self.__cifPath, cifPath)
+        complexity = getModelComplexity(cifPath)
+        with mock.patch.object(RcsbDpResourcePredictor_module, "PdbxModelCompletity") as pmcMock:
+            self.assertEqual(getModelComplexity(cifPath), complexity)
+            self.assertEqual(pmcMock.call_count, 0)
+            st = os.stat(cifPath)
+            os.utime(cifPath, ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+            getModelComplexity(cifPath)
+            self.assertEqual(pmcMock.call_count, 1)
+
+    def testRemoteSizing(self):
+        """Test that remote jobs are sized from the recorded history once enough steps have run"""
+        del REMOTE_JOB_LIST[:]
+        with mock.patch.object(RunExecutor, "RunRemote", FakeRunRemote):
+            for _ii in range(4):
+                dp = RcsbDpUtility(tmpPath=self.__wrkPath, siteId=self.__siteId)
+                dp.setWorkingDir(tempfile.mkdtemp(dir=self.__wrkPath))
+                dp.setRunRemote()
+                dp.setResourcePredictor(self.__dbPath, minRecords=3, margin=1.25)
+                dp.imp(self.__cifPath)
+                dp._RcsbDpUtility__stepInputPath = self.__cifPath  # pylint: disable=protected-access
+                lPathFull = os.path.join(dp.getWorkingDir(), "log_file_1")
+                self.assertEqual(dp._RcsbDpUtility__run("true", lPathFull, "test-op"), JobStatus.COMPLETED)  # pylint: disable=protected-access
+        self.assertEqual([job.memory_limit for job in REMOTE_JOB_LIST], [2000, 2000, 2000, 3840])
+        self.assertEqual([job.timeout for job in REMOTE_JOB_LIST], [0, 0, 0, 13])
+        self.assertEqual(RcsbDpResourcePredictor(self.__dbPath).getRecordCount("test-op"), 4)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,170 @@
+##
+# File:    RcsbDpResultCacheTests.py
+# Date:    17-Oct-2026
+#
+# Update:
+##
+"""
+Test cases for the content-addressed cache of operation results
+
+"""
+
+import functools
+import logging
+import os
+import shutil
+import tempfile
+import time
+import unittest
+from unittest import mock
+
+if __package__ is None or __package__ == "":
+    import sys
+    from os import path
+
+    sys.path.append(path.dirname(path.abspath(__file__)))
+    from commonsetup import TESTOUTPUT, TOPDIR, modified_environ, toolsmissing  # pylint: disable=import-error
+else:
+    from .commonsetup import TESTOUTPUT, TOPDIR, modified_environ, toolsmissing
+
+from wwpdb.utils.config.ConfigInfo import getSiteId
+
+from wwpdb.utils.dp.RcsbDpOpRegistry import OP_FAMILY_ANNOTATION
+from wwpdb.utils.dp.RcsbDpResultCache import RcsbDpResultCache
+from wwpdb.utils.dp.RcsbDpUtility import RcsbDpUtility
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s]-%(module)s.%(funcName)s: %(message)s")
+logger = logging.getLogger()
+
+
+class RcsbDpResultCacheTests(unittest.TestCase):
+    def setUp(self):
+        self.__siteId = getSiteId(defaultSiteId=None)
+        self.__wrkPath = tempfile.mkdtemp(dir=TESTOUTPUT)
+        self.__cacheDir = os.path.join(self.__wrkPath, "cache")
+        self.__cifPath = os.path.join(TOPDIR, "tests", "test_files", "2gc2.cif")
+
+    def tearDown(self):
+        shutil.rmtree(self.__wrkPath, ignore_errors=True)
+
+    def __writeFile(self, fn, content):
+        fPath = os.path.join(self.__wrkPath, fn)
+        with open(fPath, "w") as ofh:
+            ofh.write(content)
+        return fPath
+
+    def testKey(self):
+        rC = RcsbDpResultCache(self.__cacheDir)
+        inpPath = self.__writeFile("input", "data")
+        key = rC.makeKey("op-a", [inpPath], {"threshold": "10"}, "tool-1")
+        self.assertEqual(key, rC.makeKey("op-a", [inpPath], {"threshold": "10"}, "tool-1"))
+        self.assertNotEqual(key, rC.makeKey("op-b", [inpPath], {"threshold": "10"}, "tool-1"))
+        self.assertNotEqual(key, rC.makeKey("op-a", [inpPath], {"threshold": "20"}, "tool-1"))
+        self.assertNotEqual(key, rC.makeKey("op-a", [inpPath], {"threshold": "10"}, "tool-2"))
+        self.__writeFile("input", "other data")
+        self.assertNotEqual(key, rC.makeKey("op-a", [inpPath], {"threshold": "10"}, "tool-1"))
+
+    def testPutGetEvict(self):
+        rC = RcsbDpResultCache(self.__cacheDir, maxSize=250)
+        keyList = []
+        evict = mock.Mock(wraps=rC.evict)
+        rC.evict = evict
+        for ii in range(3):
+            key = "%02d" % ii + "a" * 62
+            self.assertTrue(rC.put(key, "op-a", {"result_file": self.__writeFile("out", "x" * 100)}))
+            # the cache is only scanned for eviction once it grows over its limit
+            self.assertEqual(evict.call_count, 1 if ii == 2 else 0)
+            keyList.append(key)
+            # distinct last use times
+            time.sleep(0.02)
+            os.utime(os.path.join(self.__cacheDir, key[:2], key, "entry.json"), (time.time() - 10 + ii, time.time() - 10 + ii))
+        #
+        dstDir = os.path.join(self.__wrkPath, "dst")
+        os.makedirs(dstDir)
+        self.assertIsNone(rC.get(keyList[0], dstDir, {"result_file": "result_file_1"}))
+        indexD = rC.get(keyList[2], dstDir, {"result_file": "result_file_1"})
+        self.assertEqual(indexD["files"], ["result_file"])
+        self.assertEqual(os.path.getsize(os.path.join(dstDir, "result_file_1")), 100)
+        self.assertLessEqual(rC.getSize(), 250)
+        self.assertEqual(rC.clear(), 2)
+        self.assertEqual(rC.getSize(), 0)
+
+    def testCacheHit(self):
+        """Test serving the result and log of a step from the cache without running it"""
+        callList = []
+
+        def fakeStep(dp, op):
+            callList.append(op)
+            wrkPath = dp.getWorkingDir()
+            for fn in ("result_file_1", "log_file_1"):
+                self.__writeFile(os.path.join(wrkPath, fn), "%s %d" % (fn, len(callList)))
+            dp._RcsbDpUtility__resultPathList = [os.path.join(wrkPath, "result_file_1")]  # pylint: disable=protected-access
+            return 0
+
+        for ii, bypass in enumerate([False, False, True]):
+            dp = RcsbDpUtility(tmpPath=self.__wrkPath, siteId=self.__siteId)
+            dp.setWorkingDir(os.path.join(self.__wrkPath, "run-%d" % ii))
+            dp.setResultCache(self.__cacheDir, bypass=bypass)
+            dp.imp(self.__cifPath)
+            dp._RcsbDpUtility__stepMethodD[OP_FAMILY_ANNOTATION] = functools.partial(fakeStep, dp)  # pylint: disable=protected-access
+            self.assertEqual(dp.op("annot-complexity"), 0)
+            self.assertEqual(dp.getResultPathList(), [os.path.join(dp.getWorkingDir(), "result_file_1")])
+            with open(os.path.join(dp.getWorkingDir(), "log_file_1")) as ifh:
+                self.assertEqual(ifh.read(), "log_file_1 %d" % (1 if ii < 2 else 2))
+        self.assertEqual(len(callList), 2)
+        # a different parameter is a cache miss
+        dp.addInput(name="threshold", value="10")
+        dp.imp(self.__cifPath)
+        dp.op("annot-complexity")
+        self.assertEqual(len(callList), 3)
+
+    def testStaleResultList(self):
+        """Test that a step which does not set the result list neither reports nor caches the results of the previous step"""
+
+        def fakeStep(dp, op):  # pylint: disable=unused-argument
+            self.__writeFile(os.path.join(dp.getWorkingDir(), "result_file_1"), "result")
+            return 0
+
+        for ii in range(2):
+            dp = RcsbDpUtility(tmpPath=self.__wrkPath, siteId=self.__siteId)
+            dp.setWorkingDir(os.path.join(self.__wrkPath, "run-%d" % ii))
+            dp.setResultCache(self.__cacheDir)
+            dp.imp(self.__cifPath)
+            dp._RcsbDpUtility__stepMethodD[OP_FAMILY_ANNOTATION] = functools.partial(fakeStep, dp)  # pylint: disable=protected-access
+            dp._RcsbDpUtility__resultPathList = [self.__writeFile("unrelated", "previous op")]  # pylint: disable=protected-access
+            self.assertEqual(dp.op("annot-complexity"), 0)
+            self.assertEqual(dp.getResultPathList(), [])
+            self.assertTrue(os.path.exists(os.path.join(dp.getWorkingDir(), "result_file_1")))
+        entryDirList = [dirPath for dirPath, _dirList, fileList in os.walk(self.__cacheDir) if "entry.json" in fileList]
+        self.assertEqual(len(entryDirList), 1)
+        self.assertEqual(sorted(os.listdir(entryDirList[0])), ["entry.json", "result_file"])
+
+    @unittest.skipIf(toolsmissing, "Tools not available for testing")
+    def testCachedOp(self):
+        """Test that a repeated deterministic operation is served from the cache"""
+        with modified_environ(PYTHONPATH=TOPDIR):
+            dpList = []
+            for ii in range(3):
+                dp = RcsbDpUtility(tmpPath=self.__wrkPath, siteId=self.__siteId)
+                dp.setWorkingDir(os.path.join(self.__wrkPath, "run-%d" % ii))
+                dp.setResultCache(self.__cacheDir, bypass=ii == 2)
+                dp.imp(self.__cifPath)
+                self.assertEqual(dp.op("annot-complexity"), 0)
+                dpList.append(dp)
+        outList = []
+        for ii, dp in enumerate(dpList):
+            outPath = os.path.join(self.__wrkPath, "out-%d.cif" % ii)
+            self.assertTrue(dp.exp(outPath))
+            with open(outPath) as ifh:
+                outList.append(ifh.read())
+        self.assertEqual(outList[0], outList[1])
+        self.assertEqual(outList[0], outList[2])
+        # cache hits do not write a step input file
+        self.assertTrue(os.path.exists(os.path.join(self.__wrkPath, "run-0", "temp_file_1")))
+        self.assertFalse(os.path.exists(os.path.join(self.__wrkPath, "run-1", "temp_file_1")))
+        self.assertTrue(os.path.exists(os.path.join(self.__wrkPath, "run-1", "log_file_1")))
+        self.assertTrue(os.path.exists(os.path.join(self.__wrkPath, "run-2", "temp_file_1")))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,171 @@
+##
+# File:    RcsbDpSiteConfigTests.py
+# Date:    17-Oct-2026
+#
+# Update:
+##
+"""
+Test cases for the process-wide site configuration cache
+
+"""
+
+import os
+import shutil
+import subprocess
+import tempfile
+import time
+import unittest
+
+if __package__ is None or __package__ == "":
+    import sys
+    from os import path
+
+    sys.path.append(path.dirname(path.abspath(__file__)))
+    from commonsetup import TESTOUTPUT, modified_environ  # pylint: disable=import-error
+else:
+    from .commonsetup import TESTOUTPUT, modified_environ
+
+from wwpdb.utils.config.ConfigInfo import ConfigInfo, getSiteId
+
+from wwpdb.utils.dp.RcsbDpSiteConfig import CachedConfig, clearSiteConfigCache, getEnvironmentUpdateCommand, getSiteConfig, getSiteEnvironment
+from wwpdb.utils.dp.RcsbDpUtility import RcsbDpUtility
+
+
+class CountingConfig:
+    def __init__(self):
+        self.count = 0
+
+    def get_path(self, name="x"):
+        self.count += 1
+        return "/path/" + name
+
+
+class RcsbDpSiteConfigTests(unittest.TestCase):
+    def setUp(self):
+        self.__siteId = getSiteId(defaultSiteId=None)
+        self.__configDir = tempfile.mkdtemp(dir=TESTOUTPUT)
+        clearSiteConfigCache()
+
+    def tearDown(self):
+        clearSiteConfigCache()
+        shutil.rmtree(self.__configDir, ignore_errors=True)
+
+    def testCachedGetter(self):
+        cC = CachedConfig(CountingConfig())
+        self.assertEqual(cC.get_path(), "/path/x")
+        self.assertEqual(cC.get_path(), "/path/x")
+        self.assertEqual(cC.get_path("y"), "/path/y")
+        self.assertEqual(cC.get_path(name="y"), "/path/y")
+        self.assertEqual(cC.count, 3)
+
+    def testSharedSnapshot(self):
+        sC = getSiteConfig(self.__siteId)
+        self.assertIs(getSiteConfig(self.__siteId), sC)
+        self.assertEqual(sC.cI.get("CONTENT_MILESTONE_LIST"), ConfigInfo(self.__siteId).get("CONTENT_MILESTONE_LIST"))
+
+    def testInvalidateOnChange(self):
+        siteLoc = "rcsb-east"
+        cachePath = os.path.join(self.__configDir, siteLoc, self.__siteId.lower(), "ConfigInfoFileCache.json")
+        os.makedirs(os.path.dirname(cachePath))
+        with open(cachePath, "w") as ofh:
+            ofh.write("{}")
+        with modified_environ(TOP_WWPDB_SITE_CONFIG_DIR=self.__configDir, WWPDB_SITE_LOC=siteLoc):
+            sC = getSiteConfig(self.__siteId)
+            self.assertIs(getSiteConfig(self.__siteId), sC)
+            mtime = time.time() + 10
+            os.utime(cachePath, (mtime, mtime))
+            self.assertIsNot(getSiteConfig(self.__siteId), sC)
+
+    def __writeEnvScript(self):
+        envPath = os.path.join(self.__configDir, "init", "env.sh")
+        os.makedirs(os.path.dirname(envPath))
+        countPath = os.path.join(self.__configDir, "count")
+        with open(envPath, "w") as ofh:
+            ofh.write("echo sourced >> %s\n" % countPath)
+            ofh.write("TEST_SITE_ENV=site ; export TEST_SITE_ENV\n")
+            ofh.write("PATH=/site/bin:$PATH ; export PATH\n")
+            ofh.write("unset TZ\n")
+        return envPath, countPath
+
+    def __getCount(self, countPath):
+        with open(countPath) as ifh:
+            return len(ifh.readlines())
+
+    def testSiteEnvironment(self):
+        envPath, countPath = self.__writeEnvScript()
+        sourceCommand = ". %s -s %s -l rcsb-east" % (envPath, self.__siteId)
+        cacheDir = os.path.join(self.__configDir, "env-cache")
+        with modified_environ(TZ="UTC", TEST_SITE_ENV_OTHER="x"):
+            envList = getSiteEnvironment(self.__siteId, [sourceCommand], cacheDir=cacheDir)
+            self.assertEqual(len(envList), 2)
+            # captured from the base environment only
+            self.assertEqual(envList[0]["TZ"], "UTC")
+            self.assertNotIn("TEST_SITE_ENV_OTHER", envList[0])
+            self.assertEqual(envList[1]["TEST_SITE_ENV"], "site")
+            self.assertNotIn("TZ", envList[1])
+            self.assertEqual(envList[1]["PATH"], "/site/bin:" + os.environ["PATH"])
+            self.assertEqual(getEnvironmentUpdateCommand(envList[0], envList[1]), 'unset TZ ; export PATH=/site/bin:"${PATH}" ; export TEST_SITE_ENV=site')
+            self.assertEqual(getSiteEnvironment(self.__siteId, [sourceCommand], cacheDir=cacheDir), envList)
+            self.assertEqual(self.__getCount(countPath), 1)
+            # served from the disk cache
+            clearSiteConfigCache()
+            self.assertEqual(getSiteEnvironment(self.__siteId, [sourceCommand], cacheDir=cacheDir), envList)
+            self.assertEqual(self.__getCount(countPath), 1)
+            # a different base environment is captured separately
+            with modified_environ(TZ="CET"):
+                self.assertEqual(getSiteEnvironment(self.__siteId, [sourceCommand], cacheDir=cacheDir)[0]["TZ"], "CET")
+            self.assertEqual(self.__getCount(countPath), 2)
+            # captured again after the script changes
+            mtime = time.time() + 10
+            os.utime(envPath, (mtime, mtime))
+            getSiteEnvironment(self.__siteId, [sourceCommand], cacheDir=cacheDir)
+            self.assertEqual(self.__getCount(countPath), 3)
+        self.assertIsNone(getSiteEnvironment(self.__siteId, [". %s/missing.sh" % self.__configDir]))
+
+    def testEnvironmentUpdateCommand(self):
+        self.assertEqual(getEnvironmentUpdateCommand({"P": "/a"}, {"P": "/b:/a"}), 'export P=/b:"${P}"')
+        self.assertEqual(getEnvironmentUpdateCommand({"P": "/a"}, {"P": "/a:/b"}), 'export P="${P}":/b')
+        self.assertEqual(getEnvironmentUpdateCommand({"P": "/a"}, {"P": "/a"}), ":")
+        # values only extend the previous one at a ':' boundary at either end
+        self.assertEqual(getEnvironmentUpdateCommand({"N": "1"}, {"N": "10"}), "export N=10")
+        self.assertEqual(getEnvironmentUpdateCommand({"N": "1"}, {"N": "21"}), "export N=21")
+        self.assertEqual(getEnvironmentUpdateCommand({"P": "/opt"}, {"P": "/opt/site/bin"}), "export P=/opt/site/bin")
+        self.assertEqual(getEnvironmentUpdateCommand({"P": "/opt"}, {"P": "/site/opt"}), "export P=/site/opt")
+        self.assertEqual(getEnvironmentUpdateCommand({"P": "/opt"}, {"P": "/a:/opt:/b"}), "export P=/a:/opt:/b")
+        # unchanged values differing from the base environment are restored unless they extend it
+        self.assertEqual(getEnvironmentUpdateCommand({"N": "10"}, {"N": "10"}, baseEnvD={"N": "1"}), "export N=10")
+        self.assertEqual(getEnvironmentUpdateCommand({"P": "/b:/opt"}, {"P": "/b:/opt"}, baseEnvD={"P": "/opt"}), ":")
+
+    def testApplySiteEnvironment(self):
+        envPath, countPath = self.__writeEnvScript()
+        dp = RcsbDpUtility(tmpPath=self.__configDir, siteId=self.__siteId)
+        sourceCommand = ". %s -s %s -l rcsb-east" % (envPath, self.__siteId)
+        dp._RcsbDpUtility__site_config_command = sourceCommand  # pylint: disable=protected-access
+        command = "(cd %s ; %s ; X=1 ; export PATH=$PATH:/chimera ; %s --validation ; echo $TEST_SITE_ENV $X $PATH $TZ)" % (
+            self.__configDir,
+            sourceCommand,
+            sourceCommand,
+        )
+        # off by default
+        self.assertEqual(dp._RcsbDpUtility__getSiteEnvironment(command), (command, None))  # pylint: disable=protected-access
+        dp.setSiteEnvCache()
+        with modified_environ(TZ="UTC"):
+            runCommand, envD = dp._RcsbDpUtility__getSiteEnvironment(command)  # pylint: disable=protected-access
+            self.assertNotIn("env.sh", runCommand)
+            # both source commands are captured together once
+            self.assertEqual(self.__getCount(countPath), 2)
+            self.assertEqual(envD["TEST_SITE_ENV"], "site")
+            self.assertNotIn("TZ", envD)
+            # the command run in the captured environment sees the same environment
+            output = subprocess.check_output(runCommand, shell=True, env=envD).decode().strip()  # noqa: S602
+            self.assertEqual(output, subprocess.check_output(command, shell=True).decode().strip())  # noqa: S602
+            self.assertEqual(output, "site 1 /site/bin:/site/bin:%s:/chimera" % os.environ["PATH"])
+            self.assertEqual(self.__getCount(countPath), 4)
+            self.assertEqual(dp._RcsbDpUtility__getSiteEnvironment(command), (runCommand, envD))  # pylint: disable=protected-access
+            self.assertEqual(self.__getCount(countPath), 4)
+        dp.setSiteEnvCache(False)
+        self.assertEqual(dp._RcsbDpUtility__getSiteEnvironment(command), (command, None))  # pylint: disable=protected-access
+
+
+if __name__ == "__main__":
+    unittest.main()
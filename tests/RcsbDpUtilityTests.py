@@ -12,24 +12,29 @@
 #               jdw -  add cif check application
 #  Aug 29, 2012 jdw -  check dependencies installed for site_id WWPDB_DEPLOY_TEST
 #  16-Oct-2018  jdw -  adapt for Py2/3 and Python packaging
+#  17-Oct-2026        -  add asynchronous operation tests
+#  17-Oct-2026        -  add import link mode test
+#  17-Oct-2026        -  add step metrics test
 ##
 """
 Test cases from
 
 """
 
+import json
 import logging
 import os
 import sys
+import tempfile
 import unittest
 
 if __package__ is None or __package__ == "":
     from os import path
 
     sys.path.append(path.dirname(path.abspath(__file__)))
-    from commonsetup import TESTOUTPUT, TOPDIR, dictsmissing  # pylint: disable=import-error
+    from commonsetup import TESTOUTPUT, TOPDIR, dictsmissing, toolsmissing  # pylint: disable=import-error
 else:
-    from .commonsetup import TESTOUTPUT, TOPDIR, dictsmissing
+    from .commonsetup import TESTOUTPUT, TOPDIR, dictsmissing, toolsmissing
 
 from wwpdb.utils.config.ConfigInfo import getSiteId
 
@@ -49,6 +54,7 @@ class RcsbDpUtilityTests(unittest.TestCase):
         #
         self.__testFilePath = os.path.join(TOPDIR, "wwpdb", "mock-data", "dp-utils")
         self.__testFileCif = "1xbb.cif"
+        self.__testFileLocalCif = os.path.join(TOPDIR, "tests", "test_files", "2gc2.cif")
 
     def tearDown(self):
         pass
@@ -120,6 +126,95 @@ class RcsbDpUtilityTests(unittest.TestCase):
             logger.exception("Failing with %s", str(e))
             self.fail()
 
+    def testOpAsyncFanOut(self):
+        """Test starting independent operations on the same input without waiting"""
+        dp = RcsbDpUtility(tmpPath=self.__tmpPath, siteId=self.__siteId, verbose=True, testMode=True)
+        dp.imp(self.__testFileLocalCif)
+        opList = ["annot-secondary-structure", "annot-cis-peptide", "annot-base-pair-info"]
+        handleList = [dp.opAsync(op) for op in opList]
+        for op, handle in zip(opList, handleList):
+            self.assertEqual(handle.getOp(), op)
+            self.assertEqual(handle.wait(timeout=30), 0)
+            self.assertEqual(handle.poll(), 0)
+            self.assertFalse(handle.cancel())
+        # Each operation has a private working directory
+        wrkPathList = {handle.getUtility().getWorkingDir() for handle in handleList}
+        self.assertEqual(len(wrkPathList), len(opList))
+        for wrkPath in wrkPathList:
+            self.assertTrue(wrkPath.startswith(dp.getWorkingDir()))
+        dp.cleanup()
+
+    @unittest.skipIf(toolsmissing, "Tools not available for testing")
+    def testOpAsyncRunFanOut(self):
+        """Test running operations at the same time, each with its own inputs and results"""
+        dp = RcsbDpUtility(tmpPath=self.__tmpPath, siteId=self.__siteId, verbose=True)
+        dp.imp(self.__testFileLocalCif)
+        thresholdList = ["100", "1000000000", "1000"]
+        handleList = []
+        for threshold in thresholdList:
+            # the inputs are copied when the operation starts
+            dp.addInput(name="threshold", value=threshold)
+            handleList.append(dp.opAsync("annot-complexity"))
+        # fails for the missing map coefficients
+        failedHandle = dp.opAsync("xray-density-bcif")
+        self.assertEqual(failedHandle.wait(timeout=60), -1)
+        resultPathSet = set()
+        for threshold, handle in zip(thresholdList, handleList):
+            self.assertEqual(handle.wait(timeout=300), 0)
+            resultPathList = handle.getUtility().getResultPathList()
+            self.assertEqual(len(resultPathList), 1)
+            self.assertTrue(resultPathList[0].startswith(handle.getUtility().getWorkingDir()))
+            resultPathSet.add(resultPathList[0])
+            with open(resultPathList[0]) as ifh:
+                text = ifh.read()
+            self.assertIn("_pdbx_complexity.complex_threshold     %.2e" % float(threshold), text)
+            self.assertIn("_pdbx_complexity.is_complex            %s" % ("False" if threshold == "1000000000" else "True"), text)
+        self.assertEqual(len(resultPathSet), len(thresholdList))
+        # the operations ran at the same time
+        metricsList = [handle.getUtility().getStepMetrics()[0] for handle in handleList]
+        self.assertLess(max(rec["start_time"] for rec in metricsList), min(rec["start_time"] + rec["wall_time"] for rec in metricsList))
+        self.assertEqual(failedHandle.getUtility().getResultPathList(), [])
+        dp.cleanup()
+
+    def testOpAsyncNoInput(self):
+        """Test that an asynchronous operation without input is refused"""
+        dp = RcsbDpUtility(tmpPath=self.__tmpPath, siteId=self.__siteId, verbose=True, testMode=True)
+        self.assertIsNone(dp.opAsync("annot-secondary-structure"))
+
+    def testImportLinkMode(self):
+        """Test importing the source file without copying its content"""
+        dp = RcsbDpUtility(tmpPath=self.__tmpPath, siteId=self.__siteId, verbose=True)
+        self.assertFalse(dp.setLinkMode("symlink"))
+        self.assertTrue(dp.setLinkMode())
+        dp.imp(self.__testFileLocalCif)
+        wrkFilePath = os.path.join(dp.getWorkingDir(), "input_file_1")
+        with open(self.__testFileLocalCif, "rb") as ifh, open(wrkFilePath, "rb") as wfh:
+            self.assertEqual(ifh.read(), wfh.read())
+        dp.cleanup()
+        self.assertTrue(os.path.exists(self.__testFileLocalCif))
+
+    def testStepMetrics(self):
+        """Test the resource usage records of locally run commands"""
+        dp = RcsbDpUtility(tmpPath=self.__tmpPath, siteId=self.__siteId, verbose=True)
+        dp.setWorkingDir(tempfile.mkdtemp(dir=self.__tmpPath))
+        metricsPath = os.path.join(dp.getWorkingDir(), "metrics.jsonl")
+        dp.setMetricsPath(metricsPath)
+        lPathFull = os.path.join(dp.getWorkingDir(), "log_file_1")
+        command = "python -c 'import time; b = bytearray(64 * 1024 * 1024); time.sleep(0.2)'"
+        self.assertEqual(dp._RcsbDpUtility__run(command, lPathFull, "test-op"), 0)  # pylint: disable=protected-access
+        self.assertEqual(dp._RcsbDpUtility__run("exit 3", lPathFull, "test-op"), 3)  # pylint: disable=protected-access
+        metricsList = dp.getStepMetrics()
+        self.assertEqual([rec["return_code"] for rec in metricsList], [0, 3])
+        rec = metricsList[0]
+        self.assertEqual(rec["op"], "test-op")
+        self.assertFalse(rec["remote"])
+        self.assertGreaterEqual(rec["wall_time"], 0.2)
+        self.assertGreaterEqual(rec["max_rss_kb"], 64 * 1024)
+        self.assertIsNotNone(rec["user_cpu"])
+        with open(metricsPath) as ifh:
+            self.assertEqual([json.loads(line) for line in ifh], metricsList)
+        dp.cleanup()
+
 
 def suiteMaxitTests():
     suiteSelect = unittest.TestSuite()
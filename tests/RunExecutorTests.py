@@ -0,0 +1,169 @@
+##
+# File:    RunExecutorTests.py
+# Date:    17-Oct-2026
+#
+# Update:
+##
+"""
+Test cases for the execution backends of operation steps
+
+"""
+
+import os
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+
+if __package__ is None or __package__ == "":
+    import sys
+    from os import path
+
+    sys.path.append(path.dirname(path.abspath(__file__)))
+    from commonsetup import TESTOUTPUT  # pylint: disable=import-error
+else:
+    from .commonsetup import TESTOUTPUT
+
+from wwpdb.utils.config.ConfigInfo import getSiteId
+
+from wwpdb.utils.dp.RcsbDpUtility import RcsbDpUtility
+from wwpdb.utils.dp.RunExecutor import (
+    EXECUTOR_INLINE,
+    EXECUTOR_LOCAL_POOL,
+    EXECUTOR_SLURM,
+    ExecutorJob,
+    InlineExecutor,
+    LocalPoolExecutor,
+    RunExecutor,
+    get_executor,
+    get_site_executor,
+)
+
+
+class CountingExecutor:
+    """Stand-in for the inline backend recording how many jobs run at the same time"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.running = 0
+        self.maxRunning = 0
+        self.order = []
+
+    def run(self, job):
+        with self.lock:
+            self.running += 1
+            self.maxRunning = max(self.maxRunning, self.running)
+            self.order.append(job.job_name)
+        time.sleep(0.1)
+        with self.lock:
+            self.running -= 1
+        return 0
+
+
+class RunExecutorTests(unittest.TestCase):
+    def setUp(self):
+        self.__wrkPath = tempfile.mkdtemp(dir=TESTOUTPUT)
+        self.__logPath = os.path.join(self.__wrkPath, "log_file_1")
+
+    def tearDown(self):
+        shutil.rmtree(self.__wrkPath, ignore_errors=True)
+
+    def __job(self, command="true", name="job", timeout=0, memory=100, cpus=1):
+        return ExecutorJob(command, name, self.__logPath, self.__wrkPath, timeout=timeout, memory_limit=memory, number_of_processors=cpus)
+
+    def __runAll(self, executor, jobList):
+        threadList = [threading.Thread(target=executor.run, args=(job,)) for job in jobList]
+        for thread in threadList:
+            thread.start()
+            # submission order
+            time.sleep(0.01)
+        for thread in threadList:
+            thread.join()
+
+    def testInline(self):
+        executor = InlineExecutor()
+        self.assertEqual(executor.run(self.__job("exit 3")), 3)
+        job = self.__job("echo step output >> %s" % self.__logPath, timeout=5)
+        self.assertEqual(executor.run(job), 0)
+        self.assertIsNotNone(job.process.rusage)
+        self.assertEqual(executor.run(self.__job("sleep 5", timeout=1)), None)
+        with open(self.__logPath) as ifh:
+            logText = ifh.read()
+        self.assertEqual(logText.count("step output"), 1)
+        self.assertIn("terminated by timeout 1", logText)
+        job = self.__job("true")
+        job.cancel()
+        self.assertEqual(executor.run(job), -1)
+
+    def testAbstractBase(self):
+        with self.assertRaises(TypeError):
+            RunExecutor()  # pylint: disable=abstract-class-instantiated
+
+        class NoRunExecutor(RunExecutor):
+            name = "no-run"
+
+        with self.assertRaises(TypeError):
+            NoRunExecutor()  # pylint: disable=abstract-class-instantiated
+
+    def testLocalPoolSlots(self):
+        pool = LocalPoolExecutor(cpu_slots=2, memory_mb=1000)
+        pool._inline = CountingExecutor()  # pylint: disable=protected-access
+        self.__runAll(pool, [self.__job(name="cpu-%d" % ii) for ii in range(4)])
+        self.assertEqual(pool._inline.maxRunning, 2)  # pylint: disable=protected-access
+        self.assertEqual(pool.get_free_slots(), (2, 1000))
+        #
+        pool._inline = CountingExecutor()  # pylint: disable=protected-access
+        self.__runAll(pool, [self.__job(name="mem-%d" % ii, memory=600) for ii in range(3)])
+        self.assertEqual(pool._inline.maxRunning, 1)  # pylint: disable=protected-access
+        # requests above the budget run alone, and jobs start in submission order
+        pool._inline = CountingExecutor()  # pylint: disable=protected-access
+        self.__runAll(pool, [self.__job(name="big", cpus=8, memory=5000), self.__job(name="small")])
+        self.assertEqual(pool._inline.order, ["big", "small"])  # pylint: disable=protected-access
+        self.assertEqual(pool._inline.maxRunning, 1)  # pylint: disable=protected-access
+
+    def testLocalPoolCancel(self):
+        pool = LocalPoolExecutor(cpu_slots=1, memory_mb=1000)
+        pool._inline = CountingExecutor()  # pylint: disable=protected-access
+        first = self.__job(name="first")
+        waiting = self.__job(name="waiting")
+        resultD = {}
+        threadList = [threading.Thread(target=lambda job=job: resultD.update({job.job_name: pool.run(job)})) for job in (first, waiting)]
+        for thread in threadList:
+            thread.start()
+            time.sleep(0.02)
+        waiting.cancel()
+        for thread in threadList:
+            thread.join()
+        self.assertEqual(resultD, {"first": 0, "waiting": -1})
+        self.assertEqual(pool._inline.order, ["first"])  # pylint: disable=protected-access
+        self.assertEqual(pool.get_free_slots(), (1, 1000))
+
+    def testSiteExecutor(self):
+        self.assertIs(get_site_executor({}), get_executor(EXECUTOR_INLINE))
+        # cluster sites use slurm only when it is selected explicitly
+        self.assertIs(get_site_executor({"USE_COMPUTE_CLUSTER": "yes", "PDBE_CLUSTER_QUEUE": "q"}), get_executor(EXECUTOR_INLINE))
+        self.assertIs(get_site_executor({"USE_COMPUTE_CLUSTER": "yes", "PDBE_CLUSTER_QUEUE": "q", "DP_EXECUTOR": EXECUTOR_SLURM}), get_executor(EXECUTOR_SLURM))
+        self.assertTrue(get_executor(EXECUTOR_SLURM).remote)
+        executor = get_site_executor({"DP_EXECUTOR": EXECUTOR_LOCAL_POOL, "DP_EXECUTOR_CPU_SLOTS": "3"})
+        self.assertIs(executor, get_executor(EXECUTOR_LOCAL_POOL))
+        self.assertRaises(ValueError, get_executor, "bogus")
+
+    def testUtilityExecutor(self):
+        dp = RcsbDpUtility(tmpPath=self.__wrkPath, siteId=getSiteId(defaultSiteId=None))
+        dp.setWorkingDir(self.__wrkPath)
+        self.assertFalse(dp.getExecutor().remote)
+        dp.setRunRemote()
+        self.assertIs(dp.getExecutor(), get_executor(EXECUTOR_SLURM))
+        dp.setRunRemote(False)
+        self.assertFalse(dp.getExecutor().remote)
+        self.assertFalse(dp.setExecutor("bogus"))
+        pool = LocalPoolExecutor(cpu_slots=1, memory_mb=1000)
+        self.assertTrue(dp.setExecutor(pool))
+        self.assertEqual(dp._RcsbDpUtility__run("exit 2", self.__logPath, "test-op"), 2)  # pylint: disable=protected-access
+        self.assertEqual(dp.getStepMetrics()[0]["return_code"], 2)
+        self.assertFalse(dp.getStepMetrics()[0]["remote"])
+
+
+if __name__ == "__main__":
+    unittest.main()
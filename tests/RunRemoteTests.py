@@ -0,0 +1,341 @@
+##
+# File:    RunRemoteTests.py
+# Date:    17-Oct-2026
+#
+# Update:
+##
+"""
+Test cases for the Slurm job helpers which do not need a cluster
+
+"""
+
+import asyncio
+import os
+import subprocess
+import tempfile
+import threading
+import unittest
+from unittest import mock
+
+if __package__ is None or __package__ == "":
+    import sys
+    from os import path
+
+    sys.path.append(path.dirname(path.abspath(__file__)))
+    import commonsetup  # noqa: F401  # pylint: disable=import-error,unused-import
+else:
+    from . import commonsetup  # noqa: F401  # pylint: disable=unused-import
+
+from wwpdb.utils.dp.RunRemote import (
+    JobStatus,
+    JobStatusPoller,
+    RunRemote,
+    RunRemoteArray,
+    RunRemoteDag,
+    expand_array_task_ids,
+    parse_job_status,
+    parse_slurm_size,
+    parse_slurm_time,
+    stage_command,
+)
+
+
+def fake_slurm(queue, accounting, sbatch_calls=None, query_calls=None):
+    """Return a replacement for subprocess.run answering sbatch, squeue and sacct from the given job states"""
+
+    def fake_run(cmd, **_kwargs):
+        stdout = ""
+        if cmd[0] == "sbatch":
+            with open(cmd[-1]) as ifh:
+                sbatch_calls.append((cmd, ifh.read()))
+            stdout = "Submitted batch job %d\n" % (100 + len(sbatch_calls))
+        elif cmd[0] in ("squeue", "sacct"):
+            if query_calls is not None:
+                query_calls.append(cmd)
+            # all tasks of a requested array are reported
+            requested = {job_id.split("_")[0] for job_id in cmd[-1].split(",")}
+            states = queue if cmd[0] == "squeue" else accounting
+            for job_id, state in states.items():
+                if job_id.split("_")[0] in requested:
+                    stdout += "%s|%s\n%s.batch|%s\n" % (job_id, state, job_id, state)
+        return subprocess.CompletedProcess(args=cmd, returncode=0, stdout=stdout.encode("utf-8"))
+
+    return fake_run
+
+
+class FakeAsyncProcess:
+    """Finished asyncio subprocess returning the output of a fake subprocess.run"""
+
+    def __init__(self, completed):
+        self.returncode = completed.returncode
+        self.__stdout = completed.stdout
+
+    async def communicate(self):
+        return self.__stdout, b""
+
+
+SACCT_OUTPUT = """\
+1234|00:02:05|01:40.500|00:03.250|||
+1234.batch|00:02:05|01:40.500|00:03.250|524288K|1024.50K|20480K
+1234.extern|00:02:05|00:00:00|00:00.001|1000K|0|0
+"""
+
+
+class RunRemoteTests(unittest.TestCase):
+    def setUp(self):
+        self.log_dir = tempfile.mkdtemp()
+
+    def test_parse_slurm_values(self):
+        self.assertEqual(parse_slurm_time("1-02:03:04"), 93784)
+        self.assertEqual(parse_slurm_time("01:40.500"), 100.5)
+        self.assertIsNone(parse_slurm_time(""))
+        self.assertEqual(parse_slurm_size("2G"), 2 * 1024 * 1024)
+        self.assertEqual(parse_slurm_size("1.5M"), 1536)
+        self.assertEqual(parse_slurm_size("4096"), 4)
+        self.assertIsNone(parse_slurm_size(""))
+
+    def test_job_accounting(self):
+        rr = RunRemote(command="true", job_name="test", log_dir=self.log_dir, run_dir=self.log_dir)
+        completed = subprocess.CompletedProcess(args=[], returncode=0, stdout=SACCT_OUTPUT.encode("utf-8"))
+        with mock.patch.object(subprocess, "run", return_value=completed) as mock_run:
+            accounting = rr.get_job_accounting(1234)
+        self.assertEqual(mock_run.call_args[0][0][0], "sacct")
+        self.assertEqual(accounting["wall_time"], 125)
+        self.assertEqual(accounting["user_cpu"], 100.5)
+        self.assertEqual(accounting["system_cpu"], 3.25)
+        self.assertEqual(accounting["max_rss_kb"], 524288)
+        self.assertEqual(accounting["read_kb"], 1024)
+        self.assertEqual(accounting["write_kb"], 20480)
+
+    def test_job_accounting_unavailable(self):
+        rr = RunRemote(command="true", job_name="test", log_dir=self.log_dir, run_dir=self.log_dir)
+        with mock.patch.object(subprocess, "run", side_effect=FileNotFoundError("sacct")):
+            self.assertIsNone(rr.get_job_accounting(1234))
+
+    def test_parse_array_values(self):
+        self.assertEqual(parse_job_status("COMPLETED"), JobStatus.COMPLETED)
+        self.assertEqual(parse_job_status("CANCELLED by 1000"), JobStatus.CANCELLED)
+        self.assertEqual(parse_job_status("OUT_OF_MEMORY"), JobStatus.OOM)
+        self.assertEqual(parse_job_status("NODE_FAIL"), JobStatus.FAILED)
+        self.assertEqual(parse_job_status("PENDING"), JobStatus.RUNNING)
+        self.assertEqual(parse_job_status(""), JobStatus.OTHER)
+        self.assertEqual(expand_array_task_ids("3"), [3])
+        self.assertEqual(expand_array_task_ids("[0-2,7]"), [0, 1, 2, 7])
+        self.assertEqual(expand_array_task_ids("[4-5%2]"), [4, 5])
+
+    def test_array_retry(self):
+        """Test that only the failed task of an array is resubmitted, with more memory after running out"""
+        sbatch_calls = []
+        # task 2 of the first array has already left the queue
+        queue = {"101_0": "COMPLETED", "101_1": "OUT_OF_MEMORY", "102_1": "COMPLETED"}
+        accounting = {"101_0": "COMPLETED", "101_1": "OUT_OF_MEMORY", "101_2": "COMPLETED"}
+        rr = RunRemoteArray(
+            commands=["echo a", "echo b", "echo c"],
+            job_name="test",
+            log_dir=self.log_dir,
+            run_dir=self.log_dir,
+            memory_limit=1000,
+            max_concurrent=2,
+            poller=JobStatusPoller(min_interval=0.01),
+        )
+        with mock.patch.object(subprocess, "run", side_effect=fake_slurm(queue, accounting, sbatch_calls=sbatch_calls)):
+            statuses = rr.run()
+        self.assertEqual(statuses, [JobStatus.COMPLETED] * 3)
+        self.assertEqual(rr.job_ids, [101, 102])
+        self.assertEqual(len(sbatch_calls), 2)
+        first_cmd, first_script = sbatch_calls[0]
+        self.assertIn("--array=0-2%2", first_cmd)
+        self.assertIn("--mem=1000", first_cmd)
+        self.assertIn("echo c", first_script)
+        retry_cmd, retry_script = sbatch_calls[1]
+        self.assertIn("--array=1%2", retry_cmd)
+        self.assertIn("--mem=2000", retry_cmd)
+        self.assertIn("echo b", retry_script)
+        self.assertNotIn("echo a", retry_script)
+        self.assertTrue(rr.get_task_log_files(1)[0].endswith("test_1.out"))
+
+    def test_staging(self):
+        """Test that only the declared paths of a staged job are redirected to scratch space"""
+        shared_dir = os.path.join(self.log_dir, "wrk")
+        scratch_dir = os.path.join(self.log_dir, "scratch")
+        work_dir = os.path.join(shared_dir, "validation_1")
+        os.makedirs(shared_dir)
+        os.makedirs(scratch_dir)
+        input_path = os.path.join(shared_dir, "input_file_1")
+        output_path = os.path.join(shared_dir, "result_file_1")
+        with open(input_path, "w") as ofh:
+            ofh.write("model\n")
+        command = (
+            "(cd {0} && case {1} in $TMPDIR/*) cp {1} {2}/tmp_file_1 && cat {2}/tmp_file_1 > {3} ; echo staged > log_file_1 ;; esac ; exit 3)"
+            " > {0}2.log".format(shared_dir, input_path, work_dir, output_path)
+        )
+        sbatch_calls = []
+        rr = RunRemote(
+            command=command,
+            job_name="test",
+            log_dir=self.log_dir,
+            run_dir=self.log_dir,
+            stage_inputs=[input_path],
+            stage_outputs=[output_path],
+            stage_dirs=[work_dir],
+            poller=JobStatusPoller(min_interval=0.01),
+        )
+        with mock.patch.object(subprocess, "run", side_effect=fake_slurm({"101": "FAILED"}, {}, sbatch_calls=sbatch_calls)):
+            self.assertEqual(rr.run(retries=1), JobStatus.FAILED)
+        # run the submitted script as the compute node would
+        node = subprocess.run(["bash", sbatch_calls[0][0][-1]], env=dict(os.environ, TMPDIR=scratch_dir), check=False)
+        self.assertEqual(node.returncode, 3)
+        with open(output_path) as ifh:
+            self.assertEqual(ifh.read(), "model\n")
+        # the scratch directory is created on the node only
+        self.assertFalse(os.path.exists(work_dir))
+        # the undeclared working directory and log are not redirected
+        with open(os.path.join(shared_dir, "log_file_1")) as ifh:
+            self.assertEqual(ifh.read(), "staged\n")
+        self.assertTrue(os.path.exists(shared_dir + "2.log"))
+        self.assertEqual(os.listdir(scratch_dir), [])
+        self.assertEqual(stage_command("true"), "true")
+        staged = stage_command("cat {0} {0}.bak {0}/x {1}/y > {1}".format(input_path, shared_dir), stage_inputs=[input_path])
+        self.assertIn("cat ${{STAGE_DIR}}{0} {0}.bak {0}/x {1}/y > {1}\n".format(input_path, shared_dir), staged)
+
+    def test_poller(self):
+        """Test that all tracked jobs are polled with one squeue call and finished jobs with sacct"""
+        query_calls = []
+        queue = {"11": "RUNNING", "12": "PENDING", "13_[0-1]": "PENDING"}
+        accounting = {"10": "COMPLETED"}
+        poller = JobStatusPoller(min_interval=0.01)
+        changed = []
+        with mock.patch.object(subprocess, "run", side_effect=fake_slurm(queue, accounting, query_calls=query_calls)):
+            # track the jobs without starting the polling thread
+            for job_id in (10, 11, 12, "13_1"):
+                poller._track_counts[str(job_id)] = 1  # pylint: disable=protected-access
+                poller._statuses[str(job_id)] = JobStatus.OTHER  # pylint: disable=protected-access
+            poller._callbacks["11"] = [lambda job_id, status: changed.append((job_id, status))]  # pylint: disable=protected-access
+            self.assertEqual(
+                poller.poll(),
+                {"10": JobStatus.COMPLETED, "11": JobStatus.RUNNING, "12": JobStatus.RUNNING, "13_1": JobStatus.RUNNING},
+            )
+            self.assertEqual([cmd[0] for cmd in query_calls], ["squeue", "sacct"])
+            self.assertEqual(query_calls[0][-1], "10,11,12,13_1")
+            self.assertEqual(query_calls[1][-1], "10")
+            self.assertEqual(changed, [("11", JobStatus.RUNNING)])
+            # finished jobs are not polled again and an unchanged state is not reported
+            self.assertEqual(poller.poll(), {})
+            self.assertEqual(query_calls[2][-1], "11,12,13_1")
+            # waiting callers are woken by the polling thread
+            queue.update({"11": "COMPLETED", "12": "OUT_OF_MEMORY", "13_[0-1]": "COMPLETED"})
+            self.assertEqual(poller.wait(11, timeout=5), JobStatus.COMPLETED)
+            self.assertEqual(poller.wait(12, timeout=5), JobStatus.OOM)
+            self.assertEqual(poller.wait("13_1", timeout=5), JobStatus.COMPLETED)
+        self.assertEqual(changed[-1], ("11", JobStatus.COMPLETED))
+        self.assertEqual(poller.get_status(10), JobStatus.COMPLETED)
+        poller.untrack(10)
+        self.assertEqual(poller.get_status(10), JobStatus.OTHER)
+
+    def test_run_async(self):
+        """Test supervising many jobs from one event loop sharing the squeue calls of one poller"""
+        num_jobs = 20
+        sbatch_calls = []
+        query_calls = []
+        queue = {}
+        all_submitted = threading.Event()
+        fake_run = fake_slurm(queue, {}, sbatch_calls=sbatch_calls, query_calls=query_calls)
+
+        async def fake_exec(*cmd, **_kwargs):
+            completed = fake_run(list(cmd))
+            if cmd[0] == "sbatch":
+                job_id = completed.stdout.decode("utf-8").split()[-1]
+                # the first submission of job-0 runs out of memory
+                queue[job_id] = "OUT_OF_MEMORY" if "--job-name=job-0" in cmd and job_id == "101" else "COMPLETED"
+                if len(sbatch_calls) >= num_jobs:
+                    all_submitted.set()
+            return FakeAsyncProcess(completed)
+
+        def fake_poll_run(cmd, **kwargs):
+            # hold the first status query until all jobs are submitted
+            all_submitted.wait(5)
+            return fake_run(cmd, **kwargs)
+
+        async def run_all(poller):
+            jobs = [
+                RunRemote(command="true", job_name="job-%d" % ii, log_dir=self.log_dir, run_dir=self.log_dir, memory_limit=1000, poller=poller)
+                for ii in range(num_jobs)
+            ]
+            return await asyncio.gather(*[job.run_async() for job in jobs])
+
+        with mock.patch.object(asyncio, "create_subprocess_exec", side_effect=fake_exec), mock.patch.object(subprocess, "run", side_effect=fake_poll_run):
+            statuses = asyncio.run(run_all(JobStatusPoller(min_interval=0.01)))
+        self.assertEqual(statuses, [JobStatus.COMPLETED] * num_jobs)
+        self.assertEqual(len(sbatch_calls), num_jobs + 1)
+        self.assertIn("--mem=2000", sbatch_calls[-1][0])
+        self.assertIn("--job-name=job-0", sbatch_calls[-1][0])
+        self.assertLessEqual(len([cmd for cmd in query_calls if cmd[0] == "squeue"]), 4)
+
+    def test_run_async_cancel(self):
+        """Test that cancelling the awaiting task cancels the Slurm job"""
+        calls = []
+        async_calls = []
+        fake_run = fake_slurm({"101": "RUNNING"}, {}, sbatch_calls=[], query_calls=calls)
+
+        async def fake_exec(*cmd, **_kwargs):
+            async_calls.append(list(cmd))
+            return FakeAsyncProcess(fake_run(list(cmd)))
+
+        def fake_sync_run(cmd, **kwargs):
+            calls.append(cmd)
+            return fake_run(cmd, **kwargs)
+
+        async def run_and_cancel():
+            rr = RunRemote(command="true", job_name="test", log_dir=self.log_dir, run_dir=self.log_dir, poller=JobStatusPoller(min_interval=0.01))
+            task = asyncio.ensure_future(rr.run_async())
+            await asyncio.sleep(0.1)
+            task.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await task
+
+        with mock.patch.object(asyncio, "create_subprocess_exec", side_effect=fake_exec), mock.patch.object(subprocess, "run", side_effect=fake_sync_run):
+            asyncio.run(run_and_cancel())
+        # scancel runs as an asynchronous subprocess rather than blocking the event loop
+        self.assertIn(["scancel", "101"], async_calls)
+        self.assertNotIn(["scancel", "101"], calls)
+
+    def test_dag(self):
+        """Test submitting dependent jobs up front and waiting for the final job"""
+        sbatch_calls = []
+        queue = {"101": "COMPLETED", "102": "COMPLETED", "103": "COMPLETED", "104": "COMPLETED"}
+        dag = RunRemoteDag("pipeline", self.log_dir, run_dir=self.log_dir, poller=JobStatusPoller(min_interval=0.01))
+        dag.add_job("convert", "echo convert")
+        dag.add_job("report", "echo report", depends_on=["convert"], memory_limit=4000)
+        dag.add_job("maps", "echo maps", depends_on=["convert"])
+        dag.add_job("collect", "echo collect", depends_on=["report", "maps"])
+        self.assertRaises(ValueError, dag.add_job, "other", "true", depends_on=["missing"])
+        self.assertRaises(ValueError, dag.add_job, "maps", "true")
+        self.assertEqual(dag.get_final_jobs(), ["collect"])
+        with mock.patch.object(subprocess, "run", side_effect=fake_slurm(queue, {}, sbatch_calls=sbatch_calls)):
+            statuses = dag.run()
+        self.assertEqual(statuses, {"convert": JobStatus.COMPLETED, "report": JobStatus.COMPLETED, "maps": JobStatus.COMPLETED, "collect": JobStatus.COMPLETED})
+        self.assertEqual(dag.job_ids, {"convert": 101, "report": 102, "maps": 103, "collect": 104})
+        self.assertFalse([arg for arg in sbatch_calls[0][0] if arg.startswith("--dependency")])
+        self.assertIn("--dependency=afterok:101", sbatch_calls[1][0])
+        self.assertIn("--mem=4000", sbatch_calls[1][0])
+        self.assertIn("--dependency=afterok:102:103", sbatch_calls[3][0])
+        self.assertIn("--kill-on-invalid-dep=yes", sbatch_calls[3][0])
+        self.assertIn("echo collect", sbatch_calls[3][1])
+
+    def test_dag_failure(self):
+        """Test that jobs cancelled after a failed dependency are reported by run_async()"""
+        fake_run = fake_slurm({"101": "FAILED", "102": "CANCELLED"}, {}, sbatch_calls=[])
+
+        async def fake_command_async(cmd):
+            return fake_run(cmd).stdout
+
+        dag = RunRemoteDag("pipeline", self.log_dir, run_dir=self.log_dir, poller=JobStatusPoller(min_interval=0.01))
+        dag.add_job("convert", "false")
+        dag.add_job("report", "echo report", depends_on=["convert"])
+        with mock.patch.object(subprocess, "run", side_effect=fake_run), mock.patch.object(RunRemote, "_run_command_async", side_effect=fake_command_async):
+            statuses = asyncio.run(dag.run_async())
+        self.assertEqual(statuses, {"convert": JobStatus.FAILED, "report": JobStatus.CANCELLED})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,150 @@
+##
+# File:    ValidationBatchTests.py
+# Date:    17-Oct-2026
+#
+# Update:
+##
+"""
+Test cases for the multi-entry validation driver
+
+"""
+
+import logging
+import os
+import re
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+if __package__ is None or __package__ == "":
+    import sys
+    from os import path
+
+    sys.path.append(path.dirname(path.abspath(__file__)))
+    from commonsetup import TOPDIR, toolsmissing  # pylint: disable=import-error
+else:
+    from .commonsetup import TOPDIR, toolsmissing
+
+from wwpdb.utils.config.ConfigInfo import getSiteId
+
+from wwpdb.utils.dp.RcsbDpBatch import STATUS_COMPLETED, STATUS_FAILED, readManifest
+from wwpdb.utils.dp.RcsbDpUtility import RcsbDpUtility
+from wwpdb.utils.dp.RunExecutor import RunExecutor
+from wwpdb.utils.dp.ValidationBatch import ValidationBatch, runValidationEntry
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s]-%(module)s.%(funcName)s: %(message)s")
+logger = logging.getLogger()
+
+
+def fakeValidationOp(dp, op):
+    """Create the validation run directory and fail for mode annotate"""
+    paramD = dp._RcsbDpUtility__inputParamDict  # pylint: disable=protected-access
+    os.makedirs(paramD["run_dir"])
+    return -1 if paramD.get("request_validation_mode") == "annotate" else 0
+
+
+def fakeExpList(_dp, dstPathList=None):
+    """Export every report except the PNG image"""
+    for pth in dstPathList:
+        if not pth.endswith(".png"):
+            with open(pth, "w") as ofh:
+                ofh.write("report\n")
+    return True
+
+
+class FakeValidationExecutor(RunExecutor):
+    """Write the reports named in the validator command except the PNG image, and none in mode annotate"""
+
+    name = "fake-validation"
+
+    def run(self, job):
+        with open(job.log_path, "a") as ofh:
+            ofh.write("validator run\n")
+        if "--mode annotate" in job.command:
+            return 0
+        for pth in re.findall(r"--\w+ (\S+/out[\w.]*)", job.command):
+            if not pth.endswith(".png"):
+                with open(pth, "w") as ofh:
+                    ofh.write("report\n")
+        return 0
+
+
+class ValidationBatchTests(unittest.TestCase):
+    def setUp(self):
+        self.__siteId = getSiteId(defaultSiteId=None)
+        self.__outputDir = tempfile.mkdtemp()
+        self.__modelPath = os.path.join(TOPDIR, "tests", "test_files", "2gc2.cif")
+        self.__entryList = [{"entry_id": "D_%d" % ii, "model_path": self.__modelPath, "mode": "release"} for ii in range(4)]
+
+    def tearDown(self):
+        shutil.rmtree(self.__outputDir, ignore_errors=True)
+
+    def testBatchManifest(self):
+        """Test the status manifest of a batch run and resuming from it"""
+        manifestPath = os.path.join(self.__outputDir, "status.csv")
+        batch = ValidationBatch(self.__outputDir, siteId=self.__siteId, numWorkers=2, resultManifestPath=manifestPath, testMode=True)
+        recList = batch.run(self.__entryList + [{"entry_id": "D_bad", "model_path": self.__modelPath, "op": "annot-validation"}])
+        self.assertEqual([rec["status"] for rec in recList], [STATUS_COMPLETED] * 4 + [STATUS_FAILED])
+        recList = readManifest(manifestPath)
+        self.assertEqual(len(recList), 5)
+        self.assertEqual(recList[0]["mode"], "release")
+        # only the failed entry is run again
+        with mock.patch("wwpdb.utils.dp.RcsbDpBatch.ProcessPoolExecutor") as mockPool:
+            mockPool.side_effect = RuntimeError("pool started")
+            recList = batch.run(self.__entryList)
+        self.assertEqual(len(recList), 4)
+        self.assertEqual(batch.getOutputPaths("D_1")["xml"], os.path.join(self.__outputDir, "D_1", "D_1_validation.xml"))
+        self.assertIn("map_coef_2fo", batch.getOutputPaths("D_1", op="annot-wwpdb-validate-all-sf"))
+
+    def testEntryOutputs(self):
+        """Test the output tree and the cleanup of the working files of an entry"""
+        workDir = os.path.join(self.__outputDir, "work")
+        with mock.patch.object(RcsbDpUtility, "op", fakeValidationOp), mock.patch.object(RcsbDpUtility, "expList", fakeExpList):
+            rec = runValidationEntry(self.__entryList[0], "annot-wwpdb-validate-all-v2", self.__outputDir, workDir, self.__siteId, executor="inline")
+            self.assertEqual(rec["status"], STATUS_COMPLETED, rec["message"])
+            self.assertEqual(rec["missing"], ["png"])
+            self.assertEqual(rec["outputs"]["map_coef_mtz"], os.path.join(self.__outputDir, "D_0", "D_0_map_coef.mtz"))
+            self.assertFalse(os.path.exists(os.path.join(workDir, "D_0")))
+            #
+            failed = dict(self.__entryList[1], mode="annotate", sf_path="D_1-sf.cif")
+            rec = runValidationEntry(failed, "annot-wwpdb-validate-all", self.__outputDir, workDir, self.__siteId)
+            self.assertEqual(rec["status"], STATUS_FAILED)
+            self.assertEqual(rec["outputs"], {})
+            # working files are kept for inspection but not the validation run directory
+            self.assertTrue(os.path.exists(os.path.join(workDir, "D_1", "work")))
+            self.assertFalse(os.path.exists(os.path.join(workDir, "D_1", "run")))
+
+    @unittest.skipIf(toolsmissing, "Tools not available for testing")
+    def testBatchExecutor(self):
+        """Test a batch run with the validation commands run by a fake execution backend"""
+        entryList = self.__entryList[:2] + [dict(self.__entryList[2], mode="annotate")]
+        batch = ValidationBatch(self.__outputDir, op="annot-wwpdb-validate-all", siteId=self.__siteId, numWorkers=2, executor=FakeValidationExecutor())
+        recD = {rec["entry_id"]: rec for rec in batch.run(entryList)}
+        for entryId in ("D_0", "D_1"):
+            rec = recD[entryId]
+            self.assertEqual(rec["status"], STATUS_COMPLETED, rec["message"])
+            self.assertEqual(rec["return_code"], 0)
+            self.assertEqual(rec["missing"], ["png"])
+            outputD = batch.getOutputPaths(entryId)
+            del outputD["png"]
+            self.assertEqual(rec["outputs"], outputD)
+            for pth in outputD.values():
+                with open(pth) as ifh:
+                    self.assertEqual(ifh.read(), "report\n")
+            with open(rec["log_path"]) as ifh:
+                self.assertIn("validator run", ifh.read())
+            self.assertFalse(os.path.exists(os.path.join(self.__outputDir, "work", entryId)))
+        # no reports are written for the failed entry
+        rec = recD["D_2"]
+        self.assertEqual(rec["status"], STATUS_FAILED)
+        self.assertEqual(rec["message"], "validation report missing")
+        self.assertEqual(rec["outputs"], {})
+        self.assertEqual(sorted(rec["missing"]), sorted(batch.getOutputPaths("D_2")))
+        self.assertTrue(os.path.exists(os.path.join(self.__outputDir, "work", "D_2", "work")))
+        recList = sorted(readManifest(batch.getResultManifestPath()), key=lambda rec: rec["entry_id"])
+        self.assertEqual(recList, [recD[entryId] for entryId in ("D_0", "D_1", "D_2")])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,329 @@
+import gzip
+import os
+import shutil
+import tempfile
+import unittest
+
+import gemmi
+import msgpack
+import numpy as np
+from mmcif.io.BinaryCifReader import BinaryCifReader
+
+from wwpdb.utils.dp.electron_density.em_density_map import EmVolumes
+from wwpdb.utils.dp.electron_density.volume_server_bcif import (
+    downsample,
+    downsample_axis,
+    get_sampling_counts,
+    pick_sampling,
+    read_ccp4_channel,
+    read_ccp4_header,
+    validate_ccp4_header,
+    write_volume_server_bcif,
+    write_volume_server_bcif_levels,
+)
+
+
+def reference_downsample_axis(values, axis):
+    """downsampling with the volume server kernel, one output value at a time"""
+    values = np.moveaxis(np.asarray(values, dtype=np.float64), axis, 0)
+    size = values.shape[0]
+    out = []
+    for i in range((size + 1) // 2):
+        acc = np.zeros(values.shape[1:])
+        for offset, coefficient in zip(range(-2, 3), (1, 4, 6, 4, 1)):
+            acc = acc + coefficient * values[min(max(2 * i + offset, 0), size - 1)]
+        out.append(acc / 16.0)
+    return np.moveaxis(np.array(out, dtype=np.float32), 0, axis)
+
+
+def read_bcif(bcif_path):
+    """data blocks as {header: {category: {column: array}}} - faster than BinaryCifReader for volumes"""
+    dtypes = {1: "i1", 3: "<i4", 4: "u1", 32: "<f4", 33: "<f8"}
+    block_dict = {}
+    with open(bcif_path, "rb") as ifh:
+        for block in msgpack.unpack(ifh)["dataBlocks"]:
+            category_dict = block_dict.setdefault(block["header"], {})
+            for category in block["categories"]:
+                column_dict = category_dict.setdefault(category["name"], {})
+                for column in category["columns"]:
+                    data = column["data"]["data"]
+                    for encoding in reversed(column["data"]["encoding"]):
+                        if encoding["kind"] == "ByteArray":
+                            data = np.frombuffer(data, dtype=dtypes[encoding["type"]])
+                        elif encoding["kind"] == "IntervalQuantization":
+                            data = encoding["min"] + data * (encoding["max"] - encoding["min"]) / (encoding["numSteps"] - 1)
+                        else:
+                            data = [encoding["stringData"] if index == 0 else None for index in data]
+                    column_dict[column["name"]] = data
+    return block_dict
+
+
+def write_fixture_map(map_path):
+    """map the volume server fixtures are made from - large enough to be downsampled at detail level 1"""
+    k, j, i = np.meshgrid(np.arange(112), np.arange(104), np.arange(96), indexing="ij")
+    values = (((i * 7 + j * 13 + k * 29) % 97 - 48) / 16.0).astype(np.float32)
+    ccp4 = gemmi.Ccp4Map()
+    ccp4.grid = gemmi.FloatGrid(np.ascontiguousarray(values.transpose(2, 1, 0)), gemmi.UnitCell(96, 104, 112, 90, 90, 90), gemmi.SpaceGroup("P 1"))
+    ccp4.update_ccp4_header(2, True)
+    ccp4.write_ccp4_map(map_path)
+
+
+def write_header_word(map_path, word, value, dtype="<i4"):
+    """overwrite header word (1-based) of a map"""
+    with open(map_path, "r+b") as ofh:
+        ofh.seek(4 * (word - 1))
+        ofh.write(np.array([value], dtype=dtype).tobytes())
+
+
+class TestVolumeServerBcif(unittest.TestCase):
+    def setUp(self):
+        self.working_dir = tempfile.mkdtemp()
+        self.map_path = os.path.join(self.working_dir, "em.map")
+        rng = np.random.default_rng(7)
+        self.values = rng.normal(size=(130, 120, 110)).astype(np.float32)
+        ccp4 = gemmi.Ccp4Map()
+        # gemmi grids are indexed (x, y, z)
+        ccp4.grid = gemmi.FloatGrid(np.ascontiguousarray(self.values.transpose(2, 1, 0)), gemmi.UnitCell(110, 120, 130, 90, 90, 90), gemmi.SpaceGroup("P 1"))
+        ccp4.update_ccp4_header(2, True)
+        ccp4.write_ccp4_map(self.map_path)
+        self.bcif_out = os.path.join(self.working_dir, "out", "em.bcif")
+
+    def tearDown(self):
+        shutil.rmtree(self.working_dir, ignore_errors=True)
+
+    def test_sampling_counts(self):
+        self.assertEqual(get_sampling_counts([400, 400, 400]), [[400, 400, 400], [200, 200, 200], [100, 100, 100], [50, 50, 50]])
+        self.assertEqual(get_sampling_counts([56, 93, 53]), [[56, 93, 53], [28, 47, 27]])
+        self.assertEqual(get_sampling_counts([3, 3, 3]), [[3, 3, 3], [2, 2, 2]])
+        self.assertEqual(get_sampling_counts([2, 2, 2]), [[2, 2, 2]])
+
+    def test_downsample(self):
+        values = self.values[:9, :10, :11]
+        for axis in range(3):
+            self.assertTrue(np.array_equal(downsample_axis(values, axis), reference_downsample_axis(values, axis)))
+        sampled = downsample(values)
+        self.assertEqual(sampled.shape, (5, 5, 6))
+        self.assertEqual(sampled.dtype, np.float32)
+        # made in blocks of sections, as one pass along each axis would
+        for block_values in (self.values[:45, :10, :11], np.trunc(self.values[:45, :10, :11] * 10).astype(np.int8)):
+            expected = block_values
+            for axis in (2, 1, 0):
+                expected = downsample_axis(expected, axis)
+            self.assertTrue(np.array_equal(downsample(block_values), expected))
+
+    def test_pick_sampling(self):
+        counts = get_sampling_counts([110, 120, 130])
+        self.assertEqual(pick_sampling(counts, 0), 1)
+        self.assertEqual(pick_sampling(counts, 4), 0)
+        self.assertEqual(pick_sampling(counts, 99), 0)
+
+    def test_read_ccp4_channel(self):
+        channel = read_ccp4_channel(self.map_path, "em")
+        self.assertIsInstance(channel.values, np.memmap)
+        self.assertTrue(np.array_equal(channel.values, self.values))
+        self.assertEqual(channel.extent, [110, 120, 130])
+        self.assertEqual(channel.get_fractional_dimensions(), [1.0, 1.0, 1.0])
+        gz_path = self.map_path + ".gz"
+        with open(self.map_path, "rb") as ifh, gzip.open(gz_path, "wb") as ofh:
+            shutil.copyfileobj(ifh, ofh)
+        self.assertTrue(np.array_equal(read_ccp4_channel(gz_path, "em").values, self.values))
+        # big-endian map
+        be_path = os.path.join(self.working_dir, "be.map")
+        data = bytearray(np.fromfile(self.map_path, dtype="<u4").byteswap().tobytes())
+        data[212:216] = b"\x11\x11\x00\x00"
+        with open(be_path, "wb") as ofh:
+            ofh.write(data)
+        channel = read_ccp4_channel(be_path, "em")
+        self.assertEqual(channel.extent, [110, 120, 130])
+        self.assertTrue(np.array_equal(channel.values, self.values))
+
+    def test_validate_header(self):
+        header = read_ccp4_header(self.map_path)
+        self.assertEqual(header["extent"], [110, 120, 130])
+        self.assertEqual(header["file_size"], os.path.getsize(self.map_path))
+        self.assertEqual(validate_ccp4_header(header), [])
+        self.assertEqual(len(validate_ccp4_header(header, max_voxels=1000)), 1)
+        for word, value, dtype in ((4, 7, "<i4"), (1, 0, "<i4"), (8, -1, "<i4"), (17, 5, "<i4"), (11, np.nan, "<f4"), (14, 0.0, "<f4"), (50, np.inf, "<f4")):
+            bad_path = os.path.join(self.working_dir, "bad.map")
+            shutil.copy(self.map_path, bad_path)
+            write_header_word(bad_path, word, value, dtype=dtype)
+            self.assertEqual(len(validate_ccp4_header(read_ccp4_header(bad_path))), 1, "header word {}".format(word))
+            with self.assertRaises(ValueError):
+                read_ccp4_channel(bad_path, "em")
+        # truncated values
+        with open(self.map_path, "rb") as ifh, open(bad_path, "wb") as ofh:
+            ofh.write(ifh.read(2048))
+        self.assertIn("shorter", validate_ccp4_header(read_ccp4_header(bad_path))[0])
+        with open(bad_path, "wb") as ofh:
+            ofh.write(b"not a map")
+        with self.assertRaises(ValueError):
+            read_ccp4_header(bad_path)
+
+    def test_em_volumes_reject_map(self):
+        bad_path = os.path.join(self.working_dir, "bad.map")
+        shutil.copy(self.map_path, bad_path)
+        write_header_word(bad_path, 4, 7)
+        em = EmVolumes(
+            em_map=bad_path,
+            node_path="node",
+            volume_server_pack_path="pack",
+            volume_server_query_path="query",
+            binary_map_out=self.bcif_out,
+            working_dir=self.working_dir,
+        )
+        self.assertFalse(em.run_conversion())
+        self.assertFalse(os.path.exists(os.path.dirname(self.bcif_out)))
+        em = EmVolumes(
+            em_map=self.map_path,
+            node_path=None,
+            volume_server_pack_path=None,
+            volume_server_query_path=None,
+            binary_map_out=self.bcif_out,
+            working_dir=self.working_dir,
+            max_voxels=1000,
+        )
+        self.assertFalse(em.validate_map())
+        self.assertFalse(em.run_conversion())
+        self.assertFalse(os.path.exists(self.bcif_out))
+
+    def test_write_detail(self):
+        channel = read_ccp4_channel(self.map_path, "em")
+        self.assertEqual(write_volume_server_bcif([channel], self.bcif_out, source_id="em", detail=0), 1)
+        block_dict = read_bcif(self.bcif_out)
+        self.assertEqual(list(block_dict), ["SERVER", "EM"])
+        info = block_dict["EM"]["_volume_data_3d_info"]
+        self.assertEqual(info["sample_rate"][0], 2)
+        self.assertEqual([info["sample_count[{}]".format(i)][0] for i in range(3)], [55, 60, 65])
+        self.assertAlmostEqual(info["mean_source"][0], float(np.mean(self.values, dtype=np.float64)))
+        sampled = downsample(self.values)
+        self.assertAlmostEqual(info["max_sampled"][0], float(sampled.max()))
+        values = block_dict["EM"]["_volume_data_3d"]["values"].reshape(sampled.shape)
+        step = (float(sampled.max()) - float(sampled.min())) / 254
+        self.assertLessEqual(float(np.abs(values - sampled).max()), step / 2 + 1e-6)
+        #
+        write_volume_server_bcif([channel], self.bcif_out, source_id="em", detail=4)
+        self.assertEqual(read_bcif(self.bcif_out)["EM"]["_volume_data_3d_info"]["sample_rate"][0], 1)
+
+    def test_write_levels(self):
+        channel = read_ccp4_channel(self.map_path, "em")
+        output_files = {detail: os.path.join(self.working_dir, "em_d{}.bcif".format(detail)) for detail in (0, 1, 4)}
+        self.assertEqual(write_volume_server_bcif_levels([channel], output_files, source_id="em"), {0: 1, 1: 1, 4: 0})
+        self.assertEqual(read_bcif(output_files[0])["EM"]["_volume_data_3d_info"]["sample_rate"][0], 2)
+        self.assertEqual(read_bcif(output_files[4])["EM"]["_volume_data_3d_info"]["sample_rate"][0], 1)
+        # the same values as written one level at a time
+        write_volume_server_bcif([channel], self.bcif_out, source_id="em", detail=0)
+        self.assertTrue(
+            np.array_equal(read_bcif(output_files[0])["EM"]["_volume_data_3d"]["values"], read_bcif(self.bcif_out)["EM"]["_volume_data_3d"]["values"])
+        )
+
+    def test_binary_cif_reader(self):
+        """Test that a small volume reads with the mmcif BinaryCIF reader"""
+        channel = read_ccp4_channel(self.map_path, "em")
+        channel.values = channel.values[:10, :12, :14]
+        channel.extent = [14, 12, 10]
+        write_volume_server_bcif([channel], self.bcif_out, source_id="em")
+        container_list = BinaryCifReader().deserialize(self.bcif_out)
+        self.assertEqual([container.getName() for container in container_list], ["SERVER", "EM"])
+        self.assertEqual(container_list[0].getObj("density_server_result").getValue("query_source_id", 0), "em")
+        info = container_list[1].getObj("volume_data_3d_info")
+        self.assertEqual(info.getValue("name", 0), "em")
+        self.assertEqual([info.getValue("sample_count[{}]".format(i), 0) for i in range(3)], [14, 12, 10])
+        values = container_list[1].getObj("volume_data_3d").getAttributeValueList("values")
+        self.assertEqual(len(values), 14 * 12 * 10)
+        self.assertAlmostEqual(min(values), float(channel.values.min()), places=5)
+
+    def test_em_volumes_in_process(self):
+        em = EmVolumes(
+            em_map=self.map_path,
+            node_path=None,
+            volume_server_pack_path=None,
+            volume_server_query_path=None,
+            binary_map_out=self.bcif_out,
+            working_dir=self.working_dir,
+            in_process=True,
+            detail_levels=[0, 1],
+        )
+        self.assertEqual(em.get_output_files(), {1: self.bcif_out, 0: os.path.join(self.working_dir, "out", "em_d0.bcif")})
+        self.assertTrue(em.run_conversion())
+        self.assertTrue(os.path.exists(os.path.join(self.working_dir, "out", "em_d0.bcif")))
+        self.assertFalse(os.path.exists(os.path.join(self.working_dir, "em_map.mdb")))
+        em.em_map = os.path.join(self.working_dir, "missing.map")
+        self.assertFalse(em.run_conversion())
+
+
+class TestVolumeServerFixtures(unittest.TestCase):
+    """
+    Compares the in-process writer with BinaryCIF files written by volume-server-pack and volume-server-query
+    for the map of write_fixture_map().  The fixtures are em_d1.bcif and em_d4.bcif in FIXTURE_DIR -
+    test_volume_server_tools copies the files the tools write there if VOLUME_SERVER_FIXTURE_DIR is set.
+    """
+
+    FIXTURE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "test_files", "volume_server")
+    DETAIL_LEVELS = (1, 4)
+
+    def setUp(self):
+        self.working_dir = tempfile.mkdtemp()
+        self.map_path = os.path.join(self.working_dir, "em.map")
+        write_fixture_map(self.map_path)
+
+    def tearDown(self):
+        shutil.rmtree(self.working_dir, ignore_errors=True)
+
+    def write_levels(self, node_path=None, pack_path=None, query_path=None):
+        em = EmVolumes(
+            em_map=self.map_path,
+            node_path=node_path,
+            volume_server_pack_path=pack_path,
+            volume_server_query_path=query_path,
+            binary_map_out=os.path.join(self.working_dir, "node" if node_path else "in_process", "em.bcif"),
+            working_dir=self.working_dir,
+            in_process=not node_path,
+            detail_levels=list(self.DETAIL_LEVELS[1:]),
+        )
+        self.assertTrue(em.run_conversion())
+        output_files = em.get_output_files()
+        return {detail: output_files[detail] for detail in self.DETAIL_LEVELS}
+
+    def assert_same_volume(self, expected_path, actual_path):
+        expected = read_bcif(expected_path)
+        actual = read_bcif(actual_path)
+        self.assertEqual(list(actual), list(expected))
+        for name in ("query_source_id", "query_type", "query_box_type", "is_empty", "has_error"):
+            self.assertEqual(actual["SERVER"]["_density_server_result"][name], expected["SERVER"]["_density_server_result"][name], name)
+        for header in list(expected)[1:]:
+            expected_info = expected[header]["_volume_data_3d_info"]
+            actual_info = actual[header]["_volume_data_3d_info"]
+            self.assertEqual(sorted(actual_info), sorted(expected_info))
+            for name, value in expected_info.items():
+                if name == "name":
+                    self.assertEqual(actual_info[name], value)
+                elif name.startswith(("axis_order", "sample_", "spacegroup_number")):
+                    self.assertTrue(np.array_equal(actual_info[name], value), name)
+                else:
+                    self.assertTrue(np.allclose(actual_info[name], value, rtol=1e-5, atol=1e-6), name)
+            sampled_range = float(expected_info["max_sampled"][0]) - float(expected_info["min_sampled"][0])
+            values = actual[header]["_volume_data_3d"]["values"]
+            self.assertEqual(len(values), len(expected[header]["_volume_data_3d"]["values"]))
+            self.assertLessEqual(float(np.abs(values - expected[header]["_volume_data_3d"]["values"]).max()), sampled_range / 254 + 1e-6)
+
+    def test_volume_server_fixtures(self):
+        fixture_files = {detail: os.path.join(self.FIXTURE_DIR, "em_d{}.bcif".format(detail)) for detail in self.DETAIL_LEVELS}
+        if not all(os.path.exists(pth) for pth in fixture_files.values()):
+            self.skipTest("volume-server fixtures not available")
+        output_files = self.write_levels()
+        self.assertEqual([read_bcif(output_files[detail])["EM"]["_volume_data_3d_info"]["sample_rate"][0] for detail in self.DETAIL_LEVELS], [2, 1])
+        for detail in self.DETAIL_LEVELS:
+            self.assert_same_volume(fixture_files[detail], output_files[detail])
+
+    @unittest.skipUnless(os.environ.get("VOLUME_SERVER_PACK_PATH") and os.environ.get("VOLUME_SERVER_QUERY_PATH"), "volume-server not available")
+    def test_volume_server_tools(self):
+        node_files = self.write_levels(shutil.which("node"), os.environ["VOLUME_SERVER_PACK_PATH"], os.environ["VOLUME_SERVER_QUERY_PATH"])
+        output_files = self.write_levels()
+        for detail in self.DETAIL_LEVELS:
+            self.assert_same_volume(node_files[detail], output_files[detail])
+            if os.environ.get("VOLUME_SERVER_FIXTURE_DIR"):
+                shutil.copy(node_files[detail], os.path.join(os.environ["VOLUME_SERVER_FIXTURE_DIR"], "em_d{}.bcif".format(detail)))
+
+
+if __name__ == "__main__":
+    unittest.main()
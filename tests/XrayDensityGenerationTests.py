@@ -2,7 +2,13 @@ import logging
 import os
 import shutil
 import tempfile
+import time
 import unittest
+from unittest import mock
+
+import gemmi
+import msgpack
+import numpy as np
 
 from wwpdb.utils.dp.electron_density.x_ray_density_map import XrayVolumeServerMap, run_process_with_gemmi
 
@@ -67,6 +73,70 @@ class TestXrayMolStarMaps(unittest.TestCase):
         self.assertTrue(ok)
         self.assertTrue(os.path.exists(self.temp_out_map))
 
+    def test_structure_read_once(self):
+        with mock.patch.object(gemmi, "read_structure", wraps=gemmi.read_structure) as read_structure:
+            for f_column, phi_column in (("pdbx_FWT", "pdbx_PHWT"), ("pdbx_DELFWT", "pdbx_DELPHWT")):
+                ok = self.xrm.gemmi_sf2map(
+                    sf_mmcif_in=self.test_2fofc_map_coeff_file if f_column == "pdbx_FWT" else self.test_fofc_map_coeff_file,
+                    map_out=self.temp_out_map,
+                    f_column=f_column,
+                    phi_column=phi_column,
+                )
+                self.assertTrue(ok)
+        self.assertEqual(read_structure.call_count, 1)
+
+    def test_structure_passed_in(self):
+        structure = gemmi.read_structure(self.test_coord_file, format=gemmi.CoorFormat.Mmcif)
+        xrm = XrayVolumeServerMap(
+            coord_path=None,
+            node_path=None,
+            volume_server_pack_path="missing",
+            volume_server_query_path=None,
+            binary_map_out=self.binary_cif_out,
+            fofc_mmcif_map_coeff_in=self.test_fofc_map_coeff_file,
+            two_fofc_mmcif_map_coeff_in=self.test_2fofc_map_coeff_file,
+            working_dir=self.working_dir,
+            structure=structure,
+        )
+        ok = xrm.gemmi_sf2map(
+            sf_mmcif_in=self.test_2fofc_map_coeff_file,
+            map_out=self.temp_out_map,
+            f_column="pdbx_FWT",
+            phi_column="pdbx_PHWT",
+        )
+        self.assertTrue(ok)
+        self.assertIs(xrm.get_structure(), structure)
+        box = self.xrm.get_fractional_box()
+        self.assertEqual(xrm.get_fractional_box().minimum.tolist(), box.minimum.tolist())
+
+    def test_make_maps_parallel(self):
+        self.xrm.map_workers = 2
+        self.assertTrue(self.xrm.make_maps())
+        self.assertTrue(os.path.exists(self.xrm.two_fo_fc_map))
+        self.assertTrue(os.path.exists(self.xrm.fo_fc_map))
+        sequential_map = os.path.join(self.working_dir, "sequential.map")
+        self.assertTrue(self.xrm.gemmi_sf2map(self.test_fofc_map_coeff_file, sequential_map, "pdbx_DELFWT", "pdbx_DELPHWT"))
+        with open(sequential_map, "rb") as ifh1, open(self.xrm.fo_fc_map, "rb") as ifh2:
+            self.assertEqual(ifh1.read(), ifh2.read())
+
+    def test_make_maps_parallel_failure(self):
+        self.xrm.map_workers = 2
+        self.xrm.fofc_mmcif_map_coeff_in = os.path.join(self.working_dir, "missing.cif")
+        finished = []
+        gemmi_sf2map = self.xrm.gemmi_sf2map
+
+        def slow_sf2map(sf_mmcif_in, *args):
+            if sf_mmcif_in != self.xrm.fofc_mmcif_map_coeff_in:
+                time.sleep(0.5)
+            ok = gemmi_sf2map(sf_mmcif_in, *args)
+            finished.append(ok)
+            return ok
+
+        with mock.patch.object(self.xrm, "gemmi_sf2map", side_effect=slow_sf2map):
+            self.assertFalse(self.xrm.make_maps())
+        # the map still running is finished before the working directory can be removed
+        self.assertEqual(sorted(finished), [False, True])
+
     def test_volume_server_incorrect_exe(self):
         ok = self.xrm.make_volume_server_map(
             two_fofc_map_in=None,
@@ -153,6 +223,36 @@ class TestXrayMolStarMaps(unittest.TestCase):
 
         self.assertFalse(ok)
 
+    def test_run_process_with_gemmi_in_process(self):
+        ok = run_process_with_gemmi(
+            node_path=None,
+            two_fofc_mmcif_map_coeff_in=self.test_2fofc_map_coeff_file,
+            fofc_mmcif_map_coeff_in=self.test_fofc_map_coeff_file,
+            coord_file=self.test_coord_file,
+            binary_map_out=self.binary_cif_out,
+            in_process=True,
+        )
+        self.assertTrue(ok)
+        with open(self.binary_cif_out, "rb") as ifh:
+            block_list = msgpack.unpack(ifh)["dataBlocks"]
+        self.assertEqual([block["header"] for block in block_list], ["SERVER", "2FO-FC", "FO-FC"])
+        info, values = block_list[1]["categories"]
+        counts = [np.frombuffer(column["data"]["data"], dtype="<i4")[0] for column in info["columns"] if column["name"].startswith("sample_count")]
+        self.assertEqual(values["rowCount"], counts[0] * counts[1] * counts[2])
+
+    def test_write_binary_cif_from_grid(self):
+        self.assertTrue(self.xrm.make_maps())
+        with mock.patch("wwpdb.utils.dp.electron_density.x_ray_density_map.read_ccp4_channel") as read_channel:
+            self.assertTrue(self.xrm.write_binary_cif())
+        read_channel.assert_not_called()
+        self.assertTrue(os.path.exists(self.binary_cif_out))
+
+    def test_write_binary_cif_failed_no_fallback(self):
+        self.xrm.in_process = True
+        with mock.patch("wwpdb.utils.dp.electron_density.x_ray_density_map.write_volume_server_bcif_levels", side_effect=ValueError("bad map")):
+            self.assertFalse(self.xrm.run_process())
+        self.assertFalse(os.path.exists(self.binary_cif_out))
+
     def tearDown(self):
         shutil.rmtree(self.working_dir, ignore_errors=True)
 
@@ -36,7 +36,8 @@ class DensityWrapper:
         logging.info("Converting EM maps to binary cif")  # noqa: LOG015
         logging.debug(working_dir)  # noqa: LOG015
         rdb = RcsbDpUtility(tmpPath=working_dir, siteId=self.__site_id, verbose=True)
-        rdb.imp(in_em_volume)
+        # the map is read in place - EM maps are too large to copy into the working directory
+        rdb.addInput(name="em_map", value=in_em_volume, type="file")
         rdb.op("em-density-bcif")
         rdb.exp(out_binary_volume)
         rdb.cleanup()
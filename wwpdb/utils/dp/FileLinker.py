@@ -0,0 +1,97 @@
+##
+# File: FileLinker.py
+# Date: 17-Oct-2026
+#
+# Updates:
+##
+"""
+Link or copy files between the steps of an operation chain.
+
+A reflink (copy-on-write clone) shares the data blocks of the source file but is an
+independent file, so it is used whenever the filesystem supports it.  Otherwise a
+hard link is made, unless the caller may modify the destination in place, and a
+plain copy is the fallback.
+"""
+
+import logging
+import os
+import shutil
+import sys
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+LINK_MODE_COPY = "copy"
+LINK_MODE_LINK = "link"
+
+METHOD_REFLINK = "reflink"
+METHOD_HARDLINK = "hardlink"
+METHOD_COPY = "copy"
+
+# ioctl request cloning a file on Linux - _IOW(0x94, 9, int)
+_FICLONE = 0x40049409
+
+
+def reflinkFile(srcPath, dstPath):
+    """Create dstPath as a copy-on-write clone of srcPath - returns False if the filesystem does not support it."""
+    if fcntl is None or not sys.platform.startswith("linux"):
+        return False
+    try:
+        with open(srcPath, "rb") as ifh, open(dstPath, "wb") as ofh:
+            fcntl.ioctl(ofh.fileno(), _FICLONE, ifh.fileno())
+        shutil.copymode(srcPath, dstPath)
+        return True
+    except OSError:
+        if os.path.exists(dstPath):
+            os.remove(dstPath)
+        return False
+
+
+def linkFile(srcPath, dstPath, allowHardlink=True):
+    """Make dstPath a reflink, hard link or copy of srcPath replacing any existing dstPath.
+
+    Args:
+        srcPath (str): source file path
+        dstPath (str): destination file path
+        allowHardlink (bool): a hard link may be used (only when neither file is modified in place)
+
+    Returns:
+        (str): the method used (METHOD_REFLINK, METHOD_HARDLINK or METHOD_COPY)
+    """
+    tmpPath = "%s.link-%d" % (dstPath, os.getpid())
+    if os.path.lexists(tmpPath):
+        os.remove(tmpPath)
+    method = None
+    if reflinkFile(srcPath, tmpPath):
+        method = METHOD_REFLINK
+    elif allowHardlink:
+        try:
+            os.link(srcPath, tmpPath)
+            method = METHOD_HARDLINK
+        except OSError:
+            pass
+    if method is None:
+        shutil.copyfile(srcPath, tmpPath)
+        shutil.copymode(srcPath, tmpPath)
+        method = METHOD_COPY
+    os.replace(tmpPath, dstPath)
+    logger.debug("Linked %s to %s by %s", srcPath, dstPath, method)
+    return method
+
+
+def unshareFile(filePath):
+    """Replace a file having more than one hard link by a private copy so it can be modified in place.
+
+    Returns True if the file was replaced.
+    """
+    try:
+        if os.stat(filePath).st_nlink < 2:
+            return False
+    except OSError:
+        return False
+    linkFile(filePath, filePath, allowHardlink=False)
+    return True
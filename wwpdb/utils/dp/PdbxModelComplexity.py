@@ -92,6 +92,10 @@ class PdbxModelCompletity:
 
         return True
 
+    def get_data(self):
+        """Returns the complexity values of the last calculated file"""
+        return dict(self.__data)
+
     def write_output(self, fpath):
         """Writes out the"""
 
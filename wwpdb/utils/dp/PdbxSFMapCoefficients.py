@@ -9,23 +9,90 @@ __email__ = "ezra.peisach@rcsb.org"
 __license__ = "Apache 2.0"
 
 import copy
+import gzip
 import logging
 import os
 import shutil
 import tempfile
 
+import gemmi
+import numpy as np
 from mmcif.api.PdbxContainers import DataContainer
 from mmcif.io.IoAdapterCore import IoAdapterCore
+from mmcif.io.PdbxWriter import PdbxWriter
 from wwpdb.utils.config.ConfigInfo import getSiteId
 
 from wwpdb.utils.dp.RcsbDpUtility import RcsbDpUtility
 
 logger = logging.getLogger(__name__)
 
+# refln attributes and the MTZ column labels they are read from - in the order sf_convert names them
+MTZ_COLUMN_LABELS = {
+    "pdbx_FWT": ("FWT", "2FOFCWT"),
+    "pdbx_PHWT": ("PHWT", "PH2FOFCWT"),
+    "pdbx_DELFWT": ("DELFWT", "FOFCWT"),
+    "pdbx_DELPHWT": ("PHDELWT", "DELPHWT", "PHFOFCWT"),
+    "fom": ("FOM",),
+}
+
+
+# refln attributes of an SF file with map coefficients
+MAP_COEFF_ATTRIBUTES = ["index_h", "index_k", "index_l", "fom", "pdbx_DELFWT", "pdbx_DELPHWT", "pdbx_FWT", "pdbx_PHWT"]
+
+
+def probe_map_coeff(pathin):
+    """Returns True if the first data block of PDBx/mmCIF SF file pathin has map coefficients, else returns False
+
+    Only the file up to the end of the refln loop header is read.  Files ending in .gz are decompressed.
+    """
+    attset = set()
+    inblock = False
+    try:
+        opener = gzip.open if pathin.endswith(".gz") else open
+        with opener(pathin, "rt") as ifh:
+            intext = False
+            for line in ifh:
+                # skip multi-line text fields
+                if line.startswith(";"):
+                    intext = not intext
+                    continue
+                if intext:
+                    continue
+                token = line.strip().split(None, 1)[0] if line.strip() else ""
+                if token[:5].lower() == "data_":
+                    if inblock:
+                        break
+                    inblock = True
+                elif token[:7].lower() == "_refln.":
+                    attset.add(token[7:].lower())
+                elif attset and token and not token.startswith("#"):
+                    # first line after the refln tags
+                    break
+    except Exception as e:  # noqa: BLE001
+        logger.info("Unable to read %s: %s", pathin, str(e))
+        return False
+
+    missing = [att for att in MAP_COEFF_ATTRIBUTES if att.lower() not in attset]
+    if missing:
+        logger.debug("Missing %s from sf file %s", missing, pathin)
+    return not missing
+
+
+def _cif_value(value):
+    """Returns value as a CIF token"""
+    if value is None:
+        return "?"
+    value = str(value)
+    if value in ("?", "."):
+        return value
+    return gemmi.cif.quote(value)
+
 
 class PdbxSFMapCoefficients:
     def __init__(self, siteid=None, tmppath="/tmp", cleanup=True):  # noqa: S108
         self.__sf = None
+        # map coefficients read from an MTZ file by gemmi (see read_mtz_sf())
+        self.__mtz_coef = None
         self.__siteid = getSiteId(siteid)
         self.__cleanup = cleanup
         self.__tmppath = tmppath
@@ -37,6 +104,7 @@ class PdbxSFMapCoefficients:
         """
 
         logger.debug("Starting read %s", pathin)
+        self.__mtz_coef = None
         try:
             io = IoAdapterCore()
             self.__sf = io.readFile(pathin)
@@ -46,8 +114,21 @@ class PdbxSFMapCoefficients:
             self.__sf = None
             return False
 
-    def has_map_coeff(self):
-        """Returns True if read in SF file has map coefficients, else returns False"""
+    def has_map_coeff(self, pathin=None):
+        """Returns True if read in SF file has map coefficients, else returns False
+
+        If the PDBx/mmCIF file pathin is given, only its header is probed (see probe_map_coeff())
+        and the file is not read in.
+        """
+        if pathin is not None:
+            return probe_map_coeff(pathin)
+
+        if self.__mtz_coef is not None:
+            missing = [att for att in MTZ_COLUMN_LABELS if att not in self.__mtz_coef["columns"]]
+            if missing:
+                logger.debug("Missing %s from mtz file", missing)
+            return not missing
+
         if self.__sf is None:
             return False
 
@@ -62,21 +143,56 @@ class PdbxSFMapCoefficients:
             return False
 
         alist = c0.getAttributeList()
-        for att in ["index_h", "index_k", "index_l", "fom", "pdbx_DELFWT", "pdbx_DELPHWT", "pdbx_FWT", "pdbx_PHWT"]:
+        for att in MAP_COEFF_ATTRIBUTES:
             if att not in alist:
                 logger.debug("Missing %s from sf file", att)
                 return False
 
         return True
 
-    def read_mtz_sf(self, pathin):
+    def read_mtz_sf(self, pathin, use_gemmi=True):
         """Reads MTZ structure factor file
 
+        With use_gemmi the map coefficient columns are read in process, otherwise (or if
+        gemmi cannot read the file) the file is converted to PDBx/mmCIF by sf_convert.
+
         Return True on success, otherwise False
         """
 
         logger.debug("Starting mtz read %s", pathin)
+        if use_gemmi:
+            if self.__read_mtz_gemmi(pathin):
+                return True
+            logger.info("Falling back to sf_convert for %s", pathin)
+        return self.__read_mtz_sf_convert(pathin)
+
+    def __read_mtz_gemmi(self, pathin):
+        """Reads the cell, space group and map coefficient columns of an MTZ file"""
+        try:
+            mtz = gemmi.read_mtz_file(pathin)
+            columns = {}
+            for att, labels in MTZ_COLUMN_LABELS.items():
+                for label in labels:
+                    column = mtz.column_with_label(label)
+                    if column is not None:
+                        columns[att] = np.array(column, dtype=np.float64)
+                        break
+            self.__mtz_coef = {
+                "cell": mtz.cell.parameters,
+                "space_group": mtz.spacegroup.hm if mtz.spacegroup else None,
+                "space_group_number": mtz.spacegroup.number if mtz.spacegroup else None,
+                "hkl": np.asarray(mtz.make_miller_array(), dtype=np.int64),
+                "columns": columns,
+            }
+            self.__sf = None
+            return True
+        except Exception as e:  # noqa: BLE001
+            logger.info("Unable to read %s with gemmi: %s", pathin, str(e))
+            self.__mtz_coef = None
+            return False
 
+    def __read_mtz_sf_convert(self, pathin):
+        """Converts the MTZ file with sf_convert and reads the resulting PDBx/mmCIF file"""
         suffix = "-dir"
         prefix = "rcsb-"
         if self.__tmppath is not None and os.path.isdir(self.__tmppath):
@@ -111,53 +227,91 @@ class PdbxSFMapCoefficients:
 
         entry.id will be set to entry_id
         """
-        ret1 = self.__write_mmcif(fopathout, "fo", entry_id)
-        ret2 = self.__write_mmcif(twofopathout, "2fo", entry_id)
-        return ret1 and ret2
+        if self.__mtz_coef is not None:
+            ret1 = self.__write_mmcif_mtz(fopathout, "fo", entry_id)
+            ret2 = self.__write_mmcif_mtz(twofopathout, "2fo", entry_id)
+            return ret1 and ret2
+        return self.__write_mmcif(fopathout, twofopathout, entry_id)
 
-    def __write_mmcif(self, pathout, coef, entry_id):
-        """Writes out the specific map coefficients"""
+    def __write_mmcif(self, fopathout, twofopathout, entry_id):
+        """Writes out the fo-fc and 2fo-fc map coefficients in a single pass over the refln rows"""
 
         # Categories that will not be copied
         _striplist = ["audit", "diffrn_radiation_wavelength", "exptl_crystal", "reflns_scale"]
 
-        # refln attributes to keep
-        _keepattr = ["index_h", "index_k", "index_l", "fom"]
-        if coef == "fo":
-            _keepattr.extend(["pdbx_DELFWT", "pdbx_DELPHWT"])
-        else:
-            _keepattr.extend(["pdbx_FWT", "pdbx_PHWT"])
-
-        # Datablockname
-        blkname = f"{entry_id}{coef}"
-        new_cont = DataContainer(blkname)
-
         # Only care about first block
         blockin = self.__sf[0]
+        refln = blockin.getObj("refln")
+        if refln is None:
+            logger.error("No refln category in sf file")
+            return False
+        attlist = refln.getAttributeList()
 
-        for objname in blockin.getObjNameList():
-            if objname in _striplist:
-                continue
-
-            myobj = blockin.getObj(objname)
-
-            # Make a copy of the original - as likely will need to modify
-            modobj = copy.deepcopy(myobj)
-            if objname == "entry":
-                modobj.setValue(entry_id, "id", 0)
-            if objname in ["cell", "symmetry"]:
-                modobj.setValue(entry_id, "entry_id", 0)
-            if objname == "refln":
-                # Remove all but what we want
-                # Make a copy to ensure not messed with during operation
-                for attr in list(modobj.getAttributeList()):
-                    if attr not in _keepattr:
-                        modobj.removeAttribute(attr)
-
-            new_cont.append(modobj)
-
-        # new_cont.printIt()
-        io = IoAdapterCore()
-        # Write out a single block
-        ret = io.writeFile(pathout, [new_cont])
-        return ret
+        try:
+            with open(fopathout, "w") as fofh, open(twofopathout, "w") as twofofh:
+                outlist = []
+                for ofh, coef, coefattr in ((fofh, "fo", ["pdbx_DELFWT", "pdbx_DELPHWT"]), (twofofh, "2fo", ["pdbx_FWT", "pdbx_PHWT"])):
+                    # Other categories are passed through - only the few entry ids are changed on copies
+                    new_cont = DataContainer(f"{entry_id}{coef}")
+                    for objname in blockin.getObjNameList():
+                        if objname in _striplist or objname == "refln":
+                            continue
+                        myobj = blockin.getObj(objname)
+                        if objname == "entry":
+                            myobj = copy.deepcopy(myobj)
+                            myobj.setValue(entry_id, "id", 0)
+                        if objname in ["cell", "symmetry"]:
+                            myobj = copy.deepcopy(myobj)
+                            myobj.setValue(entry_id, "entry_id", 0)
+                        new_cont.append(myobj)
+                    PdbxWriter(ofh).write([new_cont])
+
+                    # refln attributes to keep - in their input order
+                    keepattr = [attr for attr in attlist if attr in ["index_h", "index_k", "index_l", "fom"] + coefattr]
+                    ofh.write("loop_\n" + "".join("_refln.%s\n" % attr for attr in keepattr))
+                    outlist.append((ofh, [attlist.index(attr) for attr in keepattr]))
+
+                for row in refln.getRowList():
+                    for ofh, indices in outlist:
+                        ofh.write(" ".join(_cif_value(row[idx]) for idx in indices) + "\n")
+                for ofh, _indices in outlist:
+                    ofh.write("#\n")
+            return True
+        except Exception as e:  # noqa: BLE001
+            logger.exception("Writing map coefficients failing with %s", str(e))
+            return False
+
+    def __write_mmcif_mtz(self, pathout, coef, entry_id):
+        """Writes out the specific map coefficients from the MTZ columns"""
+        attrs = ["pdbx_DELFWT", "pdbx_DELPHWT", "fom"] if coef == "fo" else ["pdbx_FWT", "pdbx_PHWT", "fom"]
+        mtz_coef = self.__mtz_coef
+        try:
+            cell = mtz_coef["cell"]
+            lines = [
+                "data_%s%s" % (entry_id, coef),
+                "#",
+                "_cell.entry_id %s" % gemmi.cif.quote(entry_id),
+            ]
+            for name, value in zip(("length_a", "length_b", "length_c", "angle_alpha", "angle_beta", "angle_gamma"), cell):
+                lines.append("_cell.%s %.3f" % (name, value))
+            lines += ["#", "_entry.id %s" % gemmi.cif.quote(entry_id), "#", "_symmetry.entry_id %s" % gemmi.cif.quote(entry_id)]
+            if mtz_coef["space_group"]:
+                lines.append("_symmetry.space_group_name_H-M %s" % gemmi.cif.quote(mtz_coef["space_group"]))
+                lines.append("_symmetry.Int_Tables_number %d" % mtz_coef["space_group_number"])
+            lines += ["#", "loop_"] + ["_refln.%s" % att for att in ["index_h", "index_k", "index_l"] + attrs]
+            #
+            columns = [mtz_coef["hkl"][:, ii].astype(str) for ii in range(3)]
+            for att in attrs:
+                values = mtz_coef["columns"][att]
+                if att.endswith("PHWT"):
+                    # phases in the range 0 to 360 as written by sf_convert
+                    values = np.mod(values, 360.0)
+                columns.append(np.where(np.isnan(values), "?", np.char.mod("%.2f", values)))
+            with open(pathout, "w") as ofh:
+                ofh.write("\n".join(lines) + "\n")
+                ofh.write("\n".join(" ".join(row) for row in zip(*columns)))
+                ofh.write("\n#\n")
+            return True
+        except Exception as e:  # noqa: BLE001
+            logger.exception("Writing %s failing with %s", pathout, str(e))
+            return False
@@ -0,0 +1,195 @@
+##
+# File: ProcessSupervisor.py
+# Date: 17-Oct-2026
+#
+# Updates:
+##
+"""
+Event driven supervision of a child process with an optional timeout.
+
+The child runs in its own session so that the whole process group can be killed on
+timeout or cancellation.  Its output may be streamed directly into a log file so that
+no pipe is left undrained.  Waiting for the child is done without polling: on Linux
+the process file descriptor (pidfd) is waited on with poll(2) and elsewhere a helper
+thread blocks in wait4(2) while the caller blocks on an event.  In both cases the child
+is reaped with os.wait4() so that its resource usage is available afterwards.
+"""
+
+import logging
+import os
+import select
+import signal
+import subprocess
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class ProcessSupervisor:
+    """Run a command as a supervised child process."""
+
+    def __init__(self, command, logPath=None, timeout=None, shell=True, env=None, cwd=None):
+        """
+        Args:
+            command (str or list): command to execute (string with sh semantics when shell is True)
+            logPath (str): file to which child stdout and stderr are appended (default: inherited)
+            timeout (float): seconds after which the child process group is killed (default: no limit)
+            shell (bool): execute command through the shell
+            env (dict): environment for the child process (default: inherited)
+            cwd (str): working directory for the child process
+        """
+        self.__command = command
+        self.__logPath = logPath
+        self.__timeout = timeout if timeout is not None and timeout > 0 else None
+        self.__shell = shell
+        self.__env = env
+        self.__cwd = cwd
+        self.__process = None
+        self.__lock = threading.Lock()
+        self.__reaped = None
+        # set by the first caller of __reap() - others wait until it has recorded the return code
+        self.__reaping = False
+        self.__reapDone = threading.Event()
+        #
+        self.returncode = None
+        self.rusage = None
+        self.timedOut = False
+        self.killed = False
+        self.startTime = None
+        self.endTime = None
+
+    @property
+    def pid(self):
+        return self.__process.pid if self.__process is not None else None
+
+    def start(self):
+        """Start the child process."""
+        ofh = open(self.__logPath, "ab") if self.__logPath is not None else None
+        try:
+            self.startTime = time.time()
+            self.__process = subprocess.Popen(  # noqa: S603
+                self.__command,
+                stdout=ofh,
+                stderr=subprocess.STDOUT if ofh is not None else None,
+                shell=self.__shell,
+                close_fds=True,
+                start_new_session=True,
+                env=self.__env,
+                cwd=self.__cwd,
+            )
+        finally:
+            if ofh is not None:
+                ofh.close()
+        return self.__process.pid
+
+    def wait(self):
+        """Wait for the child process to exit or for the timeout to expire.
+
+        Returns the child return code, or None if the child was killed on timeout.
+        """
+        if self.__process is None:
+            self.start()
+        if self.returncode is not None:
+            return None if self.timedOut else self.returncode
+        #
+        if not self.__waitExit(self.__timeout):
+            self.timedOut = True
+            self.kill()
+            self.__waitExit(None)
+            return None
+        return self.returncode
+
+    def run(self):
+        """Start the child process and wait for it.  Returns as wait()."""
+        self.start()
+        return self.wait()
+
+    def kill(self, sig=signal.SIGKILL):
+        """Send sig to the process group of the child if it is still running."""
+        with self.__lock:
+            if self.__process is None or self.returncode is not None:
+                return False
+            try:
+                os.killpg(self.__process.pid, sig)
+                self.killed = True
+                return True
+            except OSError as e:
+                logger.debug("Unable to signal process group %r with %s", self.__process.pid, str(e))
+        return False
+
+    def getElapsedTime(self):
+        if self.startTime is None:
+            return None
+        return (self.endTime if self.endTime is not None else time.time()) - self.startTime
+
+    def __waitExit(self, timeout):
+        """Block until the child has exited and has been reaped, or until timeout seconds.
+
+        Returns True if the child has been reaped.
+        """
+        pidfd_open = getattr(os, "pidfd_open", None)
+        if pidfd_open is not None:
+            try:
+                fd = pidfd_open(self.__process.pid)
+            except OSError:
+                # The kernel may not support pidfd or the child has already been reaped
+                fd = None
+            if fd is not None:
+                try:
+                    poller = select.poll()
+                    poller.register(fd, select.POLLIN)
+                    if not poller.poll(None if timeout is None else int(timeout * 1000)):
+                        return False
+                finally:
+                    os.close(fd)
+                self.__reap()
+                return True
+        #
+        # Portable path - a single helper thread blocks in wait4() and signals an event
+        with self.__lock:
+            if self.__reaped is None:
+                self.__reaped = threading.Event()
+                thread = threading.Thread(target=self.__reapAndSignal, name="reaper-%d" % self.__process.pid)
+                thread.daemon = True
+                thread.start()
+        return self.__reaped.wait(timeout)
+
+    def __reapAndSignal(self):
+        try:
+            self.__reap()
+        finally:
+            self.__reaped.set()
+
+    def __reap(self):
+        """Reap the child with wait4() recording the return code and resource usage.
+
+        Only the first caller reaps the child, later callers wait until it has done so.
+        """
+        with self.__lock:
+            claimed = not self.__reaping
+            self.__reaping = True
+        if not claimed:
+            self.__reapDone.wait()
+            return
+        try:
+            self.__wait4()
+        finally:
+            self.__reapDone.set()
+
+    def __wait4(self):
+        try:
+            _pid, status, rusage = os.wait4(self.__process.pid, 0)
+            if os.WIFSIGNALED(status):
+                returncode = -os.WTERMSIG(status)
+            else:
+                returncode = os.WEXITSTATUS(status)
+        except ChildProcessError:
+            # Already reaped elsewhere
+            rusage = None
+            returncode = self.__process.wait()
+        with self.__lock:
+            self.endTime = time.time()
+            self.rusage = rusage
+            self.returncode = returncode
+            self.__process.returncode = returncode
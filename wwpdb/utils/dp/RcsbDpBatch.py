@@ -0,0 +1,277 @@
+##
+# File: RcsbDpBatch.py
+# Date: 17-Oct-2026
+#
+# Updates:
+##
+"""
+Batch driver running the same RcsbDpUtility operation chain over many entries.
+
+Entries are processed in parallel in a bounded pool of worker processes.  Each entry
+is given its own directory below the batch directory holding the working files, the
+exported result and the step log.  A result manifest (JSON or CSV) recording the
+per-entry status is rewritten as entries complete, and a rerun of the same batch
+skips the entries the manifest already reports as completed.
+
+Input manifest entries are dictionaries (JSON list or CSV rows) with the keys:
+
+    entry_id     -  identifier of the entry (used for the entry directory name)
+    source_path  -  input file imported before the first operation
+    result_path  -  (optional) export path for the final result
+    params       -  (optional, JSON only) dictionary of extra addInput() parameters
+
+"""
+
+import argparse
+import csv
+import functools
+import json
+import logging
+import os
+import shutil
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from wwpdb.utils.dp.RcsbDpUtility import RcsbDpUtility
+from wwpdb.utils.dp.RunRemote import JobStatus
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_FIELDS = ["entry_id", "source_path", "status", "failed_op", "return_codes", "result_path", "log_path", "elapsed", "message"]
+# manifest fields written to CSV manifests as JSON, so that they read back with their type
+MANIFEST_JSON_FIELDS = ["return_codes", "return_code", "outputs", "missing", "elapsed"]
+STATUS_COMPLETED = "completed"
+STATUS_FAILED = "failed"
+
+
+def readManifest(filePath):
+    """Read a JSON or CSV manifest and return a list of dictionaries - missing files return []
+
+    The fields in MANIFEST_JSON_FIELDS of CSV manifests are decoded from JSON, so that records read
+    back from either format have the same types.
+    """
+    if not os.path.exists(filePath):
+        return []
+    if filePath.endswith(".csv"):
+        with open(filePath, newline="") as ifh:
+            recordList = list(csv.DictReader(ifh))
+        # empty cells are read as None, as written for None
+        return [{ky: (json.loads(val) if ky in MANIFEST_JSON_FIELDS else val) if val else None for ky, val in rec.items()} for rec in recordList]
+    with open(filePath) as ifh:
+        return json.load(ifh)
+
+
+def writeManifest(filePath, recordList, fieldList=None):
+    """Write the records to a JSON or CSV manifest (selected by the file extension) replacing any prior file."""
+    fieldList = fieldList if fieldList else MANIFEST_FIELDS
+    tmpPath = filePath + ".tmp"
+    if filePath.endswith(".csv"):
+        with open(tmpPath, "w", newline="") as ofh:
+            writer = csv.DictWriter(ofh, fieldnames=fieldList, extrasaction="ignore")
+            writer.writeheader()
+            for rec in recordList:
+                writer.writerow({k: json.dumps(v) if k in MANIFEST_JSON_FIELDS or isinstance(v, (list, dict)) else v for k, v in rec.items()})
+    else:
+        with open(tmpPath, "w") as ofh:
+            json.dump(recordList, ofh, indent=2)
+    os.replace(tmpPath, filePath)
+
+
+def isOpSuccess(ret):
+    """Local operations return 0 on success and remote operations JobStatus.COMPLETED"""
+    return ret == 0 or ret == JobStatus.COMPLETED
+
+
+def runOpChainEntry(entry, opList, batchDir, siteId, params=None, cleanup=True, testMode=False):
+    """Import the entry source file, run the operations in opList and export the final result and logs.
+
+    Returns a manifest record for the entry.
+    """
+    startTime = time.time()
+    entryId = entry["entry_id"]
+    entryDir = os.path.join(batchDir, str(entryId))
+    wrkPath = os.path.join(entryDir, "work")
+    resultPath = entry.get("result_path") or os.path.join(entryDir, "%s_result" % entryId)
+    logPath = os.path.join(entryDir, "%s.log" % entryId)
+    rec = {
+        "entry_id": entryId,
+        "source_path": entry.get("source_path"),
+        "status": STATUS_FAILED,
+        "failed_op": None,
+        "return_codes": [],
+        "result_path": resultPath,
+        "log_path": logPath,
+        "elapsed": None,
+        "message": None,
+    }
+    try:
+        if cleanup and os.path.isdir(wrkPath):
+            # left over from an earlier failed run
+            shutil.rmtree(wrkPath, ignore_errors=True)
+        if os.path.exists(logPath):
+            os.remove(logPath)
+        dp = RcsbDpUtility(tmpPath=entryDir, siteId=siteId, testMode=testMode)
+        dp.setWorkingDir(wrkPath)
+        allParams = dict(params) if params else {}
+        allParams.update(entry.get("params") or {})
+        for name, value in allParams.items():
+            dp.addInput(name=name, value=value)
+        if entry.get("source_path"):
+            dp.imp(entry["source_path"])
+        ok = True
+        for op in opList:
+            ret = dp.op(op)
+            rec["return_codes"].append(ret if isinstance(ret, int) else str(ret))
+            if not isOpSuccess(ret):
+                rec["failed_op"] = op
+                rec["message"] = "operation %s returned %r" % (op, ret)
+                ok = False
+                break
+        if not testMode:
+            dp.expLogAll(logPath)
+            if ok and not dp.exp(resultPath):
+                rec["message"] = "result file missing"
+                ok = False
+        if ok:
+            rec["status"] = STATUS_COMPLETED
+            if cleanup:
+                dp.cleanup()
+    except Exception as e:  # noqa: BLE001
+        logger.exception("Entry %s failing with %s", entryId, str(e))
+        rec["message"] = str(e)
+    rec["elapsed"] = round(time.time() - startTime, 3)
+    return rec
+
+
+class RcsbDpBatch:
+    """Run an operation chain over a manifest of entries in a bounded pool of worker processes."""
+
+    def __init__(self, batchDir, opList, siteId="DEV", numWorkers=4, resultManifestPath=None, cleanup=True, testMode=False):
+        """
+        Args:
+            batchDir (str): directory holding one subdirectory per entry
+            opList (list): operations applied in order to each imported entry
+            siteId (str): site identifier passed to RcsbDpUtility
+            numWorkers (int): maximum number of entries processed at the same time
+            resultManifestPath (str): result manifest (.json or .csv) - default batchDir/batch-manifest.json
+            cleanup (bool): remove the working files of entries that complete
+            testMode (bool): run RcsbDpUtility in test mode (operations are bypassed)
+        """
+        self.__batchDir = os.path.abspath(batchDir)
+        self.__opList = list(opList)
+        self.__siteId = siteId
+        self.__numWorkers = max(1, int(numWorkers))
+        self.__resultManifestPath = resultManifestPath if resultManifestPath else os.path.join(self.__batchDir, "batch-manifest.json")
+        self.__cleanup = cleanup
+        self.__testMode = testMode
+        self.__params = {}
+        if not os.path.isdir(self.__batchDir):
+            os.makedirs(self.__batchDir, 0o755)
+
+    def addInput(self, name=None, value=None, type="param"):  # noqa: A002 # pylint: disable=redefined-builtin
+        """Add a named input applied to every entry (see RcsbDpUtility.addInput())."""
+        if type == "file":
+            value = os.path.abspath(value)
+        elif type != "param":
+            return False
+        self.__params[name] = value
+        return True
+
+    def getResultManifestPath(self):
+        return self.__resultManifestPath
+
+    def getEntryDir(self, entryId):
+        return os.path.join(self.__batchDir, str(entryId))
+
+    def run(self, entryList):
+        """Process the entries in entryList skipping those already completed in the result manifest.
+
+        Returns the list of manifest records for all entries in entryList.
+        """
+        worker = functools.partial(
+            runOpChainEntry,
+            opList=self.__opList,
+            batchDir=self.__batchDir,
+            siteId=self.__siteId,
+            params=self.__params,
+            cleanup=self.__cleanup,
+            testMode=self.__testMode,
+        )
+        return runEntries(entryList, worker, self.__resultManifestPath, numWorkers=self.__numWorkers, isCompleted=self.__isCompleted)
+
+    def __isCompleted(self, rec):
+        return self.__testMode or os.path.exists(rec.get("result_path") or "")
+
+
+def runEntries(entryList, worker, resultManifestPath, numWorkers=4, isCompleted=None, fieldList=None):
+    """Run worker(entry) for each entry in a pool of numWorkers processes and collect the returned manifest records.
+
+    Entries which the result manifest already reports as completed, and for which the
+    optional check isCompleted(record) holds, are skipped.  The manifest is rewritten as
+    entries finish with the fields fieldList (default MANIFEST_FIELDS) when written as CSV.
+    worker must be picklable (e.g. a functools.partial of a module function).
+
+    Returns the list of manifest records for all entries in entryList.
+    """
+    recD = {}
+    for rec in readManifest(resultManifestPath):
+        recD[rec["entry_id"]] = rec
+    #
+    pendingList = []
+    for entry in entryList:
+        rec = recD.get(entry["entry_id"])
+        if rec and rec.get("status") == STATUS_COMPLETED and (isCompleted is None or isCompleted(rec)):
+            logger.debug("Skipping completed entry %s", entry["entry_id"])
+            continue
+        pendingList.append(entry)
+    logger.info("Batch of %d entries - %d pending with %d workers", len(entryList), len(pendingList), numWorkers)
+    #
+    if pendingList:
+        with ProcessPoolExecutor(max_workers=numWorkers) as executor:
+            futureD = {executor.submit(worker, entry): entry for entry in pendingList}
+            for future in as_completed(futureD):
+                entry = futureD[future]
+                try:
+                    rec = future.result()
+                except Exception as e:  # noqa: BLE001
+                    logger.exception("Entry %s failing with %s", entry["entry_id"], str(e))
+                    rec = {"entry_id": entry["entry_id"], "status": STATUS_FAILED, "message": str(e)}
+                logger.info("Entry %s %s", rec["entry_id"], rec["status"])
+                recD[rec["entry_id"]] = rec
+                writeManifest(resultManifestPath, list(recD.values()), fieldList)
+    else:
+        writeManifest(resultManifestPath, list(recD.values()), fieldList)
+    #
+    return [recD[entry["entry_id"]] for entry in entryList if entry["entry_id"] in recD]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--manifest", help="input manifest of entries (.json or .csv)", type=str, required=True)
+    parser.add_argument("--ops", help="comma separated list of operations", type=str, required=True)
+    parser.add_argument("--batch_dir", help="directory for per-entry working and result files", type=str, required=True)
+    parser.add_argument("--result_manifest", help="result manifest (.json or .csv)", type=str)
+    parser.add_argument("--workers", help="number of entries processed at the same time", type=int, default=4)
+    parser.add_argument("--site_id", help="site identifier", type=str, default=os.environ.get("WWPDB_SITE_ID", "DEV"))
+    parser.add_argument("--keep_work", help="keep working files of completed entries", action="store_true")
+    parser.add_argument("-d", "--debug", help="debugging", action="store_const", dest="loglevel", const=logging.DEBUG, default=logging.INFO)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=args.loglevel, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+    batch = RcsbDpBatch(
+        batchDir=args.batch_dir,
+        opList=[op.strip() for op in args.ops.split(",") if op.strip()],
+        siteId=args.site_id,
+        numWorkers=args.workers,
+        resultManifestPath=args.result_manifest,
+        cleanup=not args.keep_work,
+    )
+    recList = batch.run(readManifest(args.manifest))
+    nFailed = len([rec for rec in recList if rec["status"] != STATUS_COMPLETED])
+    logger.info("Batch completed with %d of %d entries failed", nFailed, len(recList))
+    return 1 if nFailed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,92 @@
+##
+# File: RcsbDpChain.py
+# Date: 17-Oct-2026
+#
+# Updates:
+##
+"""
+Run a chain of RcsbDpUtility operations within a single job allocation.
+
+RcsbDpUtility.opChain() writes a specification of the chain (site, input file,
+input parameters and operations) and submits this module as one remote job.  The
+operations then run one after the other on the compute node, each on the result of
+the previous one, in a working directory below that of the submitting instance.
+The final result and the concatenated logs are exported to the paths given in the
+specification and a summary is written for the submitting instance.
+"""
+
+import argparse
+import json
+import logging
+import os
+
+from wwpdb.utils.dp.RcsbDpUtility import RcsbDpUtility
+from wwpdb.utils.dp.RunExecutor import EXECUTOR_INLINE
+from wwpdb.utils.dp.RunRemote import JobStatus
+
+logger = logging.getLogger(__name__)
+
+
+def runChain(spec):
+    """Run the chain of operations described by the dictionary spec and return the summary dictionary."""
+    dp = RcsbDpUtility(tmpPath=spec.get("tmp_path"), siteId=spec["site_id"])
+    # the operations run here rather than being submitted again
+    dp.setExecutor(EXECUTOR_INLINE)
+    dp.setWorkingDir(spec["work_path"])
+    if spec.get("timeout"):
+        dp.setTimeout(spec["timeout"])
+    dp.setNumThreads(spec.get("num_threads", 1))
+    if spec.get("link_mode"):
+        dp.setLinkMode(spec["link_mode"])
+    for name, value in spec.get("params", {}).items():
+        dp.addInput(name=name, value=value)
+    if spec.get("input_path"):
+        dp.imp(spec["input_path"])
+    #
+    ret = 0
+    failedOp = None
+    for op in spec["ops"]:
+        ret = dp.op(op)
+        if not (ret == 0 or ret == JobStatus.COMPLETED):
+            failedOp = op
+            break
+    #
+    resultPath = spec.get("result_path")
+    if failedOp is None and resultPath:
+        dp.exp(resultPath)
+    if spec.get("log_path"):
+        dp.expLogAll(spec["log_path"])
+    localResultPath = os.path.join(dp.getWorkingDir(), "result_file_%d" % dp.saveResult())
+    summary = {
+        "return_code": ret if ret is None or isinstance(ret, int) else str(getattr(ret, "value", ret)),
+        "failed_op": failedOp,
+        "step_no": dp.saveResult(),
+        "result_path_list": [resultPath if pth == localResultPath and resultPath else pth for pth in dp.getResultPathList()],
+        "step_metrics": dp.getStepMetrics(),
+    }
+    if spec.get("summary_path"):
+        with open(spec["summary_path"], "w") as ofh:
+            json.dump(summary, ofh, indent=2)
+    return summary
+
+
+def main():
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(
+        prog="RcsbDpChain.py",
+        description="Runs a chain of data processing operations described by a JSON specification",
+    )
+    parser.add_argument("--spec", required=True, help="JSON specification of the chain")
+    args = parser.parse_args()
+
+    with open(args.spec) as ifh:
+        spec = json.load(ifh)
+    summary = runChain(spec)
+    # the job itself succeeds - the submitting instance reads the outcome from the summary so that
+    # a failing operation is not resubmitted as a failed job
+    if summary["failed_op"] is not None:
+        logger.error("Operation %s failed with return code %r", summary["failed_op"], summary["return_code"])
+
+
+if __name__ == "__main__":
+    main()
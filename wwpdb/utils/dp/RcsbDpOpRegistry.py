@@ -0,0 +1,635 @@
+##
+# File: RcsbDpOpRegistry.py
+# Date: 17-Oct-2026
+#
+# Updates:
+##
+"""
+Registry of the operations supported by RcsbDpUtility.
+
+The registry is built once at import time and maps each operation name to an
+OpDescriptor holding the operation family (which selects the step method that runs
+it), the input parameters it requires and, for operations whose command line has a
+uniform shape, a precompiled command template with its environment block, output
+redirection and expected outputs.  Operations without a template are assembled by the
+family step method - these run several programs, stage or post-process files in ways
+a single command line does not describe (validation, map calculations, the dcc and
+sf-convert reports, chemical shift checks, PDBx/NMR-STAR and stripped PDBx
+conversions, bundle and assembly file generation) or belong to the maxit, rcsb, pisa,
+sequence, validate, db and pointsuite families.  Deterministic operations also name
+the tool whose installation identifies the build for the result cache
+(RcsbDpResultCache).
+"""
+
+OP_FAMILY_MAXIT = "maxit"
+OP_FAMILY_RCSB = "rcsb"
+OP_FAMILY_PISA = "pisa"
+OP_FAMILY_ANNOTATION = "annotation"
+OP_FAMILY_SEQUENCE = "sequence"
+OP_FAMILY_VALIDATE = "validate"
+OP_FAMILY_DB = "db"
+OP_FAMILY_EM = "em"
+OP_FAMILY_POINTSUITE = "pointsuite"
+
+# Tool installations identifying the build of cacheable operations
+TOOL_ANNOT = "annot"
+TOOL_CC = "cc"
+TOOL_PYTHON = "python"
+TOOL_SFVALID = "sfvalid"
+
+
+# Output redirections of command templates - the program output goes to the temporary
+# file, which is appended to the step log, or straight to either file
+REDIRECT_APPEND = " > {tPath} 2>&1 ; cat {tPath} >> {lPath}"
+REDIRECT_LOG = " > {lPath} 2>&1 "
+REDIRECT_TMP = " > {tPath} 2>&1 "
+
+
+class OpDescriptor:
+    """Static description of a single operation."""
+
+    __slots__ = ("cacheTool", "env", "family", "inPlace", "logTail", "op", "options", "outputs", "post", "program", "redirect", "requiredInputs", "template")
+
+    def __init__(
+        self,
+        op,
+        family,
+        program=None,
+        template=None,
+        options=(),
+        logTail=False,
+        requiredInputs=(),
+        cacheTool=None,
+        inPlace=False,
+        env=(),
+        redirect=REDIRECT_APPEND,
+        post=None,
+        outputs=(),
+    ):
+        """
+        Args:
+            op (str): operation name
+            family (str): operation family (OP_FAMILY_*)
+            program (str): path of the executable run by the template
+            template (str): program arguments
+            options (tuple): (input parameter name, argument format[, argument if the parameter is not set]) tuples
+                             appended when the parameter is set
+            logTail (bool): append the application log (annot-step.log) to the step log
+            requiredInputs (tuple): input parameters that must be set before the operation can run
+            cacheTool (tuple): (installation, tool path) identifying the tool build of a cacheable operation
+            inPlace (bool): the operation may rewrite its input file (the input must not be a hard link)
+            env (tuple): (variable name, value) pairs exported before the program runs
+            redirect (str): redirection of the program output (REDIRECT_*)
+            post (str): commands run after the program
+            outputs (tuple): files making up the result list of the operation - the step result file if empty
+
+        The program, template, env values, redirect, post and outputs strings are filled in with
+        str.format() from the fields passed by the step - the step file names iPath, oPath, tPath,
+        lPath and ePath and the site paths of the operation family - and the input parameters as
+        param[name].
+        """
+        self.op = op
+        self.family = family
+        self.program = program
+        self.template = template
+        self.options = tuple(options)
+        self.logTail = logTail
+        self.requiredInputs = tuple(requiredInputs)
+        self.cacheTool = cacheTool
+        self.inPlace = inPlace
+        self.env = tuple(env)
+        self.redirect = redirect
+        self.post = post
+        self.outputs = tuple(outputs)
+
+    def hasTemplate(self):
+        return self.template is not None
+
+    def isCacheable(self):
+        return self.cacheTool is not None
+
+    def missingInputs(self, paramD):
+        """Return the list of required input parameters missing from paramD."""
+        return [name for name in self.requiredInputs if name not in paramD]
+
+    def render(self, fieldD, paramD):
+        """Return the command for this operation filled in from the template."""
+        valueD = dict(fieldD, param=paramD)
+        cmd = ""
+        for name, value in self.env:
+            cmd += name + "=" + value.format(**valueD) + " ; export " + name + " ; "
+        cmd += self.program.format(**valueD) + " " + self.template.format(**valueD)
+        for option in self.options:
+            if option[0] in paramD:
+                cmd += " " + option[1].format(paramD[option[0]])
+            elif len(option) > 2:
+                cmd += " " + option[2]
+        cmd += self.redirect.format(**valueD)
+        if self.logTail:
+            cmd += " ; cat annot-step.log >> " + fieldD["lPath"]
+        if self.post:
+            cmd += " ; " + self.post.format(**valueD)
+        return cmd
+
+    def expectedOutputs(self, fieldD):
+        """Return the files making up the result list of this operation or an empty list for the step result file."""
+        return [pth.format(**fieldD) for pth in self.outputs]
+
+
+_OP_FAMILIES = (
+    (
+        OP_FAMILY_MAXIT,
+        (
+            "cif2cif",
+            "cif2cif-remove",
+            "cif2cif-ebi",
+            "cif2cif-pdbx",
+            "cif2cif-pdbx-skip-process",
+            "cif-rcsb2cif-pdbx",
+            "cif-seqed2cif-pdbx",
+            "cif2pdb",
+            "pdb2cif",
+            "pdb2cif-ebi",
+            "switch-dna",
+            "cif2pdb-assembly",
+            "pdbx2pdb-assembly",
+            "pdbx2deriv",
+        ),
+    ),
+    (
+        OP_FAMILY_RCSB,
+        (
+            "rename-atoms",
+            "cif2pdbx",
+            "pdbx2xml",
+            "pdb2dssp",
+            "pdb2stride",
+            "initial-version",
+            "poly-link-dist",
+            "chem-comp-link",
+            "chem-comp-assign",
+            "chem-comp-assign-comp",
+            "chem-comp-assign-skip",
+            "chem-comp-assign-exact",
+            "chem-comp-assign-validation",
+            "check-cif",
+            "check-cif-v4",
+            "check-cif-ext",
+            "cif2pdbx-public",
+            "cif2pdbx-ext",
+            "chem-comp-dict-makeindex",
+            "chem-comp-dict-serialize",
+            "chem-comp-annotate-comp",
+            "chem-comp-do-report",
+            "chem-comp-align-img-gen",
+            "chem-comp-align-images",
+            "chem-comp-gen-images",
+            "chem-comp-update-support-files",
+            "citation-search-and-auto-release",
+            "update-depui-taxonomy",
+            "chem-ref-checkout",
+            "chem-ref-sync",
+            "chem-ref-load",
+            "chem-ref-run-setup",
+            "chem-ref-run-update",
+            "metal-findgeo",
+            "metal-metalcoord-stats",
+            "metal-metalcoord-update",
+        ),
+    ),
+    (
+        OP_FAMILY_PISA,
+        (
+            "pisa-analysis",
+            "pisa-assembly-report-xml",
+            "pisa-assembly-report-text",
+            "pisa-interface-report-xml",
+            "pisa-assembly-coordinates-pdb",
+            "pisa-assembly-coordinates-cif",
+            "pisa-assembly-merge-cif",
+        ),
+    ),
+    (
+        OP_FAMILY_ANNOTATION,
+        (
+            "annot-secondary-structure",
+            "annot-link-ssbond",
+            "annot-link-ssbond-with-ptm",
+            "annot-cis-peptide",
+            "annot-distant-solvent",
+            "annot-merge-struct-site",
+            "annot-reposition-solvent",
+            "annot-base-pair-info",
+            "annot-validation",
+            "annot-site",
+            "annot-rcsb2pdbx",
+            "annot-consolidated-tasks",
+            "annot-wwpdb-validate-all",
+            "annot-wwpdb-validate-all-v2",
+            "prd-search",
+            "prd-process-summary",
+            "annot-nmrstar2pdbx",
+            "annot-pdbx2nmrstar",
+            "annot-reposition-solvent-add-derived",
+            "annot-rcsb2pdbx-strip",
+            "annot-rcsbeps2pdbx-strip",
+            "annot-rcsb2pdbx-strip-plus-entity",
+            "annot-rcsbeps2pdbx-strip-plus-entity",
+            "chem-comp-instance-update",
+            "annot-cif2cif",
+            "annot-cif2pdb",
+            "annot-pdb2cif",
+            "annot-poly-link-dist",
+            "annot-merge-sequence-data",
+            "annot-make-maps",
+            "annot-make-ligand-maps",
+            "annot-poly-link-dist-json",
+            "annot-make-omit-maps",
+            "annot-cif2cif-dep",
+            "annot-pdb2cif-dep",
+            "annot-format-check-pdbx",
+            "annot-format-check-pdb",
+            "annot-dcc-report",
+            "annot-sf-convert",
+            "annot-tls-range-correction",
+            "annot-dcc-refine-report",
+            "annot-dcc-biso-full",
+            "annot-dcc-special-position",
+            "annot-dcc-fix-special-position",
+            "annot-dcc-reassign-alt-ids",
+            "annot-rcsb2pdbx-withpdbid",
+            "annot-merge-tls-range-data",
+            "annot-rcsb2pdbx-withpdbid-singlequote",
+            "annot-rcsb2pdbx-alt",
+            "annot-move-xyz-by-matrix",
+            "annot-move-xyz-by-symop",
+            "annot-extra-checks",
+            "annot-update-terminal-atoms",
+            "annot-merge-xyz",
+            "annot-gen-assem-pdbx",
+            "annot-cif2pdbx-withpdbid",
+            "annot-validate-geometry",
+            "annot-update-dep-assembly-info",
+            "annot-add-default-assembly-info",
+            "annot-chem-shifts-update-with-check",
+            "annot-chem-shifts-atom-name-check",
+            "annot-chem-shifts-upload-check",
+            "annot-nef-update-with-check",
+            "annot-reorder-models",
+            "annot-chem-shifts-update",
+            "annot-generte-nmr-data-str-file",
+            "annot-get-corres-info",
+            "prd-summary-serialize",
+            "prd-family-mapping",
+            "annot-get-symmetry-operator",
+            "annot-depict-molecule-json",
+            "annot-check-select-number",
+            "annot-update-molecule",
+            "annot-depict-chemical-shift",
+            "annot-edit-chemical-shift",
+            "annot-misc-checking",
+            "annot-dcc-validation",
+            "annot-correct-freer-set",
+            "annot-cif-to-public-pdbx",
+            "annot-cif-to-pdbx-em-header",
+            "annot-public-pdbx-to-xml",
+            "annot-public-pdbx-to-xml-noatom",
+            "annot-release-update",
+            "annot-get-pdb-bundle",
+            "annot-get-biol-cif-file",
+            "annot-get-biol-pdb-file",
+            "annot-check-cif",
+            "annot-check-xml-xmllint",
+            "annot-check-xml-stdinparse",
+            "annot-get-pdb-file",
+            "annot-check-pdb-file",
+            "annot-check-sf-file",
+            "annot-check-mr-file",
+            "annot-check-cs-file",
+            "annot-add-version-info",
+            "carbohydrate-remediation",
+            "carbohydrate-remediation-test",
+            "get-branch-polymer-info",
+            "annot-get-close-contact",
+            "annot-convert-close-contact-to-link",
+            "annot-get-covalent-bond",
+            "annot-remove-covalent-bond",
+            "em-density-bcif",
+            "xray-density-bcif",
+            "centre-of-mass",
+            "annot-complexity",
+            "annot-pcm-check-ccd-ann",
+            "annot-merge-pointsuite-info",
+            "annot-check-ccd-definition",
+            "annot-get-em-exp-info",
+        ),
+    ),
+    (
+        OP_FAMILY_SEQUENCE,
+        (
+            "seq-blastp",
+            "seq-blastn",
+            "fetch-uniprot",
+            "fetch-gb",
+            "format-uniprot",
+            "format-gb",
+            "backup-seqdb",
+        ),
+    ),
+    (
+        OP_FAMILY_VALIDATE,
+        ("validate-geometry",),
+    ),
+    (
+        OP_FAMILY_DB,
+        (
+            "db-loader",
+            "sync-depositors",
+        ),
+    ),
+    (
+        OP_FAMILY_EM,
+        (
+            "mapfix-big",
+            "em2em-spider",
+            "fsc_check",
+            "img-convert",
+            "annot-read-map-header",
+            "annot-read-map-header-in-place",
+            "annot-update-map-header-in-place",
+            "deposit-update-map-header-in-place",
+            "em-map-model-upload-check",
+        ),
+    ),
+    (
+        OP_FAMILY_POINTSUITE,
+        (
+            "pointsuite-importmats",
+            "pointsuite-findframe",
+            "pointsuite-makeassembly",
+        ),
+    ),
+)
+
+_ANNOT_ARGS = "-input {iPath} -output {oPath} -log annot-step.log"
+_ANNOT_PTM_ARGS = "-input {iPath} -output {oPath} -ptm_pcm_output pcm.csv -log annot-step.log"
+_IO_ARGS = "-input {iPath} -output {oPath}"
+_IO_LOG_ARGS = "-input {iPath} -output {oPath} -log {lPath}"
+_IO_TMP_ARGS = "-input {iPath} -output {oPath} -log {tPath}"
+_DICT_EXCHANGE_ARGS = "-dicSdb {dictSdb} -pdbxDicSdb {dictSdb} -reorder  -strip -op in "
+_XML_ARGS = "-prefix  pdbx-v50 -ns PDBx -dictName mmcif_pdbx.dic -df {dictOdb} -f {iPath}"
+_MAP_HEADER_DUMP_ARGS = "-out  dummy-out.map  -voxel 1.0 1.0 1.0 -label test "
+_MAP_OPTIONS = (
+    ("voxel", "-voxel {}"),
+    ("cell", "-cell {}"),
+    ("label", "-label {}"),
+    ("gridsampling", "-gridsampling {}"),
+    ("gridstart", "-gridstart {}"),
+    ("options", "{}"),
+)
+_RESULT_TMP_LOG = ("{oPath}", "{tPath}", "{lPath}")
+_RESULT_PCM = ("{oPath}", "pcm.csv")
+
+
+def _tool(program, template, **kwD):
+    """Template of a program given by its full path"""
+    return dict(program=program, template=template, **kwD)
+
+
+def _annot(program, template, options=(), logTail=False, **kwD):
+    """Template of a program of the annotation tools"""
+    return dict(program="{annotBin}/" + program, template=template, options=options, logTail=logTail, **kwD)
+
+
+def _maxit(template, post=None, redirect="", **kwD):
+    """Template of a maxit conversion"""
+    return dict(program="{annotBin}/maxit", template=template, redirect=redirect, post=post, **kwD)
+
+
+def _mapFix(template, **kwD):
+    """Template of the map header tool - the em steps run their commands in a { ... } group
+
+    mapFixAnot.jar options (both -in and -out must be given):
+      -in  <filename>           : input map
+      -out <filename>           : output map
+      -cell <x> <y> <z>         : set x/y/z-length x/y/z
+      -label <DepCode>          : write new label
+      -gridsampling <x> <y> <z> : set x/y/z- grid sampling
+      -gridstart <x> <y> <z>    : set x/y/z- grid start point
+      -voxel <x> <y> <z>        : set x y z pixel spacing
+    The header is exported as a JSON packet to the standard output, which goes to the step result.
+    """
+    return dict(
+        program="{javaPath} -Xms256m -Xmx256m -jar {packagePath}/mapFix/mapFixAnot.jar",
+        template=template,
+        redirect=" ; }} 2> {ePath} 1> {oPath} ; cat {ePath} > {lPath}",
+        **kwD,
+    )
+
+
+# Command templates of the operations with a uniform command line - the step methods assemble the others
+_TEMPLATES = {
+    # annotation tools logging to annot-step.log
+    "annot-secondary-structure": _annot("GetSecondStruct", _ANNOT_ARGS, (("ss_topology_file_path", "-support {}"),), True),
+    "annot-pcm-check-ccd-ann": _annot("UpdatePTMAnnotation", _ANNOT_PTM_ARGS, (), True, outputs=_RESULT_PCM),
+    "annot-consolidated-tasks": _annot("GetAddAnnotation", _ANNOT_ARGS, (("ss_topology_file_path", "-support {}"),), True),
+    "annot-validate-geometry": _annot("UpdateValidateCategories", _ANNOT_ARGS, (), True),
+    "annot-link-ssbond": _annot("GetLinkAndSSBond", _ANNOT_ARGS + " -link -ssbond", (), True),
+    "annot-link-ssbond-with-ptm": _annot("GetLinkAndSSBond", _ANNOT_PTM_ARGS + " -link -ssbond", (), True, outputs=_RESULT_PCM),
+    "annot-cis-peptide": _annot("GetCisPeptide", _ANNOT_ARGS, (), True),
+    "annot-distant-solvent": _annot("CalculateDistantWater", _ANNOT_ARGS, (), True),
+    "annot-base-pair-info": _annot("GetBasePairInfo", _ANNOT_ARGS, (), True),
+    "annot-merge-struct-site": _annot("MergeSiteData", _ANNOT_ARGS, (("site_info_file_path", "-site {}"),), True),
+    "annot-get-corres-info": _annot("GetCorresInfo", _ANNOT_ARGS, (), True),
+    "annot-reposition-solvent": _annot("MovingWater", _ANNOT_ARGS, (), True),
+    "annot-reposition-solvent-add-derived": _annot("MovingWater", _ANNOT_ARGS, (), True),
+    "annot-validation": _annot("valdation_with_cif_output", "-cif {iPath} -output {oPath} -log annot-step.log", (), True),
+    "annot-merge-sequence-data": _annot("MergeSeqModuleData", _ANNOT_ARGS, (("seqmod_assign_file_path", "-assign {}"),), True),
+    "chem-comp-instance-update": _annot("updateInstance", "-i {iPath} -o {oPath} -assign {param[cc_assign_file_path]} -log annot-step.log", (), True),
+    "annot-move-xyz-by-symop": _annot("MovingCoordBySymmetry", _ANNOT_ARGS, (("transform_file_path", "-assign {}"),), True),
+    "annot-move-xyz-by-matrix": _annot("MovingCoordByMatrix", _ANNOT_ARGS, (("transform_file_path", "-assign {}"),), True),
+    "annot-reorder-models": _annot("ReorderModels", _ANNOT_ARGS, (("model_number", "-mol_id {}", "-conformer_id"),), True),
+    "annot-extra-checks": _annot("MiscChecking", _ANNOT_ARGS, (), True, post="touch {iPath}-parser.log ; cat {iPath}-parser.log >> {oPath}"),
+    "annot-merge-xyz": _annot(
+        "MergeCoordinates",
+        _ANNOT_ARGS,
+        (("new_coordinate_file_path", "-newcoord {}"), ("new_coordinate_format", "-format {}", "-format cif"), ("deposit", "-dep")),
+        True,
+    ),
+    "annot-update-terminal-atoms": _annot("UpdateTerminalAtom", _ANNOT_ARGS, (("option", "-option {}", "-option delete"),), True),
+    "annot-update-dep-assembly-info": _annot("UpdateDepositorAssemblyInfo", _ANNOT_ARGS, (), True),
+    "annot-add-default-assembly-info": _annot("AddDefaultAssembly", _ANNOT_ARGS, (), True),
+    # annotation tools logging to the step log
+    "annot-format-check-pdbx": _annot("CheckCoorFormat", "-input {iPath} -format pdbx -output {oPath}", (("nmr", "-nmr"),)),
+    "annot-format-check-pdb": _annot("CheckCoorFormat", "-input {iPath} -format pdb -output {oPath}", (("nmr", "-nmr"),)),
+    "annot-poly-link-dist": _annot("cal_polymer_linkage_distance", "-i {iPath} -o {oPath}"),
+    "annot-poly-link-dist-json": _annot("cal_polymer_linkage_distance_json", "-i {iPath} -o {oPath}"),
+    "annot-generte-nmr-data-str-file": _annot("GenNmrDataStarFile", _IO_ARGS, (("pdb_id", "-pdbid {}"),)),
+    "annot-get-symmetry-operator": _annot("GetSymmetryOperator", "-output {oPath} -log {lPath}", (("space_group", "-space_group {}"),)),
+    "annot-check-select-number": _annot("CheckSelectNumber", "-index {iPath} -log {lPath}", (("select", "-select {}"),)),
+    "annot-update-molecule": _annot("UpdateMolecule", _IO_LOG_ARGS, (("assign", "-assign {}"),)),
+    "annot-depict-chemical-shift": _annot("depict_chemical_shift", _IO_LOG_ARGS),
+    "annot-edit-chemical-shift": _annot("edit_chemical_shift", _IO_LOG_ARGS, (("assign", "-assign {}"),)),
+    "annot-correct-freer-set": _annot("CorrectFreeRsetInSFFile", _IO_LOG_ARGS, (("set_num", "-set_num {}"),)),
+    "annot-get-close-contact": _annot("DepictCloseContact", _IO_LOG_ARGS, redirect=REDIRECT_TMP),
+    "annot-get-covalent-bond": _annot("DepictCovalentBond", _IO_LOG_ARGS, redirect=REDIRECT_TMP),
+    "annot-convert-close-contact-to-link": _annot(
+        "ConvertContactToLink",
+        "-input {iPath} -datafile {param[datafile]} -output {oPath} -ptm_pcm_output pcm.csv -log {lPath}",
+        redirect=REDIRECT_TMP,
+        outputs=_RESULT_PCM,
+    ),
+    "annot-remove-covalent-bond": _annot(
+        "RemoveCovalentBond",
+        "-input {iPath} -datafile {param[datafile]} -output {oPath} -ptm_pcm_output pcm.csv -log {lPath}",
+        redirect=REDIRECT_TMP,
+        outputs=_RESULT_PCM,
+    ),
+    "annot-check-sf-file": _annot("CheckSFFile", _IO_ARGS, (("option", "{}"), ("pdb_id", "-pdbid {}")), redirect=REDIRECT_TMP, outputs=("{oPath}", "{tPath}")),
+    "annot-check-mr-file": _annot("CheckMRFile", _IO_ARGS, (("option", "{}"), ("pdb_id", "-pdbid {}")), redirect=REDIRECT_TMP, outputs=("{oPath}", "{tPath}")),
+    "annot-check-cs-file": _annot("CheckCSFile", _IO_ARGS, (("option", "{}"), ("pdb_id", "-pdbid {}")), redirect=REDIRECT_TMP, outputs=("{oPath}", "{tPath}")),
+    # annotation tools logging to the temporary file
+    "annot-misc-checking": _annot("MiscChecking", _IO_TMP_ARGS, (("option", "{}"),), redirect=REDIRECT_LOG, outputs=_RESULT_TMP_LOG),
+    "annot-add-version-info": _annot("AddVersionInfo", _IO_TMP_ARGS, (("option", "{}"),), redirect=REDIRECT_LOG, outputs=_RESULT_TMP_LOG),
+    "annot-get-em-exp-info": _annot("ReleaseUpdateGetEmInfo", _IO_TMP_ARGS, redirect=REDIRECT_LOG, outputs=_RESULT_TMP_LOG),
+    "carbohydrate-remediation": _annot("CarbohydrateRemediation", _IO_TMP_ARGS, redirect=REDIRECT_LOG, outputs=_RESULT_TMP_LOG),
+    "carbohydrate-remediation-test": _annot(
+        "CarbohydrateRemediation",
+        "-input {iPath} -output {oPath} -output_public carbohydrate_public.cif -log {tPath}",
+        redirect=REDIRECT_LOG,
+        outputs=("{oPath}", "carbohydrate_public.cif", "{tPath}", "{lPath}"),
+    ),
+    "get-branch-polymer-info": _annot("GetBranchPolymerInfo", _IO_TMP_ARGS, redirect=REDIRECT_LOG),
+    "annot-merge-pointsuite-info": _annot("MergePointSuiteResult", _IO_ARGS, (("support", "-support {} "),), redirect=REDIRECT_LOG),
+    "annot-check-ccd-definition": _annot(
+        "ChemCompDefChecker",
+        _IO_ARGS,
+        (("pcm_support_file", "-pcm_support_file {} "), ("set_stripped_down_flag", "-set_stripped_down_flag "), ("set_ok_flag", "-set_ok_flag ")),
+        redirect=REDIRECT_LOG,
+    ),
+    "prd-search": _annot(
+        "GetPrdMatch",
+        "-input {iPath} -output {oPath} -path . -index {prdSummarySerial} -cc_index {ccDictPathIdx}",
+        (("logfile", "-log {}"), ("firstmodel", "-firstmodel {}")),
+        env=(("PRDCC_PATH", "{prdccCvsPath}"), ("PRD_DICT_PATH", "{prdDictPath}")),
+    ),
+    "prd-family-mapping": _annot("get-prd-family-mapping", "-family {iPath} -output {oPath}", redirect=" > {tPath} 2>&1 ; cat {tPath} > {lPath}"),
+    "annot-site": _tool(
+        "{packagePath}/getsite-cif/bin/getsite_cif",
+        "{blockId} ",
+        options=(("site_arguments", "{}"),),
+        env=(
+            ("TOOLS_PATH", "{packagePath}"),
+            ("CCP4", "{packagePath}/ccp4"),
+            ("SYMINFO", "{packagePath}/getsite-cif/data/syminfo.lib"),
+            ("MMCIFDIC", "{packagePath}/getsite-cif/data/cif_mmdic.lib"),
+            ("STANDATA", "{packagePath}/getsite-cif/data/standard_geometry.cif"),
+            ("CCIF_NOITEMIP", "off"),
+            ("LD_LIBRARY_PATH", "{packagePath}/ccp4-ccif/lib:{packagePath}/ccp4/lib/ccif"),
+            ("DYLD_LIBRARY_PATH", "{packagePath}/ccp4-ccif/lib:{packagePath}/ccp4"),
+            ("CIFIN", "{iPath}"),
+        ),
+        post="mv -f {blockId}_site.cif {oPath}",
+    ),
+    # maxit conversions
+    "annot-cif2cif": _maxit("-o 8  -i {iPath} -log maxit.log ", post="mv -f {iPath}.cif {oPath}"),
+    "annot-cif2cif-dep": _maxit("-o 8  -i {iPath} -dep -log maxit.log ", post="mv -f {iPath}.cif {oPath}"),
+    "annot-pdb2cif": _maxit("-o 1  -i {iPath} -log maxit.log ", post="mv -f {iPath}.cif {oPath}"),
+    "annot-pdb2cif-dep": _maxit("-o 1  -i {iPath} -dep -log maxit.log ", post="mv -f {iPath}.cif {oPath}"),
+    "annot-cif2pdb": _maxit("-o 2  -i {iPath} -log maxit.log ", post="mv -f {iPath}.pdb {oPath}"),
+    "annot-rcsb2pdbx-alt": _maxit("-single_quotation -o 9  -i {iPath} -log maxit.log ", post="mv -f {iPath}.cif {oPath}"),
+    "annot-get-pdb-file": _maxit("-input {iPath} -o 2 -output {oPath} -log {tPath}", redirect=REDIRECT_LOG, outputs=_RESULT_TMP_LOG),
+    # dictionary tools
+    "annot-cif-to-public-pdbx": _tool(
+        "{dictBin}/cifexch2",
+        _DICT_EXCHANGE_ARGS + " -pdbids  -input {iPath} -output {oPath}",
+        options=(("option", "{}"),),
+        redirect=" 2> {lPath} 1> {tPath}",
+        outputs=_RESULT_TMP_LOG,
+    ),
+    "annot-cif-to-pdbx-em-header": _tool(
+        "{dictBin}/cifexch2",
+        _DICT_EXCHANGE_ARGS + " -emdbids -privatectx  -input {iPath} -output {oPath}",
+        redirect=" 2> {lPath} 1> {tPath}",
+        outputs=_RESULT_TMP_LOG,
+    ),
+    "annot-public-pdbx-to-xml": _tool(
+        "{dictBin}/mmcif2XML",
+        "-funct mmcif2xmlall " + _XML_ARGS,
+        redirect=" 2> {tPath} 1> {lPath}",
+        outputs=("{iPath}.xml", "{iPath}.xml-noatom", "{iPath}.xml-extatom", "{lPath}", "{tPath}"),
+    ),
+    "annot-public-pdbx-to-xml-noatom": _tool(
+        "{dictBin}/mmcif2XML",
+        "-funct mmcif2xmlnoatom " + _XML_ARGS,
+        redirect=" 2> {tPath} 1> {lPath}",
+        outputs=("{iPath}.xml-noatom", "{lPath}", "{tPath}"),
+    ),
+    "annot-check-cif": _tool(
+        "{dictBin}/CifCheck",
+        "-dictSdb {dictSdb} -f {iPath}",
+        options=(("first_block", "-checkFirstBlock"),),
+        redirect=" 2> tmp 1> {tPath} ; cat tmp >> {lPath}",
+        post="touch {iPath}-parser.log ; cat {iPath}-parser.log >> {lPath}",
+        outputs=("{iPath}-diag.log", "{lPath}"),
+    ),
+    "annot-check-xml-xmllint": _tool(
+        "{localBin}/xmllint", "--noout --schema {mmcifDictPath}/pdbx-v50.xsd {iPath}", redirect=REDIRECT_TMP, outputs=("{tPath}",)
+    ),
+    # map header tool
+    "annot-read-map-header": _mapFix("-in {iPath} " + _MAP_HEADER_DUMP_ARGS),
+    "annot-read-map-header-in-place": _mapFix("-in {param[map_file_path]} " + _MAP_HEADER_DUMP_ARGS),
+    "annot-update-map-header-in-place": _mapFix("-in {param[input_map_file_path]} -out  {param[output_map_file_path]}", options=_MAP_OPTIONS),
+}
+
+# Input parameters without which an operation cannot run
+_REQUIRED_INPUTS = {
+    "xray-density-bcif": ("two_fofc_cif", "one_fofc_cif"),
+    "prd-process-summary": ("resultFile", "logfile"),
+    "annot-merge-pointsuite-info": ("support",),
+    "prd-summary-serialize": ("ccsdb_path",),
+    "chem-comp-instance-update": ("cc_assign_file_path",),
+    "annot-convert-close-contact-to-link": ("datafile",),
+    "annot-remove-covalent-bond": ("datafile",),
+    "annot-read-map-header-in-place": ("map_file_path",),
+    "annot-update-map-header-in-place": ("input_map_file_path", "output_map_file_path"),
+}
+
+# Operations whose results depend only on their inputs and the tool build -
+#   (installation, tool path within the installation or python module name)
+_CACHEABLE_OPS = {
+    "annot-secondary-structure": (TOOL_ANNOT, "bin/GetSecondStruct"),
+    "annot-sf-convert": (TOOL_SFVALID, "bin/sf_convert"),
+    "annot-complexity": (TOOL_PYTHON, "wwpdb.utils.dp.PdbxModelComplexity"),
+    "centre-of-mass": (TOOL_PYTHON, "wwpdb.utils.dp.CentreOfMass"),
+    "chem-comp-dict-serialize": (TOOL_CC, "bin/checkCifUtil"),
+}
+
+# Operations which may rewrite their input file in place (the sequence operations write
+# the query sequence into the input file)
+_IN_PLACE_OPS = ("seq-blastp", "seq-blastn")
+
+
+def _buildRegistry():
+    registryD = {}
+    for family, opList in _OP_FAMILIES:
+        for op in opList:
+            if op in registryD:
+                continue
+            kwD = {"requiredInputs": _REQUIRED_INPUTS.get(op, ()), "cacheTool": _CACHEABLE_OPS.get(op), "inPlace": op in _IN_PLACE_OPS}
+            kwD.update(_TEMPLATES.get(op, {}))
+            registryD[op] = OpDescriptor(op, family, **kwD)
+    return registryD
+
+
+OP_REGISTRY = _buildRegistry()
+
+
+def getOpDescriptor(op):
+    """Return the OpDescriptor for op or None if the operation is not known."""
+    return OP_REGISTRY.get(op)
+
+
+def getOpList(family=None):
+    """Return the names of the known operations, optionally restricted to a single family."""
+    return [op for op, desc in OP_REGISTRY.items() if family is None or desc.family == family]
@@ -0,0 +1,182 @@
+##
+# File: RcsbDpResourcePredictor.py
+# Date: 17-Oct-2026
+#
+# Updates:
+##
+"""
+Prediction of the memory and run time requested for remote operations from the
+resources used by earlier runs.
+
+The peak memory and wall clock time of each completed step are recorded in a local
+SQLite database together with the total size of the step inputs and the complexity
+of the input model.  The request for a new step of the same operation is taken from
+the nearest earlier runs, scaled up where the new input is larger, with a safety
+margin added.  No prediction is made until a minimum number of runs of the operation
+have been recorded.
+"""
+
+import logging
+import math
+import os
+import sqlite3
+import threading
+import time
+from contextlib import closing
+
+from wwpdb.utils.dp.PdbxModelComplexity import PdbxModelCompletity
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS step_history (
+    op TEXT NOT NULL,
+    num_threads INTEGER NOT NULL,
+    input_size INTEGER NOT NULL,
+    complexity REAL,
+    max_rss_kb INTEGER NOT NULL,
+    wall_time REAL NOT NULL,
+    recorded REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS step_history_op ON step_history (op, num_threads, recorded);
+"""
+
+# largest input whose model complexity is computed - reading larger files costs more than it saves
+_MAX_COMPLEXITY_FILE_SIZE = 200 * 1024 * 1024
+# model complexity of the files already read - keyed on path, modification time and size
+_COMPLEXITY_CACHE = {}
+_COMPLEXITY_CACHE_SIZE = 256
+_COMPLEXITY_LOCK = threading.Lock()
+
+
+def getModelComplexity(filePath):
+    """Return the complexity of the model in an mmCIF file or None if the file holds no model.
+
+    The result is cached for each path and modification time, so a model read by several
+    steps is only parsed once.
+    """
+    try:
+        st = os.stat(filePath)
+    except OSError as e:
+        logger.debug("Model complexity not available for %s: %s", filePath, str(e))
+        return None
+    ky = (os.path.abspath(filePath), st.st_mtime_ns, st.st_size)
+    with _COMPLEXITY_LOCK:
+        if ky in _COMPLEXITY_CACHE:
+            return _COMPLEXITY_CACHE[ky]
+    complexity = _calculateModelComplexity(filePath, st.st_size)
+    with _COMPLEXITY_LOCK:
+        if len(_COMPLEXITY_CACHE) >= _COMPLEXITY_CACHE_SIZE:
+            _COMPLEXITY_CACHE.clear()
+        _COMPLEXITY_CACHE[ky] = complexity
+    return complexity
+
+
+def _calculateModelComplexity(filePath, fileSize):
+    try:
+        if fileSize > _MAX_COMPLEXITY_FILE_SIZE:
+            return None
+        with open(filePath, "rb") as ifh:
+            if not ifh.read(4096).lstrip().startswith(b"data_"):
+                return None
+        pmc = PdbxModelCompletity()
+        if not pmc.calculate(filePath):
+            return None
+        return pmc.get_data().get("entry_complexity")
+    except Exception as e:  # noqa: BLE001
+        logger.debug("Model complexity not available for %s: %s", filePath, str(e))
+        return None
+
+
+class RcsbDpResourcePredictor:
+    """Step resource history kept in a SQLite file with nearest-neighbour prediction."""
+
+    def __init__(self, dbPath, margin=1.3, minRecords=3, neighbours=5, maxHistory=500, minMemory=1000, minTime=10):
+        """
+        Args:
+            dbPath (str): path of the SQLite history file (created if missing)
+            margin (float): factor applied to the predicted memory and time
+            minRecords (int): minimum number of recorded runs of an operation needed for a prediction
+            neighbours (int): number of nearest earlier runs the prediction is based on
+            maxHistory (int): number of most recent runs kept for each operation
+            minMemory (int): smallest memory request in MB
+            minTime (int): smallest time request in minutes
+        """
+        self.__dbPath = os.path.abspath(dbPath)
+        self.__margin = margin
+        self.__minRecords = minRecords
+        self.__neighbours = neighbours
+        self.__maxHistory = maxHistory
+        self.__minMemory = minMemory
+        self.__minTime = minTime
+        dirPath = os.path.dirname(self.__dbPath)
+        if not os.path.isdir(dirPath):
+            os.makedirs(dirPath, 0o755)
+        with closing(self.__connect()) as conn, conn:
+            conn.executescript(_SCHEMA)
+
+    def __connect(self):
+        # a connection per call keeps the history usable from several threads and processes
+        return sqlite3.connect(self.__dbPath, timeout=30)
+
+    def getDbPath(self):
+        return self.__dbPath
+
+    def record(self, op, inputSize, complexity, maxRssKb, wallTime, numThreads=1):
+        """Record the peak memory (kB) and wall clock time (seconds) of a completed step of op."""
+        if not maxRssKb or wallTime is None:
+            return False
+        try:
+            with closing(self.__connect()) as conn, conn:
+                conn.execute(
+                    "INSERT INTO step_history (op, num_threads, input_size, complexity, max_rss_kb, wall_time, recorded) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (op, int(numThreads), int(inputSize), complexity, int(maxRssKb), float(wallTime), time.time()),
+                )
+                conn.execute(
+                    "DELETE FROM step_history WHERE op = ? AND num_threads = ? AND rowid NOT IN "
+                    "(SELECT rowid FROM step_history WHERE op = ? AND num_threads = ? ORDER BY recorded DESC LIMIT ?)",
+                    (op, int(numThreads), op, int(numThreads), self.__maxHistory),
+                )
+            return True
+        except sqlite3.Error as e:
+            logger.warning("Unable to record resource history in %s: %s", self.__dbPath, str(e))
+            return False
+
+    def getRecordCount(self, op):
+        with closing(self.__connect()) as conn:
+            return conn.execute("SELECT COUNT(*) FROM step_history WHERE op = ?", (op,)).fetchone()[0]
+
+    def predict(self, op, inputSize, complexity=None, numThreads=1):
+        """Return the (memory in MB, time in minutes) to request for a step of op or None without enough history."""
+        try:
+            with closing(self.__connect()) as conn, conn:
+                rowList = conn.execute(
+                    "SELECT input_size, complexity, max_rss_kb, wall_time FROM step_history WHERE op = ? AND num_threads = ?",
+                    (op, int(numThreads)),
+                ).fetchall()
+        except sqlite3.Error as e:
+            logger.warning("Unable to read resource history from %s: %s", self.__dbPath, str(e))
+            return None
+        if len(rowList) < self.__minRecords:
+            return None
+
+        def distance(row):
+            dist = abs(math.log1p(inputSize) - math.log1p(row[0]))
+            if complexity is not None and row[1] is not None:
+                dist += abs(math.log1p(complexity) - math.log1p(row[1]))
+            return dist
+
+        maxRssKb = 0
+        wallTime = 0.0
+        for rowSize, rowComplexity, rowRssKb, rowTime in sorted(rowList, key=distance)[: self.__neighbours]:
+            # resources are assumed to grow no faster than linearly with the input
+            scale = inputSize / rowSize if rowSize else 1.0
+            if complexity is not None and rowComplexity:
+                scale = max(scale, complexity / rowComplexity)
+            scale = max(scale, 1.0)
+            maxRssKb = max(maxRssKb, rowRssKb * scale)
+            wallTime = max(wallTime, rowTime * scale)
+        memory = max(math.ceil(maxRssKb * self.__margin / 1024.0), self.__minMemory)
+        minutes = max(math.ceil(wallTime * self.__margin / 60.0), self.__minTime)
+        logger.debug("Predicted %d MB and %d minutes for %s from %d records", memory, minutes, op, len(rowList))
+        return memory, minutes
@@ -0,0 +1,196 @@
+##
+# File: RcsbDpResultCache.py
+# Date: 17-Oct-2026
+#
+# Updates:
+##
+"""
+Content-addressed cache of the results of deterministic RcsbDpUtility operations.
+
+Cache entries are keyed on the operation name, the content of the input files, the
+input parameters and an identifier of the tool build.  Each entry is a directory
+below the cache directory holding the result and log files of a single step and an
+index (entry.json).  Files are cloned into and out of the cache where the filesystem
+supports reflinks and copied otherwise.  The modification time of the index records the last use of the
+entry and the least recently used entries are removed when the total size of the
+cache exceeds its limit.  The total size is kept as a running sum per process, taken
+from a scan of the cache directory on the first insert and after each eviction, so
+the entries of other processes sharing the cache count from the next scan on.
+
+"""
+
+import hashlib
+import json
+import logging
+import os
+import shutil
+import tempfile
+import threading
+
+from wwpdb.utils.dp.FileLinker import linkFile
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_SIZE = 2 * 1024 * 1024 * 1024
+_INDEX_FILE = "entry.json"
+_HASH_BLOCK_SIZE = 1024 * 1024
+
+# running total size of the cached files by cache directory
+_SIZE_TOTALS = {}
+_SIZE_LOCK = threading.Lock()
+
+
+def hashFile(filePath):
+    """Return the sha256 hex digest of the content of filePath."""
+    hsh = hashlib.sha256()
+    with open(filePath, "rb") as ifh:
+        for block in iter(lambda: ifh.read(_HASH_BLOCK_SIZE), b""):
+            hsh.update(block)
+    return hsh.hexdigest()
+
+
+class RcsbDpResultCache:
+    """Directory of cached operation results with size based LRU eviction."""
+
+    def __init__(self, cacheDir, maxSize=DEFAULT_MAX_SIZE):
+        """
+        Args:
+            cacheDir (str): directory holding the cache entries (created if missing)
+            maxSize (int): maximum total size in bytes of the cached files
+        """
+        self.__cacheDir = os.path.abspath(cacheDir)
+        self.__maxSize = int(maxSize) if maxSize else DEFAULT_MAX_SIZE
+        if not os.path.isdir(self.__cacheDir):
+            os.makedirs(self.__cacheDir, 0o755)
+
+    def getCacheDir(self):
+        return self.__cacheDir
+
+    def makeKey(self, op, inputPathList, paramD, toolId):
+        """Return the cache key for op applied to the files in inputPathList.
+
+        Parameter values naming existing files are keyed on the file content.
+        """
+        keyD = {"op": op, "tool": toolId, "inputs": [hashFile(pth) for pth in inputPathList], "params": {}}
+        for name, value in sorted((paramD or {}).items()):
+            if isinstance(value, str) and os.path.isfile(value):
+                keyD["params"][name] = "sha256:" + hashFile(value)
+            else:
+                keyD["params"][name] = repr(value)
+        return hashlib.sha256(json.dumps(keyD, sort_keys=True).encode("utf-8")).hexdigest()
+
+    def __getEntryDir(self, key):
+        return os.path.join(self.__cacheDir, key[:2], key)
+
+    def get(self, key, dstDir, nameMap=None):
+        """Materialize the files of the cache entry for key in dstDir.
+
+        Args:
+            key (str): cache key (see makeKey())
+            dstDir (str): destination directory
+            nameMap (dict): cached file names mapped to the file names used in dstDir
+
+        Returns:
+            (dict): the entry index with the materialized file names or None if the key is not cached
+        """
+        entryDir = self.__getEntryDir(key)
+        indexPath = os.path.join(entryDir, _INDEX_FILE)
+        nameMap = nameMap if nameMap else {}
+        try:
+            with open(indexPath) as ifh:
+                indexD = json.load(ifh)
+            for fn in indexD["files"]:
+                linkFile(os.path.join(entryDir, fn), os.path.join(dstDir, nameMap.get(fn, fn)), allowHardlink=False)
+            os.utime(indexPath, None)
+        except (OSError, ValueError, KeyError):
+            return None
+        logger.debug("Result cache hit for %s (%s)", indexD.get("op"), key)
+        return indexD
+
+    def put(self, key, op, fileD, **kwargs):
+        """Store the files in fileD (cached name -> source path) under key.
+
+        Additional keyword arguments are saved in the entry index.  Returns True if the
+        entry is stored or already exists.
+        """
+        entryDir = self.__getEntryDir(key)
+        if os.path.exists(os.path.join(entryDir, _INDEX_FILE)):
+            return True
+        tmpDir = None
+        try:
+            os.makedirs(os.path.dirname(entryDir), 0o755, exist_ok=True)
+            tmpDir = tempfile.mkdtemp(prefix=".tmp-", dir=self.__cacheDir)
+            for fn, srcPath in fileD.items():
+                linkFile(srcPath, os.path.join(tmpDir, fn), allowHardlink=False)
+            indexD = dict(kwargs)
+            indexD.update({"op": op, "key": key, "files": sorted(fileD)})
+            with open(os.path.join(tmpDir, _INDEX_FILE), "w") as ofh:
+                json.dump(indexD, ofh, indent=2)
+            os.rename(tmpDir, entryDir)
+            tmpDir = None
+        except OSError as e:
+            if not os.path.exists(os.path.join(entryDir, _INDEX_FILE)):
+                logger.warning("Unable to store result cache entry for %s: %s", op, str(e))
+                return False
+        finally:
+            if tmpDir is not None:
+                shutil.rmtree(tmpDir, ignore_errors=True)
+        entrySize = sum(os.path.getsize(srcPath) for srcPath in fileD.values())
+        with _SIZE_LOCK:
+            totalSize = _SIZE_TOTALS.get(self.__cacheDir)
+            if totalSize is not None:
+                totalSize += entrySize
+                _SIZE_TOTALS[self.__cacheDir] = totalSize
+        if totalSize is None:
+            totalSize = self.getSize()
+            with _SIZE_LOCK:
+                _SIZE_TOTALS[self.__cacheDir] = totalSize
+        if totalSize > self.__maxSize:
+            self.evict()
+        return True
+
+    def __getEntryList(self):
+        """Return the list of (last use time, size, entry path) of all cache entries."""
+        entryList = []
+        for prefix in os.listdir(self.__cacheDir):
+            prefixDir = os.path.join(self.__cacheDir, prefix)
+            if prefix.startswith(".") or not os.path.isdir(prefixDir):
+                continue
+            for key in os.listdir(prefixDir):
+                entryDir = os.path.join(prefixDir, key)
+                try:
+                    lastUse = os.stat(os.path.join(entryDir, _INDEX_FILE)).st_mtime
+                    size = sum(os.path.getsize(os.path.join(entryDir, fn)) for fn in os.listdir(entryDir) if fn != _INDEX_FILE)
+                except OSError:
+                    continue
+                entryList.append((lastUse, size, entryDir))
+        return entryList
+
+    def getSize(self):
+        """Return the total size in bytes of the cached result and log files."""
+        return sum(size for _lastUse, size, _entryDir in self.__getEntryList())
+
+    def evict(self, maxSize=None):
+        """Remove the least recently used entries until the cache is no larger than maxSize bytes.
+
+        Returns the number of entries removed.
+        """
+        maxSize = self.__maxSize if maxSize is None else maxSize
+        entryList = sorted(self.__getEntryList())
+        totalSize = sum(size for _lastUse, size, _entryDir in entryList)
+        numRemoved = 0
+        for _lastUse, size, entryDir in entryList:
+            if totalSize <= maxSize:
+                break
+            shutil.rmtree(entryDir, ignore_errors=True)
+            totalSize -= size
+            numRemoved += 1
+        with _SIZE_LOCK:
+            _SIZE_TOTALS[self.__cacheDir] = totalSize
+        if numRemoved:
+            logger.info("Result cache evicted %d entries from %s", numRemoved, self.__cacheDir)
+        return numRemoved
+
+    def clear(self):
+        """Remove all cache entries."""
+        return self.evict(maxSize=0)
@@ -0,0 +1,297 @@
+##
+# File: RcsbDpSiteConfig.py
+# Date: 17-Oct-2026
+#
+# Updates:
+##
+"""
+Process-wide cache of resolved site configuration shared across RcsbDpUtility instances.
+
+A single snapshot is kept per site id.  The snapshot holds the ConfigInfo and
+ConfigInfoApp* objects for the site wrapped so that each getter is resolved only
+once, after which the tool paths and environment values are served from memory.
+The snapshot is rebuilt when the modification time of the site configuration cache
+files changes.
+
+The environment produced by sourcing the site env.sh script is captured in the same
+way, once per sequence of env.sh commands, and kept in memory and optionally in a
+cache directory.  The commands are run from a fixed base environment - the variables
+of SITE_ENV_BASE_VARIABLES taken from the current process, which are part of the cache
+key - and the full environment after each command is recorded.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import shlex
+import subprocess
+import sys
+import threading
+
+from wwpdb.utils.config.ConfigInfo import ConfigInfo
+from wwpdb.utils.config.ConfigInfoApp import (
+    ConfigInfoAppCc,
+    ConfigInfoAppCommon,
+    ConfigInfoAppEm,
+    ConfigInfoAppValidation,
+)
+
+logger = logging.getLogger(__name__)
+
+_siteConfigD = {}
+_siteConfigLock = threading.Lock()
+_siteEnvD = {}
+_siteEnvLock = threading.Lock()
+
+# Variables maintained by the shell itself
+_SHELL_ENV_VARIABLES = ("_", "OLDPWD", "PWD", "SHLVL")
+
+# Variables of the current process passed to the env.sh commands when their environment is captured
+SITE_ENV_BASE_VARIABLES = (
+    "HOME",
+    "LANG",
+    "LC_ALL",
+    "LOGNAME",
+    "PATH",
+    "SHELL",
+    "TMPDIR",
+    "TOP_WWPDB_SITE_CONFIG_DIR",
+    "TZ",
+    "USER",
+    "WWPDB_SITE_ID",
+    "WWPDB_SITE_LOC",
+)
+
+# Marks the end of each environment listing in the output of the capture shell
+_ENV_END_MARK = "--site-env-end--"
+
+
+class CachedConfig:
+    """Wrap a ConfigInfo or ConfigInfoApp* object memoizing the values returned by its methods.
+
+    Getters raising an exception are not cached and raise again on the next call.
+    """
+
+    def __init__(self, cI):
+        self.__cI = cI
+        self.__valueD = {}
+
+    def __getattr__(self, name):
+        if name.startswith("_CachedConfig__"):
+            # not yet initialized (e.g. while copying)
+            raise AttributeError(name)
+        attr = getattr(self.__cI, name)
+        if not callable(attr):
+            return attr
+
+        def cachedGetter(*args, **kwargs):
+            ky = (name, args, tuple(sorted(kwargs.items())))
+            try:
+                return self.__valueD[ky]
+            except KeyError:
+                pass
+            except TypeError:
+                # unhashable arguments
+                return attr(*args, **kwargs)
+            val = attr(*args, **kwargs)
+            self.__valueD[ky] = val
+            return val
+
+        return cachedGetter
+
+
+class RcsbDpSiteConfig:
+    """Resolved configuration of a single site."""
+
+    def __init__(self, siteId, signature=None):
+        self.siteId = siteId
+        self.signature = signature
+        self.cI = CachedConfig(ConfigInfo(siteId))
+        self.cICommon = CachedConfig(ConfigInfoAppCommon(siteId))
+        self.cIAppCc = CachedConfig(ConfigInfoAppCc(siteId))
+        self.cIVal = CachedConfig(ConfigInfoAppValidation(siteId))
+        self.cIEm = CachedConfig(ConfigInfoAppEm(siteId))
+
+
+def _getConfigSignature(siteId):
+    """Return the paths and modification times of the configuration cache files for siteId."""
+    pathList = []
+    topPath = os.getenv("TOP_WWPDB_SITE_CONFIG_DIR")
+    if topPath and siteId:
+        locList = [os.getenv("WWPDB_SITE_LOC"), "rcsb-east", "rcsb-west", "pdbj", "pdbe", "pdbc"]
+        for loc in [str(loc).lower() for loc in locList if loc]:
+            for fn in ("ConfigInfoFileCache.json", "ConfigInfoFileCache.py"):
+                pathList.append(os.path.join(topPath, loc, str(siteId).lower(), fn))
+    mod = sys.modules.get("ConfigInfoFileCache")
+    if mod is not None and getattr(mod, "__file__", None):
+        pathList.append(mod.__file__)
+    #
+    sigList = []
+    for pth in pathList:
+        try:
+            sigList.append((pth, os.stat(pth).st_mtime_ns))
+        except OSError:
+            pass
+    return tuple(sigList)
+
+
+def getSiteConfig(siteId):
+    """Return the cached RcsbDpSiteConfig for siteId, rebuilding it if the site configuration has changed."""
+    signature = _getConfigSignature(siteId)
+    with _siteConfigLock:
+        sC = _siteConfigD.get(siteId)
+        if sC is None or sC.signature != signature:
+            if sC is not None:
+                logger.info("Site configuration for %s has changed - reloading", siteId)
+            sC = RcsbDpSiteConfig(siteId, signature=signature)
+            _siteConfigD[siteId] = sC
+        return sC
+
+
+def clearSiteConfigCache():
+    """Discard all cached site configurations and site environments."""
+    with _siteConfigLock:
+        _siteConfigD.clear()
+    with _siteEnvLock:
+        _siteEnvD.clear()
+
+
+def _getEnvSignature(siteId, sourceCommandList):
+    """Return the configuration signature of siteId extended with the modification times of the sourced scripts."""
+    sigList = list(_getConfigSignature(siteId))
+    for sourceCommand in sourceCommandList:
+        tokL = shlex.split(sourceCommand)
+        if len(tokL) > 1:
+            try:
+                sigList.append((tokL[1], os.stat(tokL[1]).st_mtime_ns))
+            except OSError:
+                pass
+    return json.loads(json.dumps(sigList))
+
+
+def getSiteEnvironmentBase():
+    """Return the base environment the env.sh commands are captured from."""
+    return {ky: os.environ[ky] for ky in SITE_ENV_BASE_VARIABLES if ky in os.environ}
+
+
+def captureSiteEnvironment(sourceCommandList, baseEnvD=None, timeout=300):
+    """Run the env.sh source commands one after the other in a shell started with the
+    environment baseEnvD (default: getSiteEnvironmentBase()) and return the environment
+    of the shell before the first and after each command.
+
+    Returns:
+        (list): len(sourceCommandList) + 1 environment dictionaries or None if the commands fail
+    """
+    baseEnvD = getSiteEnvironmentBase() if baseEnvD is None else baseEnvD
+    listCommand = "env -0 ; printf '%s\\0' " + _ENV_END_MARK
+    command = " ; ".join([listCommand] + ["%s > /dev/null 2>&1 ; %s" % (sourceCommand, listCommand) for sourceCommand in sourceCommandList])
+    try:
+        proc = subprocess.run(  # noqa: S603
+            ["/bin/sh", "-c", command], stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, env=baseEnvD, timeout=timeout, check=True
+        )
+    except (OSError, subprocess.SubprocessError) as e:
+        logger.info("Unable to capture site environment for %r: %s", sourceCommandList, str(e))
+        return None
+    envList = []
+    envD = {}
+    for item in proc.stdout.decode("utf-8", "replace").split("\0"):
+        if item == _ENV_END_MARK:
+            envList.append(envD)
+            envD = {}
+        elif "=" in item:
+            ky, val = item.split("=", 1)
+            if ky not in _SHELL_ENV_VARIABLES:
+                envD[ky] = val
+    if len(envList) != len(sourceCommandList) + 1:
+        logger.info("Unable to capture site environment for %r: incomplete output", sourceCommandList)
+        return None
+    return envList
+
+
+def getSiteEnvironment(siteId, sourceCommandList, cacheDir=None):
+    """Return the environments before and after each of the sequence of env.sh source commands
+    (see captureSiteEnvironment()).
+
+    The result is cached in memory and, if cacheDir is provided, on disk for the base
+    environment of the current process until the modification time of the site
+    configuration or of the sourced scripts changes.  Returns None if the environment
+    cannot be captured.
+    """
+    sourceCommandList = list(sourceCommandList)
+    baseEnvD = getSiteEnvironmentBase()
+    signature = _getEnvSignature(siteId, sourceCommandList)
+    ky = json.dumps({"commands": sourceCommandList, "base": baseEnvD}, sort_keys=True)
+    with _siteEnvLock:
+        sigEnv = _siteEnvD.get(ky)
+        if sigEnv is not None and sigEnv[0] == signature:
+            return sigEnv[1]
+    #
+    envList = None
+    cachePath = None
+    if cacheDir:
+        cachePath = os.path.join(cacheDir, "site-env-%s.json" % hashlib.sha1(ky.encode("utf-8")).hexdigest())  # noqa: S324
+        try:
+            with open(cachePath) as ifh:
+                cacheD = json.load(ifh)
+            if cacheD["signature"] == signature and cacheD["base"] == baseEnvD and cacheD["commands"] == sourceCommandList:
+                envList = cacheD["environments"]
+        except (OSError, ValueError, KeyError):
+            pass
+    if envList is None:
+        envList = captureSiteEnvironment(sourceCommandList, baseEnvD=baseEnvD)
+        if envList is None:
+            return None
+        logger.info("Captured site environment for %s (%d variables)", siteId, len(envList[-1]))
+        if cachePath is not None:
+            try:
+                os.makedirs(cacheDir, 0o755, exist_ok=True)
+                tmpPath = "%s.%d" % (cachePath, os.getpid())
+                with open(tmpPath, "w") as ofh:
+                    json.dump({"commands": sourceCommandList, "base": baseEnvD, "signature": signature, "environments": envList}, ofh)
+                os.replace(tmpPath, cachePath)
+            except OSError as e:
+                logger.warning("Unable to write site environment cache %s: %s", cachePath, str(e))
+    with _siteEnvLock:
+        _siteEnvD[ky] = (signature, envList)
+    return envList
+
+
+def _splitExtension(val, oldVal):
+    """Return the (prefix, suffix) added to the ':' separated list oldVal to give val, or None
+    if val does not extend oldVal at one end.
+    """
+    if not oldVal:
+        return None
+    if val.startswith(oldVal + ":"):
+        return "", val[len(oldVal) :]
+    if val.endswith(":" + oldVal):
+        return val[: -len(oldVal)], ""
+    return None
+
+
+def getEnvironmentUpdateCommand(fromEnvD, toEnvD, baseEnvD=None):
+    """Return the shell commands changing the environment fromEnvD into toEnvD (':' if there are no changes).
+
+    A value which extends the previous one at either end (e.g. a directory prepended to
+    PATH) is set relative to the current value of the variable, so that changes made to
+    the variable since fromEnvD was captured are kept as they would be by sourcing the
+    script.  If the base environment of the capture is given, variables which differ from
+    it are also restored - the script that set or unset them before is assumed to do so again.
+    """
+    baseEnvD = baseEnvD if baseEnvD is not None else fromEnvD
+    cmdList = ["unset %s" % ky for ky in sorted(set(fromEnvD) | set(baseEnvD)) if ky not in toEnvD]
+    for ky, val in sorted(toEnvD.items()):
+        oldVal = fromEnvD.get(ky)
+        if oldVal == val:
+            baseVal = baseEnvD.get(ky)
+            if val != baseVal and _splitExtension(val, baseVal) is None:
+                cmdList.append("export %s=%s" % (ky, shlex.quote(val)))
+            continue
+        extension = _splitExtension(val, oldVal)
+        if extension is None:
+            cmdList.append("export %s=%s" % (ky, shlex.quote(val)))
+            continue
+        prefix, suffix = extension
+        cmdList.append("export %s=%s" % (ky, (shlex.quote(prefix) if prefix else "") + '"${%s}"' % ky + (shlex.quote(suffix) if suffix else "")))
+    return " ; ".join(cmdList) if cmdList else ":"
@@ -144,20 +144,21 @@ Initial RCSB version - adapted from file utils method collections.
 
 """
 
-import datetime
 import glob
+import importlib.util
+import json
 import logging
 import os
 import random
+import re
 import shutil
-import signal
 import socket
 import stat
-import subprocess
 import sys
 import tempfile
 import time
-from subprocess import call
+from concurrent.futures import CancelledError, ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
 
 try:
     from itertools import zip_longest
@@ -165,20 +166,84 @@ except ImportError:
     from itertools import izip_longest as zip_longest  # type: ignore[attr-defined,no-redef]
 
 from wwpdb.io.file.DataFile import DataFile
-from wwpdb.utils.config.ConfigInfo import ConfigInfo
-from wwpdb.utils.config.ConfigInfoApp import (
-    ConfigInfoAppCc,
-    ConfigInfoAppCommon,
-    ConfigInfoAppEm,
-    ConfigInfoAppValidation,
-)
 
+from wwpdb.utils.dp.FileLinker import LINK_MODE_COPY, LINK_MODE_LINK, linkFile, unshareFile
 from wwpdb.utils.dp.PdbxStripCategory import PdbxStripCategory
-from wwpdb.utils.dp.RunRemote import RunRemote
+from wwpdb.utils.dp.RcsbDpOpRegistry import (
+    OP_FAMILY_ANNOTATION,
+    OP_FAMILY_DB,
+    OP_FAMILY_EM,
+    OP_FAMILY_MAXIT,
+    OP_FAMILY_PISA,
+    OP_FAMILY_POINTSUITE,
+    OP_FAMILY_RCSB,
+    OP_FAMILY_SEQUENCE,
+    OP_FAMILY_VALIDATE,
+    TOOL_ANNOT,
+    TOOL_CC,
+    TOOL_PYTHON,
+    TOOL_SFVALID,
+    getOpDescriptor,
+)
+from wwpdb.utils.dp.RcsbDpResourcePredictor import RcsbDpResourcePredictor, getModelComplexity
+from wwpdb.utils.dp.RcsbDpResultCache import RcsbDpResultCache
+from wwpdb.utils.dp.RcsbDpSiteConfig import getSiteConfig, getSiteEnvironment
+from wwpdb.utils.dp.RunExecutor import EXECUTOR_INLINE, EXECUTOR_SLURM, ExecutorJob, RunExecutor, get_executor, get_site_executor
+from wwpdb.utils.dp.RunRemote import JobStatus
 
 logger = logging.getLogger(__name__)
 
 
+class RcsbDpOpHandle:
+    """Handle on an operation started by RcsbDpUtility.opAsync()."""
+
+    def __init__(self, op, dp, future):
+        self.__op = op
+        self.__dp = dp
+        self.__future = future
+
+    def getOp(self):
+        return self.__op
+
+    def getUtility(self):
+        """Return the RcsbDpUtility instance running the operation - use this to export results and logs."""
+        return self.__dp
+
+    def getFuture(self):
+        """Return the underlying concurrent.futures.Future (e.g. for asyncio.wrap_future())."""
+        return self.__future
+
+    def poll(self):
+        """Return the operation return code, or None if the operation has not yet completed."""
+        if not self.__future.done():
+            return None
+        return self.wait()
+
+    def wait(self, timeout=None):
+        """Wait for the operation to complete and return its return code.
+
+        Returns None if the operation has not completed within timeout seconds and
+        -1 if the operation was cancelled or failed with an exception.
+        """
+        try:
+            return self.__future.result(timeout=timeout)
+        except FutureTimeoutError:
+            return None
+        except CancelledError:
+            return -1
+        except Exception as e:  # noqa: BLE001
+            logger.exception("+RcsbDpOpHandle.wait() operation %s failed with %s", self.__op, str(e))
+            return -1
+
+    def cancel(self):
+        """Cancel the operation - a pending operation is never started and a running one is killed."""
+        if self.__future.cancel():
+            return True
+        if self.__future.done():
+            return False
+        return self.__dp.cancel()
+
+
 class RcsbDpUtility:
     """Wrapper class for data processing and chemical component utilities."""
 
@@ -205,208 +270,18 @@ class RcsbDpUtility:
         self.__resultPathList = []
         self.__inputParamDict = {}
         #
-        # List of known operations ---
-        self.__maxitOps = [
-            "cif2cif",
-            "cif2cif-remove",
-            "cif2cif-ebi",
-            "cif2cif-pdbx",
-            "cif2cif-pdbx-skip-process",
-            "cif-rcsb2cif-pdbx",
-            "cif-seqed2cif-pdbx",
-            "cif2pdb",
-            "pdb2cif",
-            "pdb2cif-ebi",
-            "switch-dna",
-            "cif2pdb-assembly",
-            "pdbx2pdb-assembly",
-            "pdbx2deriv",
-        ]
-        self.__rcsbOps = [
-            "rename-atoms",
-            "cif2pdbx",
-            "pdbx2xml",
-            "pdb2dssp",
-            "pdb2stride",
-            "initial-version",
-            "poly-link-dist",
-            "chem-comp-link",
-            "chem-comp-assign",
-            "chem-comp-assign-comp",
-            "chem-comp-assign-skip",
-            "chem-comp-assign-exact",
-            "chem-comp-assign-validation",
-            "check-cif",
-            "check-cif-v4",
-            "check-cif-ext",
-            "cif2pdbx-public",
-            "cif2pdbx-ext",
-            "chem-comp-dict-makeindex",
-            "chem-comp-dict-serialize",
-            "chem-comp-annotate-comp",
-            "chem-comp-do-report",
-            "chem-comp-align-img-gen",
-            "chem-comp-align-images",
-            "chem-comp-gen-images",
-            "chem-comp-update-support-files",
-            "citation-search-and-auto-release",
-            "update-depui-taxonomy",
-            "chem-ref-checkout",
-            "chem-ref-sync",
-            "chem-ref-load",
-            "chem-ref-run-setup",
-            "chem-ref-run-update",
-            "metal-findgeo",
-            "metal-metalcoord-stats",
-            "metal-metalcoord-update",
-        ]
-        self.__pisaOps = [
-            "pisa-analysis",
-            "pisa-assembly-report-xml",
-            "pisa-assembly-report-text",
-            "pisa-interface-report-xml",
-            "pisa-assembly-coordinates-pdb",
-            "pisa-assembly-coordinates-cif",
-            "pisa-assembly-coordinates-cif",
-            "pisa-assembly-merge-cif",
-        ]
-        self.__annotationOps = [
-            "annot-secondary-structure",
-            "annot-link-ssbond",
-            "annot-link-ssbond-with-ptm",
-            "annot-cis-peptide",
-            "annot-distant-solvent",
-            "annot-merge-struct-site",
-            "annot-reposition-solvent",
-            "annot-base-pair-info",
-            "annot-validation",
-            "annot-site",
-            "annot-rcsb2pdbx",
-            "annot-consolidated-tasks",
-            "annot-wwpdb-validate-all",
-            "annot-wwpdb-validate-all-v2",
-            "prd-search",
-            "prd-process-summary",
-            "annot-nmrstar2pdbx",
-            "annot-pdbx2nmrstar",
-            "annot-reposition-solvent-add-derived",
-            "annot-rcsb2pdbx-strip",
-            "annot-rcsbeps2pdbx-strip",
-            "annot-rcsb2pdbx-strip-plus-entity",
-            "annot-rcsbeps2pdbx-strip-plus-entity",
-            "chem-comp-instance-update",
-            "annot-cif2cif",
-            "annot-cif2pdb",
-            "annot-pdb2cif",
-            "annot-poly-link-dist",
-            "annot-merge-sequence-data",
-            "annot-make-maps",
-            "annot-make-ligand-maps",
-            "annot-poly-link-dist-json",
-            "annot-make-omit-maps",
-            "annot-cif2cif-dep",
-            "annot-pdb2cif-dep",
-            "annot-format-check-pdbx",
-            "annot-format-check-pdb",
-            "annot-dcc-report",
-            "annot-sf-convert",
-            "annot-tls-range-correction",
-            "annot-dcc-refine-report",
-            "annot-dcc-biso-full",
-            "annot-dcc-special-position",
-            "annot-dcc-fix-special-position",
-            "annot-dcc-reassign-alt-ids",
-            "annot-rcsb2pdbx-withpdbid",
-            "annot-merge-tls-range-data",
-            "annot-rcsb2pdbx-withpdbid-singlequote",
-            "annot-rcsb2pdbx-alt",
-            "annot-move-xyz-by-matrix",
-            "annot-move-xyz-by-symop",
-            "annot-extra-checks",
-            "annot-update-terminal-atoms",
-            "annot-merge-xyz",
-            "annot-gen-assem-pdbx",
-            "annot-cif2pdbx-withpdbid",
-            "annot-validate-geometry",
-            "annot-update-dep-assembly-info",
-            "annot-add-default-assembly-info",
-            "annot-chem-shifts-update-with-check",
-            "annot-chem-shifts-atom-name-check",
-            "annot-chem-shifts-upload-check",
-            "annot-nef-update-with-check",
-            "annot-reorder-models",
-            "annot-chem-shifts-update",
-            "annot-generte-nmr-data-str-file",
-            "annot-get-corres-info",
-            "prd-summary-serialize",
-            "prd-family-mapping",
-            "annot-get-symmetry-operator",
-            "annot-depict-molecule-json",
-            "annot-check-select-number",
-            "annot-update-molecule",
-            "annot-depict-chemical-shift",
-            "annot-edit-chemical-shift",
-            "annot-misc-checking",
-            "annot-dcc-validation",
-            "annot-correct-freer-set",
-            "annot-cif-to-public-pdbx",
-            "annot-cif-to-pdbx-em-header",
-            "annot-public-pdbx-to-xml",
-            "annot-public-pdbx-to-xml-noatom",
-            "annot-release-update",
-            "annot-get-pdb-bundle",
-            "annot-get-biol-cif-file",
-            "annot-get-biol-pdb-file",
-            "annot-check-cif",
-            "annot-check-xml-xmllint",
-            "annot-check-xml-stdinparse",
-            "annot-get-pdb-file",
-            "annot-check-pdb-file",
-            "annot-check-sf-file",
-            "annot-check-mr-file",
-            "annot-check-cs-file",
-            "annot-add-version-info",
-            "carbohydrate-remediation",
-            "carbohydrate-remediation-test",
-            "get-branch-polymer-info",
-            "annot-get-close-contact",
-            "annot-convert-close-contact-to-link",
-            "annot-get-covalent-bond",
-            "annot-remove-covalent-bond",
-            "em-density-bcif",
-            "xray-density-bcif",
-            "centre-of-mass",
-            "annot-complexity",
-            "annot-pcm-check-ccd-ann",
-            "annot-merge-pointsuite-info",
-            "annot-check-ccd-definition",
-            "annot-get-em-exp-info",
-        ]
-
-        self.__sequenceOps = [
-            "seq-blastp",
-            "seq-blastn",
-            "fetch-uniprot",
-            "fetch-gb",
-            "format-uniprot",
-            "format-gb",
-            "backup-seqdb",
-        ]
-        self.__validateOps = ["validate-geometry"]
-        self.__dbOps = ["db-loader", "sync-depositors"]
-        self.__emOps = [
-            "mapfix-big",
-            "em2em-spider",
-            "fsc_check",
-            "img-convert",
-            "annot-read-map-header",
-            "annot-read-map-header-in-place",
-            "annot-update-map-header-in-place",
-            "deposit-update-map-header-in-place",
-            "em-map-model-upload-check",
-        ]
-
-        self.__pointsuiteOps = ["pointsuite-importmats", "pointsuite-findframe", "pointsuite-makeassembly"]
+        # Step methods for each family of known operations (see RcsbDpOpRegistry) ---
+        self.__stepMethodD = {
+            OP_FAMILY_MAXIT: self.__maxitStep,
+            OP_FAMILY_RCSB: self.__rcsbStep,
+            OP_FAMILY_PISA: self.__pisaStep,
+            OP_FAMILY_ANNOTATION: self.__annotationStep,
+            OP_FAMILY_SEQUENCE: self.__sequenceStep,
+            OP_FAMILY_VALIDATE: self.__validateStep,
+            OP_FAMILY_DB: self.__dbStep,
+            OP_FAMILY_EM: self.__emStep,
+            OP_FAMILY_POINTSUITE: self.__pointsuiteStep,
+        }
 
         #
 
@@ -424,14 +299,60 @@ class RcsbDpUtility:
         self.__numThreads = 1  # this is used by RunRemote to set the number of cores requested
         self.__startingMemory = 2000  # this is used by RunRemote to set the starting RAM to be requested
 
-        self.__run_remote = False
+        # Backend running the commands of each step (see setExecutor())
+        self.__executor = None
+        #
+        # Node-local staging of remote steps and the files declared by the current step (see setNodeLocalStaging())
+        self.__nodeLocalStaging = False
+        self.__stageInputs = None
+        self.__stageOutputs = None
+        self.__stageDirs = None
+        #
+        # Handle on the running job, used by cancel()
+        self.__job = None
+        self.__cancelled = False
+        #
+        # Executor and counter for operations started by opAsync()
+        self.__asyncExecutor = None
+        self.__asyncMaxWorkers = None
+        self.__asyncCount = 0
+        self.__chainCount = 0
+        #
+        # Optional cache of the results of deterministic operations (see setResultCache())
+        self.__resultCache = None
+        self.__resultCacheBypass = False
+        #
+        # How imported files and step results are passed on as step inputs (see setLinkMode())
+        self.__linkMode = LINK_MODE_COPY
+        #
+        # Command sourcing the site env.sh and the cache of the environment it sets up (see setSiteEnvCache())
+        self.__site_config_command = None
+        self.__siteEnvCache = False
+        self.__siteEnvCacheDir = None
+        #
+        # Resource usage of the commands run by each step (see getStepMetrics())
+        self.__stepMetricsList = []
+        self.__metricsPath = None
+        #
+        # History of step resource usage used to size remote jobs (see setResourcePredictor())
+        self.__resourcePredictor = None
+        self.__stepInputPath = None
 
-        self.__cI = ConfigInfo(self.__siteId)
-        self.__cICommon = ConfigInfoAppCommon(self.__siteId)
-        self.__cIAppCc = ConfigInfoAppCc(self.__siteId)
-        self.__cIVal = ConfigInfoAppValidation(self.__siteId)
+        self.__siteConfig = None
+        self.__setSiteConfig()
         self.__initPath()
-        self.__getRunRemote()
+        self.__executor = get_site_executor(self.__cI)
+
+    def __setSiteConfig(self):
+        """Bind the configuration accessors to the process-wide cached configuration for this site."""
+        siteConfig = getSiteConfig(self.__siteId)
+        if siteConfig is not self.__siteConfig:
+            self.__siteConfig = siteConfig
+            self.__cI = siteConfig.cI
+            self.__cICommon = siteConfig.cICommon
+            self.__cIAppCc = siteConfig.cIAppCc
+            self.__cIVal = siteConfig.cIVal
+            self.__cIEm = siteConfig.cIEm
 
     def __getConfigPath(self, ky):
         try:
@@ -479,17 +400,39 @@ class RcsbDpUtility:
 
     def setRunRemote(self, run_remote=True):
         if run_remote:
-            self.__run_remote = True
-        else:
-            self.__run_remote = False
+            self.__executor = get_executor(EXECUTOR_SLURM)
+        elif self.__executor.remote:
+            siteExecutor = get_site_executor(self.__cI)
+            self.__executor = siteExecutor if not siteExecutor.remote else get_executor(EXECUTOR_INLINE)
+
+    def setExecutor(self, executor):
+        """Set the backend running the commands of each step -
 
-    def __getRunRemote(self):
+        EXECUTOR_SLURM       - Slurm jobs submitted by RunRemote
+        EXECUTOR_LOCAL_POOL  - local processes limited by the CPU and memory slots of a shared pool
+        EXECUTOR_INLINE      - local processes run straight away
+
+        A RunExecutor instance may be given instead of a name.
+        """
         try:
-            if self.__cI.get("USE_COMPUTE_CLUSTER"):
-                if self.__cI.get("PDBE_CLUSTER_QUEUE"):
-                    self.setRunRemote()
-        except Exception as e:  # noqa: BLE001
-            logger.info("unable to get cluster queue %s", str(e))
+            self.__executor = executor if isinstance(executor, RunExecutor) else get_executor(executor)
+            return True
+        except ValueError as e:
+            logger.error("executor not set %s", str(e))
+            return False
+
+    def getExecutor(self):
+        return self.__executor
+
+    def setNodeLocalStaging(self, flag=True):
+        """Run remote steps which declare their files in node-local scratch space ($TMPDIR) -
+
+        The declared inputs are copied to the compute node and only the declared results
+        and logs are copied back, so that intermediate files do not go through the shared
+        filesystem.  Currently declared by annot-wwpdb-validate-all and annot-wwpdb-validate-all-v2,
+        which then also use a validation run directory in scratch space unless 'run_dir' is given.
+        """
+        self.__nodeLocalStaging = flag
 
     def setRcsbAppsPath(self, fPath):
         """Set or overwrite the configuration setting for __rcsbAppsPath."""
@@ -501,6 +444,145 @@ class RcsbDpUtility:
         if fPath is not None and os.path.isdir(fPath):
             self.__localAppsPath = os.path.abspath(fPath)
 
+    def setLinkMode(self, mode=LINK_MODE_LINK):
+        """Set how imported files and step results become step inputs -
+
+        LINK_MODE_COPY  - files are copied (default)
+        LINK_MODE_LINK  - reflinks or hard links are used where the filesystem allows with a copy as fallback
+        """
+        if mode in (LINK_MODE_COPY, LINK_MODE_LINK):
+            self.__linkMode = mode
+            return True
+        logger.error('link mode not set "%s" is not supported', mode)
+        return False
+
+    def setSiteEnvCache(self, flag=True, cacheDir=None):
+        """Capture the environment set up by the site env.sh script once and start local
+        operations in it rather than sourcing env.sh in each step (default: off).  The
+        captured environment is also kept in cacheDir if this is provided.
+        """
+        self.__siteEnvCache = flag
+        self.__siteEnvCacheDir = cacheDir
+
+    def __getSiteEnvironment(self, command):
+        """Return the command without its env.sh source commands and the environment to run it in.
+
+        The environment is the one of the current process with the changes made by all
+        of the source commands, taken from the cached site environment.  Returns the
+        command unchanged and None if env.sh is not sourced or its environment cannot
+        be captured.
+        """
+        if not self.__siteEnvCache or not self.__site_config_command or self.__site_config_command not in command:
+            return command, None
+        pat = re.compile(re.escape(self.__site_config_command) + r"((?:[ \t]+--[\w-]+)*)")
+        sourceCommandList = [mObj.group(0).strip() for mObj in pat.finditer(command)]
+        envList = getSiteEnvironment(self.__siteId, sourceCommandList, cacheDir=self.__siteEnvCacheDir)
+        if envList is None:
+            return command, None
+        envD = dict(os.environ)
+        for ky in envList[0]:
+            if ky not in envList[-1]:
+                envD.pop(ky, None)
+        envD.update({ky: val for ky, val in envList[-1].items() if envList[0].get(ky) != val})
+        return pat.sub(":", command), envD
+
+    def setMetricsPath(self, fPath=None):
+        """Append the resource usage record of each step to fPath as a JSON line (None to disable)."""
+        self.__metricsPath = os.path.abspath(fPath) if fPath else None
+
+    def setResourcePredictor(self, dbPath=None, **kwargs):
+        """Record the resources used by each step in the SQLite history file dbPath and size the
+        memory and time requested for remote jobs from it (None to disable).  Further keyword
+        arguments are passed to RcsbDpResourcePredictor.
+        """
+        try:
+            self.__resourcePredictor = RcsbDpResourcePredictor(dbPath, **kwargs) if dbPath else None
+            return True
+        except Exception as e:  # noqa: BLE001
+            logger.error("Resource history %r not available: %s", dbPath, str(e))
+            self.__resourcePredictor = None
+            return False
+
+    def __getStepFeatures(self):
+        """Return the total size of the step input files and the complexity of the input model
+        (None if no resource predictor is set).
+        """
+        if self.__resourcePredictor is None:
+            return None
+        pathList = [self.__stepInputPath] if self.__stepInputPath else []
+        pathList += [value for value in self.__inputParamDict.values() if isinstance(value, str) and os.path.isfile(value)]
+        inputSize = 0
+        for fPath in pathList:
+            try:
+                inputSize += os.path.getsize(fPath)
+            except OSError:
+                pass
+        complexity = getModelComplexity(self.__stepInputPath) if self.__stepInputPath else None
+        return inputSize, complexity
+
+    def getStepMetrics(self):
+        """Return the list of resource usage records of the steps run by this instance.
+
+        Each record is a dictionary with the step number and operation, the return code,
+        the wall clock time and user/system CPU time (seconds), the peak resident set size
+        (max_rss_kb) and the block input and output (read_kb/write_kb).  Values which are
+        not available are None.
+        """
+        return [dict(rec) for rec in self.__stepMetricsList]
+
+    def __recordStepMetrics(self, op, startTime, retcode, process=None, remoteJob=None, cached=False, features=None):
+        rec = {
+            "step": self.__stepNo,
+            "op": op,
+            "site_id": self.__siteId,
+            "host": socket.gethostname(),
+            "start_time": round(startTime, 3),
+            "return_code": retcode if retcode is None or isinstance(retcode, int) else str(getattr(retcode, "value", retcode)),
+            "remote": remoteJob is not None,
+            "cached": cached,
+            "job_id": None,
+            "timed_out": False,
+            "wall_time": round(time.time() - startTime, 3),
+            "user_cpu": None,
+            "system_cpu": None,
+            "max_rss_kb": None,
+            "read_kb": None,
+            "write_kb": None,
+        }
+        if process is not None:
+            rec["return_code"] = process.returncode
+            rec["timed_out"] = process.timedOut
+            if process.getElapsedTime() is not None:
+                rec["wall_time"] = round(process.getElapsedTime(), 3)
+            if process.rusage is not None:
+                ru = process.rusage
+                rec.update(
+                    {
+                        "user_cpu": round(ru.ru_utime, 3),
+                        "system_cpu": round(ru.ru_stime, 3),
+                        "max_rss_kb": ru.ru_maxrss,
+                        # blocks of 512 bytes
+                        "read_kb": ru.ru_inblock // 2,
+                        "write_kb": ru.ru_oublock // 2,
+                    }
+                )
+        if remoteJob is not None:
+            rec["job_id"] = remoteJob.job_id
+            accounting = remoteJob.accounting or {}
+            for ky in ("wall_time", "user_cpu", "system_cpu", "max_rss_kb", "read_kb", "write_kb"):
+                if accounting.get(ky) is not None:
+                    rec[ky] = accounting[ky]
+        self.__stepMetricsList.append(rec)
+        if features is not None and (retcode == 0 or retcode == JobStatus.COMPLETED):
+            self.__resourcePredictor.record(op, features[0], features[1], rec["max_rss_kb"], rec["wall_time"], numThreads=self.__numThreads)
+        if self.__metricsPath:
+            try:
+                with open(self.__metricsPath, "a") as ofh:
+                    ofh.write(json.dumps(rec) + "\n")
+            except Exception as e:  # noqa: BLE001
+                logger.warning("Unable to write step metrics to %s: %s", self.__metricsPath, str(e))
+        return rec
+
     def saveResult(self):
         return self.__stepNo
 
@@ -568,48 +650,266 @@ class RcsbDpUtility:
             self.__makeTempWorkingDir()
 
         self.__stepOpList.append(op)
+        self.__setSiteConfig()
 
         if self.__testMode:
             logger.info("TestMode - bypass operation %s", op)
             return 0
         #
-        if op in self.__maxitOps:
-            self.__stepNo += 1
-            return self.__maxitStep(op)
-        if op in self.__rcsbOps:
+        opDesc = getOpDescriptor(op)
+        if opDesc is not None:
+            missingList = opDesc.missingInputs(self.__inputParamDict)
+            if missingList:
+                logger.info("+RcsbDpUtility.op() ++ Error  - operation %s missing required inputs %r\n", op, missingList)
+                return -1
+            self.__stepInputPath = self.__getCurrentInputPath()
+            # steps which do not set the result list must not report (or cache) the results of the previous step
+            self.__resultPathList = []
+            if self.__resultCache is not None and opDesc.isCacheable():
+                return self.__cachedStep(opDesc)
             self.__stepNo += 1
-            return self.__rcsbStep(op)
+            return self.__stepMethodD[opDesc.family](op)
 
-        if op in self.__pisaOps:
-            self.__stepNo += 1
-            return self.__pisaStep(op)
+        logger.info("+RcsbDpUtility.op() ++ Error  - Unknown operation %s\n", op)
+        return -1
 
-        if op in self.__annotationOps:
-            self.__stepNo += 1
-            return self.__annotationStep(op)
+    def opChain(self, opList):
+        """Run the operations in opList one after the other, each on the result of the previous one.
 
-        if op in self.__sequenceOps:
-            self.__stepNo += 1
-            return self.__sequenceStep(op)
+        With a remote executor the whole chain is submitted as a single job so that it waits
+        in the queue only once.  The operations then run on the compute node in a working
+        directory below the current one (see RcsbDpChain), and the final result and the
+        concatenated logs become the result and log of one step of this instance.
 
-        if op in self.__validateOps:
-            self.__stepNo += 1
-            return self.__validateStep(op)
+        Returns the return code of the first failing operation or else of the last one.
+        """
+        if self.__testMode or not self.__executor.remote or len(opList) < 2:
+            ret = 0
+            for op in opList:
+                ret = self.op(op)
+                if not (ret == 0 or ret == JobStatus.COMPLETED):
+                    break
+            return ret
+        #
+        if self.__srcPath is None and len(self.__inputParamDict) < 1:
+            logger.info("++ Error  - no input provided for operation chain %r\n", opList)
+            return -1
+        for op in opList:
+            opDesc = getOpDescriptor(op)
+            if opDesc is None:
+                logger.info("+RcsbDpUtility.opChain() ++ Error  - Unknown operation %s\n", op)
+                return -1
+        missingList = getOpDescriptor(opList[0]).missingInputs(self.__inputParamDict)
+        if missingList:
+            logger.info("+RcsbDpUtility.opChain() ++ Error  - operation %s missing required inputs %r\n", opList[0], missingList)
+            return -1
+        if self.__wrkPath is None:
+            self.__makeTempWorkingDir()
+        self.__setSiteConfig()
+        #
+        self.__chainCount += 1
+        chainPath = os.path.join(self.__wrkPath, "chain-%d" % self.__chainCount)
+        os.makedirs(chainPath, 0o755, exist_ok=True)
+        self.__stepInputPath = self.__getCurrentInputPath()
+        self.__stepOpList.extend(opList)
+        self.__stepNo += 1
+        resultPath = os.path.join(self.__wrkPath, self.__getResultWrkFile(self.__stepNo))
+        lPathFull = os.path.join(self.__wrkPath, self.__getLogWrkFile(self.__stepNo))
+        summaryPath = os.path.join(chainPath, "chain-summary.json")
+        spec = {
+            "site_id": self.__siteId,
+            "tmp_path": self.__tmpPath,
+            "work_path": chainPath,
+            "input_path": self.__stepInputPath,
+            "params": self.__inputParamDict,
+            "ops": list(opList),
+            "timeout": self.__timeout,
+            "num_threads": self.__numThreads,
+            "link_mode": self.__linkMode,
+            "result_path": resultPath,
+            "log_path": lPathFull,
+            "summary_path": summaryPath,
+        }
+        specPath = os.path.join(chainPath, "chain-spec.json")
+        with open(specPath, "w") as ofh:
+            json.dump(spec, ofh, indent=2, default=str)
+        #
+        cmd = "cd " + chainPath + " ; python -m wwpdb.utils.dp.RcsbDpChain --spec " + specPath
+        ret = self.__run(cmd, lPathFull, "chain-" + "+".join(opList))
+        try:
+            with open(summaryPath) as ifh:
+                summary = json.load(ifh)
+        except (OSError, ValueError):
+            logger.info("+RcsbDpUtility.opChain() ++ Error  - operation chain %r returned %r without a summary\n", opList, ret)
+            return -1 if ret == 0 or ret == JobStatus.COMPLETED else ret
+        self.__resultPathList = summary["result_path_list"]
+        if summary["failed_op"] is not None:
+            logger.info("+RcsbDpUtility.opChain() operation %s failed with return code %r\n", summary["failed_op"], summary["return_code"])
+            return summary["return_code"]
+        return ret
+
+    def setResultCache(self, cacheDir=None, maxSize=None, bypass=False):
+        """Serve the results of deterministic operations from the cache in cacheDir (None disables the cache).
+
+        Args:
+            cacheDir (str): cache directory which may be shared by several instances and processes
+            maxSize (int): maximum size of the cache in bytes (least recently used results are evicted)
+            bypass (bool): run operations even when cached results exist (new results are still stored)
+        """
+        try:
+            self.__resultCache = RcsbDpResultCache(cacheDir, maxSize=maxSize) if cacheDir else None
+            self.__resultCacheBypass = bypass
+            return True
+        except Exception as e:  # noqa: BLE001
+            logger.error("Result cache %r not available: %s", cacheDir, str(e))
+            self.__resultCache = None
+            return False
 
-        if op in self.__dbOps:
-            self.__stepNo += 1
-            return self.__dbStep(op)
+    def setResultCacheBypass(self, flag=True):
+        self.__resultCacheBypass = flag
 
-        if op in self.__emOps:
-            self.__stepNo += 1
-            return self.__emStep(op)
+    def __getToolBuildId(self, opDesc):
+        """Return an identifier of the installed build of the tool run by a cacheable operation."""
+        toolType, toolName = opDesc.cacheTool
+        if toolType == TOOL_PYTHON:
+            spec = importlib.util.find_spec(toolName)
+            toolPath = spec.origin if spec is not None else toolName
+            buildId = "python-%d.%d" % sys.version_info[:2]
+        else:
+            toolRootD = {
+                TOOL_ANNOT: self.__cICommon.get_site_annot_tools_path,
+                TOOL_CC: self.__cICommon.get_site_cc_apps_path,
+                TOOL_SFVALID: self.__cICommon.get_sf_valid,
+            }
+            toolPath = os.path.join(toolRootD[toolType](), toolName)
+            buildId = toolType
+        try:
+            st = os.stat(toolPath)
+            return "%s:%s:%d:%d" % (buildId, toolPath, st.st_size, st.st_mtime_ns)
+        except OSError:
+            return "%s:%s:missing" % (buildId, toolPath)
+
+    def __cachedStep(self, opDesc):
+        """Run a deterministic operation serving the result and log files from the result cache if possible."""
+        op = opDesc.op
+        inputPath = self.__getCurrentInputPath()
+        try:
+            key = self.__resultCache.makeKey(op, [inputPath] if inputPath else [], self.__inputParamDict, self.__getToolBuildId(opDesc))
+        except Exception as e:  # noqa: BLE001
+            logger.info("Result cache key not available for %s: %s", op, str(e))
+            key = None
+        #
+        startTime = time.time()
+        self.__stepNo += 1
+        resultName = self.__getResultWrkFile(self.__stepNo)
+        logName = self.__getLogWrkFile(self.__stepNo)
+        nameMap = {"result_file": resultName, "log_file": logName}
+        if key is not None and not self.__resultCacheBypass:
+            indexD = self.__resultCache.get(key, self.__wrkPath, nameMap)
+            if indexD is not None:
+                logger.info("Using cached result for op %s", op)
+                self.__recordStepMetrics(op, startTime, 0, cached=True)
+                self.__resultPathList = [fn if fn == "missing" else os.path.join(self.__wrkPath, nameMap.get(fn, fn)) for fn in indexD["resultFiles"]]
+                return 0
+        #
+        ret = self.__stepMethodD[opDesc.family](op)
+        if key is None or not (ret == 0 or ret == JobStatus.COMPLETED):
+            return ret
+        #
+        fileD = {}
+        resultFileList = []
+        for fPath in self.__resultPathList:
+            if fPath == "missing":
+                resultFileList.append(fPath)
+                continue
+            if os.path.dirname(os.path.abspath(fPath)) != self.__wrkPath or not os.path.isfile(fPath):
+                logger.debug("Result %s of op %s not cached", fPath, op)
+                return ret
+            fn = os.path.basename(fPath)
+            fn = "result_file" if fn == resultName else fn
+            fileD[fn] = fPath
+            resultFileList.append(fn)
+        for fn, fPath in (("result_file", os.path.join(self.__wrkPath, resultName)), ("log_file", os.path.join(self.__wrkPath, logName))):
+            if os.path.isfile(fPath):
+                fileD[fn] = fPath
+        self.__resultCache.put(key, op, fileD, resultFiles=resultFileList)
+        return ret
+
+    def setAsyncMaxWorkers(self, maxWorkers=None):
+        """Set the maximum number of operations started by opAsync() that may run at the same time."""
+        if maxWorkers is None or (isinstance(maxWorkers, int) and maxWorkers > 0):
+            self.__asyncMaxWorkers = maxWorkers
+        else:
+            logger.error('maxWorkers not set "%s" is not a positive integer', maxWorkers)
 
-        if op in self.__pointsuiteOps:
-            self.__stepNo += 1
-            return self.__pointsuiteStep(op)
+    def opAsync(self, op):
+        """Start operation op on the current input without waiting for it to complete.
 
-        logger.info("+RcsbDpUtility.op() ++ Error  - Unknown operation %s\n", op)
-        return -1
+        The operation runs in a private RcsbDpUtility instance with its own working
+        directory below the current working directory.  Input parameters and execution
+        settings are copied from this instance, and the current input is the result
+        that the next call to op() would use.  Several independent operations may
+        therefore be started on the same input at the same time.
+
+        Returns an RcsbDpOpHandle providing wait(), poll() and cancel().
+        """
+        if self.__srcPath is None and len(self.__inputParamDict) < 1:
+            logger.info("++ Error  - no input provided for operation %s\n", op)
+            return None
+
+        if self.__wrkPath is None:
+            self.__makeTempWorkingDir()
+
+        self.__asyncCount += 1
+        dp = RcsbDpUtility(tmpPath=self.__tmpPath, siteId=self.__siteId, verbose=self.__verbose, log=self.__lfh, testMode=self.__testMode)
+        dp.setWorkingDir(os.path.join(self.__wrkPath, "async-%d-%s" % (self.__asyncCount, op)))
+        dp.setDebugMode(self.__debug)
+        dp.setTimeout(self.__timeout)
+        dp.setNumThreads(self.__numThreads)
+        dp.setStartMemory(self.__startingMemory)
+        dp.setExecutor(self.__executor)
+        dp.setLinkMode(self.__linkMode)
+        dp.setSiteEnvCache(self.__siteEnvCache, cacheDir=self.__siteEnvCacheDir)
+        dp.__resultCache = self.__resultCache
+        dp.__resultCacheBypass = self.__resultCacheBypass
+        dp.__resourcePredictor = self.__resourcePredictor
+        for name, value in self.__inputParamDict.items():
+            dp.addInput(name=name, value=value)
+        srcPath = self.__getCurrentInputPath()
+        if srcPath is not None:
+            dp.imp(srcPath)
+
+        if self.__asyncExecutor is None:
+            self.__asyncExecutor = ThreadPoolExecutor(max_workers=self.__asyncMaxWorkers)
+        future = self.__asyncExecutor.submit(dp.op, op)
+        logger.info("Started asynchronous op %s with working path %s\n", op, dp.getWorkingDir())
+        return RcsbDpOpHandle(op, dp, future)
+
+    def cancel(self):
+        """Cancel the operation currently running in this instance.
+
+        Any local process group is killed and any remote job is cancelled.  Operations
+        started afterwards on this instance are also refused.
+        """
+        self.__cancelled = True
+        job = self.__job
+        if job is not None:
+            logger.info("+RcsbDpUtility.cancel() cancelling job %s for operation %s\n", job.job_name, self.__stepOpList)
+            job.cancel()
+        return True
+
+    def __getCurrentInputPath(self):
+        """Return the path of the file that the next operation would take as input."""
+        if self.__stepNo > 0:
+            stepNo = self.__stepNoSaved if self.__stepNoSaved is not None else self.__stepNo
+            fn = self.__getResultWrkFile(stepNo)
+        else:
+            fn = self.__getSourceWrkFile(1)
+        if self.__wrkPath is not None:
+            fPath = os.path.join(self.__wrkPath, fn)
+            if os.access(fPath, os.F_OK):
+                return fPath
+        return self.__srcPath
 
     def expSize(self):
         """Return the size of the last result file..."""
@@ -689,7 +989,10 @@ class RcsbDpUtility:
             iPath = self.__getSourceWrkFile(self.__stepNo + 1)
             f1 = DataFile(self.__srcPath)
             wrkPath = os.path.join(self.__wrkPath, iPath)
-            f1.copy(wrkPath)
+            if self.__linkMode == LINK_MODE_LINK and f1.srcType is None:
+                linkFile(self.__srcPath, wrkPath)
+            else:
+                f1.copy(wrkPath)
         return True
 
     def addInput(self, name=None, value=None, type="param"):  # noqa: A002 # pylint: disable=redefined-builtin
@@ -795,6 +1098,39 @@ class RcsbDpUtility:
     def __getTmpWrkFile(self, stepNo):
         return "temp_file_" + str(stepNo)
 
+    def __stageStepInput(self, op, iPath):
+        """Make the result of the previous (or selected) step the input file iPath of the current step."""
+        wrkPath = self.__wrkPath if self.__wrkPath is not None else "."
+        iPathFull = os.path.join(wrkPath, iPath)
+        opDesc = getOpDescriptor(op)
+        inPlace = opDesc is not None and opDesc.inPlace
+        if self.__stepNo > 1:
+            pPathFull = os.path.join(wrkPath, self.__updateInputPath())
+            if not os.access(pPathFull, os.F_OK):
+                return False
+            if self.__linkMode == LINK_MODE_LINK:
+                linkFile(pPathFull, iPathFull, allowHardlink=not inPlace)
+            else:
+                shutil.copyfile(pPathFull, iPathFull)
+            return True
+        if inPlace and self.__linkMode == LINK_MODE_LINK:
+            # the imported file may be a hard link to the source file
+            unshareFile(iPathFull)
+        return True
+
+    def __checkMapHeader(self, mapPath, maxVoxels=None):
+        """Check the CCP4/MRC header of a map before a step processes it - returns True if the map can be converted."""
+        # imported here so that numpy and msgpack are only loaded by the map steps
+        from wwpdb.utils.dp.electron_density.volume_server_bcif import read_ccp4_header, validate_ccp4_header  # pylint: disable=import-outside-toplevel
+
+        try:
+            problemList = validate_ccp4_header(read_ccp4_header(mapPath), max_voxels=int(maxVoxels) if maxVoxels else None)
+        except Exception as e:  # noqa: BLE001
+            problemList = [str(e)]
+        for problem in problemList:
+            logger.error("Map %s rejected: %s", mapPath, problem)
+        return not problemList
+
     def __updateInputPath(self):
         """Shuffle the output from the previous step or a selected previous
         step as the input for the current operation.
@@ -867,10 +1203,7 @@ class RcsbDpUtility:
             # tPathFull = tPath
             cmd = "("
         #
-        if self.__stepNo > 1:
-            pPath = self.__updateInputPath()
-            if os.access(pPath, os.F_OK):
-                cmd += "; cp " + pPath + " " + iPath
+        self.__stageStepInput(op, iPath)
 
         #
         # Standard setup for maxit ---
@@ -882,113 +1215,28 @@ class RcsbDpUtility:
         maxitCmd = os.path.join(self.__rcsbAppsPath, "bin", "maxit")
 
         #
-        if op == "annot-secondary-structure":
-            cmdPath = os.path.join(self.__annotAppsPath, "bin", "GetSecondStruct")
-            thisCmd = " ; " + cmdPath
-            cmd += thisCmd + " -input " + iPath + " -output " + oPath + " -log annot-step.log "
-            #
-            if "ss_topology_file_path" in self.__inputParamDict:
-                topFilePath = self.__inputParamDict["ss_topology_file_path"]
-                cmd += " -support " + topFilePath
-            #
-            cmd += " > " + tPath + " 2>&1 ; cat " + tPath + " >> " + lPath
-            cmd += " ; cat annot-step.log " + " >> " + lPath
-
-        elif op == "annot-pcm-check-ccd-ann":
-            cmdPath = os.path.join(self.__annotAppsPath, "bin", "UpdatePTMAnnotation")
-            thisCmd = " ; " + cmdPath
-            cmd += thisCmd + " -input " + iPath + " -output " + oPath + " -ptm_pcm_output pcm.csv -log annot-step.log "
-            #
-            cmd += " > " + tPath + " 2>&1 ; cat " + tPath + " >> " + lPath
-            cmd += " ; cat annot-step.log " + " >> " + lPath
-
-        elif op == "annot-consolidated-tasks":
-            cmdPath = os.path.join(self.__annotAppsPath, "bin", "GetAddAnnotation")
-            thisCmd = " ; " + cmdPath
-            cmd += thisCmd + " -input " + iPath + " -output " + oPath + " -log annot-step.log "
-            #
-            if "ss_topology_file_path" in self.__inputParamDict:
-                topFilePath = self.__inputParamDict["ss_topology_file_path"]
-                cmd += " -support " + topFilePath
-            #
-            cmd += " > " + tPath + " 2>&1 ; cat " + tPath + " >> " + lPath
-            cmd += " ; cat annot-step.log " + " >> " + lPath
-
-        elif op == "annot-validate-geometry":
-            # UpdateValidateCategories -input input_ciffile -output output_ciffile -log logfile
-            #
-            cmdPath = os.path.join(self.__annotAppsPath, "bin", "UpdateValidateCategories")
-            thisCmd = " ; " + cmdPath
-            cmd += thisCmd + " -input " + iPath + " -output " + oPath + " -log annot-step.log "
-            #
-            cmd += " > " + tPath + " 2>&1 ; cat " + tPath + " >> " + lPath
-            cmd += " ; cat annot-step.log " + " >> " + lPath
-
-        elif op == "annot-link-ssbond":
-            cmdPath = os.path.join(self.__annotAppsPath, "bin", "GetLinkAndSSBond")
-            thisCmd = " ; " + cmdPath
-            cmd += thisCmd + " -input " + iPath + " -output " + oPath + " -log annot-step.log  -link -ssbond "
-            #
-            cmd += " > " + tPath + " 2>&1 ; cat " + tPath + " >> " + lPath
-            cmd += " ; cat annot-step.log " + " >> " + lPath
-
-        elif op == "annot-link-ssbond-with-ptm":
-            cmdPath = os.path.join(self.__annotAppsPath, "bin", "GetLinkAndSSBond")
-            thisCmd = " ; " + cmdPath
-            cmd += thisCmd + " -input " + iPath + " -output " + oPath + " -ptm_pcm_output pcm.csv -log annot-step.log  -link -ssbond "
-            #
-            cmd += " > " + tPath + " 2>&1 ; cat " + tPath + " >> " + lPath
-            cmd += " ; cat annot-step.log " + " >> " + lPath
-
-        elif op == "annot-cis-peptide":
-            cmdPath = os.path.join(self.__annotAppsPath, "bin", "GetCisPeptide")
-            thisCmd = " ; " + cmdPath
-            cmd += thisCmd + " -input " + iPath + " -output " + oPath + " -log annot-step.log "
-            #
-            cmd += " > " + tPath + " 2>&1 ; cat " + tPath + " >> " + lPath
-            cmd += " ; cat annot-step.log " + " >> " + lPath
-
-        elif op == "annot-distant-solvent":
-            cmdPath = os.path.join(self.__annotAppsPath, "bin", "CalculateDistantWater")
-            thisCmd = " ; " + cmdPath
-            cmd += thisCmd + " -input " + iPath + " -output " + oPath + " -log annot-step.log "
-            #
-            cmd += " > " + tPath + " 2>&1 ; cat " + tPath + " >> " + lPath
-            cmd += " ; cat annot-step.log " + " >> " + lPath
-
-        elif op == "annot-base-pair-info":
-            cmdPath = os.path.join(self.__annotAppsPath, "bin", "GetBasePairInfo")
-            thisCmd = " ; " + cmdPath
-            cmd += thisCmd + " -input " + iPath + " -output " + oPath + " -log annot-step.log "
-            #
-            cmd += " > " + tPath + " 2>&1 ; cat " + tPath + " >> " + lPath
-            cmd += " ; cat annot-step.log " + " >> " + lPath
-        elif op == "annot-merge-struct-site":
-            cmdPath = os.path.join(self.__annotAppsPath, "bin", "MergeSiteData")
-            thisCmd = " ; " + cmdPath
-            cmd += thisCmd + " -input " + iPath + " -output " + oPath + " -log annot-step.log "
-            if "site_info_file_path" in self.__inputParamDict:
-                topFilePath = self.__inputParamDict["site_info_file_path"]
-                cmd += " -site " + topFilePath
-            #
-            cmd += " > " + tPath + " 2>&1 ; cat " + tPath + " >> " + lPath
-            cmd += " ; cat annot-step.log " + " >> " + lPath
-
-        elif op == "annot-get-corres-info":
-            cmdPath = os.path.join(self.__annotAppsPath, "bin", "GetCorresInfo")
-            thisCmd = " ; " + cmdPath
-            cmd += thisCmd + " -input " + iPath + " -output " + oPath + " -log annot-step.log "
-            #
-            cmd += " > " + tPath + " 2>&1 ; cat " + tPath + " >> " + lPath
-            cmd += " ; cat annot-step.log " + " >> " + lPath
-
-        elif (op == "annot-reposition-solvent") or (op == "annot-reposition-solvent-add-derived"):
-            cmdPath = os.path.join(self.__annotAppsPath, "bin", "MovingWater")
-            thisCmd = " ; " + cmdPath
-            cmd += thisCmd + " -input " + iPath + " -output " + oPath + " -log annot-step.log "
-            #
-            cmd += " > " + tPath + " 2>&1 ; cat " + tPath + " >> " + lPath
-            cmd += " ; cat annot-step.log " + " >> " + lPath
+        opDesc = getOpDescriptor(op)
+        if opDesc.hasTemplate():
+            fieldD = {
+                "iPath": iPath,
+                "oPath": oPath,
+                "tPath": tPath,
+                "lPath": lPath,
+                "ePath": ePath,
+                "annotBin": os.path.join(self.__annotAppsPath, "bin"),
+                "localBin": os.path.join(self.__localAppsPath, "bin"),
+                "dictBin": os.path.join(self.__packagePath, "dict", "bin"),
+                "packagePath": self.__packagePath,
+                "mmcifDictPath": self.__cICommon.get_mmcif_dict_path(),
+                "dictSdb": self.__nameToDictPath("archive_current"),
+                "dictOdb": self.__nameToDictPath("archive_current", suffix=".odb"),
+                "prdccCvsPath": self.__prdccCvsPath,
+                "prdDictPath": self.__prdDictPath,
+                "prdSummarySerial": self.__prdSummarySerial,
+                "ccDictPathIdx": self.__ccDictPathIdx,
+                "blockId": self.__inputParamDict.get("block_id", "UNK"),
+            }
+            cmd += " ; " + opDesc.render(fieldD, self.__inputParamDict)
 
         elif op == "annot-reposition-solvent-add-derived-void":
             #
@@ -1032,112 +1280,6 @@ class RcsbDpUtility:
             #
             # see at the end for the post processing operations --
             #
-        elif op == "annot-format-check-pdbx":
-            # CheckCoorFormat -input inputfile -format (pdb|pdbx) -output outputfile
-            cmdPath = os.path.join(self.__annotAppsPath, "bin", "CheckCoorFormat")
-            thisCmd = " ; " + cmdPath
-            nmrOpt = " "
-            if "nmr" in self.__inputParamDict:
-                nmrOpt = " -nmr "
-            cmd += thisCmd + " -input " + iPath + " -format pdbx  -output " + oPath + nmrOpt
-            cmd += " > " + tPath + " 2>&1 ; cat " + tPath + " >> " + lPath
-
-        elif op == "annot-format-check-pdb":
-            # CheckCoorFormat -input inputfile -format (pdb|pdbx) -output outputfile
-            cmdPath = os.path.join(self.__annotAppsPath, "bin", "CheckCoorFormat")
-            thisCmd = " ; " + cmdPath
-            nmrOpt = " "
-            if "nmr" in self.__inputParamDict:
-                nmrOpt = " -nmr "
-            cmd += thisCmd + " -input " + iPath + " -format pdb  -output " + oPath + nmrOpt
-            cmd += " > " + tPath + " 2>&1 ; cat " + tPath + " >> " + lPath
-
-        elif op == "annot-validation":
-            cmdPath = os.path.join(self.__annotAppsPath, "bin", "valdation_with_cif_output")
-            thisCmd = " ; " + cmdPath
-            cmd += thisCmd + " -cif " + iPath + " -output " + oPath + " -log annot-step.log "
-            #
-            cmd += " > " + tPath + " 2>&1 ; cat " + tPath + " >> " + lPath
-            cmd += " ; cat annot-step.log " + " >> " + lPath
-
-        elif op == "annot-site":
-            cmd += " ; TOOLS_PATH=" + self.__packagePath + " ; export TOOLS_PATH "
-            cmd += " ; CCP4=" + os.path.join(self.__packagePath, "ccp4") + " ; export CCP4 "
-            cmd += " ; SYMINFO=" + os.path.join(self.__packagePath, "getsite-cif", "data", "syminfo.lib") + " ; export SYMINFO "
-            cmd += " ; MMCIFDIC=" + os.path.join(self.__packagePath, "getsite-cif", "data", "cif_mmdic.lib") + " ; export MMCIFDIC "
-            cmd += " ; STANDATA=" + os.path.join(self.__packagePath, "getsite-cif", "data", "standard_geometry.cif") + " ; export STANDATA "
-            cmd += " ; CCIF_NOITEMIP=off ; export CCIF_NOITEMIP "
-            # setenv DYLD_LIBRARY_PATH  "$CCP4/lib/ccif:$CCP4/lib"
-            # cmd += " ; DYLD_LIBRARY_PATH=" + os.path.join(self.__packagePath,"ccp4","lib","ccif") + ":" + \
-            #       os.path.join(self.__packagePath,"ccp4","lib") + " ; export DYLD_LIBRARY_PATH "
-
-            cmd += (
-                " ; LD_LIBRARY_PATH="
-                + os.path.join(self.__packagePath, "ccp4-ccif", "lib")
-                + ":"
-                + os.path.join(self.__packagePath, "ccp4", "lib", "ccif")
-                + " ; export LD_LIBRARY_PATH "
-            )
-
-            cmd += (
-                " ; DYLD_LIBRARY_PATH="
-                + os.path.join(self.__packagePath, "ccp4-ccif", "lib")
-                + ":"
-                + os.path.join(self.__packagePath, "ccp4")
-                + " ; export DYLD_LIBRARY_PATH "
-            )
-
-            # setenv CIFIN 1abc.cif
-            cmd += " ; CIFIN=" + iPath + " ; export CIFIN "
-            # cmd += " ; env "
-
-            if "block_id" in self.__inputParamDict:
-                blockId = self.__inputParamDict["block_id"]
-            else:
-                blockId = "UNK"
-
-            # ../getsite_cif 1abc
-
-            cmdPath = os.path.join(self.__packagePath, "getsite-cif", "bin", "getsite_cif")
-            thisCmd = " ; " + cmdPath
-
-            cmd += thisCmd + " " + blockId + " "
-
-            if "site_arguments" in self.__inputParamDict:
-                cmdArgs = self.__inputParamDict["site_arguments"]
-                cmd += cmdArgs
-            #
-            cmd += " > " + tPath + " 2>&1 ; cat " + tPath + " >> " + lPath
-            cmd += " ; mv -f " + blockId + "_site.cif " + oPath
-
-        elif op == "annot-merge-sequence-data":
-            # example -
-            # MergeSeqModuleData -input RCSB056751_model_P1.cif.V1 -assign RCSB056751_seq-assign_P1.cif.V2 -output new_model.cif
-            #
-            cmdPath = os.path.join(self.__annotAppsPath, "bin", "MergeSeqModuleData")
-            thisCmd = " ; " + cmdPath
-            cmd += thisCmd + " -input " + iPath + " -output " + oPath + " -log annot-step.log "
-            if "seqmod_assign_file_path" in self.__inputParamDict:
-                assignFilePath = self.__inputParamDict["seqmod_assign_file_path"]
-                cmd += " -assign " + assignFilePath
-            #
-            cmd += " > " + tPath + " 2>&1 ; cat " + tPath + " >> " + lPath
-            cmd += " ; cat annot-step.log " + " >> " + lPath
-
-        elif op == "chem-comp-instance-update":
-            # New version that moved from the chem-comp-pack --
-            cmdPath = os.path.join(self.__annotAppsPath, "bin", "updateInstance")
-            thisCmd = " ; " + cmdPath
-            assignPath = self.__inputParamDict["cc_assign_file_path"]
-            # selectPath = self.__inputParamDict['cc_select_file_path']
-            cmd += thisCmd + " -i " + iPath + " -o " + oPath + " -assign " + assignPath + " -log annot-step.log "
-            cmd += " > " + tPath + " 2>&1 ; cat " + tPath + " >> " + lPath
-            cmd += " ; cat annot-step.log " + " >> " + lPath
-
-        elif op == "annot-rcsb2pdbx-alt":
-            cmd += " ; " + maxitCmd + " -single_quotation -o 9  -i " + iPath + " -log maxit.log "
-            cmd += " ; mv -f " + iPath + ".cif " + oPath
-
         elif op == "annot-pdbx2nmrstar":
             #  For PDBx to NMR STar
             cmdPath = os.path.join(self.__annotAppsPath, "bin", "GenNMRStarCSFile")
@@ -1281,8 +1423,12 @@ class RcsbDpUtility:
             # If not specified at all - validation code will delete
             runDir = None
             deleteRunDir = False
+            nodeLocalStaging = self.__nodeLocalStaging and self.__executor.remote and self.__wrkPath is not None
             if "run_dir" in self.__inputParamDict:
                 runDir = self.__inputParamDict["run_dir"]
+            elif nodeLocalStaging:
+                # created in node-local scratch space by the staged job
+                runDir = os.path.join(self.__wrkPath, "validation_%s" % random.randrange(9999999))  # noqa: S311
             elif self.__validScrPath and os.access(self.__validScrPath, os.W_OK):
                 runDir = os.path.join(self.__validScrPath, "validation_%s" % random.randrange(9999999))  # noqa: S311
                 deleteRunDir = True
@@ -1425,6 +1571,14 @@ class RcsbDpUtility:
 
             cmd += " > " + tPath + " 2>&1 ; cat " + tPath + " >> " + lPath
 
+            if nodeLocalStaging:
+                inputList = [iPathFull, sfPathFull, csPathFull, nmrRestPathFull, volPathFull, authorFSCFullPath, emdbXMLFullPath]
+                self.__stageInputs = [pth for pth in inputList if pth]
+                self.__stageOutputs = [xmlPath, cifPath, pdfPath, pdfFullPath, pngPath, svgPath, imageTarPath, edmapCoefPath]
+                # the step logs are written to the working directory in place and a run directory
+                # given by the caller is kept on the shared filesystem
+                self.__stageDirs = [runDir] if "run_dir" not in self.__inputParamDict else None
+
         elif op == "annot-make-ligand-maps":
             # The sf-valid package is currently set to self configure in a wrapper
             # shell script.  PACKAGE_DIR and TOOLS_DIR only need to be set here.
@@ -1479,15 +1633,25 @@ class RcsbDpUtility:
             node_path = self.__cICommon.get_node_bin_path()
             volume_server_pack = self.__cICommon.get_volume_server_pack_path()
             volume_server_query = self.__cICommon.get_volume_server_query_path()
+            # a map given as input em_map is read in place rather than imported
+            emMapPath = self.__inputParamDict.get("em_map", iPathFull)
+            maxVoxels = self.__inputParamDict.get("max_voxels")
+            if not self.__checkMapHeader(emMapPath, maxVoxels):
+                return -1
 
             cmd_args = [
-                "--em_map {}".format(iPath),
+                "--em_map {}".format(emMapPath),
                 "--node_path {}".format(node_path),
                 "--volume_server_pack_path {}".format(volume_server_pack),
                 "--volume_server_query_path {}".format(volume_server_query),
                 "--binary_map_out {}".format(oPath),
                 "--working_dir {}".format(self.__wrkPath),
             ]
+            if maxVoxels:
+                cmd_args.append("--max_voxels {}".format(maxVoxels))
+            if self.__inputParamDict.get("in_process"):
+                # BinaryCIF written without node, falling back to volume-server
+                cmd_args.append("--in_process")
 
             cmd += "; {}".format(self.__site_config_command)
 
@@ -1510,6 +1674,12 @@ class RcsbDpUtility:
                 "--fofc_mmcif_map_coeff_in {}".format(one_fo_fc),
                 "--coordinate_file {}".format(iPath),
             ]
+            if self.__numThreads > 1:
+                # the two maps are made at the same time
+                cmd_args.append("--map_workers {}".format(self.__numThreads))
+            if self.__inputParamDict.get("in_process"):
+                # BinaryCIF written without node, falling back to volume-server
+                cmd_args.append("--in_process")
 
             cmd += "; {}".format(self.__site_config_command)
 
@@ -1868,165 +2038,6 @@ class RcsbDpUtility:
             #
             cmd += " > " + tPath + " 2>&1 ; cat " + tPath + " >> " + lPath
 
-        elif op == "annot-poly-link-dist":
-            cmdPath = os.path.join(self.__annotAppsPath, "bin", "cal_polymer_linkage_distance")
-            thisCmd = " ; " + cmdPath
-            cmd += thisCmd + " -i " + iPath + " -o " + oPath
-            cmd += " > " + tPath + " 2>&1 ; cat " + tPath + " >> " + lPath
-
-        elif op == "annot-poly-link-dist-json":
-            cmdPath = os.path.join(self.__annotAppsPath, "bin", "cal_polymer_linkage_distance_json")
-            thisCmd = " ; " + cmdPath
-            cmd += thisCmd + " -i " + iPath + " -o " + oPath
-            cmd += " > " + tPath + " 2>&1 ; cat " + tPath + " >> " + lPath
-
-        elif (op == "annot-cif2cif") or (op == "cif2cif"):
-            cmd += " ; " + maxitCmd + " -o 8  -i " + iPath + " -log maxit.log "
-            cmd += " ; mv -f " + iPath + ".cif " + oPath
-            # cmd += " ; cat maxit.err >> " + lPath
-
-        elif (op == "annot-cif2cif-dep") or (op == "cif2cif-dep"):
-            cmd += " ; " + maxitCmd + " -o 8  -i " + iPath + " -dep -log maxit.log "
-            cmd += " ; mv -f " + iPath + ".cif " + oPath
-            # cmd += " ; cat maxit.err >> " + lPath
-
-        elif (op == "annot-pdb2cif") or (op == "pdb2cif"):
-            cmd += " ; " + maxitCmd + " -o 1  -i " + iPath + " -log maxit.log "
-            cmd += " ; mv -f " + iPath + ".cif " + oPath
-            # cmd += " ; cat maxit.err >> " + lPath
-
-        elif (op == "annot-pdb2cif-dep") or (op == "pdb2cif-dep"):
-            cmd += " ; " + maxitCmd + " -o 1  -i " + iPath + " -dep -log maxit.log "
-            cmd += " ; mv -f " + iPath + ".cif " + oPath
-            # cmd += " ; cat maxit.err >> " + lPath
-
-        elif (op == "annot-cif2pdb") or (op == "cif2pdb"):
-            cmd += " ; " + maxitCmd + " -o 2  -i " + iPath + " -log maxit.log "
-            cmd += " ; mv -f " + iPath + ".pdb " + oPath
-            # cmd += " ; cat maxit.err >> " + lPath
-
-        elif op == "annot-move-xyz-by-symop":
-            # MovingCoordBySymmetry and MovingCoordByMatrix programs in annotation-pack to move coordinates. The syntax for both programs are:
-            # ${program} -input input_ciffile -output output_ciffile -assign assignment_file -log logfile
-
-            #
-            cmdPath = os.path.join(self.__annotAppsPath, "bin", "MovingCoordBySymmetry")
-            thisCmd = " ; " + cmdPath
-            cmd += thisCmd + " -input " + iPath + " -output " + oPath + " -log annot-step.log "
-            if "transform_file_path" in self.__inputParamDict:
-                assignFilePath = self.__inputParamDict["transform_file_path"]
-                cmd += " -assign " + assignFilePath
-            #
-            cmd += " > " + tPath + " 2>&1 ; cat " + tPath + " >> " + lPath
-            cmd += " ; cat annot-step.log " + " >> " + lPath
-
-        elif op == "annot-reorder-models":
-            # ReorderModels -input input_ciffile -output output_ciffile -mol_id model_number -log logfile
-            #
-            cmdPath = os.path.join(self.__annotAppsPath, "bin", "ReorderModels")
-            thisCmd = " ; " + cmdPath
-            cmd += thisCmd + " -input " + iPath + " -output " + oPath + " -log annot-step.log "
-            if "model_number" in self.__inputParamDict:
-                model_number = self.__inputParamDict["model_number"]
-                cmd += " -mol_id " + model_number
-            else:
-                cmd += " -conformer_id "
-            #
-            cmd += " > " + tPath + " 2>&1 ; cat " + tPath + " >> " + lPath
-            cmd += " ; cat annot-step.log " + " >> " + lPath
-
-        elif op == "annot-move-xyz-by-matrix":
-            # MovingCoordBySymmetry and MovingCoordByMatrix programs in annotation-pack to move coordinates. The syntax for both programs are:
-            # ${program} -input input_ciffile -output output_ciffile -assign assignment_file -log logfile
-
-            #
-            cmdPath = os.path.join(self.__annotAppsPath, "bin", "MovingCoordByMatrix")
-            thisCmd = " ; " + cmdPath
-            cmd += thisCmd + " -input " + iPath + " -output " + oPath + " -log annot-step.log "
-            if "transform_file_path" in self.__inputParamDict:
-                assignFilePath = self.__inputParamDict["transform_file_path"]
-                cmd += " -assign " + assignFilePath
-            #
-            cmd += " > " + tPath + " 2>&1 ; cat " + tPath + " >> " + lPath
-            cmd += " ; cat annot-step.log " + " >> " + lPath
-
-        elif op == "annot-extra-checks":
-            #
-            # MiscChecking -input ciffile -output outputfile -log logfile
-            #
-            cmdPath = os.path.join(self.__annotAppsPath, "bin", "MiscChecking")
-            thisCmd = " ; " + cmdPath
-            cmd += thisCmd + " -input " + iPath + " -output " + oPath + " -log annot-step.log "
-            #
-            cmd += " > " + tPath + " 2>&1 ; cat " + tPath + " >> " + lPath
-            cmd += " ; cat annot-step.log " + " >> " + lPath
-            cmd += " ; touch " + iPath + "-parser.log "
-            cmd += " ; cat " + iPath + "-parser.log >> " + oPath
-
-            ##
-        elif op == "annot-merge-xyz":
-            #   MergeCoordinates -input input_ciffile -output output_ciffile -newcoord new_coordinate_file -format pdb|cif [-log logfile] [ -dep]
-            #
-            #        option "-format pdb":   new_coordinates_file is PDB format file
-            #        option "-format cif":   new_coordinates_file is cif format file
-            #
-            ##
-            cmdPath = os.path.join(self.__annotAppsPath, "bin", "MergeCoordinates")
-            thisCmd = " ; " + cmdPath
-            cmd += thisCmd + " -input " + iPath + " -output " + oPath + " -log annot-step.log "
-            #
-            if "new_coordinate_file_path" in self.__inputParamDict:
-                xyzFilePath = self.__inputParamDict["new_coordinate_file_path"]
-                cmd += " -newcoord " + xyzFilePath
-
-            if "new_coordinate_format" in self.__inputParamDict:
-                xyzFormat = self.__inputParamDict["new_coordinate_format"]
-                cmd += " -format " + xyzFormat
-            else:
-                cmd += " -format cif "
-            #
-            if "deposit" in self.__inputParamDict:
-                cmd += " -dep "
-
-            cmd += " > " + tPath + " 2>&1 ; cat " + tPath + " >> " + lPath
-            cmd += " ; cat annot-step.log " + " >> " + lPath
-
-        elif op == "annot-update-terminal-atoms":
-            # UpdateTerminalAtom -input input_ciffile -output output_ciffile -option delete|rename [-log logfile]
-            #
-            #   If option "delete" is selected, "OXT" atom will be deleted. If option "rename" is selected,
-            #     the "OXT" will be renamed to "N" in next residue.
-            #
-            ##
-            cmdPath = os.path.join(self.__annotAppsPath, "bin", "UpdateTerminalAtom")
-            thisCmd = " ; " + cmdPath
-            cmd += thisCmd + " -input " + iPath + " -output " + oPath + " -log annot-step.log "
-            #
-            if "option" in self.__inputParamDict:
-                option = self.__inputParamDict["option"]
-                cmd += " -option " + option
-            else:
-                cmd += " -option delete "
-            #
-            cmd += " > " + tPath + " 2>&1 ; cat " + tPath + " >> " + lPath
-            cmd += " ; cat annot-step.log " + " >> " + lPath
-
-        elif op == "annot-update-dep-assembly-info":
-            cmdPath = os.path.join(self.__annotAppsPath, "bin", "UpdateDepositorAssemblyInfo")
-            thisCmd = " ; " + cmdPath
-            cmd += thisCmd + " -input " + iPath + " -output " + oPath + " -log annot-step.log "
-            #
-            cmd += " > " + tPath + " 2>&1 ; cat " + tPath + " >> " + lPath
-            cmd += " ; cat annot-step.log " + " >> " + lPath
-
-        elif op == "annot-add-default-assembly-info":
-            cmdPath = os.path.join(self.__annotAppsPath, "bin", "AddDefaultAssembly")
-            thisCmd = " ; " + cmdPath
-            cmd += thisCmd + " -input " + iPath + " -output " + oPath + " -log annot-step.log "
-            #
-            cmd += " > " + tPath + " 2>&1 ; cat " + tPath + " >> " + lPath
-            cmd += " ; cat annot-step.log " + " >> " + lPath
-
         elif op == "annot-gen-assem-pdbx":
             #
             #    GenBioCIFFile -input model_ciffile -depid depositionID -index output_index_file [-log logfile]
@@ -2163,35 +2174,6 @@ class RcsbDpUtility:
             #
             cmd += " > " + tPath + " 2>&1 ; cat " + tPath + " >> " + lPath
 
-        elif op == "annot-generte-nmr-data-str-file":
-            #  iPath input is the target nmr-data cif file oPath is the output nmr-data nmr-star file
-            #
-            # GenNmrDataStarFile -input input_nmr_data_cif_file -output output_nmr_data_str_file -pdbid pdbid
-            #
-            cmdPath = os.path.join(self.__annotAppsPath, "bin", "GenNmrDataStarFile")
-            thisCmd = " ; " + cmdPath
-            cmd += thisCmd + " -input " + iPath + " -output " + oPath
-
-            if "pdb_id" in self.__inputParamDict:
-                pdb_id = self.__inputParamDict["pdb_id"]
-                cmd += " -pdbid " + pdb_id
-            #
-            cmd += " > " + tPath + " 2>&1 ; cat " + tPath + " >> " + lPath
-
-        elif op == "annot-get-symmetry-operator":
-            #  oPath is the output space group symop info text file
-            #
-            # GetSymmetryOperator -space_group space_group_name -output space_group-symop-info.txt -log logfile
-            #
-            cmdPath = os.path.join(self.__annotAppsPath, "bin", "GetSymmetryOperator")
-            thisCmd = " ; " + cmdPath
-            if "space_group" in self.__inputParamDict:
-                thisCmd += " -space_group " + self.__inputParamDict["space_group"]
-            #
-            cmd += thisCmd + " -output " + oPath + " -log " + lPath
-            #
-            cmd += " > " + tPath + " 2>&1 ; cat " + tPath + " >> " + lPath
-
         elif op == "annot-depict-molecule-json":
             #
             txtPath = os.path.abspath(os.path.join(self.__wrkPath, "chainids.txt"))
@@ -2199,167 +2181,15 @@ class RcsbDpUtility:
             #
             cmdPath = os.path.join(self.__annotAppsPath, "bin", "DepictMolecule_Json")
             thisCmd = " ; " + cmdPath
-            cmd += thisCmd + " -input " + iPath + " -output " + oPath + " -output_2 " + txtPath + " -output_3 " + cifPath + " -log " + lPath
-            #
-            cmd += " > " + tPath + " 2>&1 ; cat " + tPath + " >> " + lPath
-
-        elif op == "annot-check-select-number":
-            #
-            cmdPath = os.path.join(self.__annotAppsPath, "bin", "CheckSelectNumber")
-            thisCmd = " ; " + cmdPath
-            cmd += thisCmd + " -index " + iPath + " -log " + lPath
-            #
-            if "select" in self.__inputParamDict:
-                cmd += " -select " + self.__inputParamDict["select"]
-            #
-            cmd += " > " + tPath + " 2>&1 ; cat " + tPath + " >> " + lPath
-
-        elif op == "annot-update-molecule":
-            #
-            cmdPath = os.path.join(self.__annotAppsPath, "bin", "UpdateMolecule")
-            thisCmd = " ; " + cmdPath
-            cmd += thisCmd + " -input " + iPath + " -output " + oPath + " -log " + lPath
-            #
-            if "assign" in self.__inputParamDict:
-                cmd += " -assign " + self.__inputParamDict["assign"]
-            #
-            cmd += " > " + tPath + " 2>&1 ; cat " + tPath + " >> " + lPath
-
-        elif op == "annot-depict-chemical-shift":
-            #
-            cmdPath = os.path.join(self.__annotAppsPath, "bin", "depict_chemical_shift")
-            thisCmd = " ; " + cmdPath
-            cmd += thisCmd + " -input " + iPath + " -output " + oPath + " -log " + lPath
-            cmd += " > " + tPath + " 2>&1 ; cat " + tPath + " >> " + lPath
-
-        elif op == "annot-edit-chemical-shift":
-            #
-            cmdPath = os.path.join(self.__annotAppsPath, "bin", "edit_chemical_shift")
-            thisCmd = " ; " + cmdPath
-            cmd += thisCmd + " -input " + iPath + " -output " + oPath + " -log " + lPath
-            #
-            if "assign" in self.__inputParamDict:
-                cmd += " -assign " + self.__inputParamDict["assign"]
-            #
-            cmd += " > " + tPath + " 2>&1 ; cat " + tPath + " >> " + lPath
-
-        elif op == "annot-correct-freer-set":
-            #
-            cmdPath = os.path.join(self.__annotAppsPath, "bin", "CorrectFreeRsetInSFFile")
-            thisCmd = " ; " + cmdPath
-            cmd += thisCmd + " -input " + iPath + " -output " + oPath + " -log " + lPath
-            #
-            if "set_num" in self.__inputParamDict:
-                cmd += " -set_num " + self.__inputParamDict["set_num"]
-            #
-            cmd += " > " + tPath + " 2>&1 ; cat " + tPath + " >> " + lPath
-
-        elif op == "annot-cif-to-public-pdbx":
-            #
-            cmdPath = os.path.join(self.__packagePath, "dict", "bin", "cifexch2")
-            thisCmd = (
-                " ; "
-                + cmdPath
-                + " -dicSdb "
-                + self.__nameToDictPath("archive_current")
-                + " -pdbxDicSdb "
-                + self.__nameToDictPath("archive_current")
-                + " -reorder  -strip -op in  -pdbids "
-            )
-            cmd += thisCmd + " -input " + iPath + " -output " + oPath
-
-            if "option" in self.__inputParamDict:
-                cmd += " " + self.__inputParamDict["option"]
-
-            cmd += " 2> " + lPath + " 1> " + tPath
-
-        elif op == "annot-cif-to-pdbx-em-header":
-            #
-            cmdPath = os.path.join(self.__packagePath, "dict", "bin", "cifexch2")
-            thisCmd = (
-                " ; "
-                + cmdPath
-                + " -dicSdb "
-                + self.__nameToDictPath("archive_current")
-                + " -pdbxDicSdb "
-                + self.__nameToDictPath("archive_current")
-                + " -reorder  -strip -op in  -emdbids -privatectx "
-            )
-            cmd += thisCmd + " -input " + iPath + " -output " + oPath
-            cmd += " 2> " + lPath + " 1> " + tPath
-
-        elif op == "annot-public-pdbx-to-xml":
-            #
-            cmdPath = os.path.join(self.__packagePath, "dict", "bin", "mmcif2XML")
-            thisCmd = (
-                " ; "
-                + cmdPath
-                + " -prefix  pdbx-v50 -ns PDBx -funct mmcif2xmlall -dictName mmcif_pdbx.dic -df "
-                + self.__nameToDictPath("archive_current", suffix=".odb")
-            )
-            cmd += thisCmd + " -f " + iPath
-            cmd += " 2> " + tPath + " 1> " + lPath
-
-        elif op == "annot-public-pdbx-to-xml-noatom":
-            #
-            cmdPath = os.path.join(self.__packagePath, "dict", "bin", "mmcif2XML")
-            thisCmd = (
-                " ; "
-                + cmdPath
-                + " -prefix  pdbx-v50 -ns PDBx -funct mmcif2xmlnoatom -dictName mmcif_pdbx.dic -df "
-                + self.__nameToDictPath("archive_current", suffix=".odb")
-            )
-            cmd += thisCmd + " -f " + iPath
-            cmd += " 2> " + tPath + " 1> " + lPath
-
-        elif op == "annot-check-cif":
-            #
-            cmdPath = os.path.join(self.__packagePath, "dict", "bin", "CifCheck")
-            thisCmd = " ; " + cmdPath + " -dictSdb " + self.__nameToDictPath("archive_current") + " -f " + iPath
-            if "first_block" in self.__inputParamDict:
-                cmd += " -checkFirstBlock"
-
-            cmd += thisCmd + " 2> tmp 1> " + tPath + " ; cat tmp >> " + lPath + " ; "
-            cmd += " touch " + iPath + "-parser.log ; cat " + iPath + "-parser.log >> " + lPath
-
-        elif op == "annot-check-xml-xmllint":
-            #
-            cmdPath = os.path.join(self.__localAppsPath, "bin", "xmllint")
-            thisCmd = " ; " + cmdPath + " --noout --schema " + os.path.join(self.__cICommon.get_mmcif_dict_path(), "pdbx-v50.xsd")
-            cmd += thisCmd + " " + iPath + " > " + tPath + " 2>&1 ; "
-
-        elif op == "annot-check-xml-stdinparse":
-            #
-            cmdPath = os.path.join(self.__localAppsPath, "bin", "StdInParse")
-            thisCmd = " ; cp -f " + os.path.join(self.__cICommon.get_mmcif_dict_path(), "pdbx-v50.xsd") + " . ; " + cmdPath
-            cmd += thisCmd + " -s -f -n -v=always < " + iPath + " >> " + tPath + " 2>&1 ; "
-
-        elif op == "annot-misc-checking":
-            #
-            cmdPath = os.path.join(self.__annotAppsPath, "bin", "MiscChecking")
-            thisCmd = " ; " + cmdPath
-            cmd += thisCmd + " -input " + iPath + " -output " + oPath + " -log " + tPath
-            #
-            if "option" in self.__inputParamDict:
-                cmd += " " + self.__inputParamDict["option"] + " "
-            #
-            cmd += " > " + lPath + " 2>&1 "
-
-        elif op == "annot-add-version-info":
-            #
-            cmdPath = os.path.join(self.__annotAppsPath, "bin", "AddVersionInfo")
-            thisCmd = " ; " + cmdPath
-            cmd += thisCmd + " -input " + iPath + " -output " + oPath + " -log " + tPath
-            #
-            if "option" in self.__inputParamDict:
-                cmd += " " + self.__inputParamDict["option"] + " "
+            cmd += thisCmd + " -input " + iPath + " -output " + oPath + " -output_2 " + txtPath + " -output_3 " + cifPath + " -log " + lPath
             #
-            cmd += " > " + lPath + " 2>&1 "
+            cmd += " > " + tPath + " 2>&1 ; cat " + tPath + " >> " + lPath
 
-        elif op == "annot-get-pdb-file":
+        elif op == "annot-check-xml-stdinparse":
             #
-            thisCmd = " ; " + maxitCmd
-            cmd += thisCmd + " -input " + iPath + " -o 2 -output " + oPath + " -log " + tPath + " > " + lPath + " 2>&1 "
+            cmdPath = os.path.join(self.__localAppsPath, "bin", "StdInParse")
+            thisCmd = " ; cp -f " + os.path.join(self.__cICommon.get_mmcif_dict_path(), "pdbx-v50.xsd") + " . ; " + cmdPath
+            cmd += thisCmd + " -s -f -n -v=always < " + iPath + " >> " + tPath + " 2>&1 ; "
 
         elif op == "annot-release-update":
             cmdPath = os.path.join(self.__annotAppsPath, "bin", "ReleaseUpdate")
@@ -2427,144 +2257,6 @@ class RcsbDpUtility:
             #
             cmd += " > " + lPath + " 2>&1 ; tar cvf result.tar " + pdb_id + "* > tmp 2>&1 ; gzip -f result.tar "
 
-        elif op == "annot-check-sf-file":
-            #
-            cmdPath = os.path.join(self.__annotAppsPath, "bin", "CheckSFFile")
-            thisCmd = " ; " + cmdPath
-            cmd += thisCmd + " -input " + iPath + " -output " + oPath
-            #
-            if "option" in self.__inputParamDict:
-                cmd += " " + self.__inputParamDict["option"] + " "
-            #
-            if "pdb_id" in self.__inputParamDict:
-                pdb_id = self.__inputParamDict["pdb_id"]
-                cmd += " -pdbid " + self.__inputParamDict["pdb_id"]
-            #
-            cmd += " > " + tPath + " 2>&1 "
-
-        elif op == "annot-check-mr-file":
-            #
-            cmdPath = os.path.join(self.__annotAppsPath, "bin", "CheckMRFile")
-            thisCmd = " ; " + cmdPath
-            cmd += thisCmd + " -input " + iPath + " -output " + oPath
-            #
-            if "option" in self.__inputParamDict:
-                cmd += " " + self.__inputParamDict["option"] + " "
-            #
-            if "pdb_id" in self.__inputParamDict:
-                pdb_id = self.__inputParamDict["pdb_id"]
-                cmd += " -pdbid " + self.__inputParamDict["pdb_id"]
-            #
-            cmd += " > " + tPath + " 2>&1 "
-
-        elif op == "annot-check-cs-file":
-            #
-            cmdPath = os.path.join(self.__annotAppsPath, "bin", "CheckCSFile")
-            thisCmd = " ; " + cmdPath
-            cmd += thisCmd + " -input " + iPath + " -output " + oPath
-            #
-            if "option" in self.__inputParamDict:
-                cmd += " " + self.__inputParamDict["option"] + " "
-            #
-            if "pdb_id" in self.__inputParamDict:
-                pdb_id = self.__inputParamDict["pdb_id"]
-                cmd += " -pdbid " + self.__inputParamDict["pdb_id"]
-            #
-            cmd += " > " + tPath + " 2>&1 "
-
-        elif op == "annot-get-close-contact":
-            #
-            cmdPath = os.path.join(self.__annotAppsPath, "bin", "DepictCloseContact")
-            thisCmd = " ; " + cmdPath
-            cmd += thisCmd + " -input " + iPath + " -output " + oPath + " -log " + lPath + " > " + tPath + " 2>&1 "
-
-        elif op == "annot-convert-close-contact-to-link":
-            #
-            dataFilePath = ""
-            if "datafile" in self.__inputParamDict:
-                dataFilePath = self.__inputParamDict["datafile"]
-            else:
-                return -1
-            #
-            cmdPath = os.path.join(self.__annotAppsPath, "bin", "ConvertContactToLink")
-            thisCmd = " ; " + cmdPath
-            cmd += (
-                thisCmd
-                + " -input "
-                + iPath
-                + " -datafile "
-                + dataFilePath
-                + " -output "
-                + oPath
-                + " -ptm_pcm_output pcm.csv -log "
-                + lPath
-                + " > "
-                + tPath
-                + " 2>&1 "
-            )
-
-        elif op == "annot-get-covalent-bond":
-            #
-            cmdPath = os.path.join(self.__annotAppsPath, "bin", "DepictCovalentBond")
-            thisCmd = " ; " + cmdPath
-            cmd += thisCmd + " -input " + iPath + " -output " + oPath + " -log " + lPath + " > " + tPath + " 2>&1 "
-
-        elif op == "annot-remove-covalent-bond":
-            #
-            dataFilePath = ""
-            if "datafile" in self.__inputParamDict:
-                dataFilePath = self.__inputParamDict["datafile"]
-            else:
-                return -1
-            #
-            cmdPath = os.path.join(self.__annotAppsPath, "bin", "RemoveCovalentBond")
-            thisCmd = " ; " + cmdPath
-            cmd += (
-                thisCmd
-                + " -input "
-                + iPath
-                + " -datafile "
-                + dataFilePath
-                + " -output "
-                + oPath
-                + " -ptm_pcm_output pcm.csv -log "
-                + lPath
-                + " > "
-                + tPath
-                + " 2>&1 "
-            )
-
-        elif op == "carbohydrate-remediation":
-            cmdPath = os.path.join(self.__annotAppsPath, "bin", "CarbohydrateRemediation")
-            thisCmd = " ; " + cmdPath
-            cmd += thisCmd + " -input " + iPath + " -output " + oPath + " -log " + tPath
-            cmd += " > " + lPath + " 2>&1 "
-
-        elif op == "carbohydrate-remediation-test":
-            cmdPath = os.path.join(self.__annotAppsPath, "bin", "CarbohydrateRemediation")
-            thisCmd = " ; " + cmdPath
-            cmd += thisCmd + " -input " + iPath + " -output " + oPath + " -output_public carbohydrate_public.cif -log " + tPath
-            cmd += " > " + lPath + " 2>&1 "
-
-        elif op == "get-branch-polymer-info":
-            cmdPath = os.path.join(self.__annotAppsPath, "bin", "GetBranchPolymerInfo")
-            thisCmd = " ; " + cmdPath
-            cmd += thisCmd + " -input " + iPath + " -output " + oPath + " -log " + tPath
-            cmd += " > " + lPath + " 2>&1 "
-
-        elif op == "prd-search":
-            cmd += " ; PRDCC_PATH=" + self.__prdccCvsPath + " ; export PRDCC_PATH "
-            cmd += " ; PRD_DICT_PATH=" + self.__prdDictPath + " ; export PRD_DICT_PATH "
-            cmdPath = os.path.join(self.__annotAppsPath, "bin", "GetPrdMatch")
-            cmd += (
-                " ; " + cmdPath + " -input " + iPath + " -output " + oPath + " -path . -index " + self.__prdSummarySerial + " -cc_index " + self.__ccDictPathIdx
-            )
-            if "logfile" in self.__inputParamDict:
-                cmd += " -log " + self.__inputParamDict["logfile"]
-            if "firstmodel" in self.__inputParamDict:
-                cmd += " -firstmodel " + self.__inputParamDict["firstmodel"]
-            cmd += " > " + tPath + " 2>&1 ; cat " + tPath + " >> " + lPath
-
         elif op == "prd-summary-serialize":
             # $binPath/get-prd-summary -ccsdb ${ccsdbin} -prdsdb ${prdsdbin} -cif ${prdsummaryout} -sdb ${prdsummarysdbout}
             #
@@ -2600,50 +2292,6 @@ class RcsbDpUtility:
             cmd += thisCmd + " --input %s --path %s" % (resultFilePath, self.__tmpPath)
             cmd += " > " + logFilePath + " 2>&1 ; "
 
-        elif op == "prd-family-mapping":
-            # $binPath/get-prd-family-mapping -family ${familyfiles} -output ${familyMapping}
-            #
-            cmdPath = os.path.join(self.__annotAppsPath, "bin", "get-prd-family-mapping")
-            thisCmd = " ; " + cmdPath
-
-            cmd += thisCmd + " -family " + iPath
-            cmd += " -output " + oPath
-            cmd += " > " + tPath + " 2>&1 ; cat " + tPath + " > " + lPath
-
-        elif op == "annot-merge-pointsuite-info":
-            cmdPath = os.path.join(self.__annotAppsPath, "bin", "MergePointSuiteResult")
-            thisCmd = " ; " + cmdPath
-            cmd += thisCmd + " -input " + iPath + " -output " + oPath
-            #
-            if "support" in self.__inputParamDict:
-                cmd += " -support " + self.__inputParamDict["support"] + " "
-            else:
-                return -1
-            #
-            cmd += " > " + lPath + " 2>&1 "
-
-        elif op == "annot-check-ccd-definition":
-            cmdPath = os.path.join(self.__annotAppsPath, "bin", "ChemCompDefChecker")
-            thisCmd = " ; " + cmdPath
-            cmd += thisCmd + " -input " + iPath + " -output " + oPath
-            #
-            if "pcm_support_file" in self.__inputParamDict:
-                cmd += " -pcm_support_file " + self.__inputParamDict["pcm_support_file"] + " "
-            #
-            if "set_stripped_down_flag" in self.__inputParamDict:
-                cmd += " -set_stripped_down_flag "
-            #
-            if "set_ok_flag" in self.__inputParamDict:
-                cmd += " -set_ok_flag "
-            #
-            cmd += " > " + lPath + " 2>&1 "
-
-        elif op == "annot-get-em-exp-info":
-            #
-            cmdPath = os.path.join(self.__annotAppsPath, "bin", "ReleaseUpdateGetEmInfo")
-            thisCmd = " ; " + cmdPath
-            cmd += thisCmd + " -input " + iPath + " -output " + oPath + " -log " + tPath + " > " + lPath + " 2>&1 "
-
         else:
             return -1
         #
@@ -2767,7 +2415,15 @@ class RcsbDpUtility:
             strpCt = PdbxStripCategory(verbose=self.__verbose, log=self.__lfh)
             strpCt.strip(oPath2Full, oPathFull, stripList)
 
-        if op in ["annot-wwpdb-validate-all", "annot-wwpdb-validate-all-v2"]:
+        if opDesc.hasTemplate():
+            outputList = opDesc.expectedOutputs(fieldD)
+            if outputList:
+                outFileList = [os.path.join(self.__wrkPath, fileName) for fileName in outputList]
+                self.__resultPathList = [outFile if os.access(outFile, os.F_OK) else "missing" for outFile in outFileList]
+            else:
+                self.__resultPathList = [os.path.join(self.__wrkPath, oPath)]
+
+        elif op in ["annot-wwpdb-validate-all", "annot-wwpdb-validate-all-v2"]:
             self.__resultPathList = []
             #
             # Push the output pdf and xml files onto the resultPathList.
@@ -2822,25 +2478,6 @@ class RcsbDpUtility:
                 except Exception:  # noqa: BLE001
                     logger.info("+RcsbDpUtility.__annotationStep() removal failed for working path %s\n", runDir)
 
-        elif (
-            (op == "annot-convert-close-contact-to-link")
-            or (op == "annot-link-ssbond-with-ptm")
-            or (op == "annot-pcm-check-ccd-ann")
-            or (op == "annot-remove-covalent-bond")
-        ):
-            outFile = os.path.join(self.__wrkPath, oPath)
-            if os.access(outFile, os.F_OK):
-                self.__resultPathList.append(outFile)
-            else:
-                self.__resultPathList.append("missing")
-            #
-            pcmFile = os.path.join(self.__wrkPath, "pcm.csv")
-            if os.access(pcmFile, os.F_OK):
-                self.__resultPathList.append(pcmFile)
-            else:
-                self.__resultPathList.append("missing")
-            #
-
         elif op == "annot-chem-shifts-update-with-check":
             outFile = os.path.join(self.__wrkPath, oPath)
             if os.access(outFile, os.F_OK):
@@ -3001,7 +2638,7 @@ class RcsbDpUtility:
                 self.__resultPathList.append("missing")
             #
 
-        elif (op == "annot-check-sf-file") or (op == "annot-check-mr-file") or (op == "annot-check-cs-file") or (op == "annot-pdbx2nmrstar"):
+        elif op == "annot-pdbx2nmrstar":
             for fileName in (oPath, tPath):
                 outFile = os.path.join(self.__wrkPath, fileName)
                 if os.access(outFile, os.F_OK):
@@ -3011,54 +2648,7 @@ class RcsbDpUtility:
                 #
             #
 
-        elif (
-            (op == "annot-cif-to-public-pdbx")
-            or (op == "annot-cif-to-pdbx-em-header")
-            or (op == "annot-misc-checking")
-            or (op == "annot-get-pdb-file")
-            or (op == "annot-add-version-info")
-            or (op == "annot-get-em-exp-info")
-        ):
-            for fileName in (oPath, tPath, lPath):
-                outFile = os.path.join(self.__wrkPath, fileName)
-                if os.access(outFile, os.F_OK):
-                    self.__resultPathList.append(outFile)
-                else:
-                    self.__resultPathList.append("missing")
-                #
-            #
-
-        elif op == "annot-public-pdbx-to-xml":
-            for fileName in (iPath + ".xml", iPath + ".xml-noatom", iPath + ".xml-extatom", lPath, tPath):
-                outFile = os.path.join(self.__wrkPath, fileName)
-                if os.access(outFile, os.F_OK):
-                    self.__resultPathList.append(outFile)
-                else:
-                    self.__resultPathList.append("missing")
-                #
-            #
-
-        elif op == "annot-public-pdbx-to-xml-noatom":
-            for fileName in (iPath + ".xml-noatom", lPath, tPath):
-                outFile = os.path.join(self.__wrkPath, fileName)
-                if os.access(outFile, os.F_OK):
-                    self.__resultPathList.append(outFile)
-                else:
-                    self.__resultPathList.append("missing")
-                #
-            #
-
-        elif op == "annot-check-cif":
-            for fileName in (iPath + "-diag.log", lPath):
-                outFile = os.path.join(self.__wrkPath, fileName)
-                if os.access(outFile, os.F_OK):
-                    self.__resultPathList.append(outFile)
-                else:
-                    self.__resultPathList.append("missing")
-                #
-            #
-
-        elif (op == "annot-check-xml-xmllint") or (op == "annot-check-xml-stdinparse"):
+        elif op == "annot-check-xml-stdinparse":
             outFile = os.path.join(self.__wrkPath, tPath)
             if os.access(outFile, os.F_OK):
                 self.__resultPathList.append(outFile)
@@ -3082,26 +2672,6 @@ class RcsbDpUtility:
                 #
             #
 
-        elif op == "carbohydrate-remediation":
-            for fileName in (oPath, tPath, lPath):
-                outFile = os.path.join(self.__wrkPath, fileName)
-                if os.access(outFile, os.F_OK):
-                    self.__resultPathList.append(outFile)
-                else:
-                    self.__resultPathList.append("missing")
-                #
-            #
-
-        elif op == "carbohydrate-remediation-test":
-            for fileName in (oPath, "carbohydrate_public.cif", tPath, lPath):
-                outFile = os.path.join(self.__wrkPath, fileName)
-                if os.access(outFile, os.F_OK):
-                    self.__resultPathList.append(outFile)
-                else:
-                    self.__resultPathList.append("missing")
-                #
-            #
-
         else:
             self.__resultPathList = [os.path.join(self.__wrkPath, oPath)]
 
@@ -3147,10 +2717,7 @@ class RcsbDpUtility:
             # tPathFull = tPath
             cmd = "("
         #
-        if self.__stepNo > 1:
-            pPath = self.__updateInputPath()
-            if os.access(pPath, os.F_OK):
-                cmd += "; cp " + pPath + " " + iPath
+        self.__stageStepInput(op, iPath)
 
         #
         # Standard setup for maxit ---
@@ -3237,10 +2804,7 @@ class RcsbDpUtility:
             # tPathFull = tPath
             cmd = "("
         #
-        if self.__stepNo > 1:
-            pPath = self.__updateInputPath()
-            if os.access(pPath, os.F_OK):
-                cmd += "; cp " + pPath + " " + iPath
+        self.__stageStepInput(op, iPath)
 
         #
         # Standard setup for maxit ---
@@ -3394,7 +2958,12 @@ class RcsbDpUtility:
             cmd += mapfix_command("tmp.map")
             cmd += " ; } 2>> " + ePath + " 1> " + lPath
 
-        if op == "mapfix-big":
+        opDesc = getOpDescriptor(op)
+        if opDesc.hasTemplate():
+            fieldD = {"iPath": iPath, "oPath": oPath, "lPath": lPath, "ePath": ePath, "packagePath": self.__packagePath, "javaPath": self.__javaPath}
+            cmd += opDesc.render(fieldD, self.__inputParamDict)
+
+        elif op == "mapfix-big":
             cmd += mapfix_command(iPath)
             cmd += " ; } 2> " + ePath + " 1> " + lPath
 
@@ -3402,8 +2971,7 @@ class RcsbDpUtility:
             system_path = os.path.join(self.__packagePath, "..")
             lib_path = os.path.join(system_path, "lib")
 
-            ciapp = ConfigInfoAppEm(self.__siteId)
-            schema = ciapp.get_emd_fsc_scheme_file_path()
+            schema = self.__cIEm.get_emd_fsc_scheme_file_path()
 
             cmd += "export LD_LIBRARY_PATH=" + lib_path + "; "
             cmd += "xmllint --format --schema " + schema + " " + iPath
@@ -3437,105 +3005,6 @@ class RcsbDpUtility:
         #
         # Annotation tasks ----
         #
-        elif op == "annot-read-map-header":
-            # update the header of the map file avoiding a local copy -
-            # Both options -in and -out must be specified.
-            #  -in  <filename>           : input map
-            #  -out <filename>           : output map
-            #  -cell <x> <y> <z>         : set x/y/z-length x/y/z
-            #  -label <DepCode>          : write new label
-            #  -gridsampling <x> <y> <z> : set x/y/z- grid sampling
-            #  -gridstart <x> <y> <z>    : set x/y/z- grid start point
-            #  -voxel <x> <y> <z>        : set x y z pixel spacing
-            #  Recommend : java -Xms256m -Xmx256m -jar mapFixAnot.jar -in <filein> -out <fileout>
-
-            # Export map header as JSON packet -
-            jarPath = os.path.join(self.__packagePath, "mapFix", "mapFixAnot.jar")
-            cmd += self.__javaPath + " -Xms256m -Xmx256m -jar " + jarPath
-            # -out is a temporary file place holder --
-            cmd += " -in " + iPath + " -out  dummy-out.map "
-            # these dummy arguments required to run this code --
-            cmd += " -voxel 1.0 1.0 1.0 -label test "
-            # oPath here will be the JSON  output containing may header details --
-            cmd += " ; } 2> " + ePath + " 1> " + oPath
-            cmd += " ; cat " + ePath + " > " + lPath
-
-        elif op == "annot-read-map-header-in-place":
-            # update the header of the map file avoiding a local copy -
-            # Both options -in and -out must be specified.
-            #  -in  <filename>           : input map
-            #  -out <filename>           : output map
-            #  -cell <x> <y> <z>         : set x/y/z-length x/y/z
-            #  -label <DepCode>          : write new label
-            #  -gridsampling <x> <y> <z> : set x/y/z- grid sampling
-            #  -gridstart <x> <y> <z>    : set x/y/z- grid start point
-            #  -voxel <x> <y> <z>        : set x y z pixel spacing
-            #  Recommend : java -Xms256m -Xmx256m -jar mapFixAnot.jar -in <filein> -out <fileout>
-
-            if "map_file_path" in self.__inputParamDict:
-                inpMapFilePath = self.__inputParamDict["map_file_path"]
-            # Export map header as JSON packet -
-            jarPath = os.path.join(self.__packagePath, "mapFix", "mapFixAnot.jar")
-            cmd += self.__javaPath + " -Xms256m -Xmx256m -jar " + jarPath
-            # -out is a temporary file place holder --
-            cmd += " -in " + inpMapFilePath + " -out  dummy-out.map "  # pylint: disable=used-before-assignment
-            # these dummy arguments required to run this code --
-            cmd += " -voxel 1.0 1.0 1.0 -label test "
-            # oPath here will be the JSON  output containing may header details --
-            cmd += " ; } 2> " + ePath + " 1> " + oPath
-            cmd += " ; cat " + ePath + " > " + lPath
-
-        elif op == "annot-update-map-header-in-place":
-            # update the header of the map file avoiding a local copy -
-            # Both options -in and -out must be specified.
-            #  -in  <filename>           : input map
-            #  -out <filename>           : output map
-            #  -cell <x> <y> <z>         : set x/y/z-length x/y/z
-            #  -label <DepCode>          : write new label
-            #  -gridsampling <x> <y> <z> : set x/y/z- grid sampling
-            #  -gridstart <x> <y> <z>    : set x/y/z- grid start point
-            #  -voxel <x> <y> <z>        : set x y z pixel spacing
-            #  Recommend : java -Xms256m -Xmx256m -jar mapFixAnot.jar -in <filein> -out <fileout>
-
-            # use references for input and output file paths -
-            if "input_map_file_path" in self.__inputParamDict:
-                inpMapFilePath = self.__inputParamDict["input_map_file_path"]
-
-            if "output_map_file_path" in self.__inputParamDict:
-                outMapFilePath = self.__inputParamDict["output_map_file_path"]
-            #
-            jarPath = os.path.join(self.__packagePath, "mapFix", "mapFixAnot.jar")
-            cmd += self.__javaPath + " -Xms256m -Xmx256m -jar " + jarPath
-            # -out is a temporary file place holder --
-            cmd += " -in " + inpMapFilePath + " -out  " + outMapFilePath  # pylint: disable=used-before-assignment
-            #
-            if "voxel" in self.__inputParamDict:
-                argVal = self.__inputParamDict["voxel"]
-                cmd += " -voxel " + argVal
-
-            if "cell" in self.__inputParamDict:
-                argVal = self.__inputParamDict["cell"]
-                cmd += " -cell " + argVal
-
-            if "label" in self.__inputParamDict:
-                argVal = self.__inputParamDict["label"]
-                cmd += " -label " + argVal
-
-            if "gridsampling" in self.__inputParamDict:
-                argVal = self.__inputParamDict["gridsampling"]
-                cmd += " -gridsampling " + argVal
-
-            if "gridstart" in self.__inputParamDict:
-                argVal = self.__inputParamDict["gridstart"]
-                cmd += " -gridstart " + argVal
-
-            # any options ---
-            if "options" in self.__inputParamDict:
-                argVal = str(self.__inputParamDict["options"]).strip()
-                cmd += " " + argVal
-
-            cmd += " ; } 2> " + ePath + " 1> " + oPath
-            cmd += " ; cat " + ePath + " > " + lPath
         elif op == "deposit-update-map-header-in-place":
             # Both options -in and -out must be specified.
             #  -in  <filename>           : input map
@@ -3596,14 +3065,11 @@ class RcsbDpUtility:
             logFilePath = os.path.join(outDirPath, f"{op}.log")
             cmd += f" > {logFilePath} 2>&1 ;"
 
-        if op not in (
+        if not opDesc.hasTemplate() and op not in (
             "em2em-spider",
             "mapfix-big",
             "fsc_check",
             "img-convert",
-            "annot-read-map-header",
-            "annot-read-map-header-in-place",
-            "annot-update-map-header-in-place",
             "deposit-update-map-header-in-place",
             "em-map-model-upload-check",
         ):
@@ -3653,10 +3119,7 @@ class RcsbDpUtility:
             lPathFull = lPath
             cmd = "("
         #
-        if self.__stepNo > 1:
-            pPath = self.__updateInputPath()
-            if os.access(pPath, os.F_OK):
-                cmd += "; cp " + pPath + " " + iPath
+        self.__stageStepInput(op, iPath)
         #
         cmd += " ; RCSBROOT=" + self.__rcsbAppsPath + " ; export RCSBROOT "
         cmd += (
@@ -3825,10 +3288,7 @@ class RcsbDpUtility:
             # tPathFull = tPath
             cmd = "("
         #
-        if self.__stepNo > 1:
-            pPath = self.__updateInputPath()
-            if os.access(pPath, os.F_OK):
-                cmd += "; cp " + pPath + " " + iPath
+        self.__stageStepInput(op, iPath)
         #
 
         if op == "rename-atoms":
@@ -3882,7 +3342,7 @@ class RcsbDpUtility:
                 java_exe = "java"  # fallback to just "java" in case it's in PATH
             findgeo_locations = [
                 os.path.join(self.__packagePath, "FindGeo", "FindGeo.jar"),
-                os.path.join(self.__packagePath, "metallo", "FindGeo", "FindGeo.jar")
+                os.path.join(self.__packagePath, "metallo", "FindGeo", "FindGeo.jar"),
             ]
             findgeo_jar = next((path for path in findgeo_locations if os.path.exists(path)), None)
             if findgeo_jar:
@@ -3962,7 +3422,7 @@ class RcsbDpUtility:
             for key, value in self.__inputParamDict.items():
                 if key == "ligands":  # list or string of CCD ID(s) of the metal ligand to check on
                     if isinstance(value, list):
-                        s_value = ','.join(value)
+                        s_value = ",".join(value)
                         d_metalcoord_args["ligands"] = s_value
                     else:
                         d_metalcoord_args["ligands"] = value
@@ -4575,10 +4035,7 @@ class RcsbDpUtility:
             # tPathFull = tPath
             cmd = "("
         #
-        if self.__stepNo > 1:
-            pPath = self.__updateInputPath()
-            if os.access(pPath, os.F_OK):
-                cmd += "; cp " + pPath + " " + iPath
+        self.__stageStepInput(op, iPath)
         #
         if "pisa_session_name" in self.__inputParamDict:
             pisaSession = str(self.__inputParamDict["pisa_session_name"])
@@ -4696,11 +4153,7 @@ class RcsbDpUtility:
             ePathFull = ePath
             cmd = "("
         #
-        if self.__stepNo > 1:
-            pPath = self.__updateInputPath()
-            if os.access(pPath, os.F_OK):
-                cmd += "; cp " + pPath + " " + iPath
-            #
+        self.__stageStepInput(op, iPath)
         #
         cmd += " ; PTSUITE=" + self.__pointsuitePath + " ; export PTSUITE "
         #
@@ -4838,10 +4291,7 @@ class RcsbDpUtility:
             # tPathFull = tPath
             cmd = "("
         #
-        if self.__stepNo > 1:
-            pPath = self.__updateInputPath()
-            if os.access(pPath, os.F_OK):
-                cmd += "; cp " + pPath + " " + iPath
+        self.__stageStepInput(op, iPath)
 
         # Disable phone home https://www.ncbi.nlm.nih.gov/books/NBK563686/
         cmd += " ; BLAST_USAGE_REPORT=false ; export BLAST_USAGE_REPORT "
@@ -5052,75 +4502,50 @@ class RcsbDpUtility:
         fName = os.path.join(pdbxDictPath, dictBase + suffix)
         return fName
 
-    def __runTimeout(self, command, timeout, logPath=None):
-        """Execute the input command string (sh semantics) as a subprocess with a timeout."""
-
-        logger.info("+RcsbDpUtility.__runTimeout() - Execution time out %d (seconds)\n", timeout)
-        start = datetime.datetime.now()  # noqa: DTZ005
-        cmdfile = os.path.join(self.__wrkPath, "timeoutscript.sh")
-        ofh = open(cmdfile, "w")
-        ofh.write("#!/bin/sh\n")
-        ofh.write(command)
-        ofh.write("\n#\n")
-        ofh.close()
-        st = os.stat(cmdfile)
-        os.chmod(cmdfile, st.st_mode | stat.S_IEXEC)
-        logger.info("+RcsbDpUtility.__runTimeout() running command %r\n", cmdfile)
-        process = subprocess.Popen(  # pylint: disable=subprocess-popen-preexec-fn
-            cmdfile,
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
-            shell=False,
-            close_fds=True,
-            preexec_fn=os.setsid,  # noqa: PLW1509
-        )  # pylint: disable=subprocess-popen-preexec-fn
-
-        while process.poll() is None:
-            time.sleep(0.1)
-            now = datetime.datetime.now()  # noqa: DTZ005
-            if (now - start).seconds > timeout:
-                # os.kill(-process.pid, signal.SIGKILL)
-                os.killpg(process.pid, signal.SIGKILL)
-                os.waitpid(-1, os.WNOHANG)
-                logger.info("+ERROR RcsbDpUtility.__runTimeout() Execution terminated by timeout %d (seconds)\n", timeout)
-                if logPath is not None:
-                    ofh = open(logPath, "a")
-                    ofh.write("+ERROR - Execution terminated by timeout %d (seconds)\n" % timeout)
-                    ofh.close()
-                return None
-        logger.info("+RcsbDpUtility.__runTimeout() completed with return code %r\n", process.stdout.read())
-        return 0
-
     def __run(self, command, lPathFull, op):
-        if self.__run_remote:
-            random_suffix = random.randrange(9999999)  # noqa: S311
-            job_name = "{}_{}".format(op, random_suffix)
-            return RunRemote(
-                command=command,
-                job_name=job_name,
-                log_dir=os.path.dirname(lPathFull),
-                run_dir=self.__tmpPath,
-                timeout=self.__timeout,
-                number_of_processors=self.__numThreads,
-                memory_limit=self.__startingMemory,
-                add_site_config=True,
-            ).run()
-
-        if self.__timeout > 0:
-            return self.__runTimeout(command, self.__timeout, lPathFull)
-        retcode = -1000
+        if self.__cancelled:
+            logger.info("+RcsbDpUtility.__run() operation %s not started - cancelled\n", op)
+            return -1
+
+        startTime = time.time()
+        executor = self.__executor
+        features = self.__getStepFeatures()
+        memoryLimit = self.__startingMemory
+        timeLimit = self.__timeout
+        prediction = self.__resourcePredictor.predict(op, features[0], features[1], numThreads=self.__numThreads) if features is not None else None
+        if prediction is not None:
+            memoryLimit = prediction[0]
+            # an explicit timeout takes precedence over the predicted run time, which only sizes remote jobs
+            if executor.remote and not self.__timeout:
+                timeLimit = prediction[1]
+            logger.info("Requesting %s MB and time limit %s for op %s from resource history", memoryLimit, timeLimit, op)
+        envD = None
+        if not executor.remote:
+            # remote jobs source the site configuration on the compute node
+            command, envD = self.__getSiteEnvironment(command)
+        random_suffix = random.randrange(9999999)  # noqa: S311
+        job = ExecutorJob(
+            command,
+            job_name="{}_{}".format(op, random_suffix),
+            log_path=lPathFull,
+            work_dir=self.__wrkPath,
+            run_dir=self.__tmpPath,
+            timeout=timeLimit,
+            memory_limit=memoryLimit,
+            number_of_processors=self.__numThreads,
+            stage_inputs=self.__stageInputs,
+            stage_outputs=self.__stageOutputs,
+            stage_dirs=self.__stageDirs,
+            env=envD,
+        )
+        self.__stageInputs = self.__stageOutputs = self.__stageDirs = None
+        self.__job = job
+        retcode = None
         try:
-            retcode = call(command, shell=True)  # noqa: S602
-            if retcode != 0:
-                logger.info(
-                    "+RcsbDpUtility.__run() operation %s completed with return code %r\n",
-                    self.__stepOpList,
-                    retcode,
-                )
-        except OSError as e:
-            logger.info("+RcsbDpUtility.__run() operation %s failed  with exception %r\n", self.__stepOpList, str(e))
-        except Exception:  # noqa: BLE001
-            logger.info("+RcsbDpUtility.__run() operation %s failed  with exception\n", self.__stepOpList)
+            retcode = executor.run(job)
+        finally:
+            self.__recordStepMetrics(op, startTime, retcode, process=job.process, remoteJob=job.remote, features=features)
+            self.__job = None
         return retcode
 
     # def __runP(self, cmd):
@@ -0,0 +1,272 @@
+##
+# File: RunExecutor.py
+# Date: 17-Oct-2026
+#
+# Updates:
+##
+"""
+Execution backends for the commands run by the steps of RcsbDpUtility operations.
+
+slurm       each command is submitted and monitored as a Slurm job by RunRemote
+local-pool  commands run on this host once enough CPU and memory slots are free
+inline      commands run on this host straight away in the calling thread
+
+The backend is chosen by the site configuration setting DP_EXECUTOR.  Without it
+commands run inline, so that only DP_EXECUTOR or RcsbDpUtility.setRunRemote() select
+a remote backend.  The slots of the local-pool backend are taken from DP_EXECUTOR_CPU_SLOTS and
+DP_EXECUTOR_MEMORY_MB, defaulting to the CPUs and physical memory of the host.  One
+instance of each backend is shared by all RcsbDpUtility instances of a process, so
+the slots are shared between threads but not between worker processes.
+"""
+
+import abc
+import collections
+import logging
+import os
+import stat
+import threading
+
+from wwpdb.utils.dp.ProcessSupervisor import ProcessSupervisor
+from wwpdb.utils.dp.RunRemote import RunRemote
+
+logger = logging.getLogger(__name__)
+
+EXECUTOR_SLURM = "slurm"
+EXECUTOR_LOCAL_POOL = "local-pool"
+EXECUTOR_INLINE = "inline"
+
+
+class ExecutorJob:
+    """A command submitted to an execution backend together with its resource request."""
+
+    def __init__(
+        self,
+        command,
+        job_name,
+        log_path,
+        work_dir,
+        run_dir=None,
+        timeout=0,
+        memory_limit=2000,
+        number_of_processors=1,
+        env=None,
+        stage_inputs=None,
+        stage_outputs=None,
+        stage_dirs=None,
+    ):
+        """
+        Args:
+            command (str): command string (sh semantics)
+            job_name (str): job name
+            log_path (str): log file of the step
+            work_dir (str): working directory of the step
+            run_dir (str): directory for the Slurm job script
+            timeout (int): time limit - seconds for local backends, passed to sbatch --time for slurm (0 for none)
+            memory_limit (int): memory in MB
+            number_of_processors (int): number of CPUs
+            env (dict): environment of a locally run command (default: inherited)
+            stage_inputs (list): inputs a remote job copies to node-local scratch space
+            stage_outputs (list): outputs a remote job copies back from node-local scratch space
+            stage_dirs (list): directories a remote job creates in node-local scratch space
+        """
+        self.command = command
+        self.job_name = job_name
+        self.log_path = log_path
+        self.work_dir = work_dir
+        self.run_dir = run_dir
+        self.timeout = timeout
+        self.memory_limit = memory_limit
+        self.number_of_processors = number_of_processors
+        self.env = env
+        self.stage_inputs = stage_inputs
+        self.stage_outputs = stage_outputs
+        self.stage_dirs = stage_dirs
+        # the supervised local process or the RunRemote instance running the job
+        self.process = None
+        self.remote = None
+        self.cancelled = False
+
+    def cancel(self):
+        """Kill the local process group or cancel the remote job and refuse to start the job later."""
+        self.cancelled = True
+        process = self.process
+        if process is not None and process.kill():
+            logger.info("Killed process group %r of job %s", process.pid, self.job_name)
+        remote = self.remote
+        if remote is not None:
+            remote.cancel()
+        return True
+
+
+class RunExecutor(abc.ABC):
+    """Base class of the execution backends."""
+
+    name = None
+    remote = False
+
+    @abc.abstractmethod
+    def run(self, job):
+        """Run job to completion and return its return code (a JobStatus for remote backends)."""
+
+
+class InlineExecutor(RunExecutor):
+    """Run commands as supervised child processes in the calling thread."""
+
+    name = EXECUTOR_INLINE
+
+    def run(self, job):
+        if job.cancelled:
+            return -1
+        if job.timeout and int(job.timeout) > 0:
+            return self.__run_timeout(job)
+        retcode = -1000
+        try:
+            job.process = ProcessSupervisor(job.command, env=job.env)
+            retcode = job.process.run()
+            if retcode != 0:
+                logger.info("+InlineExecutor.run() job %s completed with return code %r\n", job.job_name, retcode)
+        except OSError as e:
+            logger.info("+InlineExecutor.run() job %s failed  with exception %r\n", job.job_name, str(e))
+        except Exception:  # noqa: BLE001
+            logger.info("+InlineExecutor.run() job %s failed  with exception\n", job.job_name)
+        return retcode
+
+    def __run_timeout(self, job):
+        """Run the command as a script killed after the timeout - returns None on timeout and 0 otherwise."""
+        timeout = int(job.timeout)
+        logger.info("+InlineExecutor.run() - Execution time out %d (seconds)\n", timeout)
+        cmdfile = os.path.join(job.work_dir, "timeoutscript.sh")
+        with open(cmdfile, "w") as ofh:
+            ofh.write("#!/bin/sh\n")
+            ofh.write(job.command)
+            ofh.write("\n#\n")
+        st = os.stat(cmdfile)
+        os.chmod(cmdfile, st.st_mode | stat.S_IEXEC)
+        logger.info("+InlineExecutor.run() running command %r\n", cmdfile)
+        # the command writes to the step log itself
+        job.process = ProcessSupervisor(cmdfile, logPath=None, timeout=timeout, shell=False, env=job.env)
+        retcode = job.process.run()
+        if retcode is None:
+            logger.info("+ERROR InlineExecutor.run() Execution terminated by timeout %d (seconds)\n", timeout)
+            if job.log_path is not None:
+                with open(job.log_path, "a") as ofh:
+                    ofh.write("+ERROR - Execution terminated by timeout %d (seconds)\n" % timeout)
+            return None
+        logger.info("+InlineExecutor.run() completed with return code %r\n", retcode)
+        return 0
+
+
+def _get_host_memory_mb():
+    try:
+        return os.sysconf("SC_PAGE_SIZE") * os.sysconf("SC_PHYS_PAGES") // (1024 * 1024)
+    except (ValueError, OSError, AttributeError):
+        return 16000
+
+
+class LocalPoolExecutor(RunExecutor):
+    """Run commands on this host within a budget of CPU and memory slots.
+
+    A job waits until the CPUs and memory it requests are free and jobs start in the
+    order they were submitted.  Requests larger than the whole budget are reduced to it
+    so that such jobs run alone.
+    """
+
+    name = EXECUTOR_LOCAL_POOL
+
+    def __init__(self, cpu_slots=None, memory_mb=None):
+        self.cpu_slots = int(cpu_slots) if cpu_slots else (os.cpu_count() or 1)
+        self.memory_mb = int(memory_mb) if memory_mb else _get_host_memory_mb()
+        self._free_cpus = self.cpu_slots
+        self._free_memory = self.memory_mb
+        self._condition = threading.Condition()
+        self._queue = collections.deque()
+        self._inline = InlineExecutor()
+
+    def get_free_slots(self):
+        """Return the number of free CPU slots and the free memory in MB."""
+        with self._condition:
+            return self._free_cpus, self._free_memory
+
+    def run(self, job):
+        cpus = min(max(int(job.number_of_processors or 1), 1), self.cpu_slots)
+        memory = min(max(int(job.memory_limit or 0), 0), self.memory_mb)
+        with self._condition:
+            self._queue.append(job)
+            try:
+                while not job.cancelled and not (self._queue[0] is job and self._free_cpus >= cpus and self._free_memory >= memory):
+                    # woken when slots are released - the timeout notices cancellation while waiting
+                    self._condition.wait(1.0)
+            finally:
+                self._queue.remove(job)
+                self._condition.notify_all()
+            if job.cancelled:
+                return -1
+            self._free_cpus -= cpus
+            self._free_memory -= memory
+        logger.debug("Job %s started with %d CPUs and %d MB", job.job_name, cpus, memory)
+        try:
+            return self._inline.run(job)
+        finally:
+            with self._condition:
+                self._free_cpus += cpus
+                self._free_memory += memory
+                self._condition.notify_all()
+
+
+class SlurmExecutor(RunExecutor):
+    """Submit each command as a Slurm job with RunRemote."""
+
+    name = EXECUTOR_SLURM
+    remote = True
+
+    def __init__(self, add_site_config=True):
+        self.add_site_config = add_site_config
+
+    def run(self, job):
+        job.remote = RunRemote(
+            command=job.command,
+            job_name=job.job_name,
+            log_dir=os.path.dirname(job.log_path),
+            run_dir=job.run_dir,
+            timeout=job.timeout,
+            number_of_processors=job.number_of_processors,
+            memory_limit=job.memory_limit,
+            add_site_config=self.add_site_config,
+            stage_inputs=job.stage_inputs,
+            stage_outputs=job.stage_outputs,
+            stage_dirs=job.stage_dirs,
+        )
+        if job.cancelled:
+            job.remote.cancel()
+        return job.remote.run()
+
+
+_EXECUTOR_CLASSES = {
+    EXECUTOR_SLURM: SlurmExecutor,
+    EXECUTOR_LOCAL_POOL: LocalPoolExecutor,
+    EXECUTOR_INLINE: InlineExecutor,
+}
+_executorD = {}
+_executorLock = threading.Lock()
+
+
+def get_executor(name, **kwargs):
+    """Return the instance of the named backend shared by this process (kwargs apply when it is created)."""
+    if name not in _EXECUTOR_CLASSES:
+        raise ValueError("Unknown executor %r" % name)
+    with _executorLock:
+        if name not in _executorD:
+            _executorD[name] = _EXECUTOR_CLASSES[name](**kwargs)
+        return _executorD[name]
+
+
+def get_site_executor(cI):
+    """Return the backend selected by the site configuration cI."""
+    try:
+        name = cI.get("DP_EXECUTOR") or EXECUTOR_INLINE
+        if name == EXECUTOR_LOCAL_POOL:
+            return get_executor(name, cpu_slots=cI.get("DP_EXECUTOR_CPU_SLOTS"), memory_mb=cI.get("DP_EXECUTOR_MEMORY_MB"))
+        return get_executor(name)
+    except Exception as e:  # noqa: BLE001
+        logger.info("unable to get site executor %s", str(e))
+    return get_executor(EXECUTOR_INLINE)
@@ -1,15 +1,20 @@
 # pylint: disable=logging-format-interpolation
 import argparse
+import asyncio
 import logging
 import os
+import re
+import shlex
 import shutil
 import subprocess
 import tempfile
-import time
+import threading
 from enum import Enum
 from textwrap import dedent
 
-from wwpdb.utils.config.ConfigInfo import ConfigInfo, getSiteId
+from wwpdb.utils.config.ConfigInfo import getSiteId
+
+from wwpdb.utils.dp.RcsbDpSiteConfig import getSiteConfig
 
 logging.basicConfig(level=logging.DEBUG, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s")
 logger = logging.getLogger(__name__)
@@ -24,6 +29,32 @@ def remove_file(file_path):
             pass
 
 
+def parse_slurm_time(text):
+    """Convert a Slurm duration ([DD-[HH:]]MM:SS[.mmm]) to seconds - returns None for empty values."""
+    text = (text or "").strip()
+    if not text or text in ("UNLIMITED", "INVALID"):
+        return None
+    days = 0
+    if "-" in text:
+        day_text, text = text.split("-", 1)
+        days = int(day_text)
+    seconds = 0.0
+    for field in text.split(":"):
+        seconds = seconds * 60 + float(field)
+    return days * 86400 + seconds
+
+
+def parse_slurm_size(text):
+    """Convert a Slurm size (e.g. 1024K, 3.5M, 2G) to kilobytes - returns None for empty values."""
+    text = (text or "").strip()
+    if not text:
+        return None
+    scale = {"K": 1, "M": 1024, "G": 1024**2, "T": 1024**3}
+    if text[-1].upper() in scale:
+        return int(float(text[:-1]) * scale[text[-1].upper()])
+    return int(float(text) / 1024)
+
+
 class JobStatus(Enum):
     OOM = "OUT_OF_MEMORY"
     RUNNING = "RUNNING"
@@ -33,6 +64,283 @@ class JobStatus(Enum):
     OTHER = "OTHER"
 
 
+def parse_job_status(status_text):
+    """Map a Slurm job state to a JobStatus."""
+    status_text = (status_text or "").strip().split(" ")[0]
+    if status_text in ["FAILED", "TIMEOUT", "NODE_FAIL", "BOOT_FAIL", "DEADLINE"]:
+        return JobStatus.FAILED
+    if status_text == "OUT_OF_MEMORY":
+        return JobStatus.OOM
+    if status_text == "COMPLETED":
+        return JobStatus.COMPLETED
+    if status_text in ["RUNNING", "PENDING", "CONFIGURING", "COMPLETING", "REQUEUED", "RESIZING", "SUSPENDED"]:
+        return JobStatus.RUNNING
+    if status_text == "CANCELLED":
+        return JobStatus.CANCELLED
+    return JobStatus.OTHER
+
+
+def expand_array_task_ids(task_text):
+    """Expand the task part of a Slurm array job id (e.g. "3", "[0-4,7]" or "[2-9%4]") to a list of task indices."""
+    task_text = task_text.strip().strip("[]").split("%")[0]
+    task_ids = []
+    for item in task_text.split(","):
+        if not item:
+            continue
+        if "-" in item:
+            first, last = item.split("-", 1)
+            task_ids.extend(range(int(first), int(last) + 1))
+        else:
+            task_ids.append(int(item))
+    return task_ids
+
+
+def _format_array_spec(task_ids, max_concurrent=None):
+    # consecutive task indices are written as ranges to keep large arrays short
+    ranges = []
+    for task_id in sorted(task_ids):
+        if ranges and task_id == ranges[-1][1] + 1:
+            ranges[-1][1] = task_id
+        else:
+            ranges.append([task_id, task_id])
+    spec = ",".join(str(first) if first == last else "%d-%d" % (first, last) for first, last in ranges)
+    if max_concurrent:
+        spec += "%%%d" % int(max_concurrent)
+    return spec
+
+
+# characters which may continue a path - a staged path must not be followed or preceded by one
+_PATH_CHARS = r"\w.+@~,=:-"
+
+
+def stage_command(command, stage_inputs=(), stage_outputs=(), scratch_dir="${TMPDIR:-/tmp}", stage_dirs=()):
+    """Return a bash script fragment running command with its declared files in node-local scratch space.
+
+    Each declared input, output and directory is mapped to a copy at the same path below
+    a new directory in scratch_dir (evaluated on the compute node), and only the
+    references to these exact paths in command, or to paths below a declared directory,
+    are redirected to the copies.  The directories of the declared files and the declared
+    directories (stage_dirs, e.g. scratch directories of the command) are created there
+    before the declared inputs are copied in.  The declared outputs which exist once the
+    command has finished are copied back, nothing written to the declared directories is.
+    The fragment exits with the return code of command, or 1 if it succeeded but an
+    output could not be copied back.
+
+    Paths must be absolute and must not appear in single quotes within command.
+    """
+    stage_inputs = [os.path.abspath(pth) for pth in stage_inputs or ()]
+    stage_outputs = [os.path.abspath(pth) for pth in stage_outputs or ()]
+    stage_dirs = [os.path.abspath(pth) for pth in stage_dirs or ()]
+    path_list = sorted(set(stage_inputs + stage_outputs + stage_dirs), key=len, reverse=True)
+    if not path_list:
+        return command
+    # longest first so that a declared path is preferred to a declared directory holding it
+    pattern = re.compile("(?<![/%s])(%s)(?![%s])" % (_PATH_CHARS, "|".join(re.escape(pth) for pth in path_list), _PATH_CHARS))
+
+    def redirect(match):
+        if match.group(1) not in stage_dirs and command.startswith("/", match.end()):
+            return match.group(0)
+        return "${STAGE_DIR}" + match.group(1)
+
+    staged_command = pattern.sub(redirect, command)
+    dir_list = sorted({os.path.dirname(pth) for pth in stage_inputs + stage_outputs} | set(stage_dirs))
+
+    def staged(path):
+        return '"$STAGE_DIR"' + shlex.quote(path)
+
+    lines = [
+        'STAGE_DIR=$(mktemp -d "%s/run_remote_XXXXXX")' % scratch_dir,
+        "trap 'rm -rf \"$STAGE_DIR\"' EXIT",
+        "mkdir -p " + " ".join(staged(dir_path) for dir_path in dir_list),
+    ]
+    for pth in stage_inputs:
+        lines.append("if [ -e {0} ]; then cp -a {0} {1}/; fi".format(shlex.quote(pth), staged(os.path.dirname(pth))))
+    lines += ["set +e", staged_command, "rc=$?"]
+    for pth in stage_outputs:
+        lines.append("if [ -e {0} ]; then cp -a {0} {1}/ || rc=$(( rc == 0 ? 1 : rc )); fi".format(staged(pth), shlex.quote(os.path.dirname(pth))))
+    lines.append("exit $rc")
+    return "\n".join(lines)
+
+
+FINAL_JOB_STATUSES = (JobStatus.COMPLETED, JobStatus.FAILED, JobStatus.OOM, JobStatus.CANCELLED)
+
+
+def parse_job_states(text):
+    """Parse "<job id>|<state>" lines from squeue or sacct to a dictionary of job id and JobStatus.
+
+    Array tasks are reported as "<job>_<task>" and combined array records such as
+    "<job>_[2-5]" are expanded to one entry per task.  Job step records are skipped.
+    """
+    statuses = {}
+    for line in text.splitlines():
+        fields = line.strip().split("|")
+        if len(fields) < 2 or not fields[0] or "." in fields[0]:
+            continue
+        status = parse_job_status(fields[1])
+        job_id, _sep, task_text = fields[0].partition("_")
+        if task_text:
+            for task_id in expand_array_task_ids(task_text):
+                statuses["%s_%d" % (job_id, task_id)] = status
+        else:
+            statuses[job_id] = status
+    return statuses
+
+
+class JobStatusPoller:
+    """Poll the status of all tracked Slurm jobs with one squeue call per interval.
+
+    Jobs no longer known to squeue are looked up with a single sacct call.  The polling
+    interval starts at min_interval and grows by the backoff factor up to max_interval
+    while no job changes state; a state change or a newly tracked job resets it.  The
+    polling thread runs only while jobs are being tracked.  Array tasks are tracked as
+    "<job>_<task>".
+    """
+
+    def __init__(self, min_interval=5, max_interval=60, backoff=1.5):
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.backoff = backoff
+        self._condition = threading.Condition()
+        self._wakeup = threading.Event()
+        self._statuses = {}
+        self._track_counts = {}
+        self._callbacks = {}
+        self._interval = min_interval
+        self._thread = None
+
+    def track(self, job_id, callback=None):
+        """Start tracking a job - callback(job_id, status) is called on each change of its status."""
+        job_id = str(job_id)
+        with self._condition:
+            self._track_counts[job_id] = self._track_counts.get(job_id, 0) + 1
+            self._statuses.setdefault(job_id, JobStatus.OTHER)
+            if callback is not None:
+                self._callbacks.setdefault(job_id, []).append(callback)
+            self._interval = self.min_interval
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="JobStatusPoller", daemon=True)
+                self._thread.start()
+        self._wakeup.set()
+
+    def untrack(self, job_id, callback=None):
+        """Stop tracking a job once all callers tracking it have released it."""
+        job_id = str(job_id)
+        with self._condition:
+            if callback is not None and callback in self._callbacks.get(job_id, []):
+                self._callbacks[job_id].remove(callback)
+            count = self._track_counts.get(job_id, 0) - 1
+            if count > 0:
+                self._track_counts[job_id] = count
+                return
+            self._track_counts.pop(job_id, None)
+            self._statuses.pop(job_id, None)
+            self._callbacks.pop(job_id, None)
+
+    def get_status(self, job_id):
+        """Return the last polled status of a tracked job."""
+        with self._condition:
+            return self._statuses.get(str(job_id), JobStatus.OTHER)
+
+    def wait(self, job_id, timeout=None):
+        """Wait until a job has finished and return its final status (or the current status on timeout)."""
+        job_id = str(job_id)
+        self.track(job_id)
+        try:
+            with self._condition:
+                self._condition.wait_for(lambda: self._statuses[job_id] in FINAL_JOB_STATUSES, timeout=timeout)
+                return self._statuses[job_id]
+        finally:
+            self.untrack(job_id)
+
+    async def wait_async(self, job_id):
+        """Wait in the running event loop until a job has finished and return its final status."""
+        job_id = str(job_id)
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+
+        def set_status(status):
+            if not future.done():
+                future.set_result(status)
+
+        def on_change(_job_id, status):
+            if status in FINAL_JOB_STATUSES:
+                loop.call_soon_threadsafe(set_status, status)
+
+        self.track(job_id, callback=on_change)
+        try:
+            # the job may already have finished if it is tracked by another caller
+            status = self.get_status(job_id)
+            if status in FINAL_JOB_STATUSES:
+                return status
+            return await future
+        finally:
+            self.untrack(job_id, callback=on_change)
+
+    def _query(self, cmd):
+        try:
+            # squeue exits non-zero when some of the requested jobs have left the queue
+            output = subprocess.run(cmd, check=False, capture_output=True)
+        except Exception as e:
+            logger.warning(f"Unable to query job status with {cmd[0]}: {e}")
+            return {}
+        return parse_job_states(output.stdout.decode("utf-8"))
+
+    def poll(self):
+        """Query the status of all unfinished tracked jobs once - returns the dictionary of changed statuses."""
+        with self._condition:
+            job_ids = [job_id for job_id, status in self._statuses.items() if status not in FINAL_JOB_STATUSES]
+        if not job_ids:
+            return {}
+        statuses = self._query(["squeue", "--noheader", "--array", "-t", "all", "--format", "%i|%T", "--jobs", ",".join(job_ids)])
+        missing = [job_id for job_id in job_ids if job_id not in statuses]
+        if missing:
+            queried = self._query(["sacct", "--noheader", "--parsable2", "--allocations", "--format", "JobID,State", "--jobs", ",".join(missing)])
+            statuses.update({job_id: queried[job_id] for job_id in missing if job_id in queried})
+        changes = {}
+        callbacks = []
+        with self._condition:
+            for job_id in job_ids:
+                status = statuses.get(job_id)
+                if status is None or job_id not in self._statuses or self._statuses[job_id] == status:
+                    continue
+                self._statuses[job_id] = status
+                changes[job_id] = status
+                callbacks += [(callback, job_id, status) for callback in self._callbacks.get(job_id, [])]
+            if changes:
+                self._condition.notify_all()
+        for callback, job_id, status in callbacks:
+            try:
+                callback(job_id, status)
+            except Exception:  # noqa: BLE001
+                logger.exception(f"Job status callback failed for job {job_id}")
+        return changes
+
+    def _run(self):
+        while True:
+            self._wakeup.clear()
+            changes = self.poll()
+            with self._condition:
+                if not any(status not in FINAL_JOB_STATUSES for status in self._statuses.values()):
+                    self._thread = None
+                    return
+                self._interval = self.min_interval if changes else min(self._interval * self.backoff, self.max_interval)
+                interval = self._interval
+            self._wakeup.wait(interval)
+
+
+_shared_poller = None
+_shared_poller_lock = threading.Lock()
+
+
+def get_job_status_poller():
+    """Return the job status poller shared by all RunRemote instances of this process."""
+    global _shared_poller  # noqa: PLW0603  # pylint: disable=global-statement
+    with _shared_poller_lock:
+        if _shared_poller is None:
+            _shared_poller = JobStatusPoller()
+        return _shared_poller
+
+
 class RunRemote:
     def __init__(
         self,
@@ -45,7 +353,19 @@ class RunRemote:
         number_of_processors=1,
         add_site_config=False,
         add_site_config_database=False,
+        poller=None,
+        stage_inputs=None,
+        stage_outputs=None,
+        stage_dirs=None,
     ):
+        """
+        Args:
+            stage_inputs (list): files or directories copied to node-local scratch space ($TMPDIR) before the command runs
+            stage_outputs (list): files or directories copied back from scratch space once the command has finished
+            stage_dirs (list): directories used by the command which are created in scratch space and not copied back
+
+        When any list is given these paths are redirected to scratch space, see stage_command().
+        """
         self.command = command
         self.job_name = job_name
         self.log_dir = log_dir
@@ -55,13 +375,20 @@ class RunRemote:
         self.number_of_processors = str(number_of_processors)
         self.add_site_config = add_site_config
         self.add_site_config_database = add_site_config_database
+        self.stage_inputs = list(stage_inputs or [])
+        self.stage_outputs = list(stage_outputs or [])
+        self.stage_dirs = list(stage_dirs or [])
+        self.job_id = None
+        self.accounting = None
+        self._cancelled = False
+        self.poller = poller if poller is not None else get_job_status_poller()
 
         if not self.run_dir:
             self.run_dir = tempfile.mkdtemp(prefix="run_remote_")  # this won't work as cluster nodes have different temp dirs
         self._shell_script = os.path.join(self.run_dir, "run_{}.sh".format(self.job_name))
 
         self.siteId = getSiteId()
-        self.cI = ConfigInfo(self.siteId)
+        self.cI = getSiteConfig(self.siteId).cI
         self.pdbe_cluster_queue = str(self.cI.get("PDBE_CLUSTER_QUEUE"))
         self._stdout_file = os.path.join(self.log_dir, self.job_name + ".out")
         self._stderr_file = os.path.join(self.log_dir, self.job_name + ".err")
@@ -80,18 +407,46 @@ class RunRemote:
         ]
         squeue_output = subprocess.run(cmd, check=True, capture_output=True)
         status_text = squeue_output.stdout.decode("utf-8").strip()
-
-        if status_text in ["FAILED", "TIMEOUT"]:
-            return JobStatus.FAILED
-        if status_text == "OUT_OF_MEMORY":
-            return JobStatus.OOM
-        if status_text == "COMPLETED":
-            return JobStatus.COMPLETED
-        if status_text in ["RUNNING", "PENDING", "CONFIGURING", "COMPLETING"]:
-            return JobStatus.RUNNING
-        if status_text == "CANCELLED":
-            return JobStatus.CANCELLED
-        return JobStatus.OTHER
+        return parse_job_status(status_text)
+
+    _ACCOUNTING_FIELDS = ("JobID", "Elapsed", "UserCPU", "SystemCPU", "MaxRSS", "MaxDiskRead", "MaxDiskWrite")
+
+    def _accounting_command(self, job_id):
+        return ["sacct", "--noheader", "--parsable2", "--units=K", "--jobs", str(job_id), "--format", ",".join(self._ACCOUNTING_FIELDS)]
+
+    def _parse_accounting(self, job_id, text):
+        fields = self._ACCOUNTING_FIELDS
+        accounting = None
+        for line in text.splitlines():
+            values = dict(zip(fields, line.split("|")))
+            if len(values) != len(fields):
+                continue
+            if accounting is None:
+                accounting = {"job_id": job_id, "wall_time": None, "user_cpu": None, "system_cpu": None, "max_rss_kb": None, "read_kb": None, "write_kb": None}
+            if values["JobID"] == str(job_id):
+                # allocation record - CPU times are totals over the job steps
+                accounting["wall_time"] = parse_slurm_time(values["Elapsed"])
+                accounting["user_cpu"] = parse_slurm_time(values["UserCPU"])
+                accounting["system_cpu"] = parse_slurm_time(values["SystemCPU"])
+            for key, field in (("max_rss_kb", "MaxRSS"), ("read_kb", "MaxDiskRead"), ("write_kb", "MaxDiskWrite")):
+                value = parse_slurm_size(values[field])
+                if value is not None:
+                    accounting[key] = max(value, accounting[key] or 0)
+        return accounting
+
+    def get_job_accounting(self, job_id):
+        """Get the resource usage of a finished job from the Slurm accounting database.
+
+        Returns a dictionary with the elapsed time and user/system CPU time (seconds),
+        the peak resident set size and the data read and written (kilobytes) over all
+        job steps, or None if the accounting data is not available.
+        """
+        try:
+            sacct_output = subprocess.run(self._accounting_command(job_id), check=True, capture_output=True)
+        except Exception as e:
+            logger.warning(f"Unable to get accounting data for job {job_id}: {e}")
+            return None
+        return self._parse_accounting(job_id, sacct_output.stdout.decode("utf-8"))
 
     def requeue_job(self, job_id):
         """Requeue a single job."""
@@ -99,27 +454,42 @@ class RunRemote:
         subprocess.run(cmd, check=True)
         logger.info(f"Requeued failed job {job_id}")
 
-    def monitor(self, job_id, frequency=10):
-        """Monitor a job by ID, requeueing if it fails."""
-        logging.info(f"Monitoring job {job_id}")  # noqa: LOG015
-
-        while True:
-            status = self.get_job_status_by_id(job_id)
-
-            if status in (JobStatus.CANCELLED, JobStatus.FAILED, JobStatus.OOM):
-                logger.warning(f"Job {job_id} failed with status {status}")
-                break
-            if status == JobStatus.COMPLETED:
-                logger.info(f"Job {job_id} completed successfully")
-                break
-            else:
-                logger.debug(f"Job {job_id} status: {status}")
-
-            time.sleep(frequency)
-
-        return self.get_job_status_by_id(job_id)
+    def cancel(self):
+        """Cancel the submitted job and stop any further retries."""
+        self._cancelled = True
+        if self.job_id is not None:
+            cmd = ["scancel", str(self.job_id)]
+            try:
+                subprocess.run(cmd, check=True)
+                logger.info(f"Cancelled job {self.job_id}")
+            except Exception as e:
+                logger.warning(f"Unable to cancel job {self.job_id}: {e}")
+
+    async def cancel_async(self):
+        """As cancel() without blocking the event loop."""
+        self._cancelled = True
+        if self.job_id is not None:
+            try:
+                await self._run_command_async(["scancel", str(self.job_id)])
+                logger.info(f"Cancelled job {self.job_id}")
+            except Exception as e:
+                logger.warning(f"Unable to cancel job {self.job_id}: {e}")
+
+    def monitor(self, job_id, frequency=None):
+        """Wait for a job to finish and return its final status.
+
+        The status is polled by the job status poller together with all other tracked
+        jobs; frequency is kept for compatibility and not used.
+        """
+        logger.info(f"Monitoring job {job_id}")
+        status = self.poller.wait(job_id)
+        if status == JobStatus.COMPLETED:
+            logger.info(f"Job {job_id} completed successfully")
+        else:
+            logger.warning(f"Job {job_id} failed with status {status}")
+        return status
 
-    def _build_sbatch_command(self, command):
+    def _build_sbatch_command(self, command, extra_args=None):
         sbatch_args = [
             "sbatch",
             "--job-name=%s" % self.job_name,
@@ -131,15 +501,15 @@ class RunRemote:
             "--output=%s" % self._stdout_file,
             "--error=%s" % self._stderr_file,
         ]
+        sbatch_args += extra_args or []
 
         with open(self._shell_script, "w") as f:
-            cmd = f"""\
+            cmd = dedent(f"""\
             #!/bin/bash
             set -e
             export XDG_RUNTIME_DIR={self.run_dir}
-            {command}
-            """
-            f.write(dedent(cmd))
+            """)
+            f.write(cmd + command + "\n")
             f.flush()
         os.chmod(self._shell_script, 0o775)
 
@@ -150,7 +520,7 @@ class RunRemote:
         if self.run_dir.startswith("/tmp/run_remote_"):  # noqa: S108
             shutil.rmtree(self.run_dir)
 
-    def _source_site_config(self, database=False):
+    def _source_site_config(self, database=False, command=None):
         suffix = ""
         if database:
             suffix = "--database"
@@ -159,38 +529,371 @@ class RunRemote:
         site_loc = self.cI.get("WWPDB_SITE_LOC")
         site_config_command = ". {}/init/env.sh --siteid {} --location {} {} > /dev/null".format(site_config_path, self.siteId, site_loc, suffix)
 
-        return "{}; {}".format(site_config_command, self.command)
+        return "{}; {}".format(site_config_command, self.command if command is None else command)
+
+    def _workflow_command(self):
+        command = self.command
+        if self.add_site_config_database or self.add_site_config:
+            command = self._source_site_config(database=self.add_site_config_database)
+        if self.stage_inputs or self.stage_outputs or self.stage_dirs:
+            command = stage_command(command, self.stage_inputs, self.stage_outputs, stage_dirs=self.stage_dirs)
+        return command
+
+    def _set_job_id(self, sbatch_stdout):
+        job_id = int(sbatch_stdout.decode("utf-8").split()[-1])
+        self.job_id = job_id
+        logger.debug(f"Submitted: {job_id}")
+        self._cleanup()
+        return job_id
+
+    def _submitted(self, sbatch_stdout):
+        job_id = self._set_job_id(sbatch_stdout)
+        if self._cancelled:
+            # cancel() was called while the job was being submitted
+            self.cancel()
+        return job_id
+
+    async def _submitted_async(self, sbatch_stdout):
+        job_id = self._set_job_id(sbatch_stdout)
+        if self._cancelled:
+            await self.cancel_async()
+        return job_id
+
+    def _should_retry(self, job_id, status):
+        if status == JobStatus.COMPLETED or self._cancelled:
+            return False
+        if status == JobStatus.OOM:
+            self.memory_limit = str(int(self.memory_limit) * 2)
+        logger.info(f"Retrying job {job_id} with memory limit {self.memory_limit}")
+        return True
 
     def run(self, retries=3):
         status = JobStatus.OTHER
-        wf_command = self.command
-
-        if self.add_site_config_database or self.add_site_config:
-            wf_command = self._source_site_config(database=self.add_site_config_database)
+        wf_command = self._workflow_command()
 
-        while retries > 0:
+        while retries > 0 and not self._cancelled:
             sbatch_cmd = self._build_sbatch_command(command=wf_command)
             logger.info(" ".join(sbatch_cmd))
 
             output = subprocess.run(sbatch_cmd, check=True, capture_output=True)
-            job_id = int(output.stdout.decode("utf-8").split()[-1])
-            logger.debug(f"Submitted: {job_id}")
-
-            self._cleanup()
+            job_id = self._submitted(output.stdout)
             status = self.monitor(job_id=job_id)
+            self.accounting = self.get_job_accounting(job_id)
 
-            if status == JobStatus.COMPLETED:
+            if not self._should_retry(job_id, status):
                 break
+            retries -= 1
+
+        return status
+
+    async def _run_command_async(self, cmd):
+        process = await asyncio.create_subprocess_exec(*cmd, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE)
+        stdout, stderr = await process.communicate()
+        if process.returncode != 0:
+            raise subprocess.CalledProcessError(process.returncode, cmd, output=stdout, stderr=stderr)
+        return stdout
+
+    async def get_job_accounting_async(self, job_id):
+        """As get_job_accounting() without blocking the event loop."""
+        try:
+            stdout = await self._run_command_async(self._accounting_command(job_id))
+        except Exception as e:
+            logger.warning(f"Unable to get accounting data for job {job_id}: {e}")
+            return None
+        return self._parse_accounting(job_id, stdout.decode("utf-8"))
+
+    async def monitor_async(self, job_id):
+        """As monitor() without blocking the event loop."""
+        logger.info(f"Monitoring job {job_id}")
+        status = await self.poller.wait_async(job_id)
+        if status == JobStatus.COMPLETED:
+            logger.info(f"Job {job_id} completed successfully")
+        else:
+            logger.warning(f"Job {job_id} failed with status {status}")
+        return status
+
+    async def run_async(self, retries=3):
+        """As run() for use in an event loop - sbatch and sacct run as asynchronous subprocesses and the
+        status is awaited from the poller, so one loop can supervise many jobs.  Cancelling the awaiting
+        task cancels the Slurm job.
+        """
+        status = JobStatus.OTHER
+        wf_command = self._workflow_command()
 
-            if status == JobStatus.OOM:
-                self.memory_limit = str(int(self.memory_limit) * 2)
+        while retries > 0 and not self._cancelled:
+            sbatch_cmd = self._build_sbatch_command(command=wf_command)
+            logger.info(" ".join(sbatch_cmd))
+
+            job_id = await self._submitted_async(await self._run_command_async(sbatch_cmd))
+            try:
+                status = await self.monitor_async(job_id)
+            except asyncio.CancelledError:
+                await self.cancel_async()
+                raise
+            self.accounting = await self.get_job_accounting_async(job_id)
 
-            logger.info(f"Retrying job {job_id} with memory limit {self.memory_limit}")
+            if not self._should_retry(job_id, status):
+                break
             retries -= 1
 
         return status
 
 
+class RunRemoteArray(RunRemote):
+    """Run a batch of commands as a single Slurm job array.
+
+    Task i of the array runs commands[i] and writes its output to
+    <log_dir>/<job_name>_<i>.out and .err.  Tasks which fail are resubmitted as a
+    smaller array, tasks running out of memory with double the memory limit.
+    """
+
+    def __init__(
+        self,
+        commands,
+        job_name,
+        log_dir,
+        run_dir=None,
+        timeout=90,
+        memory_limit=16000,
+        number_of_processors=1,
+        add_site_config=False,
+        add_site_config_database=False,
+        max_concurrent=None,
+        poller=None,
+    ):
+        super().__init__(
+            command=None,
+            job_name=job_name,
+            log_dir=log_dir,
+            run_dir=run_dir,
+            timeout=timeout,
+            memory_limit=memory_limit,
+            number_of_processors=number_of_processors,
+            add_site_config=add_site_config,
+            add_site_config_database=add_site_config_database,
+            poller=poller,
+        )
+        self.commands = list(commands)
+        self.max_concurrent = max_concurrent
+        self.statuses = [JobStatus.OTHER] * len(self.commands)
+        self.task_memory_limits = [self.memory_limit] * len(self.commands)
+        self.job_ids = []
+        self._stdout_file = os.path.join(self.log_dir, self.job_name + "_%a.out")
+        self._stderr_file = os.path.join(self.log_dir, self.job_name + "_%a.err")
+
+    def get_task_log_files(self, task_id):
+        """Return the (stdout, stderr) log files of a task."""
+        return (self._stdout_file.replace("%a", str(task_id)), self._stderr_file.replace("%a", str(task_id)))
+
+    def _task_command(self, task_id):
+        if self.add_site_config_database or self.add_site_config:
+            return self._source_site_config(database=self.add_site_config_database, command=self.commands[task_id])
+        return self.commands[task_id]
+
+    def _build_array_command(self, task_ids):
+        lines = ['case "$SLURM_ARRAY_TASK_ID" in']
+        for task_id in task_ids:
+            lines += ["%d)" % task_id, "    %s" % self._task_command(task_id), "    ;;"]
+        lines += ["*)", '    echo "Unknown array task $SLURM_ARRAY_TASK_ID" 1>&2', "    exit 1", "    ;;", "esac"]
+        return "\n".join(lines)
+
+    def submit_array(self, task_ids):
+        """Submit the commands with the given task indices as one job array and return the array job id."""
+        # the default run directory is removed after each submission
+        os.makedirs(self.run_dir, exist_ok=True)
+        sbatch_cmd = self._build_sbatch_command(
+            command=self._build_array_command(task_ids),
+            extra_args=["--array=%s" % _format_array_spec(task_ids, self.max_concurrent)],
+        )
+        logger.info(" ".join(sbatch_cmd))
+        output = subprocess.run(sbatch_cmd, check=True, capture_output=True)
+        job_id = int(output.stdout.decode("utf-8").split()[-1])
+        self.job_id = job_id
+        self.job_ids.append(job_id)
+        logger.debug(f"Submitted array: {job_id} tasks {task_ids}")
+        if self._cancelled:
+            self.cancel()
+        self._cleanup()
+        return job_id
+
+    def monitor_array(self, job_id, task_ids):
+        """Wait until all tasks in task_ids of an array job have finished and record their status."""
+        logger.info(f"Monitoring array job {job_id}")
+        task_keys = ["%s_%d" % (job_id, task_id) for task_id in task_ids]
+        # track all tasks first so that they are polled together
+        for task_key in task_keys:
+            self.poller.track(task_key)
+        try:
+            for task_id, task_key in zip(task_ids, task_keys):
+                self.statuses[task_id] = self.poller.wait(task_key)
+                logger.debug(f"Array job {job_id} task {task_id} finished with status {self.statuses[task_id]}")
+        finally:
+            for task_key in task_keys:
+                self.poller.untrack(task_key)
+        return [self.statuses[task_id] for task_id in task_ids]
+
+    def cancel(self):
+        """Cancel all submitted array jobs and stop any further retries."""
+        self._cancelled = True
+        for job_id in self.job_ids:
+            try:
+                subprocess.run(["scancel", str(job_id)], check=True)
+                logger.info(f"Cancelled array job {job_id}")
+            except Exception as e:
+                logger.warning(f"Unable to cancel array job {job_id}: {e}")
+
+    def run(self, retries=3):
+        """Run all commands and return the list of their final JobStatus values."""
+        attempts = [0] * len(self.commands)
+        todo = list(range(len(self.commands)))
+        while todo and not self._cancelled:
+            # tasks needing the same memory limit are submitted together
+            submitted = []
+            for memory_limit in sorted({self.task_memory_limits[task_id] for task_id in todo}, key=int):
+                task_ids = [task_id for task_id in todo if self.task_memory_limits[task_id] == memory_limit]
+                self.memory_limit = memory_limit
+                submitted.append((self.submit_array(task_ids), task_ids))
+            todo = []
+            for job_id, task_ids in submitted:
+                self.monitor_array(job_id, task_ids)
+                for task_id in task_ids:
+                    attempts[task_id] += 1
+                    status = self.statuses[task_id]
+                    if status == JobStatus.COMPLETED or self._cancelled or attempts[task_id] >= retries:
+                        continue
+                    if status == JobStatus.OOM:
+                        self.task_memory_limits[task_id] = str(int(self.task_memory_limits[task_id]) * 2)
+                    logger.info(f"Retrying task {task_id} of array job {job_id} with memory limit {self.task_memory_limits[task_id]}")
+                    todo.append(task_id)
+        return list(self.statuses)
+
+
+class RunRemoteDag:
+    """Submit a set of dependent commands up front as Slurm jobs linked by --dependency=afterok.
+
+    Each job starts as soon as the jobs it depends on have completed successfully, without
+    a round trip to the client, and the client waits only for the jobs nothing depends
+    on.  Jobs whose dependencies fail are cancelled by Slurm (--kill-on-invalid-dep).
+    Failed jobs are not resubmitted.
+    """
+
+    def __init__(self, job_name, log_dir, run_dir=None, add_site_config=False, add_site_config_database=False, poller=None):
+        self.job_name = job_name
+        self.log_dir = log_dir
+        self.run_dir = run_dir
+        self.add_site_config = add_site_config
+        self.add_site_config_database = add_site_config_database
+        self.poller = poller if poller is not None else get_job_status_poller()
+        self.jobs = {}
+        self.dependencies = {}
+        self.job_ids = {}
+        self.statuses = {}
+
+    def add_job(self, name, command, depends_on=(), timeout=90, memory_limit=16000, number_of_processors=1):
+        """Add a command named name which starts after the jobs named in depends_on have completed."""
+        if name in self.jobs:
+            raise ValueError("Duplicate job name %r" % name)
+        for parent in depends_on:
+            if parent not in self.jobs:
+                raise ValueError("Job %r depends on unknown job %r" % (name, parent))
+        self.jobs[name] = RunRemote(
+            command=command,
+            job_name="%s_%s" % (self.job_name, name),
+            log_dir=self.log_dir,
+            run_dir=self.run_dir,
+            timeout=timeout,
+            memory_limit=memory_limit,
+            number_of_processors=number_of_processors,
+            add_site_config=self.add_site_config,
+            add_site_config_database=self.add_site_config_database,
+            poller=self.poller,
+        )
+        self.dependencies[name] = list(depends_on)
+        self.statuses[name] = JobStatus.OTHER
+        return name
+
+    def get_final_jobs(self):
+        """Return the names of the jobs no other job depends on."""
+        parents = {parent for depends_on in self.dependencies.values() for parent in depends_on}
+        return [name for name in self.jobs if name not in parents]
+
+    def _sbatch_command(self, name):
+        extra_args = []
+        if self.dependencies[name]:
+            extra_args += ["--dependency=afterok:" + ":".join(str(self.job_ids[parent]) for parent in self.dependencies[name]), "--kill-on-invalid-dep=yes"]
+        job = self.jobs[name]
+        os.makedirs(job.run_dir, exist_ok=True)
+        return job._build_sbatch_command(command=job._workflow_command(), extra_args=extra_args)
+
+    def submit(self):
+        """Submit all jobs - jobs are added after the jobs they depend on, so insertion order is a valid order."""
+        for name, job in self.jobs.items():
+            sbatch_cmd = self._sbatch_command(name)
+            logger.info(" ".join(sbatch_cmd))
+            output = subprocess.run(sbatch_cmd, check=True, capture_output=True)
+            self.job_ids[name] = job._submitted(output.stdout)
+        return dict(self.job_ids)
+
+    async def submit_async(self):
+        """As submit() without blocking the event loop."""
+        for name, job in self.jobs.items():
+            sbatch_cmd = self._sbatch_command(name)
+            logger.info(" ".join(sbatch_cmd))
+            self.job_ids[name] = await job._submitted_async(await job._run_command_async(sbatch_cmd))
+        return dict(self.job_ids)
+
+    def _order_waits(self):
+        # the final jobs finish last, after which the status of every other job is known
+        final_jobs = self.get_final_jobs()
+        return final_jobs + [name for name in self.jobs if name not in final_jobs]
+
+    def wait(self):
+        """Wait for all submitted jobs to finish and return the dictionary of job names and JobStatus."""
+        for name in self.job_ids:
+            self.poller.track(self.job_ids[name])
+        try:
+            for name in self._order_waits():
+                self.statuses[name] = self.poller.wait(self.job_ids[name])
+        finally:
+            for name in self.job_ids:
+                self.poller.untrack(self.job_ids[name])
+        return dict(self.statuses)
+
+    async def wait_async(self):
+        """As wait() without blocking the event loop."""
+        for name in self.job_ids:
+            self.poller.track(self.job_ids[name])
+        try:
+            for name in self._order_waits():
+                self.statuses[name] = await self.poller.wait_async(self.job_ids[name])
+        except asyncio.CancelledError:
+            await self.cancel_async()
+            raise
+        finally:
+            for name in self.job_ids:
+                self.poller.untrack(self.job_ids[name])
+        return dict(self.statuses)
+
+    def run(self):
+        """Submit all jobs and wait for them to finish - returns the dictionary of job names and JobStatus."""
+        self.submit()
+        return self.wait()
+
+    async def run_async(self):
+        await self.submit_async()
+        return await self.wait_async()
+
+    def cancel(self):
+        """Cancel all submitted jobs."""
+        for job in self.jobs.values():
+            if job.job_id is not None:
+                job.cancel()
+
+    async def cancel_async(self):
+        """As cancel() without blocking the event loop."""
+        await asyncio.gather(*[job.cancel_async() for job in self.jobs.values() if job.job_id is not None])
+
+
 if __name__ == "__main__":
     parser = argparse.ArgumentParser()
     subparsers = parser.add_subparsers(dest="comm")
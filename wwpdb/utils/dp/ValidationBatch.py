@@ -0,0 +1,296 @@
+##
+# File: ValidationBatch.py
+# Date: 17-Oct-2026
+#
+# Updates:
+##
+"""
+Batch driver running ValidationWrapper validation over many entries.
+
+Entries are validated in parallel in a bounded pool of worker processes (see
+RcsbDpBatch.runEntries()), with the validation commands run by the local or Slurm
+execution backend.  The reports of each entry are written to its own directory of
+the output tree:
+
+    <output_dir>/<entry_id>/<entry_id>_validation.pdf, .xml, .cif, .log
+                           <entry_id>_full_validation.pdf
+                           <entry_id>_multipercentile_validation.png, .svg
+                           <entry_id>_validation_images.tar
+                           <entry_id>_map_coef.mtz                         (annot-wwpdb-validate-all-v2)
+                           <entry_id>_map_coef_fo.cif, _map_coef_2fo.cif   (annot-wwpdb-validate-all-sf)
+
+Working files and the validation run directory of each entry are kept below the
+work directory and removed once the entry is finished.  A status manifest (JSON or
+CSV) is rewritten as entries complete, and a rerun skips the entries it reports as
+completed.
+
+Input manifest entries are dictionaries (JSON list or CSV rows) with the keys:
+
+    entry_id       -  identifier of the entry (used for the output directory and file names)
+    model_path     -  model file
+    sf_path, cs_path, map_path, restraint_path, fsc_path, emdb_xml_path
+                   -  (optional) experimental data files
+    mode           -  (optional) validation mode (server, deposit, release or annotate)
+    op             -  (optional) validation operation overriding that of the batch
+    pdb_id, emdb_id, kind
+                   -  (optional) passed on to the validation
+    params         -  (optional, JSON only) dictionary of extra addInput() parameters
+
+"""
+
+import argparse
+import functools
+import logging
+import os
+import shutil
+import sys
+import time
+
+from wwpdb.utils.dp.RcsbDpBatch import STATUS_COMPLETED, STATUS_FAILED, isOpSuccess, readManifest, runEntries
+from wwpdb.utils.dp.ValidationWrapper import ValidationWrapper
+
+logger = logging.getLogger(__name__)
+
+VALIDATION_OPS = ["annot-wwpdb-validate-all", "annot-wwpdb-validate-all-v2", "annot-wwpdb-validate-all-sf"]
+VALIDATION_MANIFEST_FIELDS = ["entry_id", "op", "mode", "status", "return_code", "outputs", "missing", "log_path", "elapsed", "message"]
+
+# Output names and file name suffixes in the order of the export list of each operation
+REPORT_FILES = [
+    ("pdf", "_validation.pdf"),
+    ("xml", "_validation.xml"),
+    ("full_pdf", "_full_validation.pdf"),
+    ("png", "_multipercentile_validation.png"),
+    ("svg", "_multipercentile_validation.svg"),
+    ("image_tar", "_validation_images.tar"),
+    ("cif", "_validation.cif"),
+]
+MAP_COEF_FILES = {
+    "annot-wwpdb-validate-all": [],
+    "annot-wwpdb-validate-all-v2": [("map_coef_mtz", "_map_coef.mtz")],
+    "annot-wwpdb-validate-all-sf": [("map_coef_fo", "_map_coef_fo.cif"), ("map_coef_2fo", "_map_coef_2fo.cif")],
+}
+
+# Entry keys of input files and the validation inputs they are passed as
+ENTRY_FILE_INPUTS = [
+    ("sf_path", "sf_file_path"),
+    ("cs_path", "cs_file_path"),
+    ("map_path", "vol_file_path"),
+    ("restraint_path", "nmr_restraint_file_path"),
+    ("fsc_path", "fsc_file_path"),
+    ("emdb_xml_path", "emdb_xml_path"),
+]
+ENTRY_PARAM_INPUTS = [("mode", "request_validation_mode"), ("pdb_id", "entry_id"), ("emdb_id", "emdb_id"), ("kind", "kind")]
+
+
+def getOutputPaths(op, entryId, outputDir):
+    """Return the list of (output name, path) pairs exported by the validation operation op for entryId."""
+    entryOutputDir = os.path.join(outputDir, str(entryId))
+    return [(name, os.path.join(entryOutputDir, str(entryId) + suffix)) for name, suffix in REPORT_FILES + MAP_COEF_FILES[op]]
+
+
+def runValidationEntry(entry, op, outputDir, workDir, siteId, params=None, executor=None, nodeLocalStaging=False, cleanup=True, testMode=False):
+    """Validate one entry and export its reports to the output tree.
+
+    Returns a manifest record for the entry.
+    """
+    startTime = time.time()
+    entryId = entry["entry_id"]
+    op = entry.get("op") or op
+    entryWorkDir = os.path.join(workDir, str(entryId))
+    wrkPath = os.path.join(entryWorkDir, "work")
+    runDir = os.path.join(entryWorkDir, "run")
+    logPath = os.path.join(outputDir, str(entryId), "%s_validation.log" % entryId)
+    rec = {
+        "entry_id": entryId,
+        "op": op,
+        "mode": entry.get("mode"),
+        "status": STATUS_FAILED,
+        "return_code": None,
+        "outputs": {},
+        "missing": [],
+        "log_path": logPath,
+        "elapsed": None,
+        "message": None,
+    }
+    try:
+        if op not in VALIDATION_OPS:
+            rec["message"] = "unknown validation operation %s" % op
+            return rec
+        # left over from an earlier run
+        shutil.rmtree(entryWorkDir, ignore_errors=True)
+        os.makedirs(os.path.dirname(logPath), 0o755, exist_ok=True)
+        outputList = getOutputPaths(op, entryId, outputDir)
+        for pth in [logPath] + [pth for _name, pth in outputList]:
+            if os.path.exists(pth):
+                os.remove(pth)
+        vw = ValidationWrapper(tmpPath=entryWorkDir, siteId=siteId, testMode=testMode)
+        vw.setWorkingDir(wrkPath)
+        if executor is not None and not vw.setExecutor(executor):
+            rec["message"] = "unknown executor %s" % executor
+            return rec
+        vw.setNodeLocalStaging(nodeLocalStaging)
+        allParams = dict(params) if params else {}
+        for key, name in ENTRY_FILE_INPUTS:
+            if entry.get(key):
+                allParams[name] = os.path.abspath(entry[key])
+        for key, name in ENTRY_PARAM_INPUTS:
+            if entry.get(key):
+                allParams[name] = entry[key]
+        allParams.update(entry.get("params") or {})
+        if "run_dir" not in allParams and not (nodeLocalStaging and vw.getExecutor().remote):
+            allParams["run_dir"] = runDir
+        for name, value in allParams.items():
+            vw.addInput(name=name, value=value)
+        vw.imp(entry["model_path"])
+        #
+        ret = vw.op(op)
+        rec["return_code"] = ret if isinstance(ret, int) else str(ret)
+        if not isOpSuccess(ret):
+            rec["message"] = "operation %s returned %r" % (op, ret)
+        if testMode:
+            rec["status"] = STATUS_COMPLETED
+        else:
+            vw.expLogAll(logPath)
+            if isOpSuccess(ret):
+                vw.expList(dstPathList=[pth for _name, pth in outputList])
+            for name, pth in outputList:
+                if os.path.exists(pth):
+                    rec["outputs"][name] = pth
+                else:
+                    rec["missing"].append(name)
+            # the XML report is the one output every validation run has to produce
+            if isOpSuccess(ret) and "xml" in rec["outputs"]:
+                rec["status"] = STATUS_COMPLETED
+            elif rec["message"] is None:
+                rec["message"] = "validation report missing"
+    except Exception as e:  # noqa: BLE001
+        logger.exception("Entry %s failing with %s", entryId, str(e))
+        rec["message"] = str(e)
+    finally:
+        if cleanup:
+            # working files of failed entries are kept for inspection but not their validation run directories
+            shutil.rmtree(entryWorkDir if rec["status"] == STATUS_COMPLETED else runDir, ignore_errors=True)
+        rec["elapsed"] = round(time.time() - startTime, 3)
+    return rec
+
+
+class ValidationBatch:
+    """Validate a manifest of entries in a bounded pool of worker processes."""
+
+    def __init__(
+        self,
+        outputDir,
+        op="annot-wwpdb-validate-all",
+        workDir=None,
+        siteId="DEV",
+        numWorkers=4,
+        executor=None,
+        nodeLocalStaging=False,
+        resultManifestPath=None,
+        cleanup=True,
+        testMode=False,
+    ):
+        """
+        Args:
+            outputDir (str): root of the output tree holding one subdirectory per entry
+            op (str): validation operation (see VALIDATION_OPS) for entries not naming their own
+            workDir (str): directory for working files and validation run directories - default outputDir/work
+            siteId (str): site identifier passed to ValidationWrapper
+            numWorkers (int): maximum number of entries validated at the same time
+            executor (str): execution backend of the validation commands (see RcsbDpUtility.setExecutor()) - default that of the site
+            nodeLocalStaging (bool): run remote validation in node-local scratch space (see RcsbDpUtility.setNodeLocalStaging())
+            resultManifestPath (str): status manifest (.json or .csv) - default outputDir/validation-manifest.json
+            cleanup (bool): remove the working files of entries once they complete
+            testMode (bool): run ValidationWrapper in test mode (operations are bypassed)
+        """
+        self.__outputDir = os.path.abspath(outputDir)
+        self.__op = op
+        self.__workDir = os.path.abspath(workDir) if workDir else os.path.join(self.__outputDir, "work")
+        self.__siteId = siteId
+        self.__numWorkers = max(1, int(numWorkers))
+        self.__executor = executor
+        self.__nodeLocalStaging = nodeLocalStaging
+        self.__resultManifestPath = resultManifestPath if resultManifestPath else os.path.join(self.__outputDir, "validation-manifest.json")
+        self.__cleanup = cleanup
+        self.__testMode = testMode
+        self.__params = {}
+        for dirPath in (self.__outputDir, self.__workDir):
+            if not os.path.isdir(dirPath):
+                os.makedirs(dirPath, 0o755)
+
+    def addInput(self, name=None, value=None, type="param"):  # noqa: A002 # pylint: disable=redefined-builtin
+        """Add a named validation input applied to every entry (see RcsbDpUtility.addInput())."""
+        if type == "file":
+            value = os.path.abspath(value)
+        elif type != "param":
+            return False
+        self.__params[name] = value
+        return True
+
+    def getResultManifestPath(self):
+        return self.__resultManifestPath
+
+    def getOutputPaths(self, entryId, op=None):
+        """Return a dictionary of the output names and paths of entryId."""
+        return dict(getOutputPaths(op or self.__op, entryId, self.__outputDir))
+
+    def run(self, entryList):
+        """Validate the entries in entryList skipping those already completed in the status manifest.
+
+        Returns the list of manifest records for all entries in entryList.
+        """
+        worker = functools.partial(
+            runValidationEntry,
+            op=self.__op,
+            outputDir=self.__outputDir,
+            workDir=self.__workDir,
+            siteId=self.__siteId,
+            params=self.__params,
+            executor=self.__executor,
+            nodeLocalStaging=self.__nodeLocalStaging,
+            cleanup=self.__cleanup,
+            testMode=self.__testMode,
+        )
+        return runEntries(
+            entryList, worker, self.__resultManifestPath, numWorkers=self.__numWorkers, isCompleted=self.__isCompleted, fieldList=VALIDATION_MANIFEST_FIELDS
+        )
+
+    def __isCompleted(self, rec):
+        return self.__testMode or os.path.exists((rec.get("outputs") or {}).get("xml") or "")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--manifest", help="input manifest of entries (.json or .csv)", type=str, required=True)
+    parser.add_argument("--output_dir", help="root of the output tree", type=str, required=True)
+    parser.add_argument("--op", help="validation operation", type=str, choices=VALIDATION_OPS, default="annot-wwpdb-validate-all")
+    parser.add_argument("--work_dir", help="directory for working files (default output_dir/work)", type=str)
+    parser.add_argument("--result_manifest", help="status manifest (.json or .csv)", type=str)
+    parser.add_argument("--workers", help="number of entries validated at the same time", type=int, default=4)
+    parser.add_argument("--executor", help="execution backend (slurm, local-pool or inline)", type=str)
+    parser.add_argument("--staging", help="run remote validation in node-local scratch space", action="store_true")
+    parser.add_argument("--site_id", help="site identifier", type=str, default=os.environ.get("WWPDB_SITE_ID", "DEV"))
+    parser.add_argument("--keep_work", help="keep working files of completed entries", action="store_true")
+    parser.add_argument("-d", "--debug", help="debugging", action="store_const", dest="loglevel", const=logging.DEBUG, default=logging.INFO)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=args.loglevel, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+    batch = ValidationBatch(
+        outputDir=args.output_dir,
+        op=args.op,
+        workDir=args.work_dir,
+        siteId=args.site_id,
+        numWorkers=args.workers,
+        executor=args.executor,
+        nodeLocalStaging=args.staging,
+        resultManifestPath=args.result_manifest,
+        cleanup=not args.keep_work,
+    )
+    recList = batch.run(readManifest(args.manifest))
+    nFailed = len([rec for rec in recList if rec["status"] != STATUS_COMPLETED])
+    logger.info("Validation completed with %d of %d entries failed", nFailed, len(recList))
+    return 1 if nFailed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
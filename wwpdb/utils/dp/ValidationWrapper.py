@@ -28,9 +28,9 @@ logger = logging.getLogger(__name__)
 
 
 class ValidationWrapper(RcsbDpUtility):
-    def __init__(self, tmpPath="/scratch", siteId="DEV", verbose=False, log=sys.stderr):
+    def __init__(self, tmpPath="/scratch", siteId="DEV", verbose=False, log=sys.stderr, testMode=False):
         logger.debug("Starting")
-        super(ValidationWrapper, self).__init__(tmpPath=tmpPath, siteId=siteId, verbose=verbose, log=log)
+        super(ValidationWrapper, self).__init__(tmpPath=tmpPath, siteId=siteId, verbose=verbose, log=log, testMode=testMode)
         self.__op = None
         self._tmppath = tmpPath
         self.__siteId = siteId
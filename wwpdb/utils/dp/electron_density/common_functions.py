@@ -64,36 +64,90 @@ def run_command_and_check_output_file(command, process_name, output_file, workdi
     return False
 
 
-def convert_mdb_to_binary_cif(node_path, volume_server_query_path, map_id, source_id, mdb_map_path, output_file, working_dir, detail=4):
+def get_detail_output_path(output_file, detail):
+    """
+    :return: output file name with the detail level added before the extension - map.bcif -> map_d2.bcif
+    """
+    root, ext = os.path.splitext(output_file)
+    return "{}_d{}{}".format(root, detail, ext)
+
+
+def query_mdb_maps(node_path, volume_server_query_path, mdb_maps, detail_levels, working_dir):
+    """
+    converts mdb maps to BinaryCIF at several detail levels with a single volume-server-query run
+    :param str node_path: path to node
+    :param str volume_server_query_path: path to volume-server-query
+    :param list mdb_maps: list of (map_id, source_id, mdb_map_path)
+    :param list detail_levels: detail levels to convert each map to
+    :param str working_dir: folder for the jobs file and the BinaryCIF files
+    :return dict: {map_id: {detail: BinaryCIF file}}, or None if the query failed
+    """
     query_kind = "cell"
-    map_file_name = "{}_{}-{}_d{}.bcif".format(map_id, source_id, query_kind, detail)
     if not working_dir:
         working_dir = os.getcwd()
-    temp_out_file = os.path.join(working_dir, map_file_name)
-    json_filename = "conversion.json"
-    json_content = [
-        {
-            "source": {"filename": mdb_map_path, "name": map_id, "id": source_id},
-            "query": {"kind": query_kind},
-            "params": {"detail": detail, "asBinary": True},
-            "outputFolder": working_dir,
-            "outputFilename": map_file_name,
-        }
-    ]
-    if working_dir:
-        working_json = os.path.join(working_dir, json_filename)
-    else:
-        working_json = json_filename
+    json_content = []
+    bcif_files = {}
+    for map_id, source_id, mdb_map_path in mdb_maps:
+        for detail in detail_levels:
+            map_file_name = "{}_{}-{}_d{}.bcif".format(map_id, source_id, query_kind, detail)
+            json_content.append(
+                {
+                    "source": {"filename": mdb_map_path, "name": map_id, "id": source_id},
+                    "query": {"kind": query_kind},
+                    "params": {"detail": detail, "asBinary": True},
+                    "outputFolder": working_dir,
+                    "outputFilename": map_file_name,
+                }
+            )
+            bcif_files.setdefault(map_id, {})[detail] = os.path.join(working_dir, map_file_name)
+    working_json = os.path.join(working_dir, "conversion.json")
     with open(working_json, "w") as out_file:
         json.dump(json_content, out_file)
     command = "{} {} --jobs {}".format(node_path, volume_server_query_path, working_json)
-    ret = run_command_and_check_output_file(command=command, process_name="mdb_to_binary_cif", workdir=working_dir, output_file=temp_out_file)
-    if ret:
+    if not run_command(command=command, process_name="mdb_to_binary_cif", workdir=working_dir):
+        logger.error("command returned non-zero exit status")
+        return None
+    missing = [pth for level_files in bcif_files.values() for pth in level_files.values() if not os.path.exists(pth)]
+    if missing:
+        logger.error("output files missing: {}".format(missing))  # pylint: disable=logging-format-interpolation
+        return None
+    return bcif_files
+
+
+def convert_mdb_to_binary_cif_levels(node_path, volume_server_query_path, map_id, source_id, mdb_map_path, output_files, working_dir):
+    """
+    converts an mdb map to BinaryCIF at several detail levels with a single volume-server-query run
+    :param dict output_files: {detail: output BinaryCIF file}
+    :return dict: {detail: output file}, empty if the conversion failed
+    """
+    bcif_files = query_mdb_maps(
+        node_path=node_path,
+        volume_server_query_path=volume_server_query_path,
+        mdb_maps=[(map_id, source_id, mdb_map_path)],
+        detail_levels=list(output_files),
+        working_dir=working_dir,
+    )
+    if bcif_files is None:
+        return {}
+    for detail, output_file in output_files.items():
         output_folder = os.path.dirname(output_file)
         if output_folder:
             if not os.path.exists(output_folder):
                 os.makedirs(output_folder)
-        shutil.copy(temp_out_file, output_file)
+        shutil.copy(bcif_files[map_id][detail], output_file)
         logger.debug("output file {}".format(output_file))  # pylint: disable=logging-format-interpolation
-        return True
-    return False
+    return dict(output_files)
+
+
+def convert_mdb_to_binary_cif(node_path, volume_server_query_path, map_id, source_id, mdb_map_path, output_file, working_dir, detail=4):
+    return bool(
+        convert_mdb_to_binary_cif_levels(
+            node_path=node_path,
+            volume_server_query_path=volume_server_query_path,
+            map_id=map_id,
+            source_id=source_id,
+            mdb_map_path=mdb_map_path,
+            output_files={detail: output_file},
+            working_dir=working_dir,
+        )
+    )
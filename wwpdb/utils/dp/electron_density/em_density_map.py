@@ -5,7 +5,8 @@ import logging
 import os
 import sys
 
-from wwpdb.utils.dp.electron_density.common_functions import convert_mdb_to_binary_cif, run_command_and_check_output_file
+from wwpdb.utils.dp.electron_density.common_functions import convert_mdb_to_binary_cif_levels, get_detail_output_path, run_command_and_check_output_file
+from wwpdb.utils.dp.electron_density.volume_server_bcif import read_ccp4_channel, read_ccp4_header, validate_ccp4_header, write_volume_server_bcif_levels
 
 logger = logging.getLogger()
 
@@ -19,7 +20,16 @@ class EmVolumes:
         volume_server_query_path,
         binary_map_out,
         working_dir,
+        in_process=False,
+        detail_levels=None,
+        max_voxels=None,
     ):
+        """
+        :param in_process: write the BinaryCIF in process, with volume-server as fallback if node_path is set,
+            rather than with volume-server-pack and volume-server-query
+        :param detail_levels: further detail levels, each written to binary_map_out with _d<level> added
+        :param max_voxels: largest map accepted, in voxels - no limit if None
+        """
         self.em_map = em_map
         self.em_map_name = os.path.basename(em_map)
         self.mdb_map = "em_map.mdb"
@@ -29,12 +39,24 @@ class EmVolumes:
         self.mdb_map_path = None
         self.bcif_map_path = binary_map_out
         self.workdir = working_dir or os.getcwd()
+        self.in_process = in_process
+        self.detail = 1
+        self.detail_levels = list(detail_levels or [])
+        self.max_voxels = max_voxels
 
     def run_conversion(self):
+        if not self.validate_map():
+            return False
         bcif_dir_out = os.path.dirname(self.bcif_map_path)
         if bcif_dir_out:
             if not os.path.exists(bcif_dir_out):
                 os.makedirs(bcif_dir_out)
+        if self.in_process:
+            if self.write_binary_cif():
+                return True
+            if not self.node_path:
+                return False
+            logging.warning("falling back to volume-server for %s", self.em_map)  # noqa: LOG015
         logging.debug("temp working folder: %s", self.workdir)  # noqa: LOG015
         self.mdb_map_path = os.path.join(self.workdir, self.mdb_map)
 
@@ -45,6 +67,47 @@ class EmVolumes:
 
         return worked
 
+    def validate_map(self):
+        """
+        checks the CCP4/MRC header of the map - without reading the map values
+        :return: True if the map can be converted, False otherwise
+        """
+        if not os.path.exists(self.em_map):
+            logging.error("input map file missing: %s", self.em_map)  # noqa: LOG015
+            return False
+        try:
+            problems = validate_ccp4_header(read_ccp4_header(self.em_map), max_voxels=self.max_voxels)
+        except Exception as e:  # noqa: BLE001
+            problems = [str(e)]
+        for problem in problems:
+            logging.error("invalid map %s: %s", self.em_map, problem)  # noqa: LOG015
+        return not problems
+
+    def get_output_files(self):
+        """
+        :return: dictionary {detail: BinaryCIF output file}
+        """
+        output_files = {self.detail: self.bcif_map_path}
+        for detail in self.detail_levels:
+            output_files.setdefault(detail, get_detail_output_path(self.bcif_map_path, detail))
+        return output_files
+
+    def write_binary_cif(self):
+        """
+        writes the BinaryCIF volume in process
+        :return: True if worked, False if failed
+        """
+        if not os.path.exists(self.em_map):
+            logging.error("input map file missing: %s", self.em_map)  # noqa: LOG015
+            return False
+        try:
+            channel = read_ccp4_channel(self.em_map, "em", max_voxels=self.max_voxels)
+            write_volume_server_bcif_levels([channel], self.get_output_files(), source_id="em")
+            return True
+        except Exception as e:  # noqa: BLE001
+            logging.error("writing BinaryCIF from %s failed: %s", self.em_map, e)  # noqa: LOG015
+        return False
+
     def make_volume_server_map(self):
         if os.path.exists(self.em_map):
             command = "%s %s em %s %s" % (self.node_path, self.volume_server_pack_path, self.em_map, self.mdb_map_path)
@@ -56,15 +119,16 @@ class EmVolumes:
         return False
 
     def convert_map_to_binary_cif(self):
-        return convert_mdb_to_binary_cif(
-            node_path=self.node_path,
-            volume_server_query_path=self.volume_server_query_path,
-            map_id="em_volume",
-            source_id="em",
-            output_file=self.bcif_map_path,
-            working_dir=self.workdir,
-            mdb_map_path=self.mdb_map_path,
-            detail=1,
+        return bool(
+            convert_mdb_to_binary_cif_levels(
+                node_path=self.node_path,
+                volume_server_query_path=self.volume_server_query_path,
+                map_id="em_volume",
+                source_id="em",
+                output_files=self.get_output_files(),
+                working_dir=self.workdir,
+                mdb_map_path=self.mdb_map_path,
+            )
         )
 
 
@@ -73,9 +137,12 @@ def main():  # pragma: no cover
     parser.add_argument("--em_map", help="EM map", type=str, required=True)
     parser.add_argument("--working_dir", help="working dir", type=str, required=True)
     parser.add_argument("--binary_map_out", help="Output filename of binary map", type=str, required=True)
-    parser.add_argument("--node_path", help="path to node", type=str, required=True)
-    parser.add_argument("--volume_server_pack_path", help="path to volume-server-pack", type=str, required=True)
-    parser.add_argument("--volume_server_query_path", help="path to volume-server-query", type=str, required=True)
+    parser.add_argument("--node_path", help="path to node", type=str)
+    parser.add_argument("--volume_server_pack_path", help="path to volume-server-pack", type=str)
+    parser.add_argument("--volume_server_query_path", help="path to volume-server-query", type=str)
+    parser.add_argument("--in_process", help="write the BinaryCIF in process, with volume-server as fallback", action="store_true")
+    parser.add_argument("--detail_levels", help="further detail levels to write, to binary_map_out with _d<level> added", type=int, nargs="*")
+    parser.add_argument("--max_voxels", help="largest map accepted, in voxels", type=int)
     parser.add_argument("--keep_working_directory", help="keep working directory", action="store_true")
     parser.add_argument("--debug", help="debugging", action="store_const", dest="loglevel", const=logging.DEBUG, default=logging.INFO)  # noqa: LOG015
 
@@ -93,6 +160,9 @@ def main():  # pragma: no cover
         volume_server_query_path=args.volume_server_query_path,
         binary_map_out=args.binary_map_out,
         working_dir=args.working_dir,
+        in_process=args.in_process,
+        detail_levels=args.detail_levels,
+        max_voxels=args.max_voxels,
     )
     worked = em.run_conversion()
     logging.info("EM map conversion worked: {}".format(worked))  # noqa: G001,LOG015 pylint: disable=logging-format-interpolation
@@ -0,0 +1,492 @@
+"""
+In-process writer of Mol* volume server BinaryCIF volumes.
+
+Writes the same volume as running volume-server-pack followed by a "cell" query of
+volume-server-query at a given detail level, without node and without the intermediate
+.mdb file.  As the pack step does, the map is downsampled with a 1 4 6 4 1 kernel into
+samplings of rate 1, 2, 4 ...; as the query does, the finest sampling which fits in
+the voxel limit of the detail level is written, its values quantized into 255 steps.
+"""
+
+import datetime
+import gzip
+import logging
+import os
+import uuid
+
+import msgpack
+import numpy as np
+
+from wwpdb.utils.dp import __version__
+
+logger = logging.getLogger(__name__)
+
+# maximum number of voxels in the output by detail level - as volume-server-query
+DETAIL_VOXEL_LIMITS = [
+    int(0.5 * 1024 * 1024),
+    1 * 1024 * 1024,
+    2 * 1024 * 1024,
+    4 * 1024 * 1024,
+    8 * 1024 * 1024,
+    16 * 1024 * 1024,
+    24 * 1024 * 1024,
+]
+DEFAULT_VOXEL_LIMIT = 2 * 1024 * 1024
+
+# samplings are made down to one that fits in a single block of volume-server-pack
+BLOCK_SIZE = 96
+KERNEL = (1, 4, 6, 4, 1)
+
+# BinaryCIF type codes
+BCIF_INT8 = 1
+BCIF_INT32 = 3
+BCIF_UINT8 = 4
+BCIF_FLOAT32 = 32
+BCIF_FLOAT64 = 33
+
+# CCP4 map modes and their value types
+CCP4_MODE_DTYPES = {0: "i1", 1: "i2", 2: "f4"}
+# first byte of the machine stamp (header word 54) and the byte order it stands for
+CCP4_MACHINE_STAMPS = {0x44: "<", 0x11: ">"}
+
+# slices of the map downsampled at once
+CHUNK_SLICES = 16
+
+
+class VolumeChannel:
+    """
+    one map (channel) of a volume, as the header of a CCP4 map describes it
+
+    values is an array of shape (sections, rows, columns) - the column axis changes fastest.
+    axis_order, extent and origin are in column, row, section order, grid in x, y, z order.
+    """
+
+    def __init__(self, name, values, axis_order, extent, origin, grid, spacegroup_number, cell_size, cell_angles):
+        self.name = name
+        self.values = values
+        self.axis_order = list(axis_order)
+        self.extent = list(extent)
+        self.origin = list(origin)
+        self.grid = list(grid)
+        self.spacegroup_number = spacegroup_number
+        self.cell_size = list(cell_size)
+        self.cell_angles = list(cell_angles)
+
+    def get_fractional_origin(self):
+        return [self.origin[i] / self.grid[self.axis_order[i]] for i in range(3)]
+
+    def get_fractional_dimensions(self):
+        return [self.extent[i] / self.grid[self.axis_order[i]] for i in range(3)]
+
+
+def _parse_header(words, floats):
+    """
+    :param words: function returning the integer header word n (1-based)
+    :param floats: function returning the float header word n (1-based)
+    :return: dictionary of the header fields
+    """
+    return {
+        "extent": [words(1), words(2), words(3)],
+        "mode": words(4),
+        "origin": [words(5), words(6), words(7)],
+        "grid": [words(8), words(9), words(10)],
+        "cell_size": [floats(11), floats(12), floats(13)],
+        "cell_angles": [floats(14), floats(15), floats(16)],
+        "axis_order": [words(17) - 1, words(18) - 1, words(19) - 1],
+        "spacegroup_number": words(23),
+        "symmetry_bytes": words(24),
+        "origin_xyz": [floats(50), floats(51), floats(52)],
+    }
+
+
+def read_ccp4_header(map_path):
+    """
+    reads the header of a CCP4/MRC map (optionally gzipped) - the values are not read
+    :param map_path: CCP4 or MRC map file
+    :return: dictionary of the header fields, with the byte order and the file size (None if gzipped)
+    """
+    if map_path.endswith(".gz"):
+        with gzip.open(map_path, "rb") as ifh:
+            header = ifh.read(1024)
+        file_size = None
+    else:
+        with open(map_path, "rb") as ifh:
+            header = ifh.read(1024)
+        file_size = os.path.getsize(map_path)
+    if len(header) < 1024:
+        raise ValueError("map {} is shorter than a CCP4 header".format(map_path))
+    # the machine stamp gives the byte order - or else the mode has to make sense
+    if header[212] in CCP4_MACHINE_STAMPS:
+        byte_order = CCP4_MACHINE_STAMPS[header[212]]
+    elif int(np.frombuffer(header, dtype="<i4", count=4)[3]) in CCP4_MODE_DTYPES:
+        byte_order = "<"
+    else:
+        byte_order = ">"
+    words = np.frombuffer(header, dtype=byte_order + "i4")
+    floats = np.frombuffer(header, dtype=byte_order + "f4")
+    ret = _parse_header(lambda n: int(words[n - 1]), lambda n: float(floats[n - 1]))
+    ret["byte_order"] = byte_order
+    ret["file_size"] = file_size
+    return ret
+
+
+def validate_ccp4_header(header, max_voxels=None):
+    """
+    checks that a map can be converted from its header alone
+    :param header: dictionary from read_ccp4_header
+    :param max_voxels: largest number of voxels accepted - no limit if None
+    :return: list of the problems found - empty if none
+    """
+    problems = []
+    if header["mode"] not in CCP4_MODE_DTYPES:
+        problems.append("unsupported mode {}".format(header["mode"]))
+    if min(header["extent"]) < 1:
+        problems.append("invalid dimensions {}".format(header["extent"]))
+    if min(header["grid"]) < 1:
+        problems.append("invalid sampling grid {}".format(header["grid"]))
+    if sorted(header["axis_order"]) != [0, 1, 2]:
+        problems.append("invalid axis order {}".format([ax + 1 for ax in header["axis_order"]]))
+    if not all(np.isfinite(header["cell_size"])) or min(header["cell_size"]) <= 0:
+        problems.append("invalid cell size {}".format(header["cell_size"]))
+    if not all(np.isfinite(header["cell_angles"])) or not all(0 < angle < 180 for angle in header["cell_angles"]):
+        problems.append("invalid cell angles {}".format(header["cell_angles"]))
+    if not all(np.isfinite(header["origin_xyz"])):
+        problems.append("invalid origin {}".format(header["origin_xyz"]))
+    if header["symmetry_bytes"] < 0:
+        problems.append("invalid symmetry record length {}".format(header["symmetry_bytes"]))
+    if problems:
+        return problems
+    voxels = header["extent"][0] * header["extent"][1] * header["extent"][2]
+    if max_voxels is not None and voxels > max_voxels:
+        problems.append("{} voxels exceed the limit of {}".format(voxels, max_voxels))
+    if header["file_size"] is not None:
+        data_end = 1024 + header["symmetry_bytes"] + voxels * np.dtype(CCP4_MODE_DTYPES[header["mode"]]).itemsize
+        if header["file_size"] < data_end:
+            problems.append("file of {} bytes is shorter than the {} bytes given by the header".format(header["file_size"], data_end))
+    return problems
+
+
+def _channel_from_header(name, header, values):
+    axis_order = header["axis_order"]
+    if sorted(axis_order) != [0, 1, 2]:
+        raise ValueError("invalid axis order {} in map {}".format(axis_order, name))
+    grid = header["grid"]
+    cell_size = header["cell_size"]
+    origin = header["origin"]
+    # MRC maps may give the origin in Angstrom rather than as start indices
+    origin_xyz = header["origin_xyz"]
+    if not any(origin) and any(origin_xyz):
+        origin = [origin_xyz[ax] / (cell_size[ax] / grid[ax]) for ax in axis_order]
+    return VolumeChannel(
+        name=name,
+        values=values,
+        axis_order=axis_order,
+        extent=header["extent"],
+        origin=origin,
+        grid=grid,
+        spacegroup_number=header["spacegroup_number"],
+        cell_size=cell_size,
+        cell_angles=header["cell_angles"],
+    )
+
+
+def read_ccp4_channel(map_path, name, max_voxels=None):
+    """
+    reads a CCP4/MRC map (optionally gzipped) - the header is checked first and the values
+    of uncompressed maps are memory mapped in place
+    :param map_path: CCP4 or MRC map file
+    :param name: channel name
+    :param max_voxels: largest number of voxels accepted - no limit if None
+    :return: VolumeChannel
+    """
+    header = read_ccp4_header(map_path)
+    problems = validate_ccp4_header(header, max_voxels=max_voxels)
+    if problems:
+        raise ValueError("map {}: {}".format(map_path, "; ".join(problems)))
+    dtype = np.dtype(header["byte_order"] + CCP4_MODE_DTYPES[header["mode"]])
+    shape = tuple(reversed(header["extent"]))
+    offset = 1024 + header["symmetry_bytes"]
+    if map_path.endswith(".gz"):
+        with gzip.open(map_path, "rb") as ifh:
+            data = ifh.read()
+        values = np.frombuffer(data, dtype=dtype, count=shape[0] * shape[1] * shape[2], offset=offset).reshape(shape)
+    else:
+        values = np.memmap(map_path, dtype=dtype, mode="r", offset=offset, shape=shape)
+    return _channel_from_header(name, header, values)
+
+
+def channel_from_ccp4_map(ccp4, name):
+    """
+    :param ccp4: gemmi.Ccp4Map with an up to date header, as written by gemmi
+    :param name: channel name
+    :return: VolumeChannel sharing the values of the map grid
+    """
+    if [ccp4.header_i32(17), ccp4.header_i32(18), ccp4.header_i32(19)] != [1, 2, 3]:
+        raise ValueError("map {} is not in x, y, z axis order".format(name))
+    # gemmi grids are indexed (x, y, z)
+    values = np.array(ccp4.grid, copy=False).transpose(2, 1, 0)
+    return _channel_from_header(name, _parse_header(ccp4.header_i32, ccp4.header_float), values)
+
+
+def get_sampling_counts(sample_count, block_size=BLOCK_SIZE):
+    """
+    :param sample_count: number of samples along the column, row and section axes
+    :return: list of the sample counts of the samplings of rate 1, 2, 4 ...
+    """
+    counts = [list(sample_count)]
+    previous = list(sample_count)
+    single_block = False
+    while True:
+        following = [(s + 1) // 2 for s in previous]
+        if min(following) < 2:
+            return counts
+        # no point in downsampling below the block size
+        if max(following) < block_size:
+            if single_block:
+                return counts
+            single_block = True
+        counts.append(following)
+        previous = following
+
+
+def pick_sampling(sampling_counts, detail):
+    """
+    :param sampling_counts: sample counts of the samplings
+    :param detail: detail level
+    :return: index of the finest sampling that fits in the voxel limit of the detail level
+    """
+    limit = DETAIL_VOXEL_LIMITS[detail] if 0 <= detail < len(DETAIL_VOXEL_LIMITS) else DEFAULT_VOXEL_LIMIT
+    for index, counts in enumerate(sampling_counts):
+        if np.prod(counts) <= limit:
+            return index
+    return len(sampling_counts) - 1
+
+
+def _to_dtype(values, dtype):
+    if np.issubdtype(dtype, np.integer):
+        return np.trunc(values).astype(dtype)
+    return values.astype(dtype)
+
+
+def _apply_kernel(padded, axis, count):
+    """
+    :param padded: float array holding the two values beyond each end of the axis needed by the kernel
+    :return: count values along the axis filtered with the 1 4 6 4 1 kernel at every second position
+    """
+    acc = None
+    for offset, coefficient in enumerate(KERNEL):
+        tap = [slice(None)] * padded.ndim
+        tap[axis] = slice(offset, offset + 2 * count - 1, 2)
+        term = coefficient * padded[tuple(tap)]
+        acc = term if acc is None else acc + term
+    return acc * (1.0 / sum(KERNEL))
+
+
+def downsample_axis(values, axis):
+    """
+    downsamples the values by two along an axis with the 1 4 6 4 1 kernel - the edge values are repeated
+    :param values: (sections, rows, columns) array
+    :param axis: array axis to downsample
+    :return: array of the same type with (n + 1) // 2 values along the axis
+    """
+    size = values.shape[axis]
+    count = (size + 1) // 2
+    out_shape = list(values.shape)
+    out_shape[axis] = count
+    out = np.empty(out_shape, dtype=values.dtype.newbyteorder("="))
+    chunk_axis = 1 if axis == 0 else 0
+    pad = [(0, 0)] * 3
+    pad[axis] = (2, 2)
+    for start in range(0, values.shape[chunk_axis], CHUNK_SLICES):
+        chunk = [slice(None)] * 3
+        chunk[chunk_axis] = slice(start, start + CHUNK_SLICES)
+        padded = np.pad(np.asarray(values[tuple(chunk)], dtype=np.float64), pad, mode="edge")
+        out[tuple(chunk)] = _to_dtype(_apply_kernel(padded, axis, count), out.dtype)
+    return out
+
+
+def downsample(values):
+    """
+    :return: the next sampling of the values - downsampled along columns, rows and then sections, as
+        volume-server-pack does a block of CHUNK_SLICES output sections at a time, so that only the
+        output is allocated in full
+    """
+    size = values.shape[0]
+    count = (size + 1) // 2
+    dtype = values.dtype.newbyteorder("=")
+    out = np.empty((count, (values.shape[1] + 1) // 2, (values.shape[2] + 1) // 2), dtype=dtype)
+    for start in range(0, count, CHUNK_SLICES):
+        stop = min(start + CHUNK_SLICES, count)
+        # the input sections of the block and the two beyond each end read by the kernel - repeated at the edges
+        sections = np.clip(np.arange(2 * start - 2, 2 * stop + 1), 0, size - 1)
+        block = downsample_axis(downsample_axis(values[sections], 2), 1)
+        out[start:stop] = _to_dtype(_apply_kernel(np.asarray(block, dtype=np.float64), 0, stop - start), dtype)
+    return out
+
+
+def get_values_info(values):
+    """
+    :return: dictionary with the mean, sigma, min and max of the values
+    """
+    total = 0.0
+    squares = 0.0
+    minimum = np.inf
+    maximum = -np.inf
+    for start in range(0, values.shape[0], CHUNK_SLICES):
+        chunk = np.asarray(values[start : start + CHUNK_SLICES], dtype=np.float64)
+        total += float(chunk.sum())
+        squares += float(np.square(chunk).sum())
+        minimum = min(minimum, float(chunk.min()))
+        maximum = max(maximum, float(chunk.max()))
+    count = values.size
+    mean = total / count
+    return {"mean": mean, "sigma": float(np.sqrt(max(0.0, squares / count - mean * mean))), "min": minimum, "max": maximum}
+
+
+def quantize(values, minimum, maximum, num_steps=255):
+    """
+    :return: values as uint8 steps of the interval [minimum, maximum] - BinaryCIF IntervalQuantization
+    """
+    values = np.asarray(values, dtype=np.float64)
+    delta = (maximum - minimum) / (num_steps - 1)
+    if delta > 0:
+        steps = np.floor((values - minimum) / delta + 0.5)
+    else:
+        steps = np.zeros(values.shape)
+    steps[values <= minimum] = 0
+    steps[values >= maximum] = num_steps - 1
+    return steps.astype(np.uint8)
+
+
+def _column(name, data, encoding, mask=None):
+    return {"name": name, "data": {"data": data, "encoding": encoding}, "mask": mask}
+
+
+def _int_column(name, value):
+    return _column(name, np.array([value], dtype="<i4").tobytes(), [{"kind": "ByteArray", "type": BCIF_INT32}])
+
+
+def _float_column(name, value):
+    return _column(name, np.array([value], dtype="<f8").tobytes(), [{"kind": "ByteArray", "type": BCIF_FLOAT64}])
+
+
+def _string_column(name, value):
+    int_encoding = [{"kind": "ByteArray", "type": BCIF_INT32}]
+    string_data = value or ""
+    offsets = np.array([0, len(string_data)], dtype="<i4").tobytes()
+    encoding = [{"kind": "StringArray", "dataEncoding": int_encoding, "stringData": string_data, "offsetEncoding": int_encoding, "offsets": offsets}]
+    mask = None
+    if value is None:
+        # unknown (?)
+        mask = {"data": np.array([2], dtype="u1").tobytes(), "encoding": [{"kind": "ByteArray", "type": BCIF_UINT8}]}
+    return _column(name, np.array([-1 if value is None else 0], dtype="<i4").tobytes(), encoding, mask=mask)
+
+
+def _category(name, columns, row_count=1):
+    return {"name": name, "columns": columns, "rowCount": row_count}
+
+
+def _server_block(source_id):
+    columns = [
+        _string_column("server_version", __version__),
+        _string_column("datetime_utc", datetime.datetime.now(datetime.timezone.utc).strftime("%Y-%m-%d %H:%M:%S")),
+        _string_column("guid", str(uuid.uuid4())),
+        _string_column("is_empty", "no"),
+        _string_column("has_error", "no"),
+        _string_column("error", None),
+        _string_column("query_source_id", source_id),
+        _string_column("query_type", "box"),
+        _string_column("query_box_type", "cell"),
+    ]
+    columns.extend(_float_column("query_box_{}[{}]".format(corner, i), 0.0) for corner in "ab" for i in range(3))
+    return {"header": "SERVER", "categories": [_category("_density_server_result", columns)]}
+
+
+def _channel_block(channel, sampling_index, sampled, source_info, sampled_info):
+    # the box of a "cell" query is the box of the data, so the whole sampling is written
+    origin = channel.get_fractional_origin()
+    dimensions = channel.get_fractional_dimensions()
+    counts = [sampled.shape[2], sampled.shape[1], sampled.shape[0]]
+    values = sampled
+
+    columns = [_string_column("name", channel.name)]
+    columns.extend(_int_column("axis_order[{}]".format(i), channel.axis_order[i]) for i in range(3))
+    columns.extend(_float_column("origin[{}]".format(i), origin[i]) for i in range(3))
+    columns.extend(_float_column("dimensions[{}]".format(i), dimensions[i]) for i in range(3))
+    columns.append(_int_column("sample_rate", 1 << sampling_index))
+    columns.extend(_int_column("sample_count[{}]".format(i), counts[i]) for i in range(3))
+    columns.append(_int_column("spacegroup_number", channel.spacegroup_number))
+    columns.extend(_float_column("spacegroup_cell_size[{}]".format(i), channel.cell_size[i]) for i in range(3))
+    columns.extend(_float_column("spacegroup_cell_angles[{}]".format(i), channel.cell_angles[i]) for i in range(3))
+    for key in ("mean", "sigma", "min", "max"):
+        columns.append(_float_column("{}_source".format(key), source_info[key]))
+        columns.append(_float_column("{}_sampled".format(key), sampled_info[key]))
+    info = _category("_volume_data_3d_info", columns)
+
+    if np.issubdtype(values.dtype, np.int8):
+        data = _column("values", np.ascontiguousarray(values).tobytes(), [{"kind": "ByteArray", "type": BCIF_INT8}])
+    else:
+        minimum = float(values.min()) if values.size else 0.0
+        maximum = float(values.max()) if values.size else 0.0
+        encoding = [
+            {"kind": "IntervalQuantization", "min": minimum, "max": maximum, "numSteps": 255, "srcType": BCIF_FLOAT32},
+            {"kind": "ByteArray", "type": BCIF_UINT8},
+        ]
+        data = _column("values", quantize(values, minimum, maximum).tobytes(), encoding)
+    volume = _category("_volume_data_3d", [data], row_count=values.size)
+    header = "".join(channel.name.split()).upper()
+    return {"header": header, "categories": [info, volume]}
+
+
+def write_volume_server_bcif_levels(channels, output_files, source_id):
+    """
+    writes the channels as the BinaryCIF results of volume server "cell" queries at several detail levels -
+    the samplings are made once for all levels
+    :param channels: list of VolumeChannel with the same extent, origin and grid
+    :param output_files: dictionary {detail: BinaryCIF output file}
+    :param source_id: id of the volume source ("em", "x-ray")
+    :return: dictionary {detail: index of the sampling written}
+    """
+    first = channels[0]
+    for channel in channels[1:]:
+        if (channel.extent, channel.origin, channel.grid, channel.axis_order) != (first.extent, first.origin, first.grid, first.axis_order):
+            raise ValueError("map {} does not cover the same grid as {}".format(channel.name, first.name))
+    sampling_counts = get_sampling_counts(first.extent)
+    sampling_indices = {}
+    for detail in output_files:
+        sampling_indices[detail] = pick_sampling(sampling_counts, detail)
+        logger.debug("writing sampling of rate {} for detail {}".format(1 << sampling_indices[detail], detail))  # pylint: disable=logging-format-interpolation
+
+    # channel blocks by sampling index
+    blocks = {index: [] for index in sampling_indices.values()}
+    for channel in channels:
+        source_info = get_values_info(channel.values)
+        sampled = channel.values
+        for index in range(max(blocks) + 1):
+            if index:
+                sampled = downsample(sampled)
+            if index in blocks:
+                sampled_info = get_values_info(sampled) if index else source_info
+                blocks[index].append(_channel_block(channel, index, sampled, source_info, sampled_info))
+
+    for detail, output_file in output_files.items():
+        output_folder = os.path.dirname(output_file)
+        if output_folder and not os.path.exists(output_folder):
+            os.makedirs(output_folder)
+        data_blocks = [_server_block(source_id)] + blocks[sampling_indices[detail]]
+        with open(output_file, "wb") as ofh:
+            ofh.write(msgpack.packb({"version": "0.3.0", "encoder": "wwpdb.utils.dp {}".format(__version__), "dataBlocks": data_blocks}, use_bin_type=True))
+        logger.debug("output file {}".format(output_file))  # pylint: disable=logging-format-interpolation
+    return sampling_indices
+
+
+def write_volume_server_bcif(channels, output_file, source_id, detail=4):
+    """
+    writes the channels as the BinaryCIF result of a volume server "cell" query
+    :param channels: list of VolumeChannel with the same extent, origin and grid
+    :param output_file: BinaryCIF output file
+    :param source_id: id of the volume source ("em", "x-ray")
+    :param detail: detail level (0 - 6) limiting the number of voxels written
+    :return: index of the sampling written
+    """
+    return write_volume_server_bcif_levels(channels, {detail: output_file}, source_id)[detail]
@@ -1,4 +1,5 @@
 import argparse
+import concurrent.futures
 import logging
 import os
 import shutil
@@ -7,7 +8,8 @@ import tempfile
 
 import gemmi
 
-from wwpdb.utils.dp.electron_density.common_functions import convert_mdb_to_binary_cif, run_command_and_check_output_file
+from wwpdb.utils.dp.electron_density.common_functions import convert_mdb_to_binary_cif_levels, get_detail_output_path, run_command_and_check_output_file
+from wwpdb.utils.dp.electron_density.volume_server_bcif import channel_from_ccp4_map, read_ccp4_channel, write_volume_server_bcif_levels
 
 logger = logging.getLogger(__name__)
 
@@ -23,7 +25,19 @@ class XrayVolumeServerMap:
         working_dir,
         two_fofc_mmcif_map_coeff_in,
         fofc_mmcif_map_coeff_in,
+        structure=None,
+        map_workers=1,
+        in_process=False,
+        detail_levels=None,
     ):
+        """
+        :param coord_path: mmCIF coordinate file - not read if structure is given
+        :param structure: model already read with gemmi (gemmi.Structure)
+        :param map_workers: number of threads making the 2Fo-Fc and Fo-Fc maps (1 makes them one after the other)
+        :param in_process: write the BinaryCIF in process, with volume-server as fallback if node_path is set,
+            rather than with volume-server-pack and volume-server-query
+        :param detail_levels: further detail levels, each written to binary_map_out with _d<level> added
+        """
         self.coord_path = coord_path
         self.binary_map_out = binary_map_out
         self.node_path = node_path
@@ -32,27 +46,47 @@ class XrayVolumeServerMap:
         self.working_dir = working_dir
         self.two_fofc_mmcif_map_coeff_in = two_fofc_mmcif_map_coeff_in
         self.fofc_mmcif_map_coeff_in = fofc_mmcif_map_coeff_in
+        self.map_workers = max(1, int(map_workers or 1))
+        self.in_process = in_process
+        self.detail = 4
+        self.detail_levels = list(detail_levels or [])
 
         # intermediate files
         self.mdb_map_path = os.path.join(self.working_dir, "mdb_map.mdb")
         self.two_fo_fc_map = os.path.join(self.working_dir, "2fofc.map")
         self.fo_fc_map = os.path.join(self.working_dir, "fofc.map")
 
+        # model and the map box around it - read once and shared by the maps
+        self._structure = structure
+        self._fractional_box = None
+        # maps made by gemmi_sf2map by output file
+        self._ccp4_maps = {}
+
+    def get_structure(self):
+        """
+        :return: the model as gemmi.Structure, read from coord_path on first use
+        """
+        if self._structure is None:
+            self._structure = gemmi.read_structure(self.coord_path, format=gemmi.CoorFormat.Mmcif)
+        return self._structure
+
+    def get_fractional_box(self):
+        """
+        :return: fractional box around the model with a margin of 5 A
+        """
+        if self._fractional_box is None:
+            self._fractional_box = self.get_structure().calculate_fractional_box(margin=5)
+        return self._fractional_box
+
     def run_process(self):
         ok = False
-        ok1 = self.gemmi_sf2map(
-            sf_mmcif_in=self.two_fofc_mmcif_map_coeff_in,
-            map_out=self.two_fo_fc_map,
-            f_column="pdbx_FWT",
-            phi_column="pdbx_PHWT",
-        )
-        ok2 = self.gemmi_sf2map(
-            sf_mmcif_in=self.fofc_mmcif_map_coeff_in,
-            map_out=self.fo_fc_map,
-            f_column="pdbx_DELFWT",
-            phi_column="pdbx_DELPHWT",
-        )
-        if ok1 and ok2:
+        if self.make_maps():
+            if self.in_process:
+                if self.write_binary_cif():
+                    return True
+                if not self.node_path:
+                    return False
+                logger.warning("falling back to volume-server")
             ok = self.make_maps_to_serve_with_volume_server(
                 two_fofc_map_in=self.two_fo_fc_map,
                 fofc_map_in=self.fo_fc_map,
@@ -66,6 +100,74 @@ class XrayVolumeServerMap:
 
         return ok
 
+    def make_maps(self):
+        """
+        makes the 2Fo-Fc and Fo-Fc maps - on map_workers threads at the same time if more than one
+        :return: True if both worked, False if one failed
+        """
+        map_args = [
+            (self.two_fofc_mmcif_map_coeff_in, self.two_fo_fc_map, "pdbx_FWT", "pdbx_PHWT"),
+            (self.fofc_mmcif_map_coeff_in, self.fo_fc_map, "pdbx_DELFWT", "pdbx_DELPHWT"),
+        ]
+        if self.map_workers == 1:
+            return all(self.gemmi_sf2map(*args) for args in map_args)
+
+        # shared by both maps - computed before the threads start
+        try:
+            self.get_fractional_box()
+        except Exception as e:  # noqa: BLE001
+            logger.error("reading coordinates failed: {}".format(e))  # pylint: disable=logging-format-interpolation
+            return False
+        # gemmi releases the GIL during the FFT and the map writing
+        executor = concurrent.futures.ThreadPoolExecutor(max_workers=min(self.map_workers, len(map_args)))
+        futures = [executor.submit(self.gemmi_sf2map, *args) for args in map_args]
+        ok = True
+        try:
+            for future in concurrent.futures.as_completed(futures):
+                if not future.result():
+                    ok = False
+                    break
+        except Exception as e:  # noqa: BLE001
+            logger.error("making map failed: {}".format(e))  # pylint: disable=logging-format-interpolation
+            ok = False
+        if not ok:
+            # a map not started yet is dropped, a running one is waited for as the caller removes the working directory
+            for future in futures:
+                future.cancel()
+        executor.shutdown(wait=True)
+        return ok
+
+    def get_output_files(self):
+        """
+        :return: dictionary {detail: BinaryCIF output file}
+        """
+        output_files = {self.detail: self.binary_map_out}
+        for detail in self.detail_levels:
+            output_files.setdefault(detail, get_detail_output_path(self.binary_map_out, detail))
+        return output_files
+
+    def write_binary_cif(self):
+        """
+        writes the BinaryCIF volume of the 2Fo-Fc and Fo-Fc maps in process
+        :return: True if worked, False if failed
+        """
+        try:
+            channels = [self.get_channel(self.two_fo_fc_map, "2Fo-Fc"), self.get_channel(self.fo_fc_map, "Fo-Fc")]
+            write_volume_server_bcif_levels(channels, self.get_output_files(), source_id="x-ray")
+            return True
+        except Exception as e:  # noqa: BLE001
+            logger.error("writing BinaryCIF {} failed: {}".format(self.binary_map_out, e))  # pylint: disable=logging-format-interpolation
+        return False
+
+    def get_channel(self, map_path, name):
+        """
+        :return: VolumeChannel of the map made by gemmi_sf2map, or else read from map_path
+        """
+        ccp4 = self._ccp4_maps.get(map_path)
+        if ccp4 is not None:
+            return channel_from_ccp4_map(ccp4, name)
+        return read_ccp4_channel(map_path, name)
+
     def gemmi_sf2map(self, sf_mmcif_in, map_out, f_column, phi_column):
         """
         converts input mmCIF file map coefficients to map
@@ -75,8 +177,6 @@ class XrayVolumeServerMap:
         :param phi_column: PHI column
         :return: True if worked, False if failed
         """
-        st = gemmi.read_structure(self.coord_path, format=gemmi.CoorFormat.Mmcif)
-        fbox = st.calculate_fractional_box(margin=5)
         if sf_mmcif_in:
             if os.path.exists(sf_mmcif_in):
                 doc = gemmi.cif.read(sf_mmcif_in)  # pylint: disable=no-member
@@ -85,8 +185,9 @@ class XrayVolumeServerMap:
                     ccp4 = gemmi.Ccp4Map()
                     ccp4.grid = rblocks[0].transform_f_phi_to_map(f_column, phi_column)  # pylint: disable=unsubscriptable-object
                     ccp4.update_ccp4_header(2, True)
-                    ccp4.set_extent(fbox)
+                    ccp4.set_extent(self.get_fractional_box())
                     ccp4.write_ccp4_map(map_out)
+                    self._ccp4_maps[map_out] = ccp4
 
                     if os.path.exists(map_out):
                         return True
@@ -138,15 +239,16 @@ class XrayVolumeServerMap:
         return False
 
     def convert_mdb_map_to_binary_cif(self):
-        return convert_mdb_to_binary_cif(
-            map_id="x_ray_volume",
-            source_id="x-ray",
-            output_file=self.binary_map_out,
-            working_dir=self.working_dir,
-            mdb_map_path=self.mdb_map_path,
-            volume_server_query_path=self.volume_server_query_path,
-            node_path=self.node_path,
-            detail=4,
+        return bool(
+            convert_mdb_to_binary_cif_levels(
+                map_id="x_ray_volume",
+                source_id="x-ray",
+                output_files=self.get_output_files(),
+                working_dir=self.working_dir,
+                mdb_map_path=self.mdb_map_path,
+                volume_server_query_path=self.volume_server_query_path,
+                node_path=self.node_path,
+            )
         )
 
 
@@ -158,34 +260,43 @@ def run_process_with_gemmi(
     binary_map_out,
     volume_server_pack_path=None,
     volume_server_query_path=None,
+    structure=None,
+    map_workers=1,
+    in_process=False,
+    detail_levels=None,
 ):
     """
     Process 2fo-fc and fo-fc mmCIF files and convert to maps for volume server
     :param node_path: path to node executable
+    :param in_process: write the BinaryCIF in process rather than with volume-server
+    :param detail_levels: further detail levels, each written to binary_map_out with _d<level> added
     :param coord_file: path to mmCIF coordinate file
+    :param structure: model already read with gemmi (gemmi.Structure) - used instead of coord_file
+    :param map_workers: number of threads making the 2Fo-Fc and Fo-Fc maps
     :param two_fofc_mmcif_map_coeff_in: input 2Fo-Fc map coefficient mmCIF file
     :param fofc_mmcif_map_coeff_in: input Fo-Fc map coefficient mmCIF file
     :return: True if worked, False if failed
     """
 
-    if not volume_server_pack_path:
-        logger.error("volume-server-pack path must be set")
-        return False
+    if not in_process:
+        if not volume_server_pack_path:
+            logger.error("volume-server-pack path must be set")
+            return False
 
-    if not volume_server_query_path:
-        logger.error("volume-server-query path must be set")
-        return False
+        if not volume_server_query_path:
+            logger.error("volume-server-query path must be set")
+            return False
 
-    if not coord_file:
-        logger.error("coordinate file must be provided")
-        return False
+        if not node_path:
+            logger.error("node not set")
+            return False
 
-    if not node_path:
-        logger.error("node not set")
-        return False
+        if not os.path.exists(node_path):
+            logger.error("node not found: {}".format(node_path))  # pylint: disable=logging-format-interpolation
+            return False
 
-    if not os.path.exists(node_path):
-        logger.error("node not found: {}".format(node_path))  # pylint: disable=logging-format-interpolation
+    if not coord_file and structure is None:
+        logger.error("coordinate file must be provided")
         return False
 
     if not os.path.exists(two_fofc_mmcif_map_coeff_in) or not os.path.exists(fofc_mmcif_map_coeff_in):
@@ -203,6 +314,10 @@ def run_process_with_gemmi(
         two_fofc_mmcif_map_coeff_in=two_fofc_mmcif_map_coeff_in,
         fofc_mmcif_map_coeff_in=fofc_mmcif_map_coeff_in,
         volume_server_query_path=volume_server_query_path,
+        structure=structure,
+        map_workers=map_workers,
+        in_process=in_process,
+        detail_levels=detail_levels,
     )
 
     ret = xrsm.run_process()
@@ -236,10 +351,13 @@ def main():  # pragma: no cover
         type=str,
         required=True,
     )
-    parser.add_argument("--node_path", help="node program path", type=str, required=True)
+    parser.add_argument("--node_path", help="node program path", type=str)
     parser.add_argument("--coordinate_file", help="mmCIF coordinate file", type=str, required=True)
-    parser.add_argument("--volume_server_pack_path", help="volume-server-pack path", type=str, required=True)
-    parser.add_argument("--volume_server_query_path", help="volume-server-query path", type=str, required=True)
+    parser.add_argument("--volume_server_pack_path", help="volume-server-pack path", type=str)
+    parser.add_argument("--volume_server_query_path", help="volume-server-query path", type=str)
+    parser.add_argument("--in_process", help="write the BinaryCIF in process, with volume-server as fallback", action="store_true")
+    parser.add_argument("--map_workers", help="number of threads making the 2fofc and fofc maps", type=int, default=1)
+    parser.add_argument("--detail_levels", help="further detail levels to write, to binary_map_out with _d<level> added", type=int, nargs="*")
     parser.add_argument("--keep_working", help="Keep working directory", action="store_true")
     parser.add_argument(
         "-d",
@@ -263,6 +381,9 @@ def main():  # pragma: no cover
         fofc_mmcif_map_coeff_in=args.fofc_mmcif_map_coeff_in,
         coord_file=args.coordinate_file,
         binary_map_out=args.binary_map_out,
+        map_workers=args.map_workers,
+        in_process=args.in_process,
+        detail_levels=args.detail_levels,
     )
 
     if not ok: